@@ -4,6 +4,7 @@ import yaml
 from typing import Dict, Any, Optional
 from pathlib import Path
 from config_validator import ConfigValidator
+from vms_client import CachedVASTClient, VMSCache
 
 class ConfigLoader:
     """Centralized configuration loader for all Orbital Dynamics labs"""
@@ -13,6 +14,7 @@ class ConfigLoader:
         self.secrets_path = Path(secrets_path)
         self.config = {}
         self.secrets = {}
+        self._vast_client = None
         
         self._load_config()
         self._load_secrets()
@@ -110,6 +112,40 @@ class ConfigLoader:
         # Remove empty values to avoid passing None to vastpy
         return {k: v for k, v in vast_config.items() if v}
     
+    def get_vast_client(self):
+        """Shared vastpy client for the configured VMS
+        
+        Created once per loader and, unless vast.cache.enabled is false,
+        wrapped in a CachedVASTClient: GET responses are cached per resource
+        (vast.cache.ttl_seconds), identical concurrent GETs share one request
+        and writes invalidate the resource they change.
+        """
+        if self._vast_client is None:
+            from vastpy import VASTClient
+            
+            vast_config = self.get_vast_config()
+            # vastpy constructs URLs as https://{address}/... so we need to strip protocol
+            address = vast_config['address']
+            if address.startswith('https://'):
+                address = address[8:]
+            elif address.startswith('http://'):
+                address = address[7:]
+            
+            client_params = {'address': address}
+            if vast_config.get('token'):
+                client_params['token'] = vast_config['token']
+            else:
+                client_params['user'] = vast_config.get('user')
+                client_params['password'] = vast_config.get('password')
+            if vast_config.get('version'):
+                client_params['version'] = vast_config['version']
+            
+            client = VASTClient(**client_params)
+            if self.get('vast.cache.enabled', True):
+                client = CachedVASTClient(client, VMSCache(ttls=self.get('vast.cache.ttl_seconds', {})))
+            self._vast_client = client
+        return self._vast_client
+    
     def get_lab_config(self, lab_name: str) -> Dict:
         """Get configuration specific to a particular lab"""
         return self.config.get(lab_name, {})
@@ -0,0 +1,215 @@
+# async_monitor.py
+import asyncio
+import logging
+import math
+import random
+from datetime import datetime
+from typing import Dict, Optional
+
+import requests
+
+from quota_snapshot import QuotaSnapshot
+
+logger = logging.getLogger(__name__)
+
+PAGERDUTY_EVENTS_URL = 'https://events.pagerduty.com/v2/enqueue'
+PAGERDUTY_SEVERITY = {'CRITICAL': 'critical', 'WARNING': 'warning', 'INFO': 'info'}
+
+
+class AlertDispatcher:
+    """Delivers alerts to the console, Slack and PagerDuty from a queue
+
+    Monitoring only enqueues alerts; one background task posts them, so a
+    slow or unreachable webhook never delays a cycle. When the queue is full
+    new alerts are dropped and counted.
+    """
+
+    def __init__(self, config, queue_size: int = 100, timeout: float = 10.0):
+        self.slack_webhook_url = config.get_secret('slack_webhook_url')
+        self.pagerduty_routing_key = config.get_secret('pagerduty_api_key')
+        self.pagerduty_levels = set(config.get('lab1.alerts.pagerduty_levels', ['CRITICAL']))
+        self.timeout = timeout
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.stats = {'queued': 0, 'sent': 0, 'failed': 0, 'dropped': 0}
+
+    def submit(self, message: str, level: str = 'INFO') -> bool:
+        """Queue an alert without waiting; False when it had to be dropped"""
+        alert = {'message': message, 'level': level, 'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+        try:
+            self.queue.put_nowait(alert)
+            self.stats['queued'] += 1
+            return True
+        except asyncio.QueueFull:
+            self.stats['dropped'] += 1
+            logger.warning(f"⚠️  Alert queue full, dropped alert: {message}")
+            return False
+
+    async def run(self):
+        """Deliver queued alerts until cancelled"""
+        while True:
+            alert = await self.queue.get()
+            try:
+                await self._deliver(alert)
+            finally:
+                self.queue.task_done()
+
+    async def _deliver(self, alert: Dict):
+        logger.info(f"🔔 ALERT [{alert['level']}]: {alert['message']}")
+
+        posts = []
+        if self.slack_webhook_url:
+            posts.append(('Slack', self.slack_webhook_url,
+                          {'text': f"[{alert['level']}] {alert['message']}"}))
+        if self.pagerduty_routing_key and alert['level'] in self.pagerduty_levels:
+            posts.append(('PagerDuty', PAGERDUTY_EVENTS_URL, {
+                'routing_key': self.pagerduty_routing_key,
+                'event_action': 'trigger',
+                'payload': {
+                    'summary': alert['message'],
+                    'source': 'orbital-dynamics-lab1',
+                    'severity': PAGERDUTY_SEVERITY.get(alert['level'], 'info'),
+                    'timestamp': alert['timestamp'],
+                },
+            }))
+
+        for channel, url, payload in posts:
+            try:
+                response = await asyncio.to_thread(requests.post, url, json=payload, timeout=self.timeout)
+                response.raise_for_status()
+                self.stats['sent'] += 1
+            except Exception as e:
+                self.stats['failed'] += 1
+                logger.warning(f"⚠️  Could not send alert to {channel}: {e}")
+
+
+class AsyncStorageMonitor:
+    """Runs OrbitalDynamicsStorageManager cycles on an asyncio schedule
+
+    VMS calls run in worker threads (vastpy is synchronous) with at most
+    ``max_concurrency`` in flight: the quota and view listings of a cycle
+    are fetched together and expansions of different views proceed in
+    parallel. Cycles start on a fixed grid (start + n * interval) offset by
+    random jitter, so slow cycles do not push later ones back and several
+    monitors do not poll VMS in step. Cycle duration and start lag are kept
+    in ``metrics``.
+    """
+
+    def __init__(self, manager, config):
+        self.manager = manager
+        self.interval = float(manager.monitoring_interval)
+        self.max_concurrency = max(1, int(config.get('lab1.monitoring.max_concurrency', 4)))
+        # Jitter is capped at half the interval so cycles can never swap order
+        self.jitter = min(float(config.get('lab1.monitoring.jitter_seconds', 10)), self.interval / 2)
+        self.alerts = AlertDispatcher(
+            config,
+            queue_size=config.get('lab1.alerts.queue_size', 100),
+            timeout=config.get('lab1.alerts.timeout_seconds', 10),
+        )
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.metrics = {
+            'cycles': 0,
+            'failed_cycles': 0,
+            'skipped_cycles': 0,
+            'last_duration_seconds': None,
+            'max_duration_seconds': 0.0,
+            'last_lag_seconds': None,
+            'max_lag_seconds': 0.0,
+        }
+
+    async def _call(self, fn, *args):
+        """Run a blocking VMS call in a worker thread under the concurrency cap"""
+        async with self._semaphore:
+            return await asyncio.to_thread(fn, *args)
+
+    async def fetch_snapshot(self) -> QuotaSnapshot:
+        """List quotas and views concurrently"""
+        client = self.manager.client
+        paths = self.manager.get_monitored_paths()
+        (quotas, quota_calls), (views, view_calls) = await asyncio.gather(
+            self._call(QuotaSnapshot.fetch_resource, client.quotas, 'quotas', paths),
+            self._call(QuotaSnapshot.fetch_resource, client.views, 'views', paths),
+        )
+        return QuotaSnapshot(quotas, views, api_calls=quota_calls + view_calls)
+
+    async def run_cycle(self) -> Dict[str, Dict]:
+        """One monitoring cycle: snapshot, status, alerts and concurrent expansions"""
+        logger.info("Starting monitoring cycle...")
+        snapshot = await self.fetch_snapshot()
+        status = self.manager.monitor_all_views(snapshot)
+
+        needs_expansion = {path: view_status for path, view_status in status.items()
+                           if view_status['status'] == 'NEEDS_EXPANSION'}
+        for view_path, view_status in needs_expansion.items():
+            self.alerts.submit(
+                f"Storage expansion needed: {view_path} at {view_status['utilization']:.1f}% utilization",
+                'INFO'
+            )
+
+        async def expand(view_path: str, view_status: Dict):
+            size_tb = self.manager.get_expansion_size_tb(view_path, view_status)
+            logger.info(f"Auto-expanding quota for {view_path} (utilization: {view_status['utilization']:.1f}%)")
+            return await self._call(self.manager.expand_view_quota, view_path, size_tb)
+
+        results = await asyncio.gather(*[expand(path, view_status) for path, view_status in needs_expansion.items()])
+        expanded_views = [path for path, expanded in zip(needs_expansion, results) if expanded]
+        failed_views = [path for path, expanded in zip(needs_expansion, results) if not expanded]
+
+        if expanded_views:
+            self.alerts.submit(f"Auto-expanded quotas for: {', '.join(expanded_views)}", 'INFO')
+        if failed_views:
+            self.alerts.submit(f"Auto-expansion failed for: {', '.join(failed_views)}", 'CRITICAL')
+
+        return status
+
+    async def run(self, max_cycles: Optional[int] = None):
+        """Run cycles until cancelled (or ``max_cycles`` have run)"""
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        dispatcher = asyncio.create_task(self.alerts.run())
+        loop = asyncio.get_running_loop()
+        origin = loop.time()
+        slot = 0
+
+        logger.info(f"🚀 Async monitoring every {self.interval:.0f}s (±{self.jitter:.0f}s jitter, "
+                    f"{self.max_concurrency} concurrent VMS calls)")
+        try:
+            while max_cycles is None or self.metrics['cycles'] < max_cycles:
+                scheduled = origin + slot * self.interval
+                delay = scheduled + random.uniform(-self.jitter, self.jitter) - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                started = loop.time()
+                try:
+                    status = await self.run_cycle()
+                    needs_expansion_count = sum(1 for s in status.values() if s['status'] == 'NEEDS_EXPANSION')
+                    logger.info(f"Monitoring cycle complete - Views needing expansion: {needs_expansion_count}")
+                except Exception as e:
+                    self.metrics['failed_cycles'] += 1
+                    logger.error(f"❌ Monitoring cycle failed: {e}")
+                self._record_cycle(started - scheduled, loop.time() - started)
+
+                # Next slot on the grid; slots already in the past are skipped rather than run back to back
+                next_slot = max(slot + 1, math.floor((loop.time() - origin) / self.interval) + 1)
+                if next_slot > slot + 1:
+                    self.metrics['skipped_cycles'] += next_slot - slot - 1
+                    logger.warning(f"⚠️  Cycle overran the {self.interval:.0f}s interval, "
+                                   f"skipping {next_slot - slot - 1} cycle(s)")
+                slot = next_slot
+        finally:
+            # Give queued alerts a chance to go out before stopping
+            try:
+                await asyncio.wait_for(self.alerts.queue.join(), timeout=self.alerts.timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"⚠️  {self.alerts.queue.qsize()} alerts not delivered")
+            dispatcher.cancel()
+
+    def _record_cycle(self, lag: float, duration: float):
+        metrics = self.metrics
+        metrics['cycles'] += 1
+        metrics['last_duration_seconds'] = duration
+        metrics['max_duration_seconds'] = max(metrics['max_duration_seconds'], duration)
+        metrics['last_lag_seconds'] = lag
+        metrics['max_lag_seconds'] = max(metrics['max_lag_seconds'], lag)
+        logger.info(f"⏱️  Cycle {metrics['cycles']}: {duration:.2f}s, started {lag:+.2f}s from schedule "
+                    f"(alerts sent {self.alerts.stats['sent']}, failed {self.alerts.stats['failed']}, "
+                    f"dropped {self.alerts.stats['dropped']})")
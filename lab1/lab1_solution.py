@@ -1,13 +1,18 @@
 # lab1_solution.py
+import asyncio
+import math
 import time
 import logging
 import sys
 import argparse
 from datetime import datetime, timedelta
-from vastpy import VASTClient
 from typing import Dict, List, Optional
 from lab1_config import Lab1ConfigLoader
 from safety_checker import SafetyChecker, SafetyCheckFailed
+from async_monitor import AsyncStorageMonitor
+from quota_snapshot import QuotaSnapshot, quota_usage, utilization_percent
+from utilization_history import UtilizationHistory
+from vms_client import CachedVASTClient
 
 # Configure logging
 logging.basicConfig(
@@ -26,47 +31,10 @@ class OrbitalDynamicsStorageManager:
             production_mode: If True, allows actual changes. If False, dry-run only.
         """
         self.production_mode = production_mode
-        # Load VAST configuration
-        vast_config = config.get_vast_config()
-        
-        # Build VAST client parameters dynamically based on what's available
-        # vastpy constructs URLs as https://{address}/... so we need to strip protocol
-        address = vast_config['address']
-        if address.startswith('https://'):
-            address = address[8:]  # Remove 'https://' prefix
-        elif address.startswith('http://'):
-            address = address[7:]   # Remove 'http://' prefix
-        
-        client_params = {
-            'user': vast_config['user'],
-            'password': vast_config['password'],
-            'address': address
-        }
-        
-        # Add optional parameters only if they exist and are supported
-        if vast_config.get('token'):
-            client_params['token'] = vast_config['token']
-        if vast_config.get('version'):
-            client_params['version'] = vast_config['version']
-        
-        # Note: tenant_name is not supported in vastpy 0.3.17
-        # It will be ignored if not supported by the version
-        
-        try:
-            self.client = VASTClient(**client_params)
-            logger.info("✅ VAST client initialized successfully")
-        except TypeError as e:
-            # Handle unsupported parameters gracefully
-            if "tenant_name" in str(e):
-                logger.warning("⚠️  tenant_name parameter not supported in this vastpy version, retrying without it")
-                # Remove tenant_name and retry
-                if 'tenant_name' in client_params:
-                    del client_params['tenant_name']
-                self.client = VASTClient(**client_params)
-                logger.info("✅ VAST client initialized successfully (without tenant_name)")
-            else:
-                # Re-raise other TypeError exceptions
-                raise
+        # Shared VAST client from the config loader: GET responses are cached per
+        # resource and writes invalidate them (vast.cache settings)
+        self.client = config.get_vast_client()
+        logger.info("✅ VAST client initialized successfully")
         
         # Load configuration values
         self.config = config
@@ -97,6 +65,12 @@ class OrbitalDynamicsStorageManager:
         # Monitoring settings - ALL VALUES MUST BE EXPLICITLY CONFIGURED
         self.monitoring_interval = config.get('lab1.monitoring.interval_seconds')
         
+        # Growth forecasting: expand views expected to fill within lead_time_hours,
+        # sized to absorb expansion_horizon_hours of observed growth
+        self.history = UtilizationHistory.from_config(config)
+        self.forecast_lead_hours = config.get('lab1.forecast.lead_time_hours', 24)
+        self.expansion_horizon_hours = config.get('lab1.forecast.expansion_horizon_hours', 168)
+        
         # Initialize safety checker
         self.safety_checker = SafetyChecker(config, self.client)
         
@@ -108,68 +82,63 @@ class OrbitalDynamicsStorageManager:
         else:
             logger.warning("🚨 PRODUCTION MODE: Actual changes will be made to your VAST system")
     
-    def show_current_view_status(self):
+    def get_monitored_paths(self) -> List[str]:
+        """Paths of all configured views that are monitored"""
+        return [path for path in [self.raw_data_path, self.processed_data_path, self.temp_data_path] if path]
+    
+    def fetch_snapshot(self) -> QuotaSnapshot:
+        """Fetch all quotas and views once for this cycle (two VMS calls)"""
+        return QuotaSnapshot.fetch(self.client, self.get_monitored_paths())
+    
+    def show_current_view_status(self, snapshot: Optional[QuotaSnapshot] = None):
         """Display current status of all target views"""
         logger.info("\n" + "="*60)
         logger.info("🔍 CURRENT VIEW STATUS")
         logger.info("="*60)
         
-        view_paths = [path for path in [self.raw_data_path, self.processed_data_path, self.temp_data_path] if path]
+        view_paths = self.get_monitored_paths()
         
         if not view_paths:
             logger.warning("⚠️  No view paths configured")
             return
         
+        try:
+            snapshot = snapshot or self.fetch_snapshot()
+        except Exception as e:
+            logger.warning(f"⚠️  Could not check view status: {e}")
+            return
+        
         for view_path in view_paths:
-            try:
-                existing = self.client.views.get(path=view_path)
-                if existing and len(existing) > 0:
-                    view = existing[0]
-                    view_id = view['id']
-                    
-                    # Get quota information
-                    try:
-                        quotas = self.client.quotas.get(path=view_path)
-                        if quotas:
-                            quota_info = quotas[0]
-                            used_capacity = quota_info.get('used_capacity', 0)
-                            hard_limit = quota_info.get('hard_limit', 0)
-                            soft_limit = quota_info.get('soft_limit', 0)
-                            
-                            # Convert to GB for display
-                            size_gb = used_capacity / (1024**3) if used_capacity else 0
-                            hard_limit_gb = hard_limit / (1024**3) if hard_limit else 0
-                            soft_limit_gb = soft_limit / (1024**3) if soft_limit else 0
-                            
-                            # Use hard limit for utilization calculation
-                            quota_for_calc = hard_limit if hard_limit > 0 else soft_limit
-                            if quota_for_calc > 0:
-                                utilization = (used_capacity / quota_for_calc) * 100
-                                status_icon = "🟢" if utilization < self.warning_threshold else "🟡" if utilization < self.critical_threshold else "🔴"
-                                logger.info(f"{status_icon} {view_path}")
-                                logger.info(f"    📊 Size: {size_gb:.2f} GB")
-                                if soft_limit_gb > 0:
-                                    logger.info(f"    ⚠️  Soft Limit: {soft_limit_gb:.2f} GB")
-                                if hard_limit_gb > 0:
-                                    logger.info(f"    🚫 Hard Limit: {hard_limit_gb:.2f} GB")
-                                logger.info(f"    📈 Utilization: {utilization:.1f}%")
-                            else:
-                                logger.info(f"📁 {view_path}")
-                                logger.info(f"    📊 Size: {size_gb:.2f} GB (no quota set)")
-                        else:
-                            logger.info(f"📁 {view_path}")
-                            logger.info(f"    📊 Size: 0.00 GB (no quota set)")
-                        
-                        logger.info(f"    🆔 View ID: {view_id}")
-                        
-                    except Exception as e:
-                        logger.info(f"📁 {view_path}")
-                        logger.info(f"    ⚠️  Could not get quota info: {e}")
-                        logger.info(f"    🆔 View ID: {view_id}")
+            view = snapshot.view(view_path)
+            if not view:
+                logger.info(f"❌ {view_path} - NOT FOUND")
+                continue
+            
+            usage = snapshot.usage(view_path)
+            if usage:
+                # Convert to GB for display
+                size_gb = usage['used_capacity'] / (1024**3)
+                hard_limit_gb = usage['hard_limit'] / (1024**3)
+                soft_limit_gb = usage['soft_limit'] / (1024**3)
+                
+                utilization = utilization_percent(usage)
+                if utilization is not None:
+                    status_icon = "🟢" if utilization < self.warning_threshold else "🟡" if utilization < self.critical_threshold else "🔴"
+                    logger.info(f"{status_icon} {view_path}")
+                    logger.info(f"    📊 Size: {size_gb:.2f} GB")
+                    if soft_limit_gb > 0:
+                        logger.info(f"    ⚠️  Soft Limit: {soft_limit_gb:.2f} GB")
+                    if hard_limit_gb > 0:
+                        logger.info(f"    🚫 Hard Limit: {hard_limit_gb:.2f} GB")
+                    logger.info(f"    📈 Utilization: {utilization:.1f}%")
                 else:
-                    logger.info(f"❌ {view_path} - NOT FOUND")
-            except Exception as e:
-                logger.warning(f"⚠️  {view_path} - Could not check status: {e}")
+                    logger.info(f"📁 {view_path}")
+                    logger.info(f"    📊 Size: {size_gb:.2f} GB (no quota set)")
+            else:
+                logger.info(f"📁 {view_path}")
+                logger.info(f"    📊 Size: 0.00 GB (no quota set)")
+            
+            logger.info(f"    🆔 View ID: {view['id']}")
         
         logger.info("="*60)
     
@@ -187,25 +156,21 @@ class OrbitalDynamicsStorageManager:
             logger.info(f"📋 Using view policy: {default_policy.get('name', 'default')} (ID: {default_policy['id']})")
             
             # Filter out None paths and show what we're working with
-            view_paths = [path for path in [self.raw_data_path, self.processed_data_path, self.temp_data_path] if path]
+            view_paths = self.get_monitored_paths()
             logger.info(f"🎯 Target view paths: {len(view_paths)} directories")
             
             # Check existing views first
             existing_views = []
             missing_views = []
             
+            snapshot = self.fetch_snapshot()
             for view_path in view_paths:
-                try:
-                    existing = self.client.views.get(path=view_path)
-                    if existing:
-                        existing_views.append(view_path)
-                        logger.info(f"✅ View already exists: {view_path}")
-                    else:
-                        missing_views.append(view_path)
-                        logger.info(f"📁 View does not exist: {view_path}")
-                except Exception as e:
-                    logger.warning(f"⚠️  Could not check view {view_path}: {e}")
+                if snapshot.view(view_path):
+                    existing_views.append(view_path)
+                    logger.info(f"✅ View already exists: {view_path}")
+                else:
                     missing_views.append(view_path)
+                    logger.info(f"📁 View does not exist: {view_path}")
             
             # Summary of current state
             logger.info(f"\n📊 VIEW STATUS SUMMARY:")
@@ -234,28 +199,26 @@ class OrbitalDynamicsStorageManager:
             logger.error(f"❌ Failed to setup initial views: {e}")
             return False
     
-    def get_view_utilization(self, view_path: str) -> Optional[float]:
-        """Get current utilization percentage for a view"""
+    def get_view_utilization(self, view_path: str, snapshot: Optional[QuotaSnapshot] = None) -> Optional[float]:
+        """Get current utilization percentage for a view
+        
+        With a snapshot the value comes from memory; without one the quota
+        is fetched for this path alone.
+        """
         try:
-            # Get quota information from quotas endpoint
-            quotas = self.client.quotas.get(path=view_path)
-            if not quotas:
+            if snapshot is not None:
+                usage = snapshot.usage(view_path)
+            else:
+                # Get quota information from quotas endpoint
+                quotas = self.client.quotas.get(path=view_path)
+                usage = quota_usage(quotas[0]) if quotas else None
+            
+            if usage is None:
                 logger.warning(f"No quota found for path: {view_path}")
                 return None
             
-            quota_info = quotas[0]
-            used_capacity = quota_info.get('used_capacity', 0)
-            hard_limit = quota_info.get('hard_limit', 0)
-            soft_limit = quota_info.get('soft_limit', 0)
-            
             # Use hard limit for utilization calculation (actual storage capacity)
-            quota_for_calc = hard_limit if hard_limit > 0 else soft_limit
-            
-            if quota_for_calc > 0:
-                utilization = (used_capacity / quota_for_calc) * 100
-                return utilization
-            
-            return None
+            return utilization_percent(usage)
             
         except Exception as e:
             logger.error(f"Failed to get utilization for {view_path}: {e}")
@@ -289,7 +252,7 @@ class OrbitalDynamicsStorageManager:
             
             quota_info = quotas[0]
             current_hard_limit = quota_info.get('hard_limit', 0)
-            new_hard_limit = current_hard_limit + (additional_size_tb * 1024 * 1024 * 1024)  # Convert TB to bytes
+            new_hard_limit = current_hard_limit + additional_size_tb * 1024**4  # Convert TB to bytes
             
             if self.production_mode:
                 # Actually perform the expansion
@@ -319,33 +282,65 @@ class OrbitalDynamicsStorageManager:
             logger.error(f"Failed to expand quota for {view_path}: {e}")
             return False
     
-    def monitor_all_views(self) -> Dict[str, Dict]:
-        """Monitor utilization for all views and return status"""
-        views_to_monitor = [
-            self.raw_data_path,
-            self.processed_data_path,
-            self.temp_data_path
-        ]
-        # Filter out None values
-        views_to_monitor = [path for path in views_to_monitor if path is not None]
+    def monitor_all_views(self, snapshot: Optional[QuotaSnapshot] = None) -> Dict[str, Dict]:
+        """Monitor utilization for all views and return status
+        
+        All views are evaluated against one snapshot of the cluster's quotas,
+        so a cycle costs the same two VMS calls however many views it checks.
+        """
+        views_to_monitor = self.get_monitored_paths()
         
+        if snapshot is None:
+            try:
+                snapshot = self.fetch_snapshot()
+            except Exception as e:
+                logger.error(f"Failed to fetch quotas: {e}")
+        
+        forecasts = self._update_forecasts(snapshot, views_to_monitor) if snapshot is not None else {}
         status = {}
         
         for view_path in views_to_monitor:
-            utilization = self.get_view_utilization(view_path)
+            utilization = self.get_view_utilization(view_path, snapshot) if snapshot is not None else None
+            forecast = forecasts.get(view_path, {})
+            hours_to_full = forecast.get('hours_to_full')
             
             status[view_path] = {
                 'utilization': utilization,
                 'status': self._get_status_level(utilization),
                 'needs_expansion': utilization and utilization > self.critical_threshold,
+                'growth_bytes_per_hour': forecast.get('growth_bytes_per_hour'),
+                'hours_to_full': hours_to_full,
                 'timestamp': datetime.now().isoformat()
             }
             
+            # Pre-expand ahead of the critical threshold when the view is forecast to fill soon
+            if (utilization is not None and status[view_path]['status'] != 'NEEDS_EXPANSION'
+                    and hours_to_full is not None and hours_to_full <= self.forecast_lead_hours):
+                status[view_path]['status'] = 'NEEDS_EXPANSION'
+                status[view_path]['needs_expansion'] = True
+                logger.info(f"📈 {view_path} forecast to fill in {hours_to_full:.1f}h "
+                            f"(lead time {self.forecast_lead_hours}h)")
+            
             utilization_str = f"{utilization:.1f}%" if utilization is not None else "Unknown"
-            logger.info(f"{view_path}: {utilization_str} utilization - {status[view_path]['status']}")
+            growth_str = ""
+            if forecast.get('growth_bytes_per_hour'):
+                growth_str = f", growing {forecast['growth_bytes_per_hour'] / (1024**3):.2f} GB/h"
+            logger.info(f"{view_path}: {utilization_str} utilization{growth_str} - {status[view_path]['status']}")
+        
+        if snapshot is not None:
+            logger.info(f"📡 Checked {len(views_to_monitor)} views with {snapshot.api_calls} VMS calls")
         
         return status
     
+    def _update_forecasts(self, snapshot: QuotaSnapshot, view_paths: List[str]) -> Dict[str, Dict]:
+        """Record this cycle's samples and return the growth forecast for each view"""
+        try:
+            self.history.record(snapshot, view_paths)
+            return self.history.forecast(view_paths, now=snapshot.fetched_at.timestamp())
+        except Exception as e:
+            logger.warning(f"⚠️  Growth forecast unavailable: {e}")
+            return {}
+    
     def _get_status_level(self, utilization: Optional[float]) -> str:
         """Determine status level based on utilization"""
         if utilization is None:
@@ -357,6 +352,21 @@ class OrbitalDynamicsStorageManager:
         else:
             return 'NORMAL'
     
+    def get_expansion_size_tb(self, view_path: str, view_status: Dict) -> int:
+        """How much to add to a view's quota when it needs expansion
+        
+        With a growth forecast, enough for ``expansion_horizon_hours`` of the
+        observed growth times ``expansion_factor`` (at least 1TB, at most
+        ``max_expansion_gb``); otherwise a simple 1TB expansion.
+        """
+        growth = view_status.get('growth_bytes_per_hour')
+        if not growth or growth <= 0:
+            return 1
+        
+        needed_tb = growth * self.expansion_horizon_hours * (self.auto_expand_size or 1) / (1024**4)
+        max_tb = max(1, int((self.max_expansion_gb or 1024) // 1024))
+        return min(max(1, math.ceil(needed_tb)), max_tb)
+    
     def auto_expand_if_needed(self, status: Dict[str, Dict]) -> List[str]:
         """Automatically expand quotas for views that need it"""
         expanded_views = []
@@ -365,8 +375,7 @@ class OrbitalDynamicsStorageManager:
             if view_status['status'] == 'NEEDS_EXPANSION':
                 logger.info(f"Auto-expanding quota for {view_path} (utilization: {view_status['utilization']:.1f}%)")
                 
-                # Use a simple 1TB expansion
-                expansion_size_tb = 1
+                expansion_size_tb = self.get_expansion_size_tb(view_path, view_status)
                 if self.expand_view_quota(view_path, expansion_size_tb):
                     expanded_views.append(view_path)
                     logger.info(f"✅ Successfully expanded {view_path} by {expansion_size_tb}TB")
@@ -584,6 +593,8 @@ def main():
                        help='Only create views and check setup, then exit')
     parser.add_argument('--monitor-only', action='store_true',
                        help='Only run monitoring, skip setup')
+    parser.add_argument('--async-monitor', action='store_true',
+                       help='Run monitoring cycles with asyncio: concurrent VMS calls, queued alerts, jittered schedule')
     
     args = parser.parse_args()
     
@@ -603,6 +614,7 @@ def main():
         print("⚠️  DRY RUN MODE: No actual changes will be made")
         print("💡 Use --pushtoprod to enable production mode")
     
+    storage_manager = None
     try:
         # Load configuration
         config = Lab1ConfigLoader()
@@ -649,6 +661,10 @@ def main():
         
         # Run continuous monitoring
         logger.info("Starting continuous monitoring...")
+        if args.async_monitor:
+            asyncio.run(AsyncStorageMonitor(storage_manager, config).run())
+            return
+        
         while True:
             status = storage_manager.run_monitoring_cycle()
             
@@ -664,6 +680,13 @@ def main():
         logger.info("Monitoring stopped by user")
     except Exception as e:
         logger.error(f"Monitoring failed: {e}")
+    finally:
+        if storage_manager is not None:
+            storage_manager.history.flush()
+            if isinstance(storage_manager.client, CachedVASTClient):
+                stats = storage_manager.client.cache_stats()
+                logger.info(f"📡 VMS cache: {stats['hits']} hits, {stats['coalesced']} coalesced, "
+                            f"{stats['misses'] + stats['uncached']} requests sent")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
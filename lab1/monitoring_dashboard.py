@@ -1,54 +1,72 @@
 # monitoring_dashboard.py
 import time
 import json
+import threading
 from datetime import datetime
-from vastpy import VASTClient
+from typing import Optional, Tuple
 from lab1_config import Lab1ConfigLoader
+from quota_snapshot import QuotaSnapshot, quota_usage
 from rich.console import Console, Group
 from rich.live import Live
 from rich.table import Table
 from rich.panel import Panel
 from rich.text import Text
 
+class SnapshotFetcher:
+    """Background thread that keeps one shared quota/view snapshot fresh
+    
+    Each refresh is a single bulk listing of quotas and views, however many
+    views the dashboard shows; every panel reads the latest snapshot.
+    """
+    
+    def __init__(self, client, view_paths, interval: float):
+        self.client = client
+        self.view_paths = view_paths
+        self.interval = interval
+        self.snapshot: Optional[QuotaSnapshot] = None
+        self.version = 0
+        self.error: Optional[str] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='snapshot-fetcher', daemon=True)
+    
+    def start(self):
+        self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=5)
+    
+    def latest(self) -> Tuple[Optional[QuotaSnapshot], int]:
+        """(latest snapshot or None, version increasing with every successful fetch)"""
+        with self._lock:
+            return self.snapshot, self.version
+    
+    def refresh(self):
+        """Fetch a new snapshot now; on failure the previous one is kept"""
+        try:
+            snapshot = QuotaSnapshot.fetch(self.client, self.view_paths)
+            with self._lock:
+                self.snapshot = snapshot
+                self.version += 1
+                self.error = None
+        except Exception as e:
+            with self._lock:
+                self.error = str(e)
+    
+    def _run(self):
+        while not self._stop.is_set():
+            self.refresh()
+            self._stop.wait(self.interval)
+
 class StorageDashboard:
     """Real-time storage monitoring dashboard"""
     
     def __init__(self):
         self.config = Lab1ConfigLoader()
-        vast_config = self.config.get_vast_config()
-        # Build VAST client parameters dynamically based on what's available
-        # vastpy constructs URLs as https://{address}/... so we need to strip protocol
-        address = vast_config['address']
-        if address.startswith('https://'):
-            address = address[8:]  # Remove 'https://' prefix
-        elif address.startswith('http://'):
-            address = address[7:]   # Remove 'http://' prefix
-        
-        client_params = {
-            'user': vast_config['user'],
-            'password': vast_config['password'],
-            'address': address
-        }
-        
-        # Add optional parameters only if they exist and are supported
-        if vast_config.get('token'):
-            client_params['token'] = vast_config['token']
-        if vast_config.get('version'):
-            client_params['version'] = vast_config['version']
-        
-        try:
-            self.client = VASTClient(**client_params)
-        except TypeError as e:
-            # Handle unsupported parameters gracefully
-            if "tenant_name" in str(e):
-                print("⚠️  tenant_name parameter not supported in this vastpy version, retrying without it")
-                # Remove tenant_name and retry
-                if 'tenant_name' in client_params:
-                    del client_params['tenant_name']
-                self.client = VASTClient(**client_params)
-            else:
-                # Re-raise other TypeError exceptions
-                raise
+        # Shared, cached VAST client (see vms_client.py)
+        self.client = self.config.get_vast_client()
         
         # Get view paths from the lab1.views configuration
         views_config = self.config.get('lab1.views', {})
@@ -66,6 +84,20 @@ class StorageDashboard:
         # Get refresh interval from config
         self.refresh_interval = self.config.get('lab1.monitoring.refresh_interval_seconds', 30)
         
+        # Per-panel refresh intervals: table and summary follow the data, the status panel shows its age
+        self.panel_refresh = {
+            'table': self.config.get('lab1.dashboard.table_refresh_seconds', self.refresh_interval),
+            'summary': self.config.get('lab1.dashboard.summary_refresh_seconds', self.refresh_interval),
+            'status': self.config.get('lab1.dashboard.status_refresh_seconds', 1),
+        }
+        self.max_rows = self.config.get('lab1.dashboard.max_rows', 50)
+        
+        # One background fetcher shared by all panels
+        self.fetcher = SnapshotFetcher(self.client, self.view_paths, self.refresh_interval)
+        self._panels = {}
+        self._panel_state = {}
+        self._row_cache = {}
+        
         # Initialize Rich console
         self.console = Console()
         
@@ -89,23 +121,23 @@ class StorageDashboard:
         else:  # KB or bytes
             return f"{bytes_value / 1000:.2f} KB"
     
-    def get_view_status(self, view_path: str) -> dict:
-        """Get detailed status for a specific view"""
+    def get_view_status(self, view_path: str, snapshot: Optional[QuotaSnapshot] = None) -> dict:
+        """Get detailed status for a specific view from a quota/view snapshot (no VMS calls)"""
         try:
-            # Check if we can connect to VAST
-            if not hasattr(self.client, 'views') or self.client.views is None:
+            snapshot = snapshot or self.current_snapshot()
+            if snapshot is None:
                 return {
                     'path': view_path,
                     'status': 'CONNECTION_ERROR',
-                    'error': 'VAST client not properly initialized',
+                    'error': self.fetcher.error or 'No data from VAST yet',
                     'utilization': 0,
                     'size': 0,
                     'quota': 0,
                     'available': 0
                 }
             
-            views = self.client.views.get(path=view_path)
-            if not views:
+            view = snapshot.view(view_path)
+            if not view:
                 return {
                     'path': view_path,
                     'status': 'NOT_FOUND',
@@ -115,39 +147,15 @@ class StorageDashboard:
                     'available': 0
                 }
             
-            view = views[0]
-            view_id = view['id']
-            
-            # Get detailed information from view
-            view_details = self.client.views[view_id].get()
-            
-            # Get quota information from quotas endpoint
-            quotas = self.client.quotas.get(path=view_path)
-            
-            # Get quota information first
-            soft_limit = 0
-            hard_limit = 0
-            size = 0
-            
-            if quotas:
-                quota_info = quotas[0]
-                soft_limit = quota_info.get('soft_limit', 0)
-                hard_limit = quota_info.get('hard_limit', 0)
-                used_capacity = quota_info.get('used_capacity', 0)
+            usage = snapshot.usage(view_path)
+            if usage:
                 # Use the quota's used capacity for size (this is what utilization is based on)
-                size = used_capacity
+                size = usage['used_capacity']
+                soft_limit = usage['soft_limit']
+                hard_limit = usage['hard_limit']
             else:
-                print(f"   No quota found for path: {view_path}")
                 # Fallback to view's logical capacity if no quota
-                size = view_details.get('logical_capacity', 0)
-            
-            # Convert to int if they're strings or floats
-            try:
-                size = int(float(size)) if size is not None else 0
-                soft_limit = int(float(soft_limit)) if soft_limit is not None else 0
-                hard_limit = int(float(hard_limit)) if hard_limit is not None else 0
-            except (ValueError, TypeError):
-                size = 0
+                size = quota_usage({'used_capacity': view.get('logical_capacity', 0)})['used_capacity']
                 soft_limit = 0
                 hard_limit = 0
             
@@ -156,8 +164,7 @@ class StorageDashboard:
             if quota_for_calc > 0:
                 utilization = (size / quota_for_calc) * 100
                 # Available should be based on hard limit (actual storage limit)
-                available_limit = hard_limit if hard_limit > 0 else soft_limit
-                available = available_limit - size
+                available = quota_for_calc - size
             else:
                 utilization = 0
                 available = 0
@@ -173,7 +180,7 @@ class StorageDashboard:
                 'size_bytes': size,  # Raw values for comparison
                 'soft_limit_bytes': soft_limit,
                 'hard_limit_bytes': hard_limit,
-                'last_updated': datetime.now().isoformat()
+                'last_updated': snapshot.fetched_at.isoformat()
             }
             
         except Exception as e:
@@ -184,6 +191,14 @@ class StorageDashboard:
                 'last_updated': datetime.now().isoformat()
             }
     
+    def current_snapshot(self) -> Optional[QuotaSnapshot]:
+        """Latest snapshot from the background fetcher (fetched now if it has none yet)"""
+        snapshot, _ = self.fetcher.latest()
+        if snapshot is None:
+            self.fetcher.refresh()
+            snapshot, _ = self.fetcher.latest()
+        return snapshot
+    
     def _get_status_level(self, utilization: float) -> str:
         """Determine status level based on utilization"""
         if utilization >= self.config.get_critical_threshold():
@@ -193,10 +208,11 @@ class StorageDashboard:
         else:
             return 'NORMAL'
     
-    def generate_dashboard_data(self) -> dict:
+    def generate_dashboard_data(self, snapshot: Optional[QuotaSnapshot] = None) -> dict:
         """Generate complete dashboard data"""
+        snapshot = snapshot or self.current_snapshot()
         dashboard_data = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': (snapshot.fetched_at if snapshot else datetime.now()).isoformat(),
             'views': {},
             'summary': {
                 'total_views': len(self.view_paths),
@@ -207,7 +223,7 @@ class StorageDashboard:
         }
         
         for view_path in self.view_paths:
-            view_status = self.get_view_status(view_path)
+            view_status = self.get_view_status(view_path, snapshot)
             dashboard_data['views'][view_path] = view_status
             
             # Update summary
@@ -220,11 +236,65 @@ class StorageDashboard:
         
         return dashboard_data
     
-    def create_rich_dashboard(self):
-        """Create a Rich-formatted dashboard"""
-        dashboard = self.generate_dashboard_data()
+    def _render_row(self, view_path: str, view_data: dict) -> tuple:
+        """Table cells for one view, reused while the view's values are unchanged"""
+        key = tuple(view_data.get(field) for field in
+                    ('status', 'utilization', 'size_bytes', 'soft_limit_bytes', 'hard_limit_bytes', 'error'))
+        cached = self._row_cache.get(view_path)
+        if cached and cached[0] == key:
+            return cached[1]
+        
+        status_icon = {
+            'NORMAL': '🟢',
+            'WARNING': '🟡',
+            'CRITICAL': '🔴',
+            'ERROR': '⚫',
+            'NOT_FOUND': '❓',
+            'CONNECTION_ERROR': '🔌'
+        }.get(view_data['status'], '❓')
+        
+        if view_data['status'] in ['NORMAL', 'WARNING', 'CRITICAL']:
+            # Check if soft limit is exceeded
+            size_bytes = view_data.get('size_bytes', 0)
+            soft_limit_bytes = view_data.get('soft_limit_bytes', 0)
+            soft_limit_exceeded = soft_limit_bytes > 0 and size_bytes > soft_limit_bytes
+            
+            # Add warning indicator if soft limit exceeded
+            utilization_text = f"{view_data['utilization']}%"
+            if soft_limit_exceeded:
+                utilization_text += " ⚠️"
+            
+            size_text = view_data['size_formatted']
+            soft_limit_text = view_data['soft_limit_formatted'] if view_data['soft_limit_formatted'] != "0 B" else "N/A"
+            hard_limit_text = view_data['hard_limit_formatted'] if view_data['hard_limit_formatted'] != "0 B" else "N/A"
+            available_text = view_data['available_formatted']
+            
+            # Color utilization based on level
+            if view_data['status'] == 'CRITICAL':
+                utilization_style = "bold red"
+            elif view_data['status'] == 'WARNING':
+                utilization_style = "bold yellow"
+            else:
+                utilization_style = "green"
+            
+            row = (
+                view_path,
+                status_icon,
+                Text(utilization_text, style=utilization_style),
+                size_text,
+                soft_limit_text,
+                hard_limit_text,
+                available_text
+            )
+        else:
+            error_text = view_data.get('error', view_data['status'])
+            row = (view_path, status_icon, "N/A", "N/A", "N/A", "N/A", Text(error_text, style="red"))
         
-        # Create main table
+        self._row_cache[view_path] = (key, row)
+        return row
+    
+    def build_table(self, dashboard: dict) -> Table:
+        """Views table, most utilized first, limited to ``max_rows`` rows"""
         table = Table(title="ORBITAL DYNAMICS - STORAGE MONITORING DASHBOARD", 
                      title_style="bold blue", 
                      show_header=True, 
@@ -239,92 +309,90 @@ class StorageDashboard:
         table.add_column("Hard Limit", justify="right")
         table.add_column("Available", justify="right")
         
-        # Add rows
-        for view_path, view_data in dashboard['views'].items():
-            status_icon = {
-                'NORMAL': '🟢',
-                'WARNING': '🟡',
-                'CRITICAL': '🔴',
-                'ERROR': '⚫',
-                'NOT_FOUND': '❓',
-                'CONNECTION_ERROR': '🔌'
-            }.get(view_data['status'], '❓')
-            
-            if view_data['status'] in ['NORMAL', 'WARNING', 'CRITICAL']:
-                # Check if soft limit is exceeded
-                size_bytes = view_data.get('size_bytes', 0)
-                soft_limit_bytes = view_data.get('soft_limit_bytes', 0)
-                soft_limit_exceeded = soft_limit_bytes > 0 and size_bytes > soft_limit_bytes
-                
-                # Add warning indicator if soft limit exceeded
-                utilization_text = f"{view_data['utilization']}%"
-                if soft_limit_exceeded:
-                    utilization_text += " ⚠️"
-                
-                size_text = view_data['size_formatted']
-                soft_limit_text = view_data['soft_limit_formatted'] if view_data['soft_limit_formatted'] != "0 B" else "N/A"
-                hard_limit_text = view_data['hard_limit_formatted'] if view_data['hard_limit_formatted'] != "0 B" else "N/A"
-                available_text = view_data['available_formatted']
-                
-                # Color utilization based on level
-                critical_threshold = self.config.get_critical_threshold()
-                alert_threshold = self.config.get_alert_threshold()
-                if view_data['utilization'] >= critical_threshold:
-                    utilization_style = "bold red"
-                elif view_data['utilization'] >= alert_threshold:
-                    utilization_style = "bold yellow"
-                else:
-                    utilization_style = "green"
-                
-                table.add_row(
-                    view_path,
-                    status_icon,
-                    Text(utilization_text, style=utilization_style),
-                    size_text,
-                    soft_limit_text,
-                    hard_limit_text,
-                    available_text
-                )
-            else:
-                error_text = view_data.get('error', view_data['status'])
-                table.add_row(
-                    view_path,
-                    status_icon,
-                    "N/A",
-                    "N/A",
-                    "N/A",
-                    "N/A",
-                    Text(error_text, style="red")
-                )
+        views = sorted(dashboard['views'].items(), key=lambda item: -(item[1].get('utilization') or 0))
+        for view_path, view_data in views[:self.max_rows]:
+            table.add_row(*self._render_row(view_path, view_data))
+        
+        if len(views) > self.max_rows:
+            table.caption = f"… {len(views) - self.max_rows} more views (lab1.dashboard.max_rows)"
         
-        # Create summary panel
+        # Forget rows of views that are no longer configured
+        for view_path in set(self._row_cache) - set(dashboard['views']):
+            del self._row_cache[view_path]
+        return table
+    
+    def build_summary(self, dashboard: dict) -> Panel:
         summary = dashboard['summary']
         summary_text = f"Normal: {summary['normal_views']} | Warning: {summary['warning_views']} | Critical: {summary['critical_views']}"
-        summary_panel = Panel(summary_text, title="Summary", border_style="green")
+        return Panel(summary_text, title="Summary", border_style="green")
+    
+    def build_status(self, dashboard: dict) -> Panel:
+        """Data age and fetch status"""
+        last_updated = datetime.fromisoformat(dashboard['timestamp'])
+        age = (datetime.now() - last_updated).total_seconds()
+        status_text = f"Last Updated: {dashboard['timestamp']} ({age:.0f}s ago)"
+        if self.fetcher.error:
+            status_text += f" | ⚠️  Last fetch failed: {self.fetcher.error}"
+        return Panel(status_text, border_style="blue")
+    
+    def update_panels(self) -> bool:
+        """Rebuild the panels that are due; True when anything changed
         
-        # Create timestamp panel
-        timestamp_text = f"Last Updated: {dashboard['timestamp']}"
-        timestamp_panel = Panel(timestamp_text, border_style="blue")
+        The table and summary are rebuilt only when their refresh interval has
+        passed and the fetcher has a newer snapshot; the status panel (data
+        age) follows its own, shorter interval.
+        """
+        now = time.monotonic()
+        snapshot, version = self.fetcher.latest()
+        changed = False
+        dashboard = None
         
-        # Combine everything using Rich's Group
+        for name, build in (('summary', self.build_summary), ('table', self.build_table), ('status', self.build_status)):
+            last_built, last_version = self._panel_state.get(name, (None, None))
+            due = last_built is None or now - last_built >= self.panel_refresh[name]
+            if not due or (name != 'status' and version == last_version):
+                continue
+            if name == 'status':
+                # Only the data age changes between snapshots, no need to evaluate the views
+                self._panels[name] = build({'timestamp': (snapshot.fetched_at if snapshot else datetime.now()).isoformat()})
+            else:
+                if dashboard is None:
+                    dashboard = self.generate_dashboard_data(snapshot)
+                self._panels[name] = build(dashboard)
+            self._panel_state[name] = (now, version)
+            changed = True
+        
+        return changed
+    
+    def render(self):
         return Panel(
-            Group(summary_panel, table, timestamp_panel),
+            Group(self._panels['summary'], self._panels['table'], self._panels['status']),
             border_style="bright_blue"
         )
+    
+    def run(self):
+        """Live dashboard: VMS is polled by the background fetcher, the screen is redrawn only when a panel changes"""
+        self.fetcher.start()
+        self.update_panels()
+        tick = min(1.0, *self.panel_refresh.values())
+        try:
+            with Live(self.render(), console=self.console, auto_refresh=False, screen=False) as live:
+                while True:
+                    time.sleep(tick)
+                    if self.update_panels():
+                        live.update(self.render(), refresh=True)
+        finally:
+            self.fetcher.stop()
+
 
 def main():
     """Main function for dashboard"""
-    config = Lab1ConfigLoader()
     dashboard = StorageDashboard()
     
     try:
-        while True:
-            # Clear screen and display dashboard
-            dashboard.console.clear()
-            dashboard.console.print(dashboard.create_rich_dashboard())
-            time.sleep(dashboard.refresh_interval)
+        dashboard.run()
     except KeyboardInterrupt:
         dashboard.console.print("\n[bold red]Dashboard stopped by user[/bold red]")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
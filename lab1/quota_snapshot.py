@@ -0,0 +1,102 @@
+# quota_snapshot.py
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_path(path: Optional[str]) -> Optional[str]:
+    """Path with a single leading slash and no trailing slash, as VMS reports it"""
+    if path is None:
+        return None
+    return '/' + path.strip('/')
+
+
+def quota_usage(quota: Optional[Dict]) -> Dict[str, int]:
+    """Used capacity and soft/hard limits of a quota record, in bytes"""
+    usage = {}
+    for key in ('used_capacity', 'soft_limit', 'hard_limit'):
+        value = (quota or {}).get(key)
+        try:
+            usage[key] = int(float(value)) if value is not None else 0
+        except (ValueError, TypeError):
+            usage[key] = 0
+    return usage
+
+
+def utilization_percent(usage: Dict[str, int]) -> Optional[float]:
+    """Used capacity as a percentage of the hard limit (soft limit when no hard limit is set)"""
+    quota_for_calc = usage['hard_limit'] if usage['hard_limit'] > 0 else usage['soft_limit']
+    if quota_for_calc > 0:
+        return (usage['used_capacity'] / quota_for_calc) * 100
+    return None
+
+
+class QuotaSnapshot:
+    """All quotas and views of the cluster, fetched once and indexed by path
+
+    One monitoring cycle makes two VMS calls (``quotas.get()`` and
+    ``views.get()``) no matter how many views it checks; every lookup after
+    that is a dictionary access.
+    """
+
+    def __init__(self, quotas: Iterable[Dict], views: Iterable[Dict], api_calls: int = 0):
+        self.quotas_by_path: Dict[str, Dict] = {}
+        self.views_by_path: Dict[str, Dict] = {}
+        for quota in quotas or []:
+            if quota.get('path'):
+                # Keep the first quota per path, like quotas.get(path=...)[0]
+                self.quotas_by_path.setdefault(normalize_path(quota['path']), quota)
+        for view in views or []:
+            if view.get('path'):
+                self.views_by_path.setdefault(normalize_path(view['path']), view)
+        self.api_calls = api_calls
+        self.fetched_at = datetime.now()
+
+    @classmethod
+    def fetch(cls, client, paths: Optional[List[str]] = None) -> 'QuotaSnapshot':
+        """List every quota and view in one call each
+
+        If a bulk listing fails (e.g. a restricted VMS user) and ``paths`` is
+        given, falls back to one filtered call per path for that resource.
+        """
+        quotas = cls.fetch_resource(client.quotas, 'quotas', paths)
+        views = cls.fetch_resource(client.views, 'views', paths)
+        snapshot = cls(quotas[0], views[0], api_calls=quotas[1] + views[1])
+        logger.debug(f"📡 Snapshot: {len(snapshot.quotas_by_path)} quotas, "
+                     f"{len(snapshot.views_by_path)} views in {snapshot.api_calls} VMS calls")
+        return snapshot
+
+    @staticmethod
+    def fetch_resource(endpoint, name: str, paths: Optional[List[str]]):
+        """(records, number of VMS calls made)"""
+        try:
+            return endpoint.get() or [], 1
+        except Exception as e:
+            if not paths:
+                raise
+            logger.warning(f"⚠️  Bulk {name} listing failed, fetching {len(paths)} paths one by one: {e}")
+
+        records = []
+        for path in paths:
+            try:
+                records.extend(endpoint.get(path=path) or [])
+            except Exception as e:
+                logger.warning(f"⚠️  Could not get {name} for {path}: {e}")
+        return records, 1 + len(paths)
+
+    def quota(self, path: str) -> Optional[Dict]:
+        return self.quotas_by_path.get(normalize_path(path))
+
+    def view(self, path: str) -> Optional[Dict]:
+        return self.views_by_path.get(normalize_path(path))
+
+    def usage(self, path: str) -> Optional[Dict[str, int]]:
+        """Used capacity and limits for ``path`` (None when it has no quota)"""
+        quota = self.quota(path)
+        return quota_usage(quota) if quota is not None else None
+
+    def utilization(self, path: str) -> Optional[float]:
+        usage = self.usage(path)
+        return utilization_percent(usage) if usage is not None else None
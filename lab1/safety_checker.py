@@ -1,5 +1,6 @@
 # safety_checker.py
 import logging
+import threading
 from typing import Dict, List
 from vastpy import VASTClient
 
@@ -17,9 +18,15 @@ class SafetyChecker:
         self.vast_client = vast_client
         self.checks_passed = []
         self.checks_failed = []
+        # Check results are collected on the instance, so concurrent expansions take turns
+        self._lock = threading.Lock()
     
     def validate_storage_expansion(self, view_path: str, required_size_gb: int) -> bool:
         """Validate that storage expansion is safe"""
+        with self._lock:
+            return self._validate_storage_expansion(view_path, required_size_gb)
+    
+    def _validate_storage_expansion(self, view_path: str, required_size_gb: int) -> bool:
         logger.info(f"Running essential safety checks for storage expansion: {view_path} (+{required_size_gb}GB)")
         
         # Reset check results
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Tests for Lab 1 growth forecasting and forecast-sized expansions
+Run offline against a stub VAST client: no VMS connection is made
+"""
+
+import sys
+from pathlib import Path
+
+# Add lab and parent directories to path for imports
+sys.path.append(str(Path(__file__).parent))
+sys.path.append(str(Path(__file__).parent.parent))
+
+from lab1_solution import OrbitalDynamicsStorageManager
+from utilization_history import UtilizationHistory
+
+GiB = 1024**3
+TiB = 1024**4
+START = 1_700_000_000.0
+
+
+class StubEndpoint:
+    def __init__(self, records):
+        self.records = records
+        self.patches = []
+
+    def get(self, **params):
+        return [record for record in self.records if params.get('path') in (None, record['path'])]
+
+    def __getitem__(self, record_id):
+        endpoint = self
+
+        class Record:
+            def patch(self, **changes):
+                endpoint.patches.append((record_id, changes))
+                return changes
+        return Record()
+
+
+class StubClient:
+    def __init__(self, hard_limit: int):
+        self.views = StubEndpoint([{'id': 1, 'path': '/raw'}])
+        self.quotas = StubEndpoint([{'id': 7, 'path': '/raw', 'hard_limit': hard_limit, 'used_capacity': 0}])
+
+
+class StubConfig:
+    """Minimal stand-in for Lab1ConfigLoader"""
+
+    def __init__(self, client):
+        self.client = client
+        self.values = {
+            'lab1.views': {'raw_data': {'path': '/raw'}, 'processed_data': {'path': '/processed'}},
+            'lab1.storage.expansion_factor': 1,
+            'lab1.storage.max_expansion_gb': 10240,
+            'lab1.history.path': None,
+            'lab1.forecast.expansion_horizon_hours': 168,
+        }
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+    def get_secret(self, key, default=None):
+        return default
+
+    def get_vast_client(self):
+        return self.client
+
+
+def history_with_growth(growth_per_hour: float, hours: float = 3, used: float = 500 * GiB,
+                        limit: float = TiB) -> UtilizationHistory:
+    """A memory-only history with one sample of '/raw' every 10 minutes"""
+    history = UtilizationHistory(path=None, window_hours=6, min_samples=4)
+    for i in range(int(hours * 6) + 1):
+        history._ring('/raw').append(START + i * 600, used + growth_per_hour * i / 6, limit)
+    return history
+
+
+def test_forecast_growth_and_time_to_full():
+    history = history_with_growth(50 * GiB)
+    now = START + 3 * 3600
+
+    forecast = history.forecast(['/raw', '/missing'], now=now)
+
+    assert list(forecast) == ['/raw']
+    assert abs(forecast['/raw']['growth_bytes_per_hour'] - 50 * GiB) < 1
+    # 650 GiB used at the last sample, 374 GiB left at 50 GiB/h
+    assert abs(forecast['/raw']['hours_to_full'] - 374 / 50) < 1e-6
+    assert forecast['/raw']['samples'] == 19
+
+
+def test_forecast_ignores_flat_and_sparse_views():
+    flat = history_with_growth(0).forecast(['/raw'], now=START + 3 * 3600)
+    assert flat['/raw']['growth_bytes_per_hour'] == 0
+    assert flat['/raw']['hours_to_full'] is None
+
+    # Samples older than the 6 hour window do not count
+    assert history_with_growth(50 * GiB).forecast(['/raw'], now=START + 12 * 3600) == {}
+
+
+def test_forecast_sized_expansion_adds_terabytes():
+    client = StubClient(hard_limit=TiB)
+    manager = OrbitalDynamicsStorageManager(StubConfig(client), production_mode=True)
+    checked = []
+    manager.safety_checker.validate_storage_expansion = lambda path, size_gb: checked.append(size_gb) or True
+
+    # 2.5 TiB over the 168 hour horizon rounds up to 3 TB
+    forecast = history_with_growth(2.5 * TiB / 168, used=0.9 * TiB).forecast(['/raw'], now=START + 3 * 3600)
+    size_tb = manager.get_expansion_size_tb('/raw', forecast['/raw'])
+    assert size_tb == 3
+
+    assert manager.expand_view_quota('/raw', size_tb)
+    assert checked == [3 * 1024]
+    assert client.quotas.patches == [(7, {'hard_limit': TiB + 3 * TiB})]
+
+    # Capped at max_expansion_gb
+    assert manager.get_expansion_size_tb('/raw', {'growth_bytes_per_hour': 1000 * TiB}) == 10
@@ -0,0 +1,187 @@
+# utilization_history.py
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+from quota_snapshot import QuotaSnapshot
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HISTORY_FILE = Path.home() / '.cache' / 'cosmos-labs' / 'lab1-utilization.parquet'
+
+
+class _Ring:
+    """Fixed-capacity sample buffer for one view: (epoch seconds, used bytes, limit bytes)"""
+
+    def __init__(self, capacity: int):
+        self.data = np.zeros((capacity, 3), dtype=np.float64)
+        self.count = 0
+        self.head = 0
+
+    def append(self, timestamp: float, used: float, limit: float):
+        self.data[self.head] = (timestamp, used, limit)
+        self.head = (self.head + 1) % len(self.data)
+        self.count = min(self.count + 1, len(self.data))
+
+    def samples(self) -> np.ndarray:
+        """Samples oldest first"""
+        if self.count < len(self.data):
+            return self.data[:self.count]
+        return np.roll(self.data, -self.head, axis=0)
+
+
+class UtilizationHistory:
+    """Per-view used capacity samples with a growth-rate forecast
+
+    Every cycle appends one sample per view to an in-memory ring buffer
+    (``max_samples`` per view, 24 bytes each); the buffers are written to
+    a Parquet file every ``flush_every`` cycles and reloaded on start, so the
+    forecast survives restarts. Without pyarrow the history is memory-only.
+    """
+
+    def __init__(self, path=DEFAULT_HISTORY_FILE, max_samples: int = 2016, flush_every: int = 12,
+                 window_hours: float = 6, min_samples: int = 4):
+        self.path = Path(path).expanduser() if path else None
+        self.max_samples = max(2, int(max_samples))
+        self.flush_every = max(1, int(flush_every))
+        self.window_seconds = float(window_hours) * 3600
+        self.min_samples = max(2, int(min_samples))
+        self._rings: Dict[str, _Ring] = {}
+        self._unflushed = 0
+        self.load()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            path=config.get('lab1.history.path', str(DEFAULT_HISTORY_FILE)),
+            max_samples=config.get('lab1.history.max_samples', 2016),
+            flush_every=config.get('lab1.history.flush_every_cycles', 12),
+            window_hours=config.get('lab1.forecast.window_hours', 6),
+            min_samples=config.get('lab1.forecast.min_samples', 4),
+        )
+
+    def record(self, snapshot: QuotaSnapshot, paths: List[str]):
+        """Append one sample per view that has a quota, flushing to disk every ``flush_every`` calls"""
+        timestamp = snapshot.fetched_at.timestamp()
+        for path in paths:
+            usage = snapshot.usage(path)
+            if usage is None:
+                continue
+            limit = usage['hard_limit'] if usage['hard_limit'] > 0 else usage['soft_limit']
+            self._ring(path).append(timestamp, usage['used_capacity'], limit)
+
+        self._unflushed += 1
+        if self._unflushed >= self.flush_every:
+            self.flush()
+
+    def _ring(self, path: str) -> _Ring:
+        if path not in self._rings:
+            self._rings[path] = _Ring(self.max_samples)
+        return self._rings[path]
+
+    def forecast(self, paths: List[str], now: Optional[float] = None) -> Dict[str, Dict]:
+        """Growth rate and time to full for each view, from a least-squares line over the recent window
+
+        All views are fitted at once: their windows are concatenated and the
+        regression sums are grouped with ``np.bincount``. Returns
+        ``{path: {'growth_bytes_per_hour', 'hours_to_full', 'samples'}}`` for
+        views with at least ``min_samples`` samples in the window;
+        ``hours_to_full`` is None when the view is not growing or has no limit.
+        """
+        now = time.time() if now is None else now
+        names, windows = [], []
+        for path in paths:
+            ring = self._rings.get(path)
+            if ring is None:
+                continue
+            samples = ring.samples()
+            samples = samples[samples[:, 0] >= now - self.window_seconds]
+            if len(samples) >= self.min_samples:
+                names.append(path)
+                windows.append(samples)
+        if not names:
+            return {}
+
+        group = np.repeat(np.arange(len(names)), [len(w) for w in windows])
+        samples = np.concatenate(windows)
+        hours = (samples[:, 0] - now) / 3600
+        used = samples[:, 1]
+
+        def group_sum(values):
+            return np.bincount(group, weights=values, minlength=len(names))
+
+        n = np.bincount(group, minlength=len(names)).astype(np.float64)
+        sum_t, sum_y = group_sum(hours), group_sum(used)
+        sum_tt, sum_ty = group_sum(hours * hours), group_sum(hours * used)
+        denominator = n * sum_tt - sum_t * sum_t
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = np.where(denominator > 0, (n * sum_ty - sum_t * sum_y) / denominator, 0.0)
+
+        # Latest sample of each view: last row of each group
+        last = np.cumsum(n).astype(int) - 1
+        latest_used, latest_limit = samples[last, 1], samples[last, 2]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            hours_to_full = np.where((slope > 0) & (latest_limit > 0),
+                                     np.maximum(latest_limit - latest_used, 0) / slope, np.nan)
+
+        return {
+            name: {
+                'growth_bytes_per_hour': float(slope[i]),
+                'hours_to_full': None if np.isnan(hours_to_full[i]) else float(hours_to_full[i]),
+                'samples': int(n[i]),
+            }
+            for i, name in enumerate(names)
+        }
+
+    def load(self):
+        """Refill the ring buffers from the Parquet file, keeping the newest ``max_samples`` per view"""
+        if not PYARROW_AVAILABLE or self.path is None or not self.path.exists():
+            return
+        try:
+            table = pq.read_table(self.path).sort_by([('path', 'ascending'), ('timestamp', 'ascending')])
+            columns = table.to_pydict()
+            for path, timestamp, used, limit in zip(columns['path'], columns['timestamp'],
+                                                    columns['used_capacity'], columns['limit']):
+                self._ring(path).append(timestamp, used, limit)
+            logger.info(f"📈 Loaded {table.num_rows} utilization samples for {len(self._rings)} views from {self.path}")
+        except Exception as e:
+            logger.warning(f"⚠️  Ignoring unreadable utilization history {self.path}: {e}")
+
+    def flush(self):
+        """Write every ring buffer to the Parquet file (atomically replaced)"""
+        self._unflushed = 0
+        if self.path is None or not self._rings:
+            return
+        if not PYARROW_AVAILABLE:
+            logger.debug("pyarrow not installed - utilization history is kept in memory only")
+            return
+        try:
+            paths, blocks = [], []
+            for path, ring in self._rings.items():
+                samples = ring.samples()
+                paths.extend([path] * len(samples))
+                blocks.append(samples)
+            samples = np.concatenate(blocks)
+            table = pa.table({
+                'path': pa.array(paths, pa.string()),
+                'timestamp': samples[:, 0],
+                'used_capacity': samples[:, 1].astype(np.int64),
+                'limit': samples[:, 2].astype(np.int64),
+            })
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            pq.write_table(table, temp_path, compression='zstd')
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            logger.warning(f"⚠️  Could not write utilization history {self.path}: {e}")
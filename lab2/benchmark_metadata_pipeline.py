@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Lab 2 Metadata Pipeline Benchmark
+Compares the serial download/extract/insert loop with the parallel MetadataPipeline
+(with temp-file downloads and with in-memory header reads) against a local
+mocked S3 bucket (requires moto and astropy)
+"""
+
+import argparse
+import io
+import gzip
+import logging
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from lab2.process_metadata import MetadataProcessor
+from lab2.swift_metadata_extractor import SwiftMetadataExtractor
+
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+BUCKET_NAME = 'benchmark-lab2-raw'
+DATASET_NAME = 'benchmark_dataset'
+
+
+class BenchmarkConfig:
+    """Minimal stand-in for ConfigLoader with the settings the benchmark varies"""
+
+    def __init__(self, values: Dict[str, Any]):
+        self.values = values
+
+    def get(self, key: str, default=None):
+        return self.values.get(key, default)
+
+    def get_secret(self, key: str, default=None):
+        return default
+
+
+class CatalogStandIn:
+    """In-memory catalog standing in for VASTDatabaseManager (measures ingestion, not the database)"""
+
+    def __init__(self):
+        self.records: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def insert_metadata_batch(self, records: List[Dict[str, Any]], batch_rows: int = None,
+                              manifest_entries=None, replace_paths=None) -> int:
+        with self._lock:
+            self.records.extend(records)
+        return len(records)
+
+    def is_known_checksum(self, checksum: str) -> bool:
+        return False
+
+
+class LatencyS3Client:
+    """Wraps the mocked S3 client, adds a fixed round-trip delay to each request and counts bytes transferred
+
+    moto answers in-process with no network latency, which hides exactly the
+    cost that concurrent downloads are meant to overlap.
+    """
+
+    def __init__(self, s3_client, latency_seconds: float):
+        self.s3_client = s3_client
+        self.latency_seconds = latency_seconds
+        self.bytes_transferred = 0
+        self._lock = threading.Lock()
+
+    def _count(self, nbytes: int):
+        with self._lock:
+            self.bytes_transferred += nbytes
+
+    def download_file(self, bucket, key, filename, **kwargs):
+        time.sleep(self.latency_seconds)
+        result = self.s3_client.download_file(bucket, key, filename, **kwargs)
+        self._count(os.path.getsize(filename))
+        return result
+
+    def get_object(self, **kwargs):
+        time.sleep(self.latency_seconds)
+        response = self.s3_client.get_object(**kwargs)
+        self._count(response['ContentLength'])
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self.s3_client, name)
+
+
+class BenchmarkProcessor(MetadataProcessor):
+    """MetadataProcessor wired to the benchmark config and in-memory catalog"""
+
+    def __init__(self, config: BenchmarkConfig):
+        self.config = config
+        self.db_manager = CatalogStandIn()
+        self.extractor = SwiftMetadataExtractor(config)
+
+
+def make_lightcurve(index: int, rows: int) -> bytes:
+    """Build a small gzipped Swift-style FITS light curve"""
+    import numpy as np
+    from astropy.io import fits
+
+    primary = fits.PrimaryHDU()
+    primary.header['TELESCOP'] = 'SWIFT'
+    primary.header['INSTRUME'] = 'BAT'
+    primary.header['OBJECT'] = f'BENCH_{index:05d}'
+    columns = fits.ColDefs([
+        fits.Column(name='TIME', format='D', array=np.arange(rows, dtype='f8')),
+        fits.Column(name='RATE', format='E', array=np.random.random(rows).astype('f4'))
+    ])
+    buffer = io.BytesIO()
+    fits.HDUList([primary, fits.BinTableHDU.from_columns(columns)]).writeto(buffer)
+    return gzip.compress(buffer.getvalue())
+
+
+def run_benchmark(files: int, rows: int, download_workers: int, parse_workers: int, latency_ms: float):
+    import boto3
+    from moto import mock_aws
+
+    with mock_aws():
+        s3_client = boto3.client('s3', region_name='us-east-1')
+        s3_client.create_bucket(Bucket=BUCKET_NAME)
+
+        print(f"📤 Uploading {files} synthetic light curves ({rows} rows each) to mocked S3...")
+        file_list = []
+        for i in range(files):
+            key = f"{DATASET_NAME}/swbj{i:04d}_bench_c_s{i:03d}.lc.gz"
+            body = make_lightcurve(i, rows)
+            s3_client.put_object(Bucket=BUCKET_NAME, Key=key, Body=body)
+            file_list.append({'key': key, 'size': len(body)})
+
+        base_config = {
+            'lab2.raw_data.view_path': f"/{BUCKET_NAME}",
+            'lab2.pipeline.download_workers': download_workers,
+            'lab2.pipeline.parse_workers': parse_workers,
+        }
+
+        # in-memory: header-only Range reads from S3 with the ETag as checksum (no temp files)
+        modes = {
+            'serial': {},
+            'pipeline': {},
+            'in-memory': {'lab2.ingest.in_memory_extraction': True, 'lab2.ingest.checksum_source': 'etag'}
+        }
+
+        results = {}
+        for mode, overrides in modes.items():
+            processor = BenchmarkProcessor(BenchmarkConfig(dict(base_config, **overrides)))
+            timed_client = LatencyS3Client(s3_client, latency_ms / 1000.0)
+            started = time.perf_counter()
+            if mode == 'serial':
+                result = processor._process_files_serially(timed_client, BUCKET_NAME, file_list)
+            else:
+                from lab2.metadata_pipeline import MetadataPipeline
+                pipeline = MetadataPipeline.from_config(processor.config, timed_client, BUCKET_NAME,
+                                                        processor.db_manager, processor.extractor)
+                result = pipeline.run(file_list)
+            elapsed = time.perf_counter() - started
+            results[mode] = (elapsed, result, timed_client.bytes_transferred)
+
+    total_mb = sum(f['size'] for f in file_list) / (1024 ** 2)
+    print(f"\n📊 Results ({files} files, {total_mb:.1f} MB, {latency_ms:g} ms simulated latency per request):")
+    for mode, (elapsed, result, transferred) in results.items():
+        print(f"   {mode:>9}: {elapsed:7.2f}s - {files / elapsed:8.1f} files/s, "
+              f"{transferred / (1024 ** 2):7.2f} MB transferred "
+              f"(inserted {result['inserted']}, skipped {result['skipped']}, failed {result['failed']})")
+    for mode in ('pipeline', 'in-memory'):
+        speedup = results['serial'][0] / max(results[mode][0], 1e-9)
+        print(f"   ⚡ {mode} speedup over serial: {speedup:.2f}x")
+
+    for name, stage in results['pipeline'][1].get('stage_stats', {}).items():
+        print(f"   {name:>8} stage: {stage['items_per_second']} items/s, {stage['mb_per_second']} MB/s, "
+              f"busy {stage['busy_seconds']}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark serial vs pipelined metadata ingestion')
+    parser.add_argument('--files', type=int, default=200, help='Number of synthetic files (default: 200)')
+    parser.add_argument('--rows', type=int, default=2000, help='Light curve rows per file (default: 2000)')
+    parser.add_argument('--download-workers', type=int, default=8, help='Pipeline download threads (default: 8)')
+    parser.add_argument('--parse-workers', type=int, default=4, help='Pipeline parse processes (default: 4)')
+    parser.add_argument('--latency-ms', type=float, default=20.0,
+                        help='Simulated S3 round-trip latency per request in ms (default: 20)')
+    args = parser.parse_args()
+
+    try:
+        run_benchmark(args.files, args.rows, args.download_workers, args.parse_workers, args.latency_ms)
+    except ImportError as e:
+        print(f"❌ Missing benchmark dependency: {e} (pip install moto astropy)")
+        return False
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
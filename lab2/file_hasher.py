@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+File Hashing for Lab 2
+mmap-backed file checksums with a selectable algorithm, a process pool across
+files and a persistent (path, size, mtime) cache so unchanged files are never
+re-hashed between runs
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# sha256 is the integrity checksum and stays unprefixed so existing catalog
+# values remain comparable; the faster dedup hashes are stored as "<algo>:<hex>"
+ALGORITHMS = ('sha256', 'blake2b', 'xxh3')
+DEFAULT_ALGORITHM = 'sha256'
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+DEFAULT_CACHE_PATH = Path.home() / '.cache' / 'cosmos-labs' / 'lab2-file-hashes.json'
+
+
+def resolve_algorithm(algorithm: Optional[str]) -> str:
+    """Validate an algorithm name, falling back to SHA-256 when it is unknown or unavailable"""
+    algorithm = (algorithm or DEFAULT_ALGORITHM).lower()
+    if algorithm not in ALGORITHMS:
+        logger.warning(f"⚠️  Unknown checksum algorithm '{algorithm}' - using {DEFAULT_ALGORITHM}")
+        return DEFAULT_ALGORITHM
+    if algorithm == 'xxh3' and not XXHASH_AVAILABLE:
+        logger.warning("⚠️  xxhash not installed (pip install xxhash) - using blake2b instead of xxh3")
+        return 'blake2b'
+    return algorithm
+
+
+def new_hash(algorithm: str = DEFAULT_ALGORITHM):
+    """Fresh hash object for ``algorithm``"""
+    if algorithm == 'blake2b':
+        return hashlib.blake2b(digest_size=32)
+    if algorithm == 'xxh3':
+        return xxhash.xxh3_128()
+    return hashlib.sha256()
+
+
+def format_digest(algorithm: str, hexdigest: str) -> str:
+    """Catalog representation of a digest"""
+    return hexdigest if algorithm == DEFAULT_ALGORITHM else f"{algorithm}:{hexdigest}"
+
+
+def hash_file(path, algorithm: str = DEFAULT_ALGORITHM, chunk_size: int = DEFAULT_CHUNK_SIZE) -> str:
+    """Checksum a file through a read-only memory map
+
+    The mapping is fed to the hash in ``chunk_size`` slices (hashlib releases
+    the GIL for large updates). Empty or unmappable files fall back to
+    buffered reads.
+    """
+    hash_object = new_hash(algorithm)
+    with open(path, 'rb') as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # Empty files (and some special files) cannot be mapped
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                hash_object.update(chunk)
+        else:
+            with mapped, memoryview(mapped) as view:
+                for offset in range(0, len(view), chunk_size):
+                    hash_object.update(view[offset:offset + chunk_size])
+    return format_digest(algorithm, hash_object.hexdigest())
+
+
+def _hash_file_task(task: Tuple[str, str, int]) -> Tuple[str, Optional[str], Optional[str]]:
+    """Process-pool entry point: (path, algorithm, chunk_size) -> (path, checksum, error)"""
+    path, algorithm, chunk_size = task
+    try:
+        return path, hash_file(path, algorithm, chunk_size), None
+    except Exception as e:
+        return path, None, str(e)
+
+
+class HashCache:
+    """Persistent checksum cache keyed on (path, size, mtime)
+
+    Stored as JSON; an entry is only reused when the file's size and
+    ``st_mtime_ns`` still match, so any modification forces a re-hash.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path).expanduser()
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, Dict]] = None
+        self._dirty = False
+
+    def _load(self) -> Dict[str, Dict]:
+        if self._entries is None:
+            try:
+                with open(self.path) as f:
+                    self._entries = json.load(f)
+            except FileNotFoundError:
+                self._entries = {}
+            except Exception as e:
+                logger.warning(f"⚠️  Ignoring unreadable hash cache {self.path}: {e}")
+                self._entries = {}
+        return self._entries
+
+    def get(self, path: str, stat: os.stat_result, algorithm: str) -> Optional[str]:
+        with self._lock:
+            entry = self._load().get(os.path.abspath(path))
+        if (entry and entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns):
+            return entry.get('checksums', {}).get(algorithm)
+        return None
+
+    def put(self, path: str, stat: os.stat_result, algorithm: str, checksum: str):
+        path = os.path.abspath(path)
+        with self._lock:
+            entries = self._load()
+            entry = entries.get(path)
+            if not entry or entry.get('size') != stat.st_size or entry.get('mtime_ns') != stat.st_mtime_ns:
+                entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'checksums': {}}
+                entries[path] = entry
+            entry['checksums'][algorithm] = checksum
+            self._dirty = True
+
+    def save(self):
+        """Write the cache atomically (no-op when nothing changed)"""
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                temp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+                with open(temp_path, 'w') as f:
+                    json.dump(self._entries, f)
+                os.replace(temp_path, self.path)
+                self._dirty = False
+            except Exception as e:
+                logger.warning(f"⚠️  Could not save hash cache {self.path}: {e}")
+
+
+class FileHasher:
+    """Checksums local files with one algorithm, a process pool and an optional cache"""
+
+    def __init__(self, algorithm: str = DEFAULT_ALGORITHM, workers: Optional[int] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, cache: Optional[HashCache] = None):
+        self.algorithm = resolve_algorithm(algorithm)
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.chunk_size = chunk_size
+        self.cache = cache
+
+    @classmethod
+    def from_config(cls, config) -> 'FileHasher':
+        """Build a hasher from the ``lab2.hashing`` settings"""
+        cache_path = config.get('lab2.hashing.cache_path', str(DEFAULT_CACHE_PATH))
+        return cls(
+            algorithm=config.get('lab2.hashing.algorithm', DEFAULT_ALGORITHM),
+            workers=config.get('lab2.hashing.workers', None),
+            chunk_size=int(config.get('lab2.hashing.chunk_mb', 8) * 1024 * 1024),
+            cache=HashCache(cache_path) if cache_path else None
+        )
+
+    def hash_file(self, path, use_cache: bool = True) -> str:
+        """Checksum one file (from the cache when its size and mtime are unchanged)"""
+        path = str(path)
+        stat = os.stat(path) if use_cache and self.cache else None
+        if stat is not None:
+            cached = self.cache.get(path, stat, self.algorithm)
+            if cached:
+                return cached
+        checksum = hash_file(path, self.algorithm, self.chunk_size)
+        if stat is not None:
+            self.cache.put(path, stat, self.algorithm, checksum)
+            self.cache.save()
+        return checksum
+
+    def hash_files(self, paths: Iterable) -> Dict[str, str]:
+        """Checksum many files, spreading cache misses over a process pool
+
+        Returns {path: checksum}; files that could not be read are left out.
+        The cache is saved once at the end.
+        """
+        checksums = {}
+        misses = []
+        stats = {}
+        for path in map(str, paths):
+            try:
+                stat = os.stat(path)
+            except OSError as e:
+                logger.warning(f"⚠️  Cannot stat {path}: {e}")
+                continue
+            cached = self.cache.get(path, stat, self.algorithm) if self.cache else None
+            if cached:
+                checksums[path] = cached
+            else:
+                stats[path] = stat
+                misses.append(path)
+
+        if misses:
+            logger.info(f"🔐 Hashing {len(misses)} files with {self.algorithm} "
+                        f"({len(checksums)} unchanged files reused from cache)")
+            tasks = [(path, self.algorithm, self.chunk_size) for path in misses]
+            if self.workers > 1 and len(misses) > 1:
+                with ProcessPoolExecutor(max_workers=min(self.workers, len(misses))) as pool:
+                    results = list(pool.map(_hash_file_task, tasks, chunksize=max(1, len(tasks) // (self.workers * 4))))
+            else:
+                results = [_hash_file_task(task) for task in tasks]
+
+            for path, checksum, error in results:
+                if error:
+                    logger.warning(f"⚠️  Failed to hash {path}: {error}")
+                    continue
+                checksums[path] = checksum
+                if self.cache:
+                    self.cache.put(path, stats[path], self.algorithm, checksum)
+
+        if self.cache:
+            self.cache.save()
+        return checksums
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Lab 2 Metadata Pipeline
+Staged S3-to-VAST-DB metadata ingestion: concurrent (ranged) downloads, a
+process pool for metadata extraction and a single batched database writer
+"""
+
+import logging
+import multiprocessing
+import os
+import queue
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from lab2.ingestion_manifest import STATUS_FAILED, STATUS_INGESTED, STATUS_SKIPPED
+from lab2.vast_database_manager import MetadataInsertBuffer
+
+logger = logging.getLogger(__name__)
+
+# End-of-stream marker passed between stages
+_STOP = object()
+
+# Extractor owned by each parse worker process (see _init_parse_worker)
+_worker_extractor = None
+
+
+def _init_parse_worker(config):
+    """Process pool initializer - build one extractor per worker process"""
+    global _worker_extractor
+    from lab2.swift_metadata_extractor import SwiftMetadataExtractor
+    _worker_extractor = SwiftMetadataExtractor(config)
+
+
+def _parse_in_worker(file_path: str, s3_key: str, s3_bucket: str) -> Optional[Dict[str, Any]]:
+    """Extract metadata for one downloaded object inside a parse worker process"""
+    return _worker_extractor.extract_s3_object_metadata(file_path, s3_key, s3_bucket)
+
+
+class StageStats:
+    """Thread-safe throughput counters for one pipeline stage"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.bytes = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.started_at = time.monotonic()
+
+    def finish(self):
+        self.finished_at = time.monotonic()
+
+    def record(self, seconds: float, nbytes: int = 0, error: bool = False):
+        """Record one processed item"""
+        with self._lock:
+            self.items += 1
+            self.bytes += nbytes
+            self.busy_seconds += seconds
+            if error:
+                self.errors += 1
+
+    def summary(self) -> Dict[str, Any]:
+        """Counters plus derived throughput for this stage"""
+        end = self.finished_at or time.monotonic()
+        elapsed = max(end - (self.started_at or end), 1e-9)
+        return {
+            'items': self.items,
+            'errors': self.errors,
+            'bytes': self.bytes,
+            'elapsed_seconds': round(elapsed, 3),
+            'busy_seconds': round(self.busy_seconds, 3),
+            'items_per_second': round(self.items / elapsed, 2),
+            'mb_per_second': round(self.bytes / (1024 ** 2) / elapsed, 2)
+        }
+
+
+class MetadataPipeline:
+    """Parallel, streaming replacement for the serial download/extract/insert loop
+
+    Stages are connected by bounded queues, so a slow stage applies
+    backpressure to the ones in front of it instead of letting downloaded
+    files pile up on disk:
+
+      download threads  ->  parse dispatchers (process pool)  ->  batched writer
+
+    Downloads use boto3 managed transfers, which split large objects into
+    concurrent ranged GETs. Parsing runs in worker processes because FITS
+    parsing and hashing are CPU bound. The writer runs in the calling thread
+    and feeds a MetadataInsertBuffer, so there is only ever one writer.
+    """
+
+    def __init__(self, s3_client, bucket_name: str, config, db_manager, extractor,
+                 download_workers: int = 8, parse_workers: Optional[int] = None,
+                 queue_size: int = 64, transfer_config=None):
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.config = config
+        self.db_manager = db_manager
+        self.extractor = extractor
+        self.download_workers = max(1, int(download_workers))
+        # 0 parse workers = extract in a dispatcher thread (no process pool)
+        self.parse_workers = (os.cpu_count() or 1) if parse_workers is None else max(0, int(parse_workers))
+        self.queue_size = max(1, int(queue_size))
+        self.transfer_config = transfer_config
+        # Headers are read straight from S3 by the download stage (no temp files, no parse stage work)
+        self.in_memory = bool(config.get('lab2.ingest.in_memory_extraction', False))
+
+        self.stats = {
+            'download': StageStats('download'),
+            'parse': StageStats('parse'),
+            'write': StageStats('write')
+        }
+        self._abort = threading.Event()
+
+    @classmethod
+    def from_config(cls, config, s3_client, bucket_name: str, db_manager, extractor) -> 'MetadataPipeline':
+        """Build a pipeline using the lab2.pipeline settings"""
+        transfer_config = None
+        try:
+            from boto3.s3.transfer import TransferConfig
+            mb = 1024 ** 2
+            transfer_config = TransferConfig(
+                multipart_threshold=int(config.get('lab2.pipeline.multipart_threshold_mb', 8) * mb),
+                multipart_chunksize=int(config.get('lab2.pipeline.multipart_chunksize_mb', 8) * mb),
+                max_concurrency=config.get('lab2.pipeline.max_request_concurrency', 4)
+            )
+        except ImportError:
+            logger.warning("⚠️  boto3 transfer config not available - using client defaults")
+
+        return cls(
+            s3_client, bucket_name, config, db_manager, extractor,
+            download_workers=config.get('lab2.pipeline.download_workers', 8),
+            parse_workers=config.get('lab2.pipeline.parse_workers', None),
+            queue_size=config.get('lab2.pipeline.queue_size', 64),
+            transfer_config=transfer_config
+        )
+
+    def run(self, files: List[Dict[str, Any]], manifest=None) -> Dict[str, Any]:
+        """Process all files and return the same counters as the serial loop (plus stage stats)
+
+        When an IngestionManifest is given, every outcome is recorded in it as
+        part of the same batched transaction as the metadata.
+        """
+        result = {'processed': 0, 'inserted': 0, 'skipped': 0, 'failed': 0}
+        if not files:
+            result['stage_stats'] = {name: stage.summary() for name, stage in self.stats.items()}
+            return result
+
+        logger.info(f"🚀 Pipeline: {self.download_workers} download workers, "
+                    f"{'in-memory' if self.in_memory else self.parse_workers or 'inline'} parse workers, "
+                    f"queue size {self.queue_size}")
+
+        work_queue = queue.Queue()
+        for file_info in files:
+            work_queue.put(file_info)
+        downloaded_queue = queue.Queue(maxsize=self.queue_size)
+        parsed_queue = queue.Queue(maxsize=self.queue_size)
+
+        pool = None
+        if self.parse_workers and not self.in_memory:
+            # 'spawn' keeps worker start-up safe while download threads are running
+            pool = ProcessPoolExecutor(
+                max_workers=self.parse_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_parse_worker,
+                initargs=(self.config,)
+            )
+
+        for stage in self.stats.values():
+            stage.start()
+
+        downloaders = [
+            threading.Thread(target=self._download_worker, args=(work_queue, downloaded_queue), daemon=True,
+                             name=f"metadata-download-{i}")
+            for i in range(self.download_workers)
+        ]
+        dispatchers = [
+            threading.Thread(target=self._parse_dispatcher, args=(downloaded_queue, parsed_queue, pool), daemon=True,
+                             name=f"metadata-parse-{i}")
+            for i in range(max(1, self.parse_workers))
+        ]
+        # Closers forward end-of-stream once every thread of a stage has finished
+        closers = [
+            threading.Thread(target=self._close_stage, args=(downloaders, downloaded_queue, len(dispatchers), 'download'),
+                             daemon=True),
+            threading.Thread(target=self._close_stage, args=(dispatchers, parsed_queue, 1, 'parse'), daemon=True)
+        ]
+
+        for thread in downloaders + dispatchers + closers:
+            thread.start()
+
+        try:
+            self._write(parsed_queue, len(files), result, manifest)
+        except BaseException:
+            self._abort.set()
+            raise
+        finally:
+            for thread in downloaders + dispatchers + closers:
+                thread.join(timeout=5)
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+            for stage in self.stats.values():
+                if stage.finished_at is None:
+                    stage.finish()
+
+        result['stage_stats'] = {name: stage.summary() for name, stage in self.stats.items()}
+        self.log_stats()
+        return result
+
+    def log_stats(self):
+        """Log per-stage throughput"""
+        logger.info("📈 Pipeline stage throughput:")
+        for name, stage in self.stats.items():
+            summary = stage.summary()
+            logger.info(f"   {name:>8}: {summary['items']} items ({summary['errors']} errors) in "
+                        f"{summary['elapsed_seconds']}s - {summary['items_per_second']} items/s, "
+                        f"{summary['mb_per_second']} MB/s, busy {summary['busy_seconds']}s")
+
+    def _put(self, target_queue: queue.Queue, item) -> bool:
+        """Blocking put that gives up if the pipeline is aborted (avoids deadlock on a full queue)"""
+        while not self._abort.is_set():
+            try:
+                target_queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, source_queue: queue.Queue):
+        """Blocking get that returns _STOP if the pipeline is aborted"""
+        while not self._abort.is_set():
+            try:
+                return source_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+        return _STOP
+
+    def _close_stage(self, threads: List[threading.Thread], output_queue: queue.Queue, markers: int, stage_name: str):
+        """Wait for a stage's threads, then send one end-of-stream marker per downstream consumer"""
+        for thread in threads:
+            thread.join()
+        self.stats[stage_name].finish()
+        for _ in range(markers):
+            self._put(output_queue, _STOP)
+
+    def _download_worker(self, work_queue: queue.Queue, downloaded_queue: queue.Queue):
+        """Stage 1: download objects to temp files"""
+        while not self._abort.is_set():
+            try:
+                file_info = work_queue.get_nowait()
+            except queue.Empty:
+                return
+
+            if self.in_memory:
+                item = self._extract_in_memory(file_info)
+                if not self._put(downloaded_queue, item):
+                    return
+                continue
+
+            started = time.monotonic()
+            temp_path = None
+            try:
+                with tempfile.NamedTemporaryFile(delete=False, suffix='.gz') as temp_file:
+                    temp_path = temp_file.name
+                if self.transfer_config is not None:
+                    self.s3_client.download_file(self.bucket_name, file_info['key'], temp_path,
+                                                 Config=self.transfer_config)
+                else:
+                    self.s3_client.download_file(self.bucket_name, file_info['key'], temp_path)
+                self.stats['download'].record(time.monotonic() - started, nbytes=file_info.get('size', 0))
+                item = (file_info, temp_path, None, None)
+            except Exception as e:
+                self.stats['download'].record(time.monotonic() - started, error=True)
+                if temp_path and os.path.exists(temp_path):
+                    os.unlink(temp_path)
+                item = (file_info, None, None, e)
+
+            if not self._put(downloaded_queue, item) and item[1]:
+                os.unlink(item[1])
+
+    def _extract_in_memory(self, file_info: Dict[str, Any]):
+        """Download-stage extraction straight from S3 (header range reads or one streamed pass)"""
+        started = time.monotonic()
+        try:
+            metadata = self.extractor.extract_s3_object_metadata_in_memory(
+                self.s3_client, self.bucket_name, file_info['key'],
+                size=file_info.get('size'), etag=file_info.get('etag'), last_modified=file_info.get('last_modified')
+            )
+            self.stats['download'].record(time.monotonic() - started, nbytes=file_info.get('size', 0))
+            return file_info, None, metadata, None
+        except Exception as e:
+            self.stats['download'].record(time.monotonic() - started, error=True)
+            return file_info, None, None, e
+
+    def _parse_dispatcher(self, downloaded_queue: queue.Queue, parsed_queue: queue.Queue, pool):
+        """Stage 2: extract metadata (in the process pool, or inline) and clean up temp files"""
+        while True:
+            item = self._get(downloaded_queue)
+            if item is _STOP:
+                return
+
+            file_info, temp_path, metadata, error = item
+            if error is None and temp_path is not None:
+                started = time.monotonic()
+                try:
+                    s3_bucket = self.bucket_name
+                    if pool is not None:
+                        metadata = pool.submit(_parse_in_worker, temp_path, file_info['key'], s3_bucket).result()
+                    else:
+                        metadata = self.extractor.extract_s3_object_metadata(temp_path, file_info['key'], s3_bucket)
+                    self.stats['parse'].record(time.monotonic() - started, nbytes=file_info.get('size', 0))
+                except Exception as e:
+                    self.stats['parse'].record(time.monotonic() - started, error=True)
+                    error = e
+                finally:
+                    if os.path.exists(temp_path):
+                        os.unlink(temp_path)
+
+            if not self._put(parsed_queue, (file_info, metadata, error)):
+                return
+
+    def _write(self, parsed_queue: queue.Queue, total: int, result: Dict[str, Any], manifest=None):
+        """Stage 3: single writer - dedupe, buffer and insert in batches"""
+        dedupe_by_checksum = self.config.get('lab2.ingest.dedupe_by_checksum', False)
+        buffer = MetadataInsertBuffer(
+            self.db_manager,
+            max_rows=self.config.get('lab2.ingest.batch_rows', 5000),
+            max_age_seconds=self.config.get('lab2.ingest.flush_interval_seconds', 30)
+        )
+
+        with buffer:
+            while True:
+                item = self._get(parsed_queue)
+                if item is _STOP:
+                    break
+
+                file_info, metadata, error = item
+                filename = file_info['key'].split('/')[-1]
+                result['processed'] += 1
+                if result['processed'] % 100 == 0 or result['processed'] == total:
+                    logger.info(f"Processing file {result['processed']}/{total}: {filename}")
+
+                status = STATUS_SKIPPED
+                started = time.monotonic()
+                if error is not None:
+                    logger.error(f"❌ Failed to process {file_info['key']}: {error}")
+                    result['failed'] += 1
+                    status = STATUS_FAILED
+                elif not metadata:
+                    logger.debug(f"Skipped file (no metadata): {filename}")
+                    result['skipped'] += 1
+                elif dedupe_by_checksum and self.db_manager.is_known_checksum(metadata.get('checksum')):
+                    logger.debug(f"Skipped file with already catalogued content: {filename}")
+                    result['skipped'] += 1
+                else:
+                    status = STATUS_INGESTED
+                    buffer.add(
+                        metadata,
+                        manifest_entry=manifest.entry(file_info, status) if manifest is not None else None,
+                        replace_existing=file_info.get('replace_existing', False)
+                    )
+
+                if status != STATUS_INGESTED and manifest is not None:
+                    buffer.add_manifest_entry(manifest.entry(file_info, status))
+                self.stats['write'].record(time.monotonic() - started)
+
+            started = time.monotonic()
+
+        # Final flush happened on leaving the buffer context
+        self.stats['write'].busy_seconds += time.monotonic() - started
+        self.stats['write'].finish()
+
+        result['inserted'] = buffer.inserted_count
+        result['failed'] += buffer.failed_count
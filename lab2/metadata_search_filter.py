@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Metadata Search Filter for Lab 2
+Compiles search criteria into VAST DB predicates (evaluated server-side) and
+vectorized pyarrow.compute filters for whatever cannot be pushed down
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from ibis import _
+
+logger = logging.getLogger(__name__)
+
+COMPARISON_OPERATORS = {
+    '>': (pc.greater, lambda col, value: col > value),
+    '<': (pc.less, lambda col, value: col < value),
+    '>=': (pc.greater_equal, lambda col, value: col >= value),
+    '<=': (pc.less_equal, lambda col, value: col <= value),
+}
+
+
+class SearchCondition:
+    """A single compiled search criterion
+
+    ``mask`` is always available and evaluates the criterion on a RecordBatch.
+    ``predicate`` is the equivalent ibis expression for VAST DB, or None when
+    the criterion cannot be pushed down with identical semantics.
+    """
+
+    def __init__(self, column: str, mask: Callable[[pa.RecordBatch], pa.Array], predicate=None):
+        self.column = column
+        self.mask = mask
+        self.predicate = predicate
+
+
+class MetadataSearchFilter:
+    """Compiled form of the search criteria accepted by VASTDatabaseManager.search_metadata
+
+    Supported criteria per column:
+      {'type': 'exact', 'value': ...}
+      {'type': 'wildcard', 'pattern': 'abc*' | '*abc' | '*abc*' | '*'}
+      {'type': 'comparison', 'operator': '>' | '<' | '>=' | '<=', 'value': ...}
+
+    String matching is case-insensitive unless the criterion sets
+    'case_sensitive': True. VAST DB predicates are case-sensitive, so a
+    case-insensitive exact or wildcard match pushes down the value as typed,
+    in lower case, upper case and capitalized (e.g. swift/SWIFT/Swift); the
+    case-insensitive mask is still used when pushdown is off. Stored values in
+    any other mixed case (e.g. 'sWiFt') are only found with 'case_sensitive':
+    True and the exact spelling. Case-insensitive string comparisons and
+    suffix wildcards are evaluated client-side.
+    """
+
+    def __init__(self, search_criteria: Dict[str, Any], table_schema: pa.Schema):
+        self.table_schema = table_schema
+        self.conditions: List[SearchCondition] = []
+        # Criteria on unknown columns can never match any record
+        self.matches_nothing = False
+
+        for column, criteria in search_criteria.items():
+            if column not in table_schema.names:
+                logger.debug(f"Search column '{column}' not in table schema - no records can match")
+                self.matches_nothing = True
+                continue
+            condition = self._compile(column, table_schema.field(column).type, criteria)
+            if condition is not None:
+                self.conditions.append(condition)
+
+    @property
+    def predicate(self):
+        """Combined ibis predicate of all pushable conditions (None if nothing can be pushed down)"""
+        combined = None
+        for condition in self.conditions:
+            if condition.predicate is not None:
+                combined = condition.predicate if combined is None else combined & condition.predicate
+        return combined
+
+    def residual_conditions(self, pushdown: bool = True) -> List[SearchCondition]:
+        """Conditions that have to be evaluated client-side"""
+        if not pushdown:
+            return list(self.conditions)
+        return [c for c in self.conditions if c.predicate is None]
+
+    def residual_columns(self, pushdown: bool = True) -> List[str]:
+        """Columns needed to evaluate the client-side conditions"""
+        columns = []
+        for condition in self.residual_conditions(pushdown):
+            if condition.column not in columns:
+                columns.append(condition.column)
+        return columns
+
+    def filter_batch(self, batch: pa.RecordBatch, pushdown: bool = True) -> pa.RecordBatch:
+        """Apply the client-side conditions to a whole batch at once"""
+        conditions = self.residual_conditions(pushdown)
+        if not conditions or batch.num_rows == 0:
+            return batch
+
+        mask = None
+        for condition in conditions:
+            condition_mask = pc.fill_null(condition.mask(batch), False)
+            mask = condition_mask if mask is None else pc.and_(mask, condition_mask)
+        return batch.filter(mask)
+
+    def _compile(self, column: str, column_type: pa.DataType, criteria: Dict[str, Any]) -> Optional[SearchCondition]:
+        """Compile one criterion into a SearchCondition (None means 'matches everything')"""
+        criteria_type = criteria.get('type')
+        case_sensitive = bool(criteria.get('case_sensitive', False))
+        is_string = pa.types.is_string(column_type) or pa.types.is_large_string(column_type)
+
+        if criteria_type == 'wildcard':
+            pattern = str(criteria.get('pattern', ''))
+            if pattern == '*':
+                return None
+            if not is_string:
+                # Wildcards on typed columns compare against the string form
+                return SearchCondition(column, self._string_mask(column, pattern, case_sensitive, cast=True))
+            if case_sensitive:
+                predicate = self._wildcard_predicate(column, pattern)
+            else:
+                predicate = self._any_case_predicate(lambda form: self._wildcard_predicate(column, form), pattern)
+            return SearchCondition(column, self._string_mask(column, pattern, case_sensitive), predicate)
+
+        if criteria_type == 'exact':
+            value = criteria.get('value')
+            if is_string:
+                if case_sensitive:
+                    predicate = _[column] == str(value)
+                else:
+                    predicate = self._any_case_predicate(lambda form: _[column] == form, str(value))
+                return SearchCondition(column, self._string_mask(column, str(value), case_sensitive), predicate)
+            literal = self._coerce_literal(value, column_type)
+            if literal is None:
+                return SearchCondition(column, self._string_mask(column, str(value), case_sensitive, cast=True))
+            return SearchCondition(
+                column,
+                lambda batch: pc.equal(batch[column], pa.scalar(literal, type=column_type)),
+                _[column] == literal
+            )
+
+        if criteria_type == 'comparison':
+            operator = criteria.get('operator')
+            if operator not in COMPARISON_OPERATORS:
+                raise ValueError(f"Unsupported comparison operator: {operator}")
+            compute_fn, build_predicate = COMPARISON_OPERATORS[operator]
+            value = criteria.get('value')
+
+            if is_string:
+                if case_sensitive:
+                    return SearchCondition(
+                        column,
+                        lambda batch: compute_fn(batch[column], str(value)),
+                        build_predicate(_[column], str(value))
+                    )
+                return SearchCondition(column, lambda batch: compute_fn(pc.utf8_lower(batch[column]), str(value).lower()))
+
+            literal = self._coerce_literal(value, column_type)
+            if literal is None:
+                # e.g. a fractional bound on an integer column, or a non-date on a timestamp column
+                try:
+                    number = float(value)
+                except (ValueError, TypeError):
+                    return SearchCondition(
+                        column,
+                        lambda batch: compute_fn(pc.utf8_lower(pc.cast(batch[column], pa.utf8())), str(value).lower())
+                    )
+                return SearchCondition(column, lambda batch: compute_fn(batch[column], number))
+            return SearchCondition(
+                column,
+                lambda batch: compute_fn(batch[column], pa.scalar(literal, type=column_type)),
+                build_predicate(_[column], literal)
+            )
+
+        raise ValueError(f"Unsupported search criteria type for '{column}': {criteria_type}")
+
+    @staticmethod
+    def _case_forms(text: str) -> List[str]:
+        """Spellings pushed down for a case-insensitive match (one when ``text`` has no letters)"""
+        return list(dict.fromkeys([text, text.lower(), text.upper(), text.capitalize()]))
+
+    @classmethod
+    def _any_case_predicate(cls, build: Callable, text: str):
+        """OR of ``build(form)`` over the case forms of ``text`` (None if any form cannot be pushed down)"""
+        predicate = None
+        for form in cls._case_forms(text):
+            term = build(form)
+            if term is None:
+                return None
+            predicate = term if predicate is None else predicate | term
+        return predicate
+
+    @staticmethod
+    def _wildcard_predicate(column: str, pattern: str):
+        """ibis predicate for a case-sensitive wildcard (None when VAST DB has no equivalent)"""
+        if pattern.startswith('*') and pattern.endswith('*'):
+            return _[column].contains(pattern[1:-1])
+        if pattern.startswith('*'):
+            # No server-side 'ends with' - evaluated client-side
+            return None
+        if pattern.endswith('*'):
+            return _[column].startswith(pattern[:-1])
+        return _[column] == pattern
+
+    @staticmethod
+    def _string_mask(column: str, pattern: str, case_sensitive: bool, cast: bool = False) -> Callable:
+        """Vectorized wildcard/exact string match"""
+        ignore_case = not case_sensitive
+
+        def values(batch):
+            array = batch[column]
+            return pc.cast(array, pa.utf8()) if cast else array
+
+        if pattern.startswith('*') and pattern.endswith('*') and len(pattern) > 1:
+            needle = pattern[1:-1]
+            return lambda batch: pc.match_substring(values(batch), needle, ignore_case=ignore_case)
+        if pattern.startswith('*'):
+            needle = pattern[1:]
+            return lambda batch: pc.ends_with(values(batch), needle, ignore_case=ignore_case)
+        if pattern.endswith('*'):
+            needle = pattern[:-1]
+            return lambda batch: pc.starts_with(values(batch), needle, ignore_case=ignore_case)
+        if ignore_case:
+            return lambda batch: pc.equal(pc.utf8_lower(values(batch)), pattern.lower())
+        return lambda batch: pc.equal(values(batch), pattern)
+
+    @staticmethod
+    def _coerce_literal(value: Any, column_type: pa.DataType) -> Any:
+        """Convert a criterion value to the column's Python type (None if it cannot be converted)"""
+        try:
+            if pa.types.is_timestamp(column_type):
+                if isinstance(value, datetime):
+                    parsed = value
+                else:
+                    parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+                if parsed.tzinfo is not None:
+                    # Table timestamps are stored as naive UTC
+                    parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+                return parsed
+            if pa.types.is_integer(column_type):
+                number = float(value)
+                return int(number) if number.is_integer() else None
+            if pa.types.is_floating(column_type):
+                return float(value)
+            if pa.types.is_boolean(column_type):
+                text = str(value).strip().lower()
+                if text in ('true', '1', 'yes'):
+                    return True
+                if text in ('false', '0', 'no'):
+                    return False
+                return None
+        except (ValueError, TypeError):
+            return None
+        return value
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Metadata Statistics for Lab 2
+Vectorized catalog statistics (group-by counts, size sums, time ranges) over a
+projected column set, plus a small TTL cache so repeated stats calls do not
+rescan the table
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+logger = logging.getLogger(__name__)
+
+# Group-by column -> prefix of its entries in the stats dict
+GROUP_COLUMNS = {'mission_id': 'mission', 'dataset_name': 'dataset', 'file_format': 'format'}
+SIZE_COLUMN = 'file_size_bytes'
+TIME_COLUMNS = ('observation_timestamp', 'ingestion_timestamp')
+# The only columns the stats scan needs to fetch
+STATS_COLUMNS = tuple(GROUP_COLUMNS) + (SIZE_COLUMN,) + TIME_COLUMNS
+
+UNKNOWN = 'unknown'
+
+
+class MetadataStatsAccumulator:
+    """Aggregates catalog batches into per-group counts, size sums and time ranges
+
+    Each batch is reduced with ``Table.group_by().aggregate()`` as soon as it
+    arrives, so memory is bounded by the number of distinct groups rather than
+    the number of rows. Partial aggregates are combined in ``result()``.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.size_bytes = 0
+        self._partials: Dict[str, List[pa.Table]] = {column: [] for column in GROUP_COLUMNS}
+        self._time_ranges: Dict[str, List[Tuple[Any, Any]]] = {column: [] for column in TIME_COLUMNS}
+
+    def add(self, batch: pa.RecordBatch):
+        """Aggregate one projected RecordBatch"""
+        if not batch.num_rows:
+            return
+        self.rows += batch.num_rows
+        table = pa.Table.from_batches([batch])
+
+        sizes = (table.column(SIZE_COLUMN).fill_null(0) if SIZE_COLUMN in table.column_names
+                 else pa.nulls(table.num_rows, pa.int64()).fill_null(0))
+        self.size_bytes += pc.sum(sizes).as_py() or 0
+        for column in GROUP_COLUMNS:
+            if column not in table.column_names:
+                continue
+            keys = table.column(column).fill_null(UNKNOWN)
+            grouped = pa.table({'key': keys, 'size': sizes}).group_by('key').aggregate([
+                ('key', 'count'),
+                ('size', 'sum'),
+            ])
+            self._partials[column].append(grouped)
+
+        for column in TIME_COLUMNS:
+            if column in table.column_names:
+                bounds = pc.min_max(table.column(column))
+                if bounds['min'].is_valid:
+                    self._time_ranges[column].append((bounds['min'].as_py(), bounds['max'].as_py()))
+
+    def result(self) -> Dict[str, Any]:
+        """Combine partial aggregates into the stats dict returned by get_metadata_stats"""
+        stats = {'total_files': self.rows, 'total_size_bytes': self.size_bytes}
+
+        for column, name in GROUP_COLUMNS.items():
+            counts, sizes = self._combine(self._partials[column])
+            stats[f'{name}_counts'] = counts
+            stats[f'{name}_size_bytes'] = sizes
+
+        for column in TIME_COLUMNS:
+            ranges = self._time_ranges[column]
+            name = column.replace('_timestamp', '')
+            stats[f'{name}_range'] = ({'min': min(r[0] for r in ranges), 'max': max(r[1] for r in ranges)}
+                                      if ranges else None)
+        return stats
+
+    @staticmethod
+    def _combine(partials: List[pa.Table]) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """Merge per-batch group tables into {key: count} and {key: size} (largest groups first)"""
+        if not partials:
+            return {}, {}
+        merged = pa.concat_tables(partials).group_by('key').aggregate([
+            ('key_count', 'sum'),
+            ('size_sum', 'sum'),
+        ]).sort_by([('key_count_sum', 'descending'), ('key', 'ascending')])
+        keys = merged.column('key').to_pylist()
+        counts = merged.column('key_count_sum').to_pylist()
+        sizes = merged.column('size_sum_sum').to_pylist()
+        return dict(zip(keys, counts)), dict(zip(keys, sizes))
+
+
+class MetadataStatsCache:
+    """Thread-safe TTL cache for stats results, keyed by tuples that start with (endpoint, bucket, schema)
+
+    Entries expire after ``ttl_seconds`` and are dropped immediately when the
+    owning process inserts into or clears the catalog. Writes from other
+    processes are picked up once the TTL runs out.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple, Tuple[float, Dict[str, Any]]] = {}
+
+    def get(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, stats = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+            return dict(stats)
+
+    def put(self, key: Tuple, stats: Dict[str, Any], ttl_seconds: float):
+        if ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl_seconds, dict(stats))
+
+    def invalidate(self, prefix: Optional[Tuple] = None):
+        """Drop every entry whose key starts with ``prefix`` (everything if None)"""
+        with self._lock:
+            if prefix is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if k[:len(prefix)] == prefix]:
+                del self._entries[key]
+
+
+# Shared by every VASTDatabaseManager in the process
+stats_cache = MetadataStatsCache()
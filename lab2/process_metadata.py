@@ -10,14 +10,16 @@ import logging
 import tempfile
 from pathlib import Path
 import urllib3
-from typing import Dict, List, Any
+from contextlib import nullcontext
+from typing import Dict, List, Any, Optional
 
 # Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent.parent))
 
 from config_loader import ConfigLoader
-from lab2.vast_database_manager import VASTDatabaseManager
+from lab2.vast_database_manager import VASTDatabaseManager, MetadataInsertBuffer, VASTDB_AVAILABLE
 from lab2.swift_metadata_extractor import SwiftMetadataExtractor
+from lab2.ingestion_manifest import IngestionManifest, STATUS_INGESTED, STATUS_SKIPPED, STATUS_FAILED
 
 # Configure logging
 logging.basicConfig(
@@ -39,7 +41,7 @@ class MetadataProcessor:
         self.db_manager = VASTDatabaseManager(self.config)
         self.extractor = SwiftMetadataExtractor(self.config)
     
-    def process_all_datasets(self) -> Dict[str, Any]:
+    def process_all_datasets(self, serial: Optional[bool] = None) -> Dict[str, Any]:
         """Process metadata for all available datasets from S3"""
         logger.info("🚀 Starting metadata processing from S3...")
         
@@ -64,7 +66,7 @@ class MetadataProcessor:
             logger.info(f"{'='*60}")
             
             # Process dataset from S3
-            result = self.process_dataset_metadata_from_s3(dataset['name'])
+            result = self.process_dataset_metadata_from_s3(dataset['name'], serial=serial)
             
             if result['failed'] == 0:
                 success_count += 1
@@ -180,8 +182,13 @@ class MetadataProcessor:
             logger.error(f"❌ Failed to scan S3 for datasets: {e}")
             return []
     
-    def process_dataset_metadata_from_s3(self, dataset_name: str) -> Dict[str, Any]:
-        """Process metadata for a dataset from S3"""
+    def process_dataset_metadata_from_s3(self, dataset_name: str, serial: Optional[bool] = None) -> Dict[str, Any]:
+        """Process metadata for a dataset from S3
+        
+        By default files go through the staged MetadataPipeline (parallel
+        downloads, process-pool extraction, one batched writer). ``serial=True``
+        uses the original one-file-at-a-time loop.
+        """
         try:
             import boto3
             
@@ -231,6 +238,7 @@ class MetadataProcessor:
                             files.append({
                                 'key': obj['Key'],
                                 'size': obj['Size'],
+                                'etag': obj.get('ETag', '').strip('"'),
                                 'last_modified': obj['LastModified']
                             })
             
@@ -240,34 +248,129 @@ class MetadataProcessor:
                 logger.warning(f"⚠️  No files found in dataset: {dataset_name}")
                 return {'processed': 0, 'inserted': 0, 'skipped': 0, 'failed': 0}
             
-            # Process files
-            processed = 0
-            inserted = 0
-            skipped = 0
-            failed = 0
+            # Objects that are unchanged since they were last handled are
+            # skipped using the ingestion manifest (key, ETag, size)
+            manifest = None
+            candidates = files
+            unchanged = 0
+            use_manifest = self.config.get('lab2.ingest.manifest', True) and self.db_manager.ensure_manifest_table()
+            
+            # Planning reads (manifest, catalog lookups) and the manifest backfill share one
+            # transaction; without a reachable VAST DB each call falls back to its own handling
+            shared = VASTDB_AVAILABLE and (self.db_manager.connection or self.db_manager.connect())
+            with self.db_manager.session() if shared else nullcontext():
+                if use_manifest:
+                    manifest = IngestionManifest.load(self.db_manager, prefix=f"{dataset_name}/")
+                    candidates, unchanged = manifest.plan(files)
+                    logger.info(f"📒 Manifest: {unchanged} unchanged objects skipped, {len(candidates)} new or changed")
+                
+                # Find objects that are already catalogued with one bulk lookup
+                # (no per-file table scans), optionally from a preloaded in-process index
+                if self.config.get('lab2.ingest.preload_known_files', False):
+                    self.db_manager.load_known_files()
+                catalog_paths = {
+                    file_info['key']: self.extractor.catalog_file_path(dataset_name, file_info['key'].split('/')[-1])
+                    for file_info in candidates
+                }
+                # Changed objects are re-ingested (replacing their row), so they are not looked up
+                known_paths = self.db_manager.existing_file_paths(
+                    catalog_paths[file_info['key']] for file_info in candidates if not file_info.get('replace_existing')
+                )
+                
+                pending = []
+                catalogued = []
+                for file_info in candidates:
+                    catalog_path = catalog_paths[file_info['key']]
+                    if catalog_path in known_paths and not file_info.get('replace_existing'):
+                        catalogued.append(file_info)
+                        continue
+                    if catalog_path:
+                        # Files with the same catalog path are only ingested once per run
+                        known_paths.add(catalog_path)
+                    pending.append(file_info)
+                
+                if catalogued:
+                    logger.info(f"⏭️  {len(catalogued)} files already have metadata and will be skipped")
+                    if manifest is not None:
+                        # Backfill the manifest so the next run skips them without a catalog lookup
+                        self.db_manager.insert_metadata_batch(
+                            [], manifest_entries=[manifest.entry(file_info, STATUS_INGESTED) for file_info in catalogued]
+                        )
+            
+            already_catalogued = unchanged + len(catalogued)
+            
+            if serial is None:
+                serial = not self.config.get('lab2.pipeline.enabled', True)
+            
+            if serial:
+                result = self._process_files_serially(s3_client, bucket_name, pending, manifest=manifest)
+            else:
+                from lab2.metadata_pipeline import MetadataPipeline
+                pipeline = MetadataPipeline.from_config(
+                    self.config, s3_client, bucket_name, self.db_manager, self.extractor
+                )
+                result = pipeline.run(pending, manifest=manifest)
+            
+            result['processed'] += already_catalogued
+            result['skipped'] += already_catalogued
             
+            logger.info(f"Processing complete: {result['inserted']} inserted, {result['skipped']} skipped, {result['failed']} failed")
+            self.db_manager.transaction_metrics.log_summary()
+            return result
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to process dataset from S3: {e}")
+            return {'processed': 0, 'inserted': 0, 'skipped': 0, 'failed': 0}
+    
+    def _process_files_serially(self, s3_client, bucket_name: str, files: List[Dict[str, Any]],
+                                manifest: Optional[IngestionManifest] = None) -> Dict[str, Any]:
+        """Download, extract and buffer one file at a time (reference path for the pipeline)"""
+        processed = 0
+        skipped = 0
+        failed = 0
+        dedupe_by_checksum = self.config.get('lab2.ingest.dedupe_by_checksum', False)
+        in_memory = self.config.get('lab2.ingest.in_memory_extraction', False)
+        
+        # Metadata is accumulated and inserted in batches (by row count or age)
+        # instead of one transaction per file
+        buffer = MetadataInsertBuffer(
+            self.db_manager,
+            max_rows=self.config.get('lab2.ingest.batch_rows', 5000),
+            max_age_seconds=self.config.get('lab2.ingest.flush_interval_seconds', 30)
+        )
+        
+        with buffer:
             for i, file_info in enumerate(files, 1):
                 filename = file_info['key'].split('/')[-1]
                 if i % 100 == 0 or i == len(files):
                     logger.info(f"Processing file {i}/{len(files)}: {filename}")
                 
+                temp_path = None
                 try:
-                    # Download file temporarily for processing
-                    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.gz')
-                    s3_client.download_file(bucket_name, file_info['key'], temp_file.name)
-                    
-                    # Process the file
-                    metadata = self.extract_file_metadata(temp_file.name, file_info['key'])
+                    if in_memory:
+                        # Read headers straight from S3 (no temp file)
+                        metadata = self.extract_object_metadata_in_memory(s3_client, bucket_name, file_info)
+                    else:
+                        # Download file temporarily for processing
+                        with tempfile.NamedTemporaryFile(delete=False, suffix='.gz') as temp_file:
+                            temp_path = temp_file.name
+                        s3_client.download_file(bucket_name, file_info['key'], temp_path)
+                        
+                        # Process the file
+                        metadata = self.extract_file_metadata(temp_path, file_info['key'])
                     
-                    if metadata:
-                        # Insert metadata into database
-                        logger.info(f"Attempting to insert metadata for {filename}")
-                        if self.db_manager.insert_metadata(metadata):
-                            inserted += 1
-                            logger.info(f"Successfully inserted {filename}")
-                        else:
-                            logger.warning(f"Failed to insert metadata for {filename}")
-                            skipped += 1
+                    if metadata and dedupe_by_checksum and self.db_manager.is_known_checksum(metadata.get('checksum')):
+                        logger.debug(f"Skipped file with already catalogued content: {filename}")
+                        skipped += 1
+                        if manifest is not None:
+                            buffer.add_manifest_entry(manifest.entry(file_info, STATUS_SKIPPED))
+                    elif metadata:
+                        # Queue metadata (and its manifest entry) for the next batched insert
+                        buffer.add(
+                            metadata,
+                            manifest_entry=manifest.entry(file_info, STATUS_INGESTED) if manifest is not None else None,
+                            replace_existing=file_info.get('replace_existing', False)
+                        )
                     else:
                         # Log why file was skipped
                         if "tmp" in filename.lower():
@@ -275,53 +378,43 @@ class MetadataProcessor:
                         else:
                             logger.debug(f"Skipped file (no metadata): {filename}")
                         skipped += 1
+                        if manifest is not None:
+                            buffer.add_manifest_entry(manifest.entry(file_info, STATUS_SKIPPED))
                     
                     processed += 1
                     
-                    # Clean up temp file
-                    os.unlink(temp_file.name)
-                    
                 except Exception as e:
                     logger.error(f"❌ Failed to process {file_info['key']}: {e}")
                     failed += 1
                     processed += 1
-            
-            logger.info(f"Processing complete: {inserted} inserted, {skipped} skipped, {failed} failed")
-            return {
-                'processed': processed,
-                'inserted': inserted,
-                'skipped': skipped,
-                'failed': failed
-            }
-            
-        except Exception as e:
-            logger.error(f"❌ Failed to process dataset from S3: {e}")
-            return {'processed': 0, 'inserted': 0, 'skipped': 0, 'failed': 0}
+                    if manifest is not None:
+                        buffer.add_manifest_entry(manifest.entry(file_info, STATUS_FAILED))
+                finally:
+                    # Clean up temp file
+                    if temp_path and os.path.exists(temp_path):
+                        os.unlink(temp_path)
+        
+        return {
+            'processed': processed,
+            'inserted': buffer.inserted_count,
+            'skipped': skipped,
+            'failed': failed + buffer.failed_count
+        }
     
     def extract_file_metadata(self, file_path: str, s3_key: str) -> Dict[str, Any]:
         """Extract metadata from a file and prepare for database insertion"""
-        try:
-            # Extract dataset name from S3 key (first part before first slash)
-            dataset_name = s3_key.split('/')[0] if '/' in s3_key else 'unknown'
-            
-            # Extract metadata using the Swift metadata extractor
-            original_filename = s3_key.split('/')[-1]  # Get the original filename from S3 key
-            metadata = self.extractor.extract_metadata_from_file(file_path, dataset_name, original_filename)
-            
-            if not metadata:
-                return None
-            
-            # Add S3-specific information
-            metadata['s3_key'] = s3_key
-            metadata['s3_bucket'] = self.config.get('lab2.raw_data.view_path', '/lab2-raw-data').lstrip('/').replace('/', '-')
-            metadata['file_size'] = os.path.getsize(file_path)
-            metadata['extraction_timestamp'] = self.extractor.get_current_timestamp()
-            
-            return metadata
-            
-        except Exception as e:
-            logger.error(f"❌ Failed to extract metadata from {file_path}: {e}")
-            return None
+        return self.extractor.extract_s3_object_metadata(file_path, s3_key, self._raw_data_bucket())
+    
+    def extract_object_metadata_in_memory(self, s3_client, bucket_name: str, file_info: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Extract metadata for a listed S3 object without downloading it to disk"""
+        return self.extractor.extract_s3_object_metadata_in_memory(
+            s3_client, bucket_name, file_info['key'],
+            size=file_info.get('size'), etag=file_info.get('etag'), last_modified=file_info.get('last_modified')
+        )
+    
+    def _raw_data_bucket(self) -> str:
+        """S3 bucket name derived from the raw data view path"""
+        return self.config.get('lab2.raw_data.view_path', '/lab2-raw-data').lstrip('/').replace('/', '-')
 
 def main():
     """Main entry point for metadata processing"""
@@ -333,6 +426,7 @@ def main():
     parser.add_argument('--dataset', help='Process specific dataset only')
     parser.add_argument('--dry-run', action='store_true', help='Dry run mode (no changes)')
     parser.add_argument('--skip-db-check', action='store_true', help='Skip DB connectivity check in dry-run (setup already verified)')
+    parser.add_argument('--serial', action='store_true', help='Process files one at a time instead of using the parallel pipeline')
     
     args = parser.parse_args()
     
@@ -381,11 +475,11 @@ def main():
     
     if args.dataset:
         # Process specific dataset
-        result = processor.process_dataset_metadata_from_s3(args.dataset)
+        result = processor.process_dataset_metadata_from_s3(args.dataset, serial=args.serial or None)
         logger.info(f"📊 Dataset processing complete: {result}")
     else:
         # Process all datasets
-        result = processor.process_all_datasets()
+        result = processor.process_all_datasets(serial=args.serial or None)
         if result['failed'] == 0:
             logger.info("✅ All datasets processed successfully")
             sys.exit(0)
@@ -9,7 +9,7 @@ import sys
 import logging
 import json
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Union
 from datetime import datetime
 
 # Add parent directory to path for imports
@@ -25,6 +25,12 @@ class DateTimeEncoder(json.JSONEncoder):
             return obj.isoformat()
         return super().default(obj)
 
+def as_records(results) -> List[Dict[str, Any]]:
+    """Convert a pyarrow Table (or an existing list of dicts) to a list of dicts"""
+    if hasattr(results, 'to_pylist'):
+        return results.to_pylist()
+    return results or []
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -77,15 +83,15 @@ class MetadataSearcher:
         finally:
             self.db_manager.close()
     
-    def get_recent_metadata(self, limit: int = 100) -> List[Dict[str, Any]]:
-        """Get recent metadata records"""
+    def get_recent_metadata(self, limit: int = 100):
+        """Get recent metadata records as a pyarrow Table"""
         try:
             if not self.db_manager.connect():
                 logger.error("❌ Failed to connect to database")
                 return []
             
-            results = self.db_manager.get_recent_metadata(limit)
-            logger.info(f"📊 Retrieved {len(results)} recent records")
+            results = self.db_manager.get_recent_metadata(limit, as_arrow=True)
+            logger.info(f"📊 Retrieved {results.num_rows} recent records")
             return results
             
         except Exception as e:
@@ -94,15 +100,15 @@ class MetadataSearcher:
         finally:
             self.db_manager.close()
     
-    def get_latest_files(self, count: int = 10) -> List[Dict[str, Any]]:
-        """Get latest files by timestamp"""
+    def get_latest_files(self, count: int = 10):
+        """Get the most recently ingested files as a pyarrow Table"""
         try:
             if not self.db_manager.connect():
                 logger.error("❌ Failed to connect to database")
                 return []
             
-            results = self.db_manager.get_latest_files(count)
-            logger.info(f"📊 Retrieved {len(results)} latest files")
+            results = self.db_manager.get_latest_files(count, as_arrow=True)
+            logger.info(f"📊 Retrieved {results.num_rows} latest files")
             return results
             
         except Exception as e:
@@ -111,16 +117,20 @@ class MetadataSearcher:
         finally:
             self.db_manager.close()
     
-    def display_results(self, results: List[Dict[str, Any]], max_display: int = 10):
-        """Display search results in a formatted way"""
-        if not results:
+    def display_results(self, results: Union[List[Dict[str, Any]], Any], max_display: int = 10):
+        """Display search results in a formatted way
+        
+        Accepts a list of dicts or a pyarrow Table; only the rows that are
+        actually printed are converted to dicts.
+        """
+        if results is None or len(results) == 0:
             print("📭 No results found")
             return
         
         print(f"\n📊 Found {len(results)} results:")
         print("-" * 80)
         
-        for i, result in enumerate(results[:max_display]):
+        for i, result in enumerate(as_records(results[:max_display])):
             print(f"\n{i+1}. File: {result.get('file_name', 'N/A')}")
             print(f"   Mission: {result.get('mission_id', 'N/A')}")
             print(f"   Satellite: {result.get('satellite_name', 'N/A')}")
@@ -187,10 +197,28 @@ class MetadataSearcher:
         
         # Show dataset breakdown
         dataset_counts = stats.get('dataset_counts', {})
+        dataset_sizes = stats.get('dataset_size_bytes', {})
         if dataset_counts:
             print(f"Datasets: {len(dataset_counts)}")
             for dataset, count in dataset_counts.items():
-                print(f"  - {dataset}: {count} files")
+                size = dataset_sizes.get(dataset)
+                size_text = f" ({size / (1024 * 1024):.1f} MB)" if size is not None else ""
+                print(f"  - {dataset}: {count} files{size_text}")
+        
+        # Show format breakdown
+        format_counts = stats.get('format_counts', {})
+        if format_counts:
+            print(f"Formats: {len(format_counts)}")
+            for file_format, count in format_counts.items():
+                print(f"  - {file_format}: {count} files")
+        
+        if stats.get('total_size_bytes') is not None:
+            print(f"Total size: {stats['total_size_bytes'] / (1024 * 1024):.1f} MB")
+        
+        for label, key in (("Observations", 'observation_range'), ("Ingested", 'ingestion_range')):
+            time_range = stats.get(key)
+            if time_range:
+                print(f"{label}: {time_range['min']} → {time_range['max']}")
 
 def main():
     """Main entry point for metadata search"""
@@ -205,6 +233,10 @@ def main():
     parser.add_argument('--recent', type=int, help='Show recent N files')
     parser.add_argument('--stats', action='store_true', help='Show statistics')
     parser.add_argument('--json', action='store_true', help='Output results as JSON')
+    parser.add_argument('--case-sensitive', action='store_true',
+                        help='Exact-case matching. By default matching ignores case; VAST DB then filters '
+                             'on the value as typed, lower-case, upper-case and capitalized, so stored values '
+                             'in other mixed case are only found with this flag and the exact spelling')
     
     args = parser.parse_args()
     
@@ -226,7 +258,7 @@ def main():
     if args.recent:
         results = searcher.get_recent_metadata(args.recent)
         if args.json:
-            print(json.dumps(results, indent=2, cls=DateTimeEncoder))
+            print(json.dumps(as_records(results), indent=2, cls=DateTimeEncoder))
         else:
             searcher.display_results(results)
         return
@@ -247,6 +279,10 @@ def main():
         print("❌ No search criteria provided. Use --help for options.")
         return
     
+    if args.case_sensitive:
+        for criterion in criteria.values():
+            criterion['case_sensitive'] = True
+    
     results = searcher.search_metadata(criteria)
     
     if args.json:
@@ -12,10 +12,126 @@ from datetime import datetime
 from typing import Dict, List, Optional, Any, Tuple
 from pathlib import Path
 import gzip
+import io
 import re
+import zlib
 
 logger = logging.getLogger(__name__)
 
+# FITS files are made of 2880-byte blocks; headers are 80-character cards
+FITS_BLOCK_SIZE = 2880
+FITS_CARD_SIZE = 80
+# Give up looking for the END card after this many blocks (not a FITS header)
+MAX_FITS_HEADER_BLOCKS = 100
+
+
+class S3RangeReader(io.RawIOBase):
+    """Read-only file object over an S3 object that fetches data with Range requests on demand
+
+    Wrap it in io.BufferedReader so each underlying read fetches one whole
+    range. Only the bytes that are actually read (or read ahead by the
+    buffer) are transferred.
+    """
+    
+    def __init__(self, s3_client, bucket: str, key: str, size: int):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.size = size
+        self.position = 0
+        self.bytes_fetched = 0
+        self.requests = 0
+    
+    def readable(self) -> bool:
+        return True
+    
+    def seekable(self) -> bool:
+        return True
+    
+    def tell(self) -> int:
+        return self.position
+    
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        else:
+            self.position = self.size + offset
+        self.position = max(0, self.position)
+        return self.position
+    
+    def readinto(self, buffer) -> int:
+        if self.position >= self.size or len(buffer) == 0:
+            return 0
+        end = min(self.position + len(buffer), self.size) - 1
+        response = self.s3_client.get_object(Bucket=self.bucket, Key=self.key, Range=f"bytes={self.position}-{end}")
+        data = response['Body'].read()
+        self.requests += 1
+        self.bytes_fetched += len(data)
+        buffer[:len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+
+class HashingReader:
+    """Pass-through reader that hashes every byte handed out (forward-only)"""
+    
+    def __init__(self, stream, hash_object=None):
+        self.stream = stream
+        self.hash = hash_object or hashlib.sha256()
+        self.bytes_read = 0
+    
+    def read(self, size: int = -1) -> bytes:
+        data = self.stream.read() if size is None or size < 0 else self.stream.read(size)
+        self.hash.update(data)
+        self.bytes_read += len(data)
+        return data
+    
+    def readable(self) -> bool:
+        return True
+    
+    def drain(self, chunk_size: int = 1024 * 1024) -> str:
+        """Read (and hash) whatever is left and return the hex digest"""
+        while self.read(chunk_size):
+            pass
+        return self.hash.hexdigest()
+
+
+class GunzipReader:
+    """Streaming gunzip that only pulls as much compressed input as the reads need"""
+    
+    def __init__(self, stream, chunk_size: int = 16 * 1024):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        self._buffer = bytearray()
+        self._eof = False
+    
+    def read(self, size: int = -1) -> bytes:
+        while not self._eof and (size is None or size < 0 or len(self._buffer) < size):
+            compressed = self.stream.read(self.chunk_size)
+            if not compressed:
+                self._buffer += self._decompressor.flush()
+                self._eof = True
+                break
+            self._buffer += self._decompressor.decompress(compressed)
+            # Concatenated gzip members
+            while self._decompressor.unused_data:
+                remainder = self._decompressor.unused_data
+                self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                self._buffer += self._decompressor.decompress(remainder)
+        
+        if size is None or size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+    
+    def readable(self) -> bool:
+        return True
+
+
 class SwiftMetadataExtractor:
     """Extracts metadata from Swift satellite data files"""
     
@@ -24,8 +140,12 @@ class SwiftMetadataExtractor:
         self.config = config
         self.supported_formats = ['.fits', '.gz', '.txt', '.json', '.lc']
         
-    def extract_metadata_from_file(self, file_path: str, dataset_name: str = None, original_filename: str = None) -> Optional[Dict[str, Any]]:
-        """Extract metadata from a Swift data file"""
+        from lab2.file_hasher import FileHasher
+        self.hasher = FileHasher.from_config(config)
+        
+    def extract_metadata_from_file(self, file_path: str, dataset_name: str = None, original_filename: str = None,
+                                   checksum: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Extract metadata from a Swift data file (pass ``checksum`` if it is already known)"""
         try:
             file_path = Path(file_path)
             
@@ -69,10 +189,8 @@ class SwiftMetadataExtractor:
             # If we have an original filename, construct the original file path
             if original_filename and original_filename != file_path.name:
                 # For S3-based processing, construct the original path from dataset and filename
-                if dataset_name and dataset_name != 'unknown':
-                    # Construct path like: swift_datasets/dataset_name/original_filename
-                    original_file_path = f"swift_datasets/{dataset_name}/{original_filename}"
-                else:
+                original_file_path = self.catalog_file_path(dataset_name, original_filename)
+                if original_file_path is None:
                     # Fallback: use the original filename in the same directory as temp file
                     original_file_path = str(file_path.parent / original_filename)
                 metadata['file_path'] = original_file_path
@@ -91,7 +209,7 @@ class SwiftMetadataExtractor:
                 metadata.update(self._extract_basic_metadata(file_path))
             
             # Add checksum
-            metadata['checksum'] = self._calculate_checksum(file_path)
+            metadata['checksum'] = checksum or self._calculate_checksum(file_path)
             
             return metadata
             
@@ -101,6 +219,162 @@ class SwiftMetadataExtractor:
                 logger.warning(f"⚠️  Could not extract metadata from {file_path.name}: {e}")
             return None
     
+    def extract_s3_object_metadata(self, file_path: str, s3_key: str, s3_bucket: str) -> Optional[Dict[str, Any]]:
+        """Extract metadata from a downloaded S3 object and prepare it for database insertion"""
+        try:
+            # Extract dataset name from S3 key (first part before first slash)
+            dataset_name = s3_key.split('/')[0] if '/' in s3_key else 'unknown'
+            
+            # Extract metadata using the original filename from the S3 key
+            original_filename = s3_key.split('/')[-1]
+            metadata = self.extract_metadata_from_file(file_path, dataset_name, original_filename)
+            
+            if not metadata:
+                return None
+            
+            # Add S3-specific information
+            metadata['s3_key'] = s3_key
+            metadata['s3_bucket'] = s3_bucket
+            metadata['file_size'] = os.path.getsize(file_path)
+            metadata['extraction_timestamp'] = self.get_current_timestamp()
+            
+            return metadata
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to extract metadata from {file_path}: {e}")
+            return None
+    
+    def extract_s3_object_metadata_in_memory(self, s3_client, s3_bucket: str, s3_key: str, size: Optional[int] = None,
+                                             etag: Optional[str] = None, last_modified=None) -> Optional[Dict[str, Any]]:
+        """Extract metadata straight from S3 without writing a temp file
+        
+        With ``lab2.ingest.checksum_source: etag`` the object's ETag is recorded
+        as the checksum and only the leading header blocks are fetched with Range
+        requests. The default (``content``) streams the whole object once, hashing
+        it with the ``lab2.hashing.algorithm`` while the headers are parsed.
+        """
+        try:
+            checksum_source = self.config.get('lab2.ingest.checksum_source', 'content')
+            dataset_name = s3_key.split('/')[0] if '/' in s3_key else 'unknown'
+            original_filename = s3_key.split('/')[-1]
+            
+            if size is None or (checksum_source == 'etag' and not etag):
+                head = s3_client.head_object(Bucket=s3_bucket, Key=s3_key)
+                size = head['ContentLength']
+                etag = etag or head.get('ETag')
+                last_modified = last_modified or head.get('LastModified')
+            
+            if checksum_source == 'etag':
+                range_bytes = int(self.config.get('lab2.ingest.header_range_kb', 16) * 1024)
+                reader = S3RangeReader(s3_client, s3_bucket, s3_key, size)
+                stream = io.BufferedReader(reader, buffer_size=max(FITS_BLOCK_SIZE, range_bytes))
+                checksum = f"etag:{str(etag).strip(chr(34))}"
+            else:
+                reader = None
+                stream = s3_client.get_object(Bucket=s3_bucket, Key=s3_key)['Body']
+                checksum = None
+            
+            try:
+                metadata = self.extract_metadata_from_stream(
+                    stream, original_filename, dataset_name=dataset_name,
+                    file_size=size, last_modified=last_modified, checksum=checksum
+                )
+            finally:
+                stream.close()
+            
+            if reader is not None:
+                logger.debug(f"Fetched {reader.bytes_fetched} of {size} bytes in {reader.requests} range requests: {s3_key}")
+            
+            if not metadata:
+                return None
+            
+            # Add S3-specific information
+            metadata['s3_key'] = s3_key
+            metadata['s3_bucket'] = s3_bucket
+            metadata['file_size'] = size
+            metadata['extraction_timestamp'] = self.get_current_timestamp()
+            
+            return metadata
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to extract metadata from s3://{s3_bucket}/{s3_key}: {e}")
+            return None
+    
+    def extract_metadata_from_stream(self, stream, original_filename: str, dataset_name: str = None,
+                                     file_size: Optional[int] = None, last_modified=None,
+                                     checksum: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Extract metadata from a binary stream (same fields as extract_metadata_from_file)
+        
+        Only as much of the stream as the headers need is read, and ``.gz``
+        files are decompressed on the fly. When ``checksum`` is not given the
+        rest of the stream is read to compute it with the configured algorithm.
+        """
+        try:
+            # Skip temporary files
+            if "tmp" in original_filename.lower():
+                logger.debug(f"Skipping temporary file: {original_filename}")
+                return None
+            
+            # Skip empty files to avoid processing errors
+            if file_size == 0:
+                logger.debug(f"Skipping empty file: {original_filename}")
+                return None
+            
+            from lab2.file_hasher import new_hash
+            hashing_stream = HashingReader(stream, new_hash(self.hasher.algorithm)) if checksum is None else None
+            source = hashing_stream or stream
+            
+            name_path = Path(original_filename)
+            file_format = self._get_file_format(name_path)
+            
+            if isinstance(last_modified, datetime):
+                last_modified = last_modified.isoformat()
+            
+            metadata = {
+                'file_path': self.catalog_file_path(dataset_name, original_filename) or original_filename,
+                'file_name': original_filename,
+                'file_size_bytes': file_size,
+                'file_format': file_format,
+                'dataset_name': dataset_name or 'unknown',
+                'ingestion_timestamp': datetime.now().isoformat(),
+                'metadata_version': '1.0',
+                'last_modified': last_modified or datetime.now().isoformat()
+            }
+            
+            # Extract format-specific metadata
+            if name_path.suffix == '.gz':
+                # Compressed files - decompress only as far as the headers go
+                metadata.update(self._extract_swift_lightcurve_metadata_from_stream(GunzipReader(source), original_filename))
+            elif file_format in ['.fits', '.lc']:
+                metadata.update(self._extract_fits_metadata_from_stream(source, original_filename))
+            elif file_format == '.json':
+                metadata.update(self._extract_json_metadata_from_stream(source))
+            else:
+                # For other formats, use basic filename parsing
+                metadata.update(self._extract_basic_metadata(name_path))
+            
+            if hashing_stream is not None:
+                from lab2.file_hasher import format_digest
+                checksum = format_digest(self.hasher.algorithm, hashing_stream.drain())
+                if file_size is None:
+                    metadata['file_size_bytes'] = hashing_stream.bytes_read
+                    if hashing_stream.bytes_read == 0:
+                        return None
+            metadata['checksum'] = checksum
+            
+            return metadata
+            
+        except Exception as e:
+            logger.warning(f"⚠️  Could not extract metadata from {original_filename}: {e}")
+            return None
+    
+    def catalog_file_path(self, dataset_name: Optional[str], original_filename: str) -> Optional[str]:
+        """Catalog file_path for a file processed from S3 (None when it would depend on the temp file location)"""
+        if dataset_name and dataset_name != 'unknown':
+            # Construct path like: swift_datasets/dataset_name/original_filename
+            return f"swift_datasets/{dataset_name}/{original_filename}"
+        return None
+    
     def _get_file_format(self, file_path: Path) -> str:
         """Determine the file format"""
         # Check for compressed files first
@@ -139,16 +413,7 @@ class SwiftMetadataExtractor:
             from astropy.io import fits
             
             with fits.open(file_path) as hdul:
-                header = hdul[0].header
-                
-                return {
-                    'mission_id': header.get('MISSION', 'SWIFT'),
-                    'satellite_name': header.get('TELESCOP', 'SWIFT'),
-                    'instrument_type': header.get('INSTRUME', 'BAT'),
-                    'observation_timestamp': header.get('DATE-OBS', 'unknown'),
-                    'target_object': header.get('OBJECT', 'unknown'),
-                    'processing_status': 'raw'
-                }
+                return self._fits_header_metadata(hdul[0].header)
                 
         except ImportError:
             logger.warning("⚠️  astropy not available, using basic FITS parsing")
@@ -167,37 +432,50 @@ class SwiftMetadataExtractor:
         try:
             with open(file_path, 'rb') as f:
                 # Read first 2880 bytes (FITS header block)
-                header_block = f.read(2880)
-                
-                # Parse header cards (80 characters each)
-                header_cards = [header_block[i:i+80] for i in range(0, len(header_block), 80)]
-                
-                metadata = self._get_default_metadata()
-                
-                for card in header_cards:
-                    card_str = card.decode('ascii', errors='ignore').strip()
-                    if '=' in card_str:
-                        key, value = card_str.split('=', 1)
-                        key = key.strip()
-                        value = value.split('/')[0].strip().strip("'")
-                        
-                        if key == 'MISSION':
-                            metadata['mission_id'] = value
-                        elif key == 'TELESCOP':
-                            metadata['satellite_name'] = value
-                        elif key == 'INSTRUME':
-                            metadata['instrument_type'] = value
-                        elif key == 'DATE-OBS':
-                            metadata['observation_timestamp'] = value
-                        elif key == 'OBJECT':
-                            metadata['target_object'] = value
-                
-                return metadata
+                return self._basic_fits_metadata_from_block(f.read(FITS_BLOCK_SIZE))
                 
         except Exception as e:
             logger.debug(f"Basic FITS parsing failed ({file_path.name}): {e}")
             return self._get_default_metadata()
     
+    def _basic_fits_metadata_from_block(self, header_block: bytes) -> Dict[str, Any]:
+        """Parse the well-known keywords out of a raw FITS header block"""
+        # Parse header cards (80 characters each)
+        header_cards = [header_block[i:i+FITS_CARD_SIZE] for i in range(0, len(header_block), FITS_CARD_SIZE)]
+        
+        metadata = self._get_default_metadata()
+        
+        for card in header_cards:
+            card_str = card.decode('ascii', errors='ignore').strip()
+            if '=' in card_str:
+                key, value = card_str.split('=', 1)
+                key = key.strip()
+                value = value.split('/')[0].strip().strip("'")
+                
+                if key == 'MISSION':
+                    metadata['mission_id'] = value
+                elif key == 'TELESCOP':
+                    metadata['satellite_name'] = value
+                elif key == 'INSTRUME':
+                    metadata['instrument_type'] = value
+                elif key == 'DATE-OBS':
+                    metadata['observation_timestamp'] = value
+                elif key == 'OBJECT':
+                    metadata['target_object'] = value
+        
+        return metadata
+    
+    def _fits_header_metadata(self, header) -> Dict[str, Any]:
+        """Map a FITS primary header onto the catalog fields"""
+        return {
+            'mission_id': header.get('MISSION', 'SWIFT'),
+            'satellite_name': header.get('TELESCOP', 'SWIFT'),
+            'instrument_type': header.get('INSTRUME', 'BAT'),
+            'observation_timestamp': header.get('DATE-OBS', 'unknown'),
+            'target_object': header.get('OBJECT', 'unknown'),
+            'processing_status': 'raw'
+        }
+    
     def _extract_swift_lightcurve_metadata(self, file_path: Path, original_filename: str = None) -> Dict[str, Any]:
         """Extract metadata from Swift lightcurve files (FITS format)"""
         try:
@@ -207,20 +485,10 @@ class SwiftMetadataExtractor:
             # Use original filename if available, otherwise use temp file name
             filename = original_filename if original_filename else file_path.name
             
-            # Parse Swift BAT filename pattern
-            # Example: swbj0001_0m9012_c_s157.lc.gz
-            # Format: swbjXXXX_XXXXXXX_XXXX_XXXX.extension
-            pattern = r'swbj(\d{4})_([a-z0-9]+)_([a-z0-9]+)_([a-z0-9]+)\.([a-z0-9.]+)'
-            match = re.match(pattern, filename)
+            match = self._match_swift_lightcurve_filename(filename)
             
             if match:
-                metadata.update({
-                    'mission_id': 'SWIFT',
-                    'satellite_name': 'SWIFT',
-                    'instrument_type': 'BAT',
-                    'target_object': f"BAT_{match.group(1)}",  # BAT source number
-                    'processing_status': 'raw'
-                })
+                metadata.update(self._swift_lightcurve_filename_metadata(match))
                 
                 # Try to extract FITS header information
                 try:
@@ -228,85 +496,9 @@ class SwiftMetadataExtractor:
                     
                     # Open the FITS file (handle gzipped files)
                     with fits.open(file_path) as hdul:
-                        # Get the primary header
-                        header = hdul[0].header
-                        
-                        # Extract observation date (use DATE-OBS from primary header)
-                        if 'DATE-OBS' in header:
-                            date_obs = header['DATE-OBS']
-                            # Convert to ISO format if needed
-                            if 'T' in str(date_obs):
-                                metadata['observation_timestamp'] = str(date_obs).split('T')[0]  # Just the date part
-                            else:
-                                metadata['observation_timestamp'] = str(date_obs)
-                        
-                        # Extract object name if available
-                        if 'OBJECT' in header and metadata.get('target_object') == f"BAT_{match.group(1)}":
-                            object_name = header['OBJECT']
-                            if object_name and object_name.strip() != '':
-                                metadata['target_object'] = str(object_name).strip()
-                        
-                        # Extract additional metadata from primary header
-                        if 'TELESCOP' in header:
-                            metadata['mission_id'] = str(header['TELESCOP']).strip()
-                        if 'INSTRUME' in header:
-                            metadata['instrument_type'] = str(header['INSTRUME']).strip()
-                        
-                        # Extract coordinates if available
-                        if 'RA_OBJ' in header:
-                            metadata['ra_deg'] = float(header['RA_OBJ'])
-                        if 'DEC_OBJ' in header:
-                            metadata['dec_deg'] = float(header['DEC_OBJ'])
-                        
-                        # Look for additional metadata in extension headers
-                        for i, hdu in enumerate(hdul):
-                            if i > 0:  # Skip primary header
-                                ext_header = hdu.header
-                                
-                                # Extract time range information
-                                if 'DATE-OBS' in ext_header and 'observation_timestamp' not in metadata:
-                                    date_obs = ext_header['DATE-OBS']
-                                    if 'T' in str(date_obs):
-                                        metadata['observation_timestamp'] = str(date_obs).split('T')[0]
-                                    else:
-                                        metadata['observation_timestamp'] = str(date_obs)
-                                
-                                if 'DATE-END' in ext_header:
-                                    date_end = ext_header['DATE-END']
-                                    if 'T' in str(date_end):
-                                        metadata['observation_end'] = str(date_end).split('T')[0]
-                                    else:
-                                        metadata['observation_end'] = str(date_end)
-                                
-                                # Extract energy range
-                                if 'E_MIN' in ext_header:
-                                    metadata['energy_min_kev'] = float(ext_header['E_MIN'])
-                                if 'E_MAX' in ext_header:
-                                    metadata['energy_max_kev'] = float(ext_header['E_MAX'])
-                                
-                                # Extract observation duration
-                                if 'ONTIME' in ext_header:
-                                    metadata['on_target_time_s'] = float(ext_header['ONTIME'])
-                                if 'TELAPSE' in ext_header:
-                                    metadata['elapsed_time_s'] = float(ext_header['TELAPSE'])
-                                
-                                # Extract catalog information
-                                if 'CATNUM' in ext_header:
-                                    metadata['catalog_number'] = int(ext_header['CATNUM'])
-                                if 'CAT_NAME' in ext_header:
-                                    metadata['catalog_name'] = str(ext_header['CAT_NAME']).strip()
-                                
-                                # Extract lightcurve type
-                                if 'LCTYPE' in ext_header:
-                                    metadata['lightcurve_type'] = str(ext_header['LCTYPE']).strip()
-                                
-                                # Extract data quality flags
-                                if 'BACKAPP' in ext_header:
-                                    metadata['background_applied'] = bool(ext_header['BACKAPP'])
-                                
-                                # Break after first extension (usually contains the main data)
-                                break
-                            
+                        # Primary header plus the first extension (usually contains the main data)
+                        ext_header = hdul[1].header if len(hdul) > 1 else None
+                        self._apply_lightcurve_headers(metadata, match, hdul[0].header, ext_header)
                             
                 except ImportError:
                     logger.warning("astropy not available, using filename-based extraction only")
@@ -319,34 +511,229 @@ class SwiftMetadataExtractor:
             logger.debug(f"Swift lightcurve parsing failed ({file_path.name}): {e}")
             return self._get_default_metadata()
     
+    @staticmethod
+    def _match_swift_lightcurve_filename(filename: str):
+        """Match the Swift BAT lightcurve filename pattern"""
+        # Parse Swift BAT filename pattern
+        # Example: swbj0001_0m9012_c_s157.lc.gz
+        # Format: swbjXXXX_XXXXXXX_XXXX_XXXX.extension
+        pattern = r'swbj(\d{4})_([a-z0-9]+)_([a-z0-9]+)_([a-z0-9]+)\.([a-z0-9.]+)'
+        return re.match(pattern, filename)
+    
+    @staticmethod
+    def _swift_lightcurve_filename_metadata(match) -> Dict[str, Any]:
+        """Metadata implied by a Swift BAT lightcurve filename"""
+        return {
+            'mission_id': 'SWIFT',
+            'satellite_name': 'SWIFT',
+            'instrument_type': 'BAT',
+            'target_object': f"BAT_{match.group(1)}",  # BAT source number
+            'processing_status': 'raw'
+        }
+    
+    def _apply_lightcurve_headers(self, metadata: Dict[str, Any], match, header, ext_header=None):
+        """Update lightcurve metadata from the primary header and the first extension header"""
+        # Extract observation date (use DATE-OBS from primary header)
+        if 'DATE-OBS' in header:
+            date_obs = header['DATE-OBS']
+            # Convert to ISO format if needed
+            if 'T' in str(date_obs):
+                metadata['observation_timestamp'] = str(date_obs).split('T')[0]  # Just the date part
+            else:
+                metadata['observation_timestamp'] = str(date_obs)
+        
+        # Extract object name if available
+        if 'OBJECT' in header and metadata.get('target_object') == f"BAT_{match.group(1)}":
+            object_name = header['OBJECT']
+            if object_name and object_name.strip() != '':
+                metadata['target_object'] = str(object_name).strip()
+        
+        # Extract additional metadata from primary header
+        if 'TELESCOP' in header:
+            metadata['mission_id'] = str(header['TELESCOP']).strip()
+        if 'INSTRUME' in header:
+            metadata['instrument_type'] = str(header['INSTRUME']).strip()
+        
+        # Extract coordinates if available
+        if 'RA_OBJ' in header:
+            metadata['ra_deg'] = float(header['RA_OBJ'])
+        if 'DEC_OBJ' in header:
+            metadata['dec_deg'] = float(header['DEC_OBJ'])
+        
+        # Look for additional metadata in the extension header
+        if ext_header is None:
+            return
+        
+        # Extract time range information
+        if 'DATE-OBS' in ext_header and 'observation_timestamp' not in metadata:
+            date_obs = ext_header['DATE-OBS']
+            if 'T' in str(date_obs):
+                metadata['observation_timestamp'] = str(date_obs).split('T')[0]
+            else:
+                metadata['observation_timestamp'] = str(date_obs)
+        
+        if 'DATE-END' in ext_header:
+            date_end = ext_header['DATE-END']
+            if 'T' in str(date_end):
+                metadata['observation_end'] = str(date_end).split('T')[0]
+            else:
+                metadata['observation_end'] = str(date_end)
+        
+        # Extract energy range
+        if 'E_MIN' in ext_header:
+            metadata['energy_min_kev'] = float(ext_header['E_MIN'])
+        if 'E_MAX' in ext_header:
+            metadata['energy_max_kev'] = float(ext_header['E_MAX'])
+        
+        # Extract observation duration
+        if 'ONTIME' in ext_header:
+            metadata['on_target_time_s'] = float(ext_header['ONTIME'])
+        if 'TELAPSE' in ext_header:
+            metadata['elapsed_time_s'] = float(ext_header['TELAPSE'])
+        
+        # Extract catalog information
+        if 'CATNUM' in ext_header:
+            metadata['catalog_number'] = int(ext_header['CATNUM'])
+        if 'CAT_NAME' in ext_header:
+            metadata['catalog_name'] = str(ext_header['CAT_NAME']).strip()
+        
+        # Extract lightcurve type
+        if 'LCTYPE' in ext_header:
+            metadata['lightcurve_type'] = str(ext_header['LCTYPE']).strip()
+        
+        # Extract data quality flags
+        if 'BACKAPP' in ext_header:
+            metadata['background_applied'] = bool(ext_header['BACKAPP'])
+    
+    def _extract_swift_lightcurve_metadata_from_stream(self, stream, original_filename: str) -> Dict[str, Any]:
+        """Stream variant of _extract_swift_lightcurve_metadata (reads the first two headers only)"""
+        metadata = self._get_default_metadata()
+        match = self._match_swift_lightcurve_filename(original_filename)
+        if not match:
+            return metadata
+        
+        metadata.update(self._swift_lightcurve_filename_metadata(match))
+        try:
+            headers = self._read_fits_headers(stream, max_headers=2)
+            if headers:
+                self._apply_lightcurve_headers(metadata, match, headers[0], headers[1] if len(headers) > 1 else None)
+        except ImportError:
+            logger.warning("astropy not available, using filename-based extraction only")
+        except Exception as e:
+            logger.warning(f"FITS header extraction failed ({original_filename}): {e}")
+        return metadata
+    
+    def _extract_fits_metadata_from_stream(self, stream, original_filename: str) -> Dict[str, Any]:
+        """Stream variant of _extract_fits_metadata (reads the primary header only)"""
+        try:
+            header_bytes = self._read_fits_header_bytes(stream)
+            if header_bytes is None:
+                return self._get_default_metadata()
+            try:
+                from astropy.io import fits
+            except ImportError:
+                logger.warning("⚠️  astropy not available, using basic FITS parsing")
+                return self._basic_fits_metadata_from_block(header_bytes[:FITS_BLOCK_SIZE])
+            return self._fits_header_metadata(fits.Header.fromstring(header_bytes.decode('ascii', errors='replace')))
+        except Exception as e:
+            logger.debug(f"FITS file issue ({original_filename}): {e}")
+            return self._get_default_metadata()
+    
+    def _extract_json_metadata_from_stream(self, stream) -> Dict[str, Any]:
+        """Stream variant of _extract_json_metadata"""
+        try:
+            return self._json_metadata(json.loads(stream.read().decode('utf-8')))
+        except Exception as e:
+            logger.error(f"❌ JSON metadata extraction failed: {e}")
+            return self._get_default_metadata()
+    
+    def _read_fits_headers(self, stream, max_headers: int = 2) -> List[Any]:
+        """Read up to ``max_headers`` consecutive HDU headers, skipping the data in between"""
+        from astropy.io import fits
+        
+        headers = []
+        while len(headers) < max_headers:
+            header_bytes = self._read_fits_header_bytes(stream)
+            if header_bytes is None:
+                break
+            header = fits.Header.fromstring(header_bytes.decode('ascii', errors='replace'))
+            headers.append(header)
+            if len(headers) < max_headers:
+                self._skip_bytes(stream, self._fits_data_size(header))
+        return headers
+    
+    @staticmethod
+    def _read_fits_header_bytes(stream) -> Optional[bytes]:
+        """Read whole 2880-byte blocks up to and including the one holding the END card"""
+        blocks = []
+        for _ in range(MAX_FITS_HEADER_BLOCKS):
+            block = stream.read(FITS_BLOCK_SIZE)
+            if len(block) < FITS_BLOCK_SIZE:
+                # End of stream (or truncated header)
+                return None
+            blocks.append(block)
+            for offset in range(0, FITS_BLOCK_SIZE, FITS_CARD_SIZE):
+                if block[offset:offset + FITS_CARD_SIZE].rstrip() == b'END':
+                    return b''.join(blocks)
+        raise ValueError("no END card found - not a FITS header")
+    
+    @staticmethod
+    def _fits_data_size(header) -> int:
+        """Size in bytes of the data unit following a header, padded to whole blocks"""
+        naxis = int(header.get('NAXIS', 0))
+        if naxis == 0:
+            return 0
+        elements = 1
+        for axis in range(1, naxis + 1):
+            elements *= int(header.get(f'NAXIS{axis}', 0))
+        size = abs(int(header.get('BITPIX', 8))) // 8 * int(header.get('GCOUNT', 1)) * (int(header.get('PCOUNT', 0)) + elements)
+        return -(-size // FITS_BLOCK_SIZE) * FITS_BLOCK_SIZE
+    
+    @staticmethod
+    def _skip_bytes(stream, count: int):
+        """Advance a stream without keeping the data (seeks when the stream allows it)"""
+        if count <= 0:
+            return
+        seekable = getattr(stream, 'seekable', None)
+        if seekable is not None and seekable():
+            stream.seek(count, io.SEEK_CUR)
+            return
+        while count > 0:
+            chunk = stream.read(min(count, 1024 * 1024))
+            if not chunk:
+                return
+            count -= len(chunk)
+    
     def _extract_json_metadata(self, file_path: Path) -> Dict[str, Any]:
         """Extract metadata from JSON files"""
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                
-                metadata = self._get_default_metadata()
-                
-                # Map common JSON fields to our schema
-                field_mapping = {
-                    'mission_id': 'mission_id',
-                    'satellite': 'satellite_name',
-                    'instrument': 'instrument_type',
-                    'target': 'target_object',
-                    'status': 'processing_status',
-                    'date_obs': 'observation_timestamp'
-                }
-                
-                for json_key, schema_key in field_mapping.items():
-                    if json_key in data:
-                        metadata[schema_key] = data[json_key]
-                
-                return metadata
+                return self._json_metadata(json.load(f))
                 
         except Exception as e:
             logger.error(f"❌ JSON metadata extraction failed: {e}")
             return self._get_default_metadata()
     
+    def _json_metadata(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Map common JSON fields onto the catalog fields"""
+        metadata = self._get_default_metadata()
+        
+        # Map common JSON fields to our schema
+        field_mapping = {
+            'mission_id': 'mission_id',
+            'satellite': 'satellite_name',
+            'instrument': 'instrument_type',
+            'target': 'target_object',
+            'status': 'processing_status',
+            'date_obs': 'observation_timestamp'
+        }
+        
+        for json_key, schema_key in field_mapping.items():
+            if json_key in data:
+                metadata[schema_key] = data[json_key]
+        
+        return metadata
+    
     def _extract_basic_metadata(self, file_path: Path) -> Dict[str, Any]:
         """Extract basic metadata from filename patterns"""
         filename = file_path.name
@@ -410,13 +797,12 @@ class SwiftMetadataExtractor:
         return datetime.utcnow().isoformat() + 'Z'
     
     def _calculate_checksum(self, file_path: Path) -> str:
-        """Calculate SHA-256 checksum of file"""
+        """Calculate the checksum of a file (``lab2.hashing.algorithm``, mmap-backed reads)
+        
+        Not cached: this is also used for short-lived temp downloads.
+        """
         try:
-            sha256_hash = hashlib.sha256()
-            with open(file_path, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    sha256_hash.update(chunk)
-            return sha256_hash.hexdigest()
+            return self.hasher.hash_file(file_path, use_cache=False)
         except Exception as e:
             logger.error(f"❌ Failed to calculate checksum: {e}")
             return "unknown"
@@ -434,19 +820,26 @@ class SwiftMetadataExtractor:
         metadata_list = []
         file_count = 0
         
-        # Find all files in the dataset
-        for file_path in dataset_path.rglob('*'):
-            if file_path.is_file():
-                file_count += 1
-                
-                # Extract metadata from file
-                metadata = self.extract_metadata_from_file(file_path, dataset_path.name)
-                if metadata:
-                    metadata_list.append(metadata)
-                
-                # Progress logging (less frequent)
-                if file_count % 100 == 0:
-                    logger.info(f"📊 Processed {file_count} files, extracted {len(metadata_list)} metadata records")
+        # Find all files in the dataset, then hash them in parallel (unchanged
+        # files come from the (path, size, mtime) cache) before reading headers
+        files = [file_path for file_path in dataset_path.rglob('*') if file_path.is_file()]
+        # Temporary and empty files are skipped by extraction, so they are not hashed either
+        checksums = self.hasher.hash_files(
+            file_path for file_path in files if "tmp" not in file_path.name.lower() and file_path.stat().st_size > 0
+        )
+        
+        for file_path in files:
+            file_count += 1
+            
+            # Extract metadata from file
+            metadata = self.extract_metadata_from_file(file_path, dataset_path.name,
+                                                       checksum=checksums.get(str(file_path)))
+            if metadata:
+                metadata_list.append(metadata)
+            
+            # Progress logging (less frequent)
+            if file_count % 100 == 0:
+                logger.info(f"📊 Processed {file_count} files, extracted {len(metadata_list)} metadata records")
         
         logger.info(f"✅ Completed metadata extraction: {len(metadata_list)}/{file_count} files processed")
         return metadata_list
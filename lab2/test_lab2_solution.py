@@ -138,6 +138,254 @@ def test_swift_datasets():
         logger.error(f"❌ Swift datasets test failed: {e}")
         return False
 
+def test_search_filter_compiler():
+    """Test that search criteria compile to the right pushdown predicates and Arrow masks"""
+    import pyarrow as pa
+    from datetime import datetime
+    from lab2.metadata_search_filter import MetadataSearchFilter
+    
+    logger.info("🔍 Testing metadata search filter compiler...")
+    schema = pa.schema([
+        ('file_name', pa.utf8()),
+        ('mission_id', pa.utf8()),
+        ('file_size_bytes', pa.int64()),
+        ('observation_timestamp', pa.timestamp('us')),
+    ])
+    batch = pa.RecordBatch.from_pydict({
+        'file_name': ['swbj0001_a.lc.gz', 'SWBJ0002_b.LC.GZ', 'notes.txt', None],
+        'mission_id': ['SWIFT', 'swift', 'Chandra', None],
+        'file_size_bytes': [500, 1000, 2000, None],
+        'observation_timestamp': [datetime(2020, 1, 1), datetime(2021, 6, 1), datetime(2022, 1, 1), None],
+    }, schema=schema)
+    
+    def matches(criteria, pushdown=False):
+        compiled = MetadataSearchFilter(criteria, schema)
+        return compiled.filter_batch(batch, pushdown=pushdown).column('file_name').to_pylist()
+    
+    # String criteria are case-insensitive by default; the common spellings are pushed down
+    search = MetadataSearchFilter({'mission_id': {'type': 'exact', 'value': 'swift'}}, schema)
+    assert search.predicate is not None and search.residual_conditions() == []
+    assert search.residual_columns(pushdown=False) == ['mission_id']
+    assert MetadataSearchFilter._case_forms('swift') == ['swift', 'SWIFT', 'Swift']
+    assert MetadataSearchFilter._case_forms('0001') == ['0001']
+    assert MetadataSearchFilter({'file_name': {'type': 'wildcard', 'pattern': 'swbj*'}}, schema).predicate is not None
+    assert MetadataSearchFilter({'file_name': {'type': 'wildcard', 'pattern': '*.gz'}}, schema).predicate is None
+    assert matches({'mission_id': {'type': 'exact', 'value': 'swift'}}) == ['swbj0001_a.lc.gz', 'SWBJ0002_b.LC.GZ']
+    
+    # Case-sensitive string criteria are pushed down
+    search = MetadataSearchFilter({'mission_id': {'type': 'exact', 'value': 'SWIFT', 'case_sensitive': True}}, schema)
+    assert search.predicate is not None and search.residual_conditions() == []
+    assert matches({'mission_id': {'type': 'exact', 'value': 'SWIFT', 'case_sensitive': True}}) == ['swbj0001_a.lc.gz']
+    
+    # Wildcards: prefix and contains push down, suffix cannot
+    assert MetadataSearchFilter({'file_name': {'type': 'wildcard', 'pattern': 'swbj*', 'case_sensitive': True}},
+                                schema).predicate is not None
+    assert MetadataSearchFilter({'file_name': {'type': 'wildcard', 'pattern': '*.gz', 'case_sensitive': True}},
+                                schema).predicate is None
+    assert matches({'file_name': {'type': 'wildcard', 'pattern': '*.lc.gz'}}) == ['swbj0001_a.lc.gz', 'SWBJ0002_b.LC.GZ']
+    assert matches({'file_name': {'type': 'wildcard', 'pattern': '*0002*'}}) == ['SWBJ0002_b.LC.GZ']
+    assert MetadataSearchFilter({'file_name': {'type': 'wildcard', 'pattern': '*'}}, schema).conditions == []
+    
+    # Numeric and timestamp comparisons use the column type and push down
+    search = MetadataSearchFilter({'file_size_bytes': {'type': 'comparison', 'operator': '>=', 'value': '1000'}}, schema)
+    assert search.predicate is not None
+    assert matches({'file_size_bytes': {'type': 'comparison', 'operator': '>=', 'value': '1000'}}) == [
+        'SWBJ0002_b.LC.GZ', 'notes.txt']
+    # A fractional bound on an integer column is compared client-side
+    search = MetadataSearchFilter({'file_size_bytes': {'type': 'comparison', 'operator': '<', 'value': 999.5}}, schema)
+    assert search.predicate is None
+    assert matches({'file_size_bytes': {'type': 'comparison', 'operator': '<', 'value': 999.5}}) == ['swbj0001_a.lc.gz']
+    assert matches({'observation_timestamp': {'type': 'comparison', 'operator': '>',
+                                              'value': '2021-01-01T00:00:00Z'}}) == ['SWBJ0002_b.LC.GZ', 'notes.txt']
+    
+    # Case-insensitive string comparisons lower-case both sides
+    assert matches({'mission_id': {'type': 'comparison', 'operator': '>=', 'value': 'SWIFT'}}) == [
+        'swbj0001_a.lc.gz', 'SWBJ0002_b.LC.GZ']
+    assert matches({'mission_id': {'type': 'comparison', 'operator': '<', 'value': 'D'}}) == ['notes.txt']
+    
+    # Criteria combine with AND; unknown columns match nothing; bad operators are rejected
+    assert matches({'mission_id': {'type': 'exact', 'value': 'swift'},
+                    'file_size_bytes': {'type': 'comparison', 'operator': '>', 'value': 600}}) == ['SWBJ0002_b.LC.GZ']
+    assert MetadataSearchFilter({'no_such_column': {'type': 'exact', 'value': 1}}, schema).matches_nothing
+    try:
+        MetadataSearchFilter({'file_size_bytes': {'type': 'comparison', 'operator': '!=', 'value': 1}}, schema)
+        raise AssertionError("unsupported operator accepted")
+    except ValueError:
+        pass
+    logger.info("✅ Search filter compiler works")
+
+def test_metadata_stats_accumulator():
+    """Test that per-batch partial aggregates combine into the catalog stats"""
+    import pyarrow as pa
+    from datetime import datetime
+    from lab2.metadata_stats import MetadataStatsAccumulator
+    
+    logger.info("🔍 Testing metadata stats accumulator...")
+    accumulator = MetadataStatsAccumulator()
+    accumulator.add(pa.RecordBatch.from_pydict({
+        'mission_id': ['SWIFT', 'SWIFT', None],
+        'dataset_name': ['bat', 'bat', 'xrt'],
+        'file_format': ['.gz', '.gz', '.fits'],
+        'file_size_bytes': [100, 200, None],
+        'observation_timestamp': [datetime(2020, 1, 1), None, datetime(2019, 5, 1)],
+        'ingestion_timestamp': [datetime(2024, 1, 1)] * 3,
+    }))
+    accumulator.add(pa.RecordBatch.from_pydict({'mission_id': pa.array([], pa.utf8())}))
+    # A later batch without some of the columns
+    accumulator.add(pa.RecordBatch.from_pydict({
+        'mission_id': ['CHANDRA', 'SWIFT'],
+        'file_size_bytes': [1000, 50],
+        'observation_timestamp': [datetime(2021, 3, 1), datetime(2018, 2, 1)],
+    }))
+    stats = accumulator.result()
+    
+    assert stats['total_files'] == 5
+    assert stats['total_size_bytes'] == 1350
+    # Largest groups first; nulls are counted as 'unknown'
+    assert list(stats['mission_counts'].items()) == [('SWIFT', 3), ('CHANDRA', 1), ('unknown', 1)]
+    assert stats['mission_size_bytes'] == {'SWIFT': 350, 'CHANDRA': 1000, 'unknown': 0}
+    assert stats['dataset_counts'] == {'bat': 2, 'xrt': 1}
+    assert stats['format_size_bytes'] == {'.gz': 300, '.fits': 0}
+    assert stats['observation_range'] == {'min': datetime(2018, 2, 1), 'max': datetime(2021, 3, 1)}
+    assert stats['ingestion_range'] == {'min': datetime(2024, 1, 1), 'max': datetime(2024, 1, 1)}
+    
+    empty = MetadataStatsAccumulator().result()
+    assert empty['total_files'] == 0 and empty['mission_counts'] == {} and empty['observation_range'] is None
+    logger.info("✅ Metadata stats accumulator works")
+
+def test_ingestion_manifest_plan():
+    """Test that a bucket listing is split into new, changed, retried and unchanged objects"""
+    from datetime import datetime, timezone
+    from lab2.ingestion_manifest import IngestionManifest, STATUS_FAILED, STATUS_INGESTED, STATUS_SKIPPED
+    
+    logger.info("🔍 Testing ingestion manifest planning...")
+    manifest = IngestionManifest({
+        'a.lc.gz': {'etag': 'e1', 'size_bytes': 10, 'status': STATUS_INGESTED},
+        'b.lc.gz': {'etag': 'e2', 'size_bytes': 20, 'status': STATUS_INGESTED},
+        'c.lc.gz': {'etag': 'e3', 'size_bytes': 30, 'status': STATUS_FAILED},
+        'd.tmp': {'etag': 'e4', 'size_bytes': 40, 'status': STATUS_SKIPPED},
+        'e.lc.gz': {'etag': None, 'size_bytes': 50, 'status': STATUS_INGESTED},
+    }, run_id='run1')
+    files = [
+        {'key': 'a.lc.gz', 'etag': 'e1', 'size': 10},   # unchanged
+        {'key': 'b.lc.gz', 'etag': 'e2x', 'size': 20},  # content changed, same size
+        {'key': 'c.lc.gz', 'etag': 'e3', 'size': 30},   # failed last time - retried
+        {'key': 'd.tmp', 'etag': 'e4', 'size': 40},     # skipped and unchanged
+        {'key': 'e.lc.gz', 'etag': 'e5', 'size': 51},   # no stored ETag, size changed
+        {'key': 'f.lc.gz', 'etag': 'e6', 'size': 60},   # new
+    ]
+    
+    candidates, unchanged = manifest.plan(files)
+    
+    assert unchanged == 2
+    assert [(f['key'], f['replace_existing']) for f in candidates] == [
+        ('b.lc.gz', True), ('c.lc.gz', False), ('e.lc.gz', True), ('f.lc.gz', False)]
+    
+    entry = manifest.entry({'key': 'f.lc.gz', 'etag': 'e6', 'size': 60,
+                            'last_modified': datetime(2024, 1, 1, 12, tzinfo=timezone.utc)}, STATUS_INGESTED)
+    assert entry['s3_key'] == 'f.lc.gz' and entry['run_id'] == 'run1' and entry['status'] == STATUS_INGESTED
+    assert entry['last_modified'] == datetime(2024, 1, 1, 12)
+    logger.info("✅ Ingestion manifest planning works")
+
+def test_insert_buffer_failed_batch():
+    """Test that records of a batch that does not commit are counted failed and recorded for retry"""
+    from lab2.ingestion_manifest import STATUS_FAILED, STATUS_INGESTED, STATUS_SKIPPED
+    from lab2.vast_database_manager import MetadataInsertBuffer
+    
+    logger.info("🔍 Testing insert buffer failure accounting...")
+    
+    class FailingDBManager:
+        def __init__(self):
+            self.manifest_writes = []
+        
+        def insert_metadata_batch(self, records, batch_rows=None, manifest_entries=None, replace_paths=None):
+            if records:
+                return 0
+            self.manifest_writes.append(manifest_entries)
+            return 0
+    
+    db_manager = FailingDBManager()
+    buffer = MetadataInsertBuffer(db_manager, max_rows=10)
+    buffer.add({'file_path': 'a.lc.gz'}, manifest_entry={'s3_key': 'a.lc.gz', 'status': STATUS_INGESTED})
+    buffer.add({'file_path': 'b.lc.gz'}, manifest_entry={'s3_key': 'b.lc.gz', 'status': STATUS_INGESTED})
+    buffer.add_manifest_entry({'s3_key': 'c.tmp', 'status': STATUS_SKIPPED})
+    buffer.flush()
+    
+    assert buffer.inserted_count == 0 and buffer.failed_count == 2
+    assert db_manager.manifest_writes == [[
+        {'s3_key': 'a.lc.gz', 'status': STATUS_FAILED},
+        {'s3_key': 'b.lc.gz', 'status': STATUS_FAILED},
+        {'s3_key': 'c.tmp', 'status': STATUS_SKIPPED},
+    ]]
+    logger.info("✅ Failed batches are counted and recorded for retry")
+
+class StubConfig:
+    """Minimal stand-in for ConfigLoader"""
+
+    def __init__(self, values=None):
+        self.values = values or {}
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+    def get_secret(self, key, default=None):
+        return default
+
+def test_streaming_fits_headers():
+    """Test that gzipped FITS headers are read from a stream without decompressing the data"""
+    import gzip
+    import io
+    import numpy as np
+    from astropy.io import fits
+    from lab2.swift_metadata_extractor import GunzipReader, SwiftMetadataExtractor
+    
+    logger.info("🔍 Testing streaming FITS header extraction...")
+    
+    # GunzipReader: sized reads across chunk boundaries and concatenated gzip members
+    payload = bytes(range(256)) * 64
+    reader = GunzipReader(io.BytesIO(gzip.compress(payload[:5000]) + gzip.compress(payload[5000:])), chunk_size=100)
+    assert reader.read(10) == payload[:10]
+    assert reader.read(6000) == payload[10:6010]
+    assert reader.read() == payload[6010:]
+    assert reader.read(1) == b''
+    
+    rng = np.random.default_rng(1)
+    primary = fits.PrimaryHDU(data=rng.integers(0, 2**31, 5000, dtype=np.int32))
+    primary.header.update({'TELESCOP': 'SWIFT', 'INSTRUME': 'BAT', 'DATE-OBS': '2005-02-13T04:05:06',
+                           'OBJECT': 'Crab', 'RA_OBJ': 83.63, 'DEC_OBJ': 22.01})
+    extension = fits.BinTableHDU.from_columns([fits.Column(name='RATE', format='E', array=rng.random(200_000))])
+    extension.header.update({'E_MIN': 14.0, 'E_MAX': 195.0, 'ONTIME': 1200.5, 'DATE-END': '2005-02-14T00:00:00'})
+    buffer = io.BytesIO()
+    fits.HDUList([primary, extension]).writeto(buffer)
+    compressed = gzip.compress(buffer.getvalue())
+    
+    extractor = SwiftMetadataExtractor(StubConfig({'lab2.hashing.cache_path': None}))
+    stream = io.BytesIO(compressed)
+    metadata = extractor.extract_metadata_from_stream(stream, 'swbj0001_0m9012_c_s157.lc.gz', dataset_name='bat',
+                                                      file_size=len(compressed), checksum='known')
+    
+    assert metadata['target_object'] == 'Crab'
+    assert metadata['mission_id'] == 'SWIFT' and metadata['instrument_type'] == 'BAT'
+    assert metadata['observation_timestamp'] == '2005-02-13'
+    assert metadata['observation_end'] == '2005-02-14'
+    assert (metadata['ra_deg'], metadata['dec_deg']) == (83.63, 22.01)
+    assert (metadata['energy_min_kev'], metadata['energy_max_kev'], metadata['on_target_time_s']) == (14.0, 195.0, 1200.5)
+    assert metadata['checksum'] == 'known'
+    # The primary data unit is skipped and the table data after the second header is never read
+    assert stream.tell() < len(compressed)
+    
+    # Plain FITS: primary header only; without a known checksum the rest of the stream is hashed
+    stream = io.BytesIO(buffer.getvalue())
+    metadata = extractor.extract_metadata_from_stream(stream, 'crab.fits', file_size=len(buffer.getvalue()))
+    assert metadata['target_object'] == 'Crab' and metadata['observation_timestamp'] == '2005-02-13T04:05:06'
+    assert metadata['checksum'] and stream.tell() == len(buffer.getvalue())
+    
+    # Not a FITS file: defaults instead of an error
+    metadata = extractor.extract_metadata_from_stream(io.BytesIO(b'x' * 5000), 'broken.fits', file_size=5000,
+                                                      checksum='known')
+    assert metadata is not None and metadata['target_object'] == extractor._get_default_metadata()['target_object']
+    logger.info("✅ Streaming FITS header extraction works")
+
 def main():
     """Run all tests"""
     logger.info("🧪 Starting Lab 2 Solution Tests")
@@ -147,7 +395,12 @@ def main():
         ("Import Test", test_imports),
         ("Configuration Test", test_config_loading),
         ("Component Initialization Test", test_component_initialization),
-        ("Swift Datasets Test", test_swift_datasets)
+        ("Swift Datasets Test", test_swift_datasets),
+        ("Search Filter Compiler Test", test_search_filter_compiler),
+        ("Metadata Stats Accumulator Test", test_metadata_stats_accumulator),
+        ("Ingestion Manifest Test", test_ingestion_manifest_plan),
+        ("Insert Buffer Failure Test", test_insert_buffer_failed_batch),
+        ("Streaming FITS Header Test", test_streaming_fits_headers),
     ]
     
     passed = 0
@@ -156,7 +409,8 @@ def main():
     for test_name, test_func in tests:
         logger.info(f"\n🔍 Running: {test_name}")
         try:
-            if test_func():
+            # Checks that assert return None on success
+            if test_func() is not False:
                 logger.info(f"✅ {test_name} PASSED")
                 passed += 1
             else:
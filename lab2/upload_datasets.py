@@ -6,8 +6,11 @@ Uploads Swift datasets to S3 using boto3
 
 import os
 import sys
+import time
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 import urllib3
 
 # Add parent directory to path for imports
@@ -34,10 +37,17 @@ class DatasetUploader:
         self.config = ConfigLoader(config_path, secrets_path)
         self.swift_datasets_dir = Path(__file__).parent.parent / "scripts" / "swift_datasets"
     
-    def upload_all_datasets(self) -> bool:
-        """Upload all datasets under swift_datasets to S3 using boto3"""
+    def upload_all_datasets(self, workers: int = None) -> bool:
+        """Upload all datasets under swift_datasets to S3 using boto3
+        
+        Which files need uploading is decided from one ``list_objects_v2``
+        listing diffed against the local tree (no per-file HEAD requests). The
+        uploads then run on a thread pool, each one a boto3 managed transfer
+        that switches to concurrent multipart upload for large files.
+        """
         try:
             import boto3
+            from boto3.s3.transfer import TransferConfig
             
             # Get S3 configuration
             endpoint_url = self.config.get('s3.endpoint_url')
@@ -59,7 +69,11 @@ class DatasetUploader:
             # Suppress SSL warnings if verification is disabled by config
             if not ssl_verify:
                 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-
+            
+            if workers is None:
+                workers = self.config.get('lab2.upload.workers', 16)
+            workers = max(1, int(workers))
+            
             s3_client = boto3.client(
                 's3',
                 endpoint_url=endpoint_url,
@@ -68,82 +82,112 @@ class DatasetUploader:
                 region_name=region_name,
                 verify=ssl_verify,
                 config=boto3.session.Config(
-                    s3={'addressing_style': 'path' if path_style else 'auto'}
+                    s3={'addressing_style': 'path' if path_style else 'auto'},
+                    # One pooled connection per upload thread and multipart part
+                    max_pool_connections=workers * self.config.get('lab2.upload.max_concurrency', 4)
                 )
             )
             
+            mb = 1024 ** 2
+            transfer_config = TransferConfig(
+                multipart_threshold=int(self.config.get('lab2.upload.multipart_threshold_mb', 64) * mb),
+                multipart_chunksize=int(self.config.get('lab2.upload.multipart_chunksize_mb', 16) * mb),
+                max_concurrency=self.config.get('lab2.upload.max_concurrency', 4)
+            )
+            
             if not self.swift_datasets_dir.exists():
                 logger.warning(f"⚠️  Swift datasets directory not found: {self.swift_datasets_dir}")
                 return False
             
             logger.info(f"📤 Uploading datasets from {self.swift_datasets_dir} to s3://{bucket_name}")
             
-            uploaded_count = 0
+            local_files = self._list_local_files()
+            remote_objects = self._list_remote_objects(s3_client, bucket_name)
+            
+            to_upload = []
             skipped_count = 0
+            for file_path, key, local_size, local_mtime in local_files:
+                if self._is_up_to_date(local_size, local_mtime, remote_objects.get(key)):
+                    skipped_count += 1
+                else:
+                    to_upload.append((file_path, key, local_size))
+            
+            logger.info(f"📊 {len(local_files)} local files: {len(to_upload)} to upload, "
+                        f"{skipped_count} already up to date ({len(remote_objects)} objects listed)")
+            
+            uploaded_count = 0
             failed_count = 0
+            uploaded_bytes = 0
+            started = time.monotonic()
             
-            for dataset_dir in self.swift_datasets_dir.iterdir():
-                if dataset_dir.is_dir():
-                    logger.info(f"📁 Processing dataset: {dataset_dir.name}")
-                    
-                    for file_path in dataset_dir.rglob('*'):
-                        if file_path.is_file():
-                            # Create S3 key preserving directory structure
-                            relative_path = file_path.relative_to(self.swift_datasets_dir)
-                            key = str(relative_path).replace('\\', '/')  # Ensure forward slashes
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    executor.submit(s3_client.upload_file, str(file_path), bucket_name, key, Config=transfer_config):
+                        (file_path, key, size)
+                    for file_path, key, size in to_upload
+                }
+                
+                for future in as_completed(futures):
+                    file_path, key, size = futures[future]
+                    try:
+                        future.result()
+                        uploaded_count += 1
+                        uploaded_bytes += size
+                        
+                        if uploaded_count % 100 == 0:
+                            logger.info(f"📤 Uploaded={uploaded_count}/{len(to_upload)} files so far…")
                             
-                            try:
-                                # Check if file already exists and is up-to-date
-                                if self._should_skip_file(s3_client, bucket_name, key, file_path):
-                                    skipped_count += 1
-                                    continue
-                                
-                                s3_client.upload_file(str(file_path), bucket_name, key)
-                                uploaded_count += 1
-                                
-                                if (uploaded_count + skipped_count) % 100 == 0:
-                                    logger.info(f"📤 Uploaded={uploaded_count}, Skipped={skipped_count} files so far…")
-                                    
-                            except Exception as e:
-                                logger.error(f"❌ Failed to upload {file_path} -> s3://{bucket_name}/{key}: {e}")
-                                failed_count += 1
+                    except Exception as e:
+                        logger.error(f"❌ Failed to upload {file_path} -> s3://{bucket_name}/{key}: {e}")
+                        failed_count += 1
             
+            elapsed = max(time.monotonic() - started, 1e-9)
             logger.info(f"✅ Upload complete. Uploaded={uploaded_count}, Skipped={skipped_count}, Failed={failed_count}")
+            if uploaded_count:
+                logger.info(f"📈 Throughput: {uploaded_bytes / mb / elapsed:.2f} MB/s, "
+                            f"{uploaded_count / elapsed:.1f} objects/s ({elapsed:.1f}s, {workers} workers)")
             return failed_count == 0
             
         except Exception as e:
             logger.error(f"❌ Upload failed: {e}")
             return False
     
-    def _should_skip_file(self, s3_client, bucket_name: str, key: str, file_path: Path) -> bool:
-        """Check if file should be skipped (already exists and is up-to-date)"""
-        try:
-            # Get local file stats
-            local_size = file_path.stat().st_size
-            local_mtime = file_path.stat().st_mtime
-            
-            # Check if file exists in S3
-            try:
-                response = s3_client.head_object(Bucket=bucket_name, Key=key)
-                s3_size = response['ContentLength']
-                s3_mtime = response['LastModified'].timestamp()
+    def _list_local_files(self) -> List[Tuple[Path, str, int, float]]:
+        """(path, S3 key, size, mtime) for every file under swift_datasets"""
+        local_files = []
+        for dataset_dir in self.swift_datasets_dir.iterdir():
+            if dataset_dir.is_dir():
+                logger.info(f"📁 Processing dataset: {dataset_dir.name}")
                 
-                # Skip if sizes match and S3 file is newer or same age
-                if local_size == s3_size and s3_mtime >= local_mtime:
-                    return True
-                    
-            except s3_client.exceptions.NoSuchKey:
-                # File doesn't exist in S3, should upload
-                pass
-            except Exception as e:
-                # Other S3 errors, proceed with upload
-                logger.debug(f"Could not check S3 file {key}: {e}")
-                
-            return False
-            
+                for file_path in dataset_dir.rglob('*'):
+                    if file_path.is_file():
+                        # Create S3 key preserving directory structure
+                        relative_path = file_path.relative_to(self.swift_datasets_dir)
+                        key = str(relative_path).replace('\\', '/')  # Ensure forward slashes
+                        stat = file_path.stat()
+                        local_files.append((file_path, key, stat.st_size, stat.st_mtime))
+        return local_files
+    
+    def _list_remote_objects(self, s3_client, bucket_name: str) -> Dict[str, Tuple[int, float]]:
+        """{key: (size, last_modified timestamp)} for every object in the bucket, from one paginated listing"""
+        remote_objects = {}
+        try:
+            paginator = s3_client.get_paginator('list_objects_v2')
+            for page in paginator.paginate(Bucket=bucket_name):
+                for obj in page.get('Contents', []):
+                    remote_objects[obj['Key']] = (obj['Size'], obj['LastModified'].timestamp())
         except Exception as e:
-            logger.debug(f"Could not check local file {file_path}: {e}")
+            # Without a listing every file is uploaded
+            logger.warning(f"⚠️  Could not list s3://{bucket_name}: {e}")
+        return remote_objects
+    
+    @staticmethod
+    def _is_up_to_date(local_size: int, local_mtime: float, remote: Optional[Tuple[int, float]]) -> bool:
+        """Skip if sizes match and the S3 object is newer or same age"""
+        if remote is None:
             return False
+        s3_size, s3_mtime = remote
+        return local_size == s3_size and s3_mtime >= local_mtime
     
     def list_uploaded_datasets(self) -> list:
         """List datasets that have been uploaded to S3"""
@@ -222,6 +266,7 @@ def main():
     parser.add_argument('--secrets', default=None, help='Secrets file path (default: ../secrets.yaml)')
     parser.add_argument('--list', action='store_true', help='List uploaded datasets')
     parser.add_argument('--dry-run', action='store_true', help='Dry run mode (no changes)')
+    parser.add_argument('--workers', type=int, default=None, help='Concurrent uploads (default: lab2.upload.workers or 16)')
     
     args = parser.parse_args()
     
@@ -251,7 +296,7 @@ def main():
         logger.info("💡 Dataset upload would be performed")
         return
     
-    if uploader.upload_all_datasets():
+    if uploader.upload_all_datasets(workers=args.workers):
         logger.info("✅ Dataset upload completed successfully")
         sys.exit(0)
     else:
@@ -7,9 +7,13 @@ Safely manages database creation, schema setup, and metadata storage
 import logging
 import json
 import os
+import sys
+import threading
+import time
 import warnings
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Any, Set, Tuple, Union
 from pathlib import Path
 
 # Suppress SSL warnings for internal networks
@@ -54,6 +58,15 @@ class VASTDatabaseManager:
         
         self.connection = None
         self.database = None
+        
+        # Optional in-process index of catalogued files (see load_known_files)
+        self._known_file_paths = None
+        self._known_checksums = None
+        
+        # Per-thread transaction scope (see session()) and its latency metrics
+        self._session_local = threading.local()
+        self._connect_lock = threading.Lock()
+        self.transaction_metrics = TransactionMetrics()
     
     def _log_api_call(self, operation: str, details: str = ""):
         """Log API calls if show_api_calls is enabled"""
@@ -93,6 +106,82 @@ class VASTDatabaseManager:
             logger.error(f"❌ Failed to connect to VAST Database: {e}")
             return False
     
+    def _ensure_connection(self) -> bool:
+        """Connect once, even when several worker threads get here at the same time"""
+        if self.connection:
+            return True
+        with self._connect_lock:
+            if self.connection:
+                return True
+            return self.connect()
+    
+    def session(self):
+        """Share one VAST DB transaction (and its resolved handles) across several calls
+        
+            with manager.session() as s:
+                if not manager.metadata_exists(path):
+                    manager.insert_metadata_batch(records)
+        
+        Every manager method called on this thread inside the block joins the
+        session instead of opening its own transaction. The transaction
+        commits when the block exits cleanly and rolls back if it raises or if
+        a write inside it failed (``s.committed`` tells which). The known-files
+        index and stats cache only see the session's inserts after the commit.
+        Sessions are per thread, so each worker in a pool gets its own;
+        ``transaction_metrics`` records open/commit latency across all of them.
+        """
+        return self._session(bind=True)
+    
+    @contextmanager
+    def _session(self, bind: bool = True):
+        """Join this thread's active session, or open a new transaction for the block
+        
+        ``bind=False`` keeps the new session private to the block; generators
+        that stay suspended between calls use it so they never capture
+        unrelated calls made on the same thread.
+        """
+        active = getattr(self._session_local, 'session', None)
+        if active is not None:
+            yield active
+            return
+        
+        if not self._ensure_connection():
+            raise ConnectionError(f"Cannot connect to VAST Database at {self.db_config['endpoint']}")
+        
+        scope = self.connection.transaction()
+        started = time.perf_counter()
+        tx = scope.__enter__()
+        self.transaction_metrics.record_open(time.perf_counter() - started)
+        
+        session = MetadataSession(tx, self.bucket_name, self.schema_name)
+        if bind:
+            self._session_local.session = session
+        try:
+            yield session
+        except BaseException:
+            scope.__exit__(*sys.exc_info())
+            self.transaction_metrics.record_rollback()
+            raise
+        else:
+            if session.failed:
+                logger.error("❌ Rolling back VAST DB session after a failed write")
+                error = RuntimeError("session rolled back after a failed write")
+                scope.__exit__(RuntimeError, error, None)
+                self.transaction_metrics.record_rollback()
+            else:
+                started = time.perf_counter()
+                scope.__exit__(None, None, None)
+                self.transaction_metrics.record_commit(time.perf_counter() - started)
+                session.committed = True
+                session.run_commit_callbacks()
+        finally:
+            if bind:
+                self._session_local.session = None
+    
+    def in_session(self) -> bool:
+        """True while this thread is inside ``session()``"""
+        return getattr(self._session_local, 'session', None) is not None
+    
     def database_exists(self) -> bool:
         """Check if the target bucket exists in VAST DB"""
         if not VASTDB_AVAILABLE:
@@ -201,6 +290,14 @@ class VASTDatabaseManager:
                     logger.error(f"❌ Failed to create/get table 'swift_metadata': {e}")
                     raise
                 
+                # Ingestion manifest used for incremental/resumable processing
+                from lab2.ingestion_manifest import MANIFEST_TABLE, manifest_columns
+                try:
+                    schema.create_table(MANIFEST_TABLE, manifest_columns())
+                    logger.info(f"✅ Created table '{MANIFEST_TABLE}' in schema '{self.schema_name}'")
+                except vastdb.errors.TableExists:
+                    logger.info(f"✅ Table '{MANIFEST_TABLE}' already exists in schema '{self.schema_name}'")
+                
                 return True
                 
         except Exception as e:
@@ -391,148 +488,358 @@ class VASTDatabaseManager:
             logger.error(f"❌ Failed to create metadata table: {e}")
             return False
     
+    def ensure_manifest_table(self) -> bool:
+        """Create the ingestion manifest table if it doesn't exist"""
+        if not VASTDB_AVAILABLE:
+            logger.warning("⚠️  vastdb not available - ingestion manifest disabled")
+            return False
+        
+        from lab2.ingestion_manifest import MANIFEST_TABLE, manifest_columns
+        
+        try:
+            if not self.connection:
+                if not self.connect():
+                    return False
+            
+            if self.table_exists(MANIFEST_TABLE):
+                return True
+            
+            with self.connection.transaction() as tx:
+                schema = tx.bucket(self.bucket_name).schema(self.schema_name)
+                self._log_api_call("schema.create_table()", f"schema={self.schema_name}, table={MANIFEST_TABLE}")
+                try:
+                    schema.create_table(MANIFEST_TABLE, manifest_columns())
+                    logger.info(f"✅ Created ingestion manifest table '{MANIFEST_TABLE}'")
+                except vastdb.errors.TableExists:
+                    pass
+            return True
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to create ingestion manifest table: {e}")
+            return False
+    
+    def load_ingestion_manifest(self, prefix: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Latest manifest entry per S3 key (optionally only keys starting with ``prefix``)"""
+        if not VASTDB_AVAILABLE:
+            return {}
+        
+        from lab2.ingestion_manifest import MANIFEST_TABLE, manifest_columns
+        from ibis import _
+        
+        try:
+            if not self.connection:
+                if not self.connect():
+                    return {}
+            
+            with self._session() as session:
+                table = session.table(MANIFEST_TABLE)
+                predicate = _.s3_key.startswith(prefix) if prefix else None
+                manifest = table.select(predicate=predicate).read_all()
+            
+            if manifest.num_rows == 0:
+                return {}
+            
+            # Append-only log: the most recent row for a key wins
+            manifest = manifest.sort_by([('recorded_at', 'ascending')])
+            columns = {name: manifest.column(name).to_pylist() for name in manifest.column_names}
+            entries = {}
+            for i, key in enumerate(columns['s3_key']):
+                entries[key] = {name: values[i] for name, values in columns.items()}
+            
+            logger.info(f"📒 Loaded ingestion manifest: {len(entries)} objects ({manifest.num_rows} entries)")
+            return entries
+            
+        except Exception as e:
+            logger.warning(f"⚠️  Could not load ingestion manifest: {e}")
+            return {}
+    
     def metadata_exists(self, file_path: str) -> bool:
         """Check if metadata for a file already exists in the database using VAST DB"""
+        return file_path in self.existing_file_paths([file_path])
+    
+    def existing_file_paths(self, paths: Iterable[str], chunk_size: int = 1000) -> Set[str]:
+        """Return the subset of ``paths`` that already have metadata in the catalog
+        
+        Uses the in-process index when load_known_files() has been called,
+        otherwise pushes a ``file_path IN (...)`` predicate to VAST DB (in chunks
+        of ``chunk_size`` paths) and reads back only the file_path column.
+        """
+        paths = list(dict.fromkeys(p for p in paths if p))
+        if not paths:
+            return set()
+        
+        if self._known_file_paths is not None:
+            return {p for p in paths if p in self._known_file_paths}
+        
         if not VASTDB_AVAILABLE:
             logger.warning("⚠️  vastdb not available - mock metadata existence check")
-            return False
+            return set()
             
         try:
             if not self.connection:
                 if not self.connect():
-                    return False
+                    return set()
             
-            # Use VAST DB transaction to check if metadata exists
-            with self.connection.transaction() as tx:
-                bucket = tx.bucket(self.bucket_name)
-                
+            # Use VAST DB transaction to check which paths exist
+            with self._session() as session:
                 # Check if schema and table exist
                 try:
-                    schema = bucket.schema(self.schema_name)
-                    table = schema.table("swift_metadata")
-                    
-                    # Search for the file_path
-                    reader = table.select()
-                    
-                    for batch in reader:
-                        for i in range(len(batch)):
-                            if batch['file_path'][i].as_py() == file_path:
-                                return True
-                    
-                    return False
-                    
+                    table = session.table("swift_metadata")
                 except Exception:
                     # Schema or table doesn't exist yet
                     logger.info(f"ℹ️  Schema '{self.schema_name}' or table 'swift_metadata' doesn't exist yet")
-                    return False
+                    return set()
+                
+                from ibis import _
+                
+                existing = set()
+                for start in range(0, len(paths), chunk_size):
+                    chunk = paths[start:start + chunk_size]
+                    self._log_api_call(
+                        "table.select()",
+                        f"table=swift_metadata, columns=['file_path'], predicate=file_path.isin({len(chunk)} paths)"
+                    )
+                    reader = table.select(columns=['file_path'], predicate=_.file_path.isin(chunk))
+                    for batch in reader:
+                        existing.update(batch['file_path'].to_pylist())
+                
+                existing.discard(None)
+                return existing
             
         except Exception as e:
             logger.error(f"❌ Error checking metadata existence: {e}")
-            return False
+            return set()
     
-    def insert_metadata(self, metadata: Dict[str, Any]) -> bool:
-        """Insert metadata into the database using VAST DB"""
-        if not VASTDB_AVAILABLE:
-            logger.warning("⚠️  vastdb not available - mock metadata insertion")
+    def load_known_files(self) -> bool:
+        """Load every catalogued file_path and checksum into an in-process hash set
+        
+        After this, existing_file_paths() and is_known_checksum() are answered
+        from memory, and batches inserted through this manager keep the index
+        up to date. Costs one projected scan of two columns per run.
+        """
+        if self._known_file_paths is not None:
             return True
-            
+        
+        if not VASTDB_AVAILABLE:
+            logger.warning("⚠️  vastdb not available - cannot load known files")
+            return False
+        
         try:
             if not self.connection:
-                logger.debug("No database connection, attempting to connect...")
                 if not self.connect():
-                    logger.error("❌ Failed to connect to database")
                     return False
             
-            # Insert metadata (no need to log every file)
+            known_paths = set()
+            known_checksums = set()
             
-            # Use VAST DB transaction to insert metadata
-            with self.connection.transaction() as tx:
-                bucket = tx.bucket(self.bucket_name)
-                schema = bucket.schema(self.schema_name)
-                table = schema.table("swift_metadata")
-                
-                # Convert metadata to PyArrow format
-                import pyarrow as pa
-                import json
-                
-                # Prepare data for insertion (matching the complete table schema - 17 columns)
-                # Convert timestamp strings to datetime objects for PyArrow
-                def parse_timestamp(ts_str):
-                    if not ts_str:
-                        return None
-                    if isinstance(ts_str, datetime):
-                        return ts_str
-                    try:
-                        # Try parsing ISO format timestamp
-                        return datetime.fromisoformat(ts_str.replace('Z', '+00:00'))
-                    except:
-                        return None
-                
-                # PyArrow expects data as column arrays, not row arrays
-                data = {
-                    'file_path': [metadata.get('file_path', '')],
-                    'file_name': [metadata.get('file_name', '')],
-                    'file_size_bytes': [metadata.get('file_size_bytes', 0)],
-                    'file_format': [metadata.get('file_format', '')],
-                    'dataset_name': [metadata.get('dataset_name', '')],
-                    'mission_id': [metadata.get('mission_id', '')],
-                    'satellite_name': [metadata.get('satellite_name', '')],
-                    'instrument_type': [metadata.get('instrument_type', '')],
-                    'observation_timestamp': [parse_timestamp(metadata.get('observation_timestamp', datetime.now()))],
-                    'target_object': [metadata.get('target_object', '')],
-                    'processing_status': [metadata.get('processing_status', '')],
-                    'ingestion_timestamp': [parse_timestamp(metadata.get('ingestion_timestamp', datetime.now()))],
-                    'last_modified': [parse_timestamp(metadata.get('last_modified'))],
-                    'checksum': [metadata.get('checksum', '')],
-                    'metadata_version': [metadata.get('metadata_version', '1.0')],
-                    'created_at': [datetime.now()],
-                    'updated_at': [datetime.now()],
-                    # New Swift-specific metadata fields
-                    'ra_deg': [metadata.get('ra_deg', None)],
-                    'dec_deg': [metadata.get('dec_deg', None)],
-                    'observation_end': [parse_timestamp(metadata.get('observation_end'))],
-                    'energy_min_kev': [metadata.get('energy_min_kev', None)],
-                    'energy_max_kev': [metadata.get('energy_max_kev', None)],
-                    'on_target_time_s': [metadata.get('on_target_time_s', None)],
-                    'elapsed_time_s': [metadata.get('elapsed_time_s', None)],
-                    'catalog_number': [metadata.get('catalog_number', None)],
-                    'catalog_name': [metadata.get('catalog_name', '')],
-                    'lightcurve_type': [metadata.get('lightcurve_type', '')],
-                    'background_applied': [metadata.get('background_applied', None)]
-                }
-                
-                # Validate schema and data match
-                schema = table.columns()
-                data_columns = len(data)
-                schema_columns = len(schema)
-                
-                # Schema validation
-                if data_columns != schema_columns:
-                    error_msg = f"Schema mismatch: Data has {data_columns} columns but table schema expects {schema_columns} columns"
-                    logger.error(error_msg)
-                    raise ValueError(error_msg)
-                
-                # Create PyArrow table and insert
-                arrow_table = pa.table(data=data, schema=table.columns())
-                
-                # Log API call
-                if self.config.get('debug.api_calls', False):
-                    self._log_api_call(
-                        "table.insert()",
-                        f"table=swift_metadata, file_name={metadata.get('file_name', 'Unknown')}"
-                    )
+            with self._session() as session:
+                try:
+                    table = session.table("swift_metadata")
+                except Exception:
+                    logger.info(f"ℹ️  Schema '{self.schema_name}' or table 'swift_metadata' doesn't exist yet")
+                    table = None
                 
-                table.insert(arrow_table)
-                logger.debug(f"Successfully inserted metadata for {metadata.get('file_name', 'Unknown')}")
+                if table is not None:
+                    self._log_api_call("table.select()", "table=swift_metadata, columns=['file_path', 'checksum']")
+                    for batch in table.select(columns=['file_path', 'checksum']):
+                        known_paths.update(batch['file_path'].to_pylist())
+                        known_checksums.update(batch['checksum'].to_pylist())
+            
+            known_paths.discard(None)
+            known_checksums.difference_update({None, '', 'unknown'})
+            self._known_file_paths = known_paths
+            self._known_checksums = known_checksums
+            logger.info(f"📇 Loaded {len(known_paths)} known file paths and {len(known_checksums)} checksums")
+            return True
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to load known files: {e}")
+            return False
+    
+    def is_known_checksum(self, checksum: str) -> bool:
+        """Check a checksum against the in-process index (always False until load_known_files())"""
+        if self._known_checksums is None or not checksum:
+            return False
+        return checksum in self._known_checksums
+    
+    def _remember_known_files(self, records: List[Dict[str, Any]]):
+        """Add freshly inserted records to the in-process index (if it is loaded)"""
+        if self._known_file_paths is None:
+            return
+        for metadata in records:
+            if metadata.get('file_path'):
+                self._known_file_paths.add(metadata['file_path'])
+            if metadata.get('checksum') not in (None, '', 'unknown'):
+                self._known_checksums.add(metadata['checksum'])
+    
+    @staticmethod
+    def _parse_timestamp(ts_str):
+        """Convert an ISO timestamp string (or datetime) into a datetime for PyArrow"""
+        if not ts_str:
+            return None
+        if isinstance(ts_str, datetime):
+            return ts_str
+        try:
+            # Try parsing ISO format timestamp
+            return datetime.fromisoformat(ts_str.replace('Z', '+00:00'))
+        except (ValueError, TypeError, AttributeError):
+            return None
+    
+    def _metadata_to_row(self, metadata: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+        """Map an extracted metadata dict onto the swift_metadata table columns"""
+        parse_timestamp = self._parse_timestamp
+        return {
+            'file_path': metadata.get('file_path', ''),
+            'file_name': metadata.get('file_name', ''),
+            'file_size_bytes': metadata.get('file_size_bytes', 0),
+            'file_format': metadata.get('file_format', ''),
+            'dataset_name': metadata.get('dataset_name', ''),
+            'mission_id': metadata.get('mission_id', ''),
+            'satellite_name': metadata.get('satellite_name', ''),
+            'instrument_type': metadata.get('instrument_type', ''),
+            'observation_timestamp': parse_timestamp(metadata.get('observation_timestamp', now)),
+            'target_object': metadata.get('target_object', ''),
+            'processing_status': metadata.get('processing_status', ''),
+            'ingestion_timestamp': parse_timestamp(metadata.get('ingestion_timestamp', now)),
+            'last_modified': parse_timestamp(metadata.get('last_modified')),
+            'checksum': metadata.get('checksum', ''),
+            'metadata_version': metadata.get('metadata_version', '1.0'),
+            'created_at': now,
+            'updated_at': now,
+            # New Swift-specific metadata fields
+            'ra_deg': metadata.get('ra_deg', None),
+            'dec_deg': metadata.get('dec_deg', None),
+            'observation_end': parse_timestamp(metadata.get('observation_end')),
+            'energy_min_kev': metadata.get('energy_min_kev', None),
+            'energy_max_kev': metadata.get('energy_max_kev', None),
+            'on_target_time_s': metadata.get('on_target_time_s', None),
+            'elapsed_time_s': metadata.get('elapsed_time_s', None),
+            'catalog_number': metadata.get('catalog_number', None),
+            'catalog_name': metadata.get('catalog_name', ''),
+            'lightcurve_type': metadata.get('lightcurve_type', ''),
+            'background_applied': metadata.get('background_applied', None)
+        }
+    
+    def insert_metadata(self, metadata: Dict[str, Any]) -> bool:
+        """Insert metadata into the database using VAST DB"""
+        return self.insert_metadata_batch([metadata]) == 1
+    
+    def insert_metadata_batch(self, records: List[Dict[str, Any]], batch_rows: Optional[int] = None,
+                              manifest_entries: Optional[List[Dict[str, Any]]] = None,
+                              replace_paths: Optional[Iterable[str]] = None) -> int:
+        """Insert many metadata records in a single VAST DB transaction
+        
+        The records are converted column-wise into one Arrow RecordBatch that is
+        validated against the table schema before anything is sent, then inserted
+        in slices of at most ``batch_rows`` rows. Returns the number of rows
+        inserted (0 if the batch failed).
+        
+        ``manifest_entries`` are appended to the ingestion manifest and existing
+        rows for ``replace_paths`` are deleted in the same transaction, so the
+        catalog and the manifest always commit (or fail) together.
+        """
+        if not records and not manifest_entries:
+            return 0
+        
+        if not VASTDB_AVAILABLE:
+            logger.warning("⚠️  vastdb not available - mock metadata insertion")
+            return len(records)
+        
+        if batch_rows is None:
+            batch_rows = self.config.get('lab2.ingest.batch_rows', 5000)
+        
+        replace_paths = list(replace_paths or [])
+        
+        try:
+            if not self._ensure_connection():
+                logger.error("❌ Failed to connect to database")
+                return 0
+            
+            # Use a single VAST DB transaction for the whole batch (or join the caller's session)
+            with self._session() as session:
+                try:
+                    table = session.table("swift_metadata")
+                    
+                    import pyarrow as pa
+                    
+                    if replace_paths:
+                        self._delete_metadata_rows(table, replace_paths)
+                    
+                    if records:
+                        table_schema = session.columns("swift_metadata")
+                        now = datetime.now()
+                        rows = [self._metadata_to_row(metadata, now) for metadata in records]
+                        
+                        # Schema validation
+                        data_columns = len(rows[0])
+                        schema_columns = len(table_schema)
+                        if data_columns != schema_columns:
+                            error_msg = f"Schema mismatch: Data has {data_columns} columns but table schema expects {schema_columns} columns"
+                            logger.error(error_msg)
+                            raise ValueError(error_msg)
+                        
+                        # PyArrow expects data as column arrays, not row arrays
+                        data = {name: [row[name] for row in rows] for name in table_schema.names}
+                        record_batch = pa.RecordBatch.from_pydict(data, schema=table_schema)
+                        
+                        # Log API call
+                        if self.config.get('debug.api_calls', False):
+                            self._log_api_call(
+                                "table.insert()",
+                                f"table=swift_metadata, rows={record_batch.num_rows}, batch_rows={batch_rows}"
+                            )
+                        
+                        for offset in range(0, record_batch.num_rows, batch_rows):
+                            table.insert(record_batch.slice(offset, batch_rows))
+                    
+                    if manifest_entries:
+                        from lab2.ingestion_manifest import MANIFEST_TABLE, manifest_columns
+                        columns = manifest_columns()
+                        data = {name: [entry.get(name) for entry in manifest_entries] for name in columns.names}
+                        session.table(MANIFEST_TABLE).insert(pa.RecordBatch.from_pydict(data, schema=columns))
+                except Exception:
+                    # Part of the batch may already be written - never let a shared session commit it
+                    session.mark_failed()
+                    raise
                 
-                return True
+                # Keep the in-process index and stats cache in sync once the rows are committed
+                session.after_commit(lambda: self._after_insert(records, replace_paths))
+            
+            logger.debug(f"Successfully inserted {len(records)} metadata records")
+            return len(records)
                 
         except Exception as e:
-            logger.error(f"❌ Failed to insert metadata: {e}")
-            return False
+            logger.error(f"❌ Failed to insert metadata batch of {len(records)} records: {e}")
+            return 0
+    
+    def _after_insert(self, records: List[Dict[str, Any]], replace_paths: List[str]):
+        """Bookkeeping for a committed insert_metadata_batch"""
+        self._remember_known_files(records)
+        if records or replace_paths:
+            self.invalidate_stats_cache()
     
-    def search_metadata(self, search_criteria: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Search metadata based on criteria using VAST DB with wildcard support"""
+    def _delete_metadata_rows(self, table, paths: Iterable[str], chunk_size: int = 1000):
+        """Delete the catalog rows for the given file paths (inside the caller's transaction)"""
+        from ibis import _
+        
+        paths = list(dict.fromkeys(p for p in paths if p))
+        for start in range(0, len(paths), chunk_size):
+            chunk = paths[start:start + chunk_size]
+            reader = table.select(columns=['file_path'], predicate=_.file_path.isin(chunk), internal_row_id=True)
+            for batch in reader:
+                if batch.num_rows:
+                    table.delete(batch)
+        logger.debug(f"Replaced catalog rows for {len(paths)} changed objects")
+    
+    def search_metadata(self, search_criteria: Dict[str, Any], columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Search metadata based on criteria using VAST DB with wildcard support
+        
+        Criteria are compiled into a VAST DB predicate that is evaluated
+        server-side. Anything that cannot be pushed down (e.g. suffix
+        wildcards or case-insensitive string comparisons) is filtered with
+        pyarrow.compute on whole batches, so only matching rows are ever
+        converted to dicts. Pass ``columns`` to return only the fields you need.
+        """
         if not VASTDB_AVAILABLE:
             logger.error("❌ vastdb not available - cannot search metadata")
             return []
@@ -543,180 +850,30 @@ class VASTDatabaseManager:
                     return []
             
             # Use VAST DB transaction to search metadata
-            with self.connection.transaction() as tx:
-                bucket = tx.bucket(self.bucket_name)
-                
+            with self._session() as session:
                 # Check if schema and table exist
                 try:
-                    schema = bucket.schema(self.schema_name)
-                    table = schema.table("swift_metadata")
+                    table = session.table("swift_metadata")
+                    
+                    from lab2.metadata_search_filter import MetadataSearchFilter
                     
-                    # Use Python-side filtering (ibis support removed)
-                    self._log_api_call(
-                        "table.select()",
-                        f"table=swift_metadata, python_filtering=True, conditions={len(search_criteria)}"
-                    )
                     logger.info(f"Search criteria: {search_criteria}")
-                    reader = table.select()
-                    results = []
+                    table_schema = session.columns("swift_metadata")
+                    search_filter = MetadataSearchFilter(search_criteria, table_schema)
+                    if search_filter.matches_nothing:
+                        logger.info("🔍 Found 0 metadata records")
+                        return []
                     
-                    batch_count = 0
-                    total_records_processed = 0
-                    for batch in reader:
-                        batch_count += 1
-                        for i in range(len(batch)):
-                            total_records_processed += 1
-                            record = {}
-                            # Convert PyArrow record to Python dict
-                            for col_name in batch.column_names:
-                                value = batch[col_name][i]
-                                if value is not None:
-                                    record[col_name] = value.as_py()
-                                else:
-                                    record[col_name] = None
-                            
-                            # Apply search criteria with wildcard support (Python filtering)
-                            matches = True
-                            criteria_loop_break = False
-                            for key, criteria in search_criteria.items():
-                                if key not in record:
-                                    matches = False
-                                    criteria_loop_break = True
-                                    break
-                                
-                                record_value = str(record[key]).lower() if record[key] is not None else ""
-                                
-                                if criteria['type'] == 'exact':
-                                    # Exact match
-                                    if record_value != str(criteria['value']).lower():
-                                        matches = False
-                                        criteria_loop_break = True
-                                        break
-                                elif criteria['type'] == 'wildcard':
-                                    # Wildcard match
-                                    pattern = criteria['pattern'].lower()
-                                    
-                                    if pattern == '*':
-                                        # Match everything - set matches to True and break out of criteria loop
-                                        matches = True
-                                        criteria_loop_break = True
-                                        break
-                                    else:
-                                        # Other wildcard patterns
-                                        if pattern.startswith('*') and pattern.endswith('*'):
-                                            # Contains pattern: *value*
-                                            search_value = pattern[1:-1]
-                                            if search_value not in record_value:
-                                                matches = False
-                                                criteria_loop_break = True
-                                                break
-                                        elif pattern.startswith('*'):
-                                            # Ends with pattern: *value
-                                            search_value = pattern[1:]
-                                            if not record_value.endswith(search_value):
-                                                matches = False
-                                                criteria_loop_break = True
-                                                break
-                                        elif pattern.endswith('*'):
-                                            # Starts with pattern: value*
-                                            search_value = pattern[:-1]
-                                            if not record_value.startswith(search_value):
-                                                matches = False
-                                                criteria_loop_break = True
-                                                break
-                                        else:
-                                            # No wildcards, treat as exact match
-                                            if record_value != pattern:
-                                                matches = False
-                                                criteria_loop_break = True
-                                                break
-                                elif criteria['type'] == 'comparison':
-                                    # Comparison match (for dates, numbers, etc.)
-                                    operator = criteria['operator']
-                                    compare_value = criteria['value']
-                                    
-                                    # Try to parse as date first
-                                    try:
-                                        from datetime import datetime
-                                        record_date = datetime.fromisoformat(record_value.replace('Z', '+00:00'))
-                                        compare_date = datetime.fromisoformat(compare_value.replace('Z', '+00:00'))
-                                        
-                                        if operator == '>':
-                                            if not (record_date > compare_date):
-                                                matches = False
-                                                criteria_loop_break = True
-                                                break
-                                        elif operator == '<':
-                                            if not (record_date < compare_date):
-                                                matches = False
-                                                criteria_loop_break = True
-                                                break
-                                        elif operator == '>=':
-                                            if not (record_date >= compare_date):
-                                                matches = False
-                                                criteria_loop_break = True
-                                                break
-                                        elif operator == '<=':
-                                            if not (record_date <= compare_date):
-                                                matches = False
-                                                criteria_loop_break = True
-                                                break
-                                    except (ValueError, TypeError):
-                                        # Not a date, try numeric comparison
-                                        try:
-                                            record_num = float(record_value)
-                                            compare_num = float(compare_value)
-                                            
-                                            if operator == '>':
-                                                if not (record_num > compare_num):
-                                                    matches = False
-                                                    criteria_loop_break = True
-                                                    break
-                                            elif operator == '<':
-                                                if not (record_num < compare_num):
-                                                    matches = False
-                                                    criteria_loop_break = True
-                                                    break
-                                            elif operator == '>=':
-                                                if not (record_num >= compare_num):
-                                                    matches = False
-                                                    criteria_loop_break = True
-                                                    break
-                                            elif operator == '<=':
-                                                if not (record_num <= compare_num):
-                                                    matches = False
-                                                    criteria_loop_break = True
-                                                    break
-                                        except (ValueError, TypeError):
-                                                # Not numeric either, do string comparison
-                                                if operator == '>':
-                                                    if not (record_value > compare_value):
-                                                        matches = False
-                                                        criteria_loop_break = True
-                                                        break
-                                                elif operator == '<':
-                                                    if not (record_value < compare_value):
-                                                        matches = False
-                                                        criteria_loop_break = True
-                                                        break
-                                                elif operator == '>=':
-                                                    if not (record_value >= compare_value):
-                                                        matches = False
-                                                        criteria_loop_break = True
-                                                        break
-                                                elif operator == '<=':
-                                                    if not (record_value <= compare_value):
-                                                        matches = False
-                                                        criteria_loop_break = True
-                                                        break
-                                
-                                # Check if we should continue to the next record
-                                if criteria_loop_break:
-                                    break
-                            
-                            # Check if record matches after processing all criteria
-                            if matches:
-                                results.append(record)
+                    output_columns = [c for c in (columns or table_schema.names) if c in table_schema.names]
+                    
+                    try:
+                        results = self._select_filtered(table, search_filter, output_columns, pushdown=True)
+                    except Exception as e:
+                        if search_filter.predicate is None:
+                            raise
+                        # Older servers may reject some predicates - evaluate everything client-side
+                        logger.info(f"🔄 Predicate pushdown failed ({e}), retrying with client-side filtering...")
+                        results = self._select_filtered(table, search_filter, output_columns, pushdown=False)
                     
                     logger.info(f"🔍 Found {len(results)} metadata records")
                     return results
@@ -728,327 +885,203 @@ class VASTDatabaseManager:
                         logger.info(f"ℹ️  Schema '{self.schema_name}' or table 'swift_metadata' doesn't exist yet")
                     else:
                         logger.error(f"❌ Search error: {e}")
-                        # If it's an ibis-related error, try fallback to Python filtering
-                        if 'ibis' in error_msg.lower() or 'predicate' in error_msg.lower():
-                            logger.info("🔄 Retrying with Python-side filtering...")
-                            try:
-                                # Retry without ibis predicate
-                                reader = table.select()
-                                results = []
-                                
-                                for batch in reader:
-                                    for i in range(len(batch)):
-                                        record = {}
-                                        for col_name in batch.column_names:
-                                            value = batch[col_name][i]
-                                            if value is not None:
-                                                record[col_name] = value.as_py()
-                                            else:
-                                                record[col_name] = None
-                                        
-                                        # Apply Python filtering
-                                        matches = True
-                                        for key, criteria in search_criteria.items():
-                                            if key not in record:
-                                                matches = False
-                                                break
-                                            
-                                            record_value = str(record[key]).lower()
-                                            
-                                            if criteria['type'] == 'exact':
-                                                if record_value != str(criteria['value']).lower():
-                                                    matches = False
-                                                    break
-                                            elif criteria['type'] == 'wildcard':
-                                                pattern = criteria['pattern'].lower()
-                                                if pattern == '*':
-                                                    continue
-                                                elif pattern.startswith('*') and pattern.endswith('*'):
-                                                    search_value = pattern[1:-1]
-                                                    if search_value not in record_value:
-                                                        matches = False
-                                                        break
-                                                elif pattern.startswith('*'):
-                                                    search_value = pattern[1:]
-                                                    if not record_value.endswith(search_value):
-                                                        matches = False
-                                                        break
-                                                elif pattern.endswith('*'):
-                                                    search_value = pattern[:-1]
-                                                    if not record_value.startswith(search_value):
-                                                        matches = False
-                                                        break
-                                                else:
-                                                    if record_value != pattern:
-                                                        matches = False
-                                                        break
-                                            elif criteria['type'] == 'comparison':
-                                                operator = criteria['operator']
-                                                compare_value = criteria['value']
-                                                
-                                                try:
-                                                    from datetime import datetime
-                                                    record_date = datetime.fromisoformat(record_value.replace('Z', '+00:00'))
-                                                    compare_date = datetime.fromisoformat(compare_value.replace('Z', '+00:00'))
-                                                    
-                                                    if operator == '>':
-                                                        if not (record_date > compare_date):
-                                                            matches = False
-                                                            break
-                                                    elif operator == '<':
-                                                        if not (record_date < compare_date):
-                                                            matches = False
-                                                            break
-                                                    elif operator == '>=':
-                                                        if not (record_date >= compare_date):
-                                                            matches = False
-                                                            break
-                                                    elif operator == '<=':
-                                                        if not (record_date <= compare_date):
-                                                            matches = False
-                                                            break
-                                                except (ValueError, TypeError):
-                                                    try:
-                                                        record_num = float(record_value)
-                                                        compare_num = float(compare_value)
-                                                        
-                                                        if operator == '>':
-                                                            if not (record_num > compare_num):
-                                                                matches = False
-                                                                break
-                                                        elif operator == '<':
-                                                            if not (record_num < compare_num):
-                                                                matches = False
-                                                                break
-                                                        elif operator == '>=':
-                                                            if not (record_num >= compare_num):
-                                                                matches = False
-                                                                break
-                                                        elif operator == '<=':
-                                                            if not (record_num <= compare_num):
-                                                                matches = False
-                                                                break
-                                                    except (ValueError, TypeError):
-                                                        if operator == '>':
-                                                            if not (record_value > compare_value):
-                                                                matches = False
-                                                                break
-                                                        elif operator == '<':
-                                                            if not (record_value < compare_value):
-                                                                matches = False
-                                                                break
-                                                        elif operator == '>=':
-                                                            if not (record_value >= compare_value):
-                                                                matches = False
-                                                                break
-                                                        elif operator == '<=':
-                                                            if not (record_value <= compare_value):
-                                                                matches = False
-                                                                break
-                                        
-                                        if matches:
-                                            results.append(record)
-                                
-                                logger.info(f"🔍 Found {len(results)} metadata records (fallback filtering)")
-                                return results
-                            except Exception as fallback_error:
-                                logger.error(f"❌ Fallback filtering also failed: {fallback_error}")
                     return []
             
         except Exception as e:
             logger.error(f"❌ Search failed: {e}")
             return []
     
-    def get_all_metadata(self) -> List[Dict[str, Any]]:
-        """Get all metadata records from the database"""
+    def _select_filtered(self, table, search_filter, output_columns: List[str], pushdown: bool = True) -> List[Dict[str, Any]]:
+        """Run a projected select with the compiled filter and return matching rows as dicts"""
+        import pyarrow as pa
+        
+        # Fetch the output columns plus whatever the client-side filter needs
+        query_columns = list(output_columns)
+        for column in search_filter.residual_columns(pushdown):
+            if column not in query_columns:
+                query_columns.append(column)
+        predicate = search_filter.predicate if pushdown else None
+        
+        self._log_api_call(
+            "table.select()",
+            f"table=swift_metadata, columns={len(query_columns)}, pushdown={predicate is not None}, "
+            f"client_side_conditions={len(search_filter.residual_conditions(pushdown))}"
+        )
+        
+        reader = table.select(columns=query_columns, predicate=predicate)
+        
+        matched_batches = []
+        for batch in reader:
+            filtered = search_filter.filter_batch(batch, pushdown=pushdown)
+            if filtered.num_rows:
+                matched_batches.append(filtered)
+        
+        if not matched_batches:
+            return []
+        return pa.Table.from_batches(matched_batches).select(output_columns).to_pylist()
+    
+    def iter_metadata_batches(self, columns: Optional[List[str]] = None, predicate=None,
+                              limit_rows: Optional[int] = None) -> Iterator[Any]:
+        """Stream the metadata table as pyarrow RecordBatches
+        
+        The read transaction stays open while the iterator is consumed, so
+        large catalogs can be processed batch by batch without building the
+        whole result in memory. Unknown names in ``columns`` are ignored.
+        """
+        if not VASTDB_AVAILABLE:
+            logger.warning("⚠️  vastdb not available - cannot stream metadata")
+            return
+        
+        if not self.connection:
+            if not self.connect():
+                return
+        
+        with self._session(bind=False) as session:
+            table = session.table("swift_metadata")
+            table_columns = session.columns("swift_metadata").names
+            if columns is not None:
+                columns = [c for c in columns if c in table_columns]
+            
+            self._log_api_call(
+                "table.select()",
+                f"table=swift_metadata, columns={len(columns) if columns is not None else 'all'}, "
+                f"pushdown={predicate is not None}, limit_rows={limit_rows}"
+            )
+            
+            reader = table.select(columns=columns, predicate=predicate, limit_rows=limit_rows)
+            for batch in reader:
+                if batch.num_rows:
+                    yield batch
+    
+    def _read_metadata_table(self, columns: Optional[List[str]] = None, predicate=None,
+                             limit_rows: Optional[int] = None):
+        """Collect ``iter_metadata_batches`` into a single pyarrow Table"""
+        import pyarrow as pa
+        
+        batches = list(self.iter_metadata_batches(columns, predicate, limit_rows))
+        if not batches:
+            return None
+        return pa.Table.from_batches(batches)
+    
+    def get_all_metadata(self, columns: Optional[List[str]] = None,
+                         as_arrow: bool = False) -> Union[List[Dict[str, Any]], Any]:
+        """Get all metadata records from the database
+        
+        Returns a list of dicts by default, or a pyarrow Table with
+        ``as_arrow=True``. Use ``iter_metadata_batches`` to stream instead.
+        """
         if not VASTDB_AVAILABLE:
             logger.warning("⚠️  vastdb not available - mock metadata retrieval")
-            return []
+            return self._metadata_result(None, as_arrow)
             
         try:
-            if not self.connection:
-                if not self.connect():
-                    return []
-            
-            # Use VAST DB transaction to get all metadata
-            with self.connection.transaction() as tx:
-                bucket = tx.bucket(self.bucket_name)
-                
-                # Check if schema and table exist
-                try:
-                    schema = bucket.schema(self.schema_name)
-                    table = schema.table("swift_metadata")
-                    
-                    # Get all records
-                    reader = table.select()
-                    results = []
-                    
-                    for batch in reader:
-                        for i in range(len(batch)):
-                            record = {}
-                            # Convert PyArrow record to Python dict
-                            for col_name in batch.column_names:
-                                col_data = batch.column(col_name)
-                                if hasattr(col_data, 'to_pylist'):
-                                    record[col_name] = col_data.to_pylist()[i]
-                                else:
-                                    record[col_name] = col_data[i]
-                            results.append(record)
-                    
-                    logger.info(f"📊 Retrieved {len(results)} metadata records")
-                    return results
-                    
-                except Exception as e:
-                    logger.error(f"❌ Failed to access metadata table: {e}")
-                    return []
+            result = self._read_metadata_table(columns)
+            num_rows = result.num_rows if result is not None else 0
+            logger.info(f"📊 Retrieved {num_rows} metadata records")
+            return self._metadata_result(result, as_arrow)
                     
         except Exception as e:
             logger.error(f"❌ Failed to get all metadata: {e}")
-            return []
+            return self._metadata_result(None, as_arrow)
     
-    def get_recent_metadata(self, limit: int = 1000) -> List[Dict[str, Any]]:
-        """Get recent metadata records from the database (limited for performance)"""
+    def get_recent_metadata(self, limit: int = 1000, columns: Optional[List[str]] = None,
+                            as_arrow: bool = False) -> Union[List[Dict[str, Any]], Any]:
+        """Get up to ``limit`` metadata records (the server stops after ``limit`` rows)
+        
+        Returns a list of dicts by default, or a pyarrow Table with ``as_arrow=True``.
+        """
         if not VASTDB_AVAILABLE:
             logger.warning("⚠️  vastdb not available - mock recent metadata")
-            return []
+            return self._metadata_result(None, as_arrow)
             
         try:
-            if not self.connection:
-                if not self.connect():
-                    return []
-            
-            # Use VAST DB transaction to get recent metadata
-            with self.connection.transaction() as tx:
-                bucket = tx.bucket(self.bucket_name)
-                
-                # Check if schema and table exist
-                try:
-                    schema = bucket.schema(self.schema_name)
-                    table = schema.table("swift_metadata")
-                    
-                    # Use QueryConfig to limit results efficiently
-                    from vastdb.config import QueryConfig
-                    
-                    config = QueryConfig(
-                        num_splits=1,                    # Use 1 split
-                        num_sub_splits=1,                # 1 subsplit per split
-                        limit_rows_per_sub_split=limit,  # Limit to requested count
-                    )
-                    
-                    # Get records with limit applied
-                    reader = table.select(config=config)
-                    results = []
-                    
-                    # Process the first batch (which should contain up to 'limit' records)
-                    try:
-                        first_batch = next(reader)
-                        for i in range(len(first_batch)):
-                            record = {}
-                            # Convert PyArrow record to Python dict
-                            for col_name in first_batch.column_names:
-                                value = first_batch[col_name][i]
-                                if value is not None:
-                                    record[col_name] = value.as_py()
-                                else:
-                                    record[col_name] = None
-                            results.append(record)
-                    except StopIteration:
-                        # No data available
-                        pass
-                    
-                    logger.info(f"📊 Retrieved {len(results)} recent metadata records (limit: {limit})")
-                    return results
-                    
-                except Exception as e:
-                    logger.error(f"❌ Failed to access metadata table: {e}")
-                    return []
+            result = self._read_metadata_table(columns, limit_rows=limit)
+            if result is not None and result.num_rows > limit:
+                result = result.slice(0, limit)
+            num_rows = result.num_rows if result is not None else 0
+            logger.info(f"📊 Retrieved {num_rows} recent metadata records (limit: {limit})")
+            return self._metadata_result(result, as_arrow)
                     
         except Exception as e:
             logger.error(f"❌ Failed to get recent metadata: {e}")
-            return []
+            return self._metadata_result(None, as_arrow)
     
-    def get_latest_files(self, count: int) -> List[Dict[str, Any]]:
-        """Get the N latest files by observation timestamp using VAST DB"""
+    def get_latest_files(self, count: int, columns: Optional[List[str]] = None,
+                         as_arrow: bool = False) -> Union[List[Dict[str, Any]], Any]:
+        """Get the N most recently ingested files, newest first
+        
+        VAST DB has no server-side ORDER BY, so the table is streamed and a
+        running top-k on ``ingestion_timestamp`` is kept with
+        pyarrow.compute - memory stays at ``count`` rows plus one batch.
+        Returns a list of dicts by default, or a pyarrow Table with ``as_arrow=True``.
+        """
         if not VASTDB_AVAILABLE:
             logger.warning("⚠️  vastdb not available - mock latest files")
-            return []
+            return self._metadata_result(None, as_arrow)
             
         try:
-            if not self.connection:
-                if not self.connect():
-                    return []
+            import pyarrow as pa
+            import pyarrow.compute as pc
             
-            # Use VAST DB transaction to get latest files
-            with self.connection.transaction() as tx:
-                bucket = tx.bucket(self.bucket_name)
-                
-                # Check if schema and table exist
-                try:
-                    schema = bucket.schema(self.schema_name)
-                    table = schema.table("swift_metadata")
-                    
-                    # Use QueryConfig to limit results efficiently
-                    from vastdb.config import QueryConfig
-                    
-                    config = QueryConfig(
-                        num_splits=1,                    # Use 1 split
-                        num_sub_splits=1,                # 1 subsplit per split
-                        limit_rows_per_sub_split=count,  # Limit to requested count
-                    )
-                    
-                    # Get records with limit applied
-                    reader = table.select(config=config)
-                    records = []
-                    
-                    # Process the first batch (which should contain up to 'count' records)
-                    try:
-                        first_batch = next(reader)
-                        for i in range(len(first_batch)):
-                            record = {}
-                            # Convert PyArrow record to Python dict
-                            for col_name in first_batch.column_names:
-                                value = first_batch[col_name][i]
-                                if value is not None:
-                                    record[col_name] = value.as_py()
-                                else:
-                                    record[col_name] = None
-                            
-                            records.append(record)
-                    except StopIteration:
-                        # No data available
-                        pass
-                    
-                    # Sort by observation_timestamp (descending - latest first)
-                    def get_timestamp(record):
-                        obs_time = record.get('observation_timestamp')
-                        if obs_time is None:
-                            return datetime.min
-                        if isinstance(obs_time, str):
-                            try:
-                                return datetime.fromisoformat(obs_time.replace('Z', '+00:00'))
-                            except:
-                                return datetime.min
-                        return obs_time
-                    
-                    records.sort(key=get_timestamp, reverse=True)
-                    
-                    # Return the requested number of latest files
-                    latest_files = records[:count]
-                    
-                    logger.info(f"🕒 Retrieved {len(latest_files)} latest files")
-                    return latest_files
-                    
-                except Exception:
-                    # Schema or table doesn't exist yet
-                    logger.info(f"ℹ️  Schema '{self.schema_name}' or table 'swift_metadata' doesn't exist yet")
-                    return []
+            sort_key = 'ingestion_timestamp'
+            query_columns = None
+            if columns is not None:
+                query_columns = list(columns) + ([sort_key] if sort_key not in columns else [])
+            
+            latest = None
+            if count > 0:
+                for batch in self.iter_metadata_batches(query_columns):
+                    candidates = pa.Table.from_batches([batch])
+                    if latest is not None:
+                        candidates = pa.concat_tables([latest, candidates])
+                    top = pc.select_k_unstable(candidates, k=count, sort_keys=[(sort_key, 'descending')])
+                    latest = candidates.take(top)
+            
+            if latest is not None:
+                # select_k is unstable - order the final (small) result
+                latest = latest.sort_by([(sort_key, 'descending')])
+                if columns is not None:
+                    latest = latest.select([c for c in columns if c in latest.column_names])
+            
+            num_rows = latest.num_rows if latest is not None else 0
+            logger.info(f"🕒 Retrieved {num_rows} latest files")
+            return self._metadata_result(latest, as_arrow)
             
         except Exception as e:
-            logger.error(f"❌ Failed to get latest files: {e}")
-            return []
+            error_msg = str(e).lower()
+            if 'schema' in error_msg or 'table' in error_msg or 'not found' in error_msg:
+                logger.info(f"ℹ️  Schema '{self.schema_name}' or table 'swift_metadata' doesn't exist yet")
+            else:
+                logger.error(f"❌ Failed to get latest files: {e}")
+            return self._metadata_result(None, as_arrow)
+    
+    @staticmethod
+    def _metadata_result(table, as_arrow: bool):
+        """Return a read result as a pyarrow Table, or as dicts for existing callers"""
+        if as_arrow:
+            import pyarrow as pa
+            return table if table is not None else pa.table({})
+        return table.to_pylist() if table is not None else []
+    
+    def _stats_cache_key(self) -> Tuple[str, str, str]:
+        """Identifies this catalog in the process-wide stats cache"""
+        return (self.db_config['endpoint'], self.bucket_name, self.schema_name)
+    
+    def invalidate_stats_cache(self):
+        """Drop cached stats for this catalog (called after every write)"""
+        from lab2.metadata_stats import stats_cache
+        stats_cache.invalidate(self._stats_cache_key())
     
-    def get_metadata_stats(self) -> Dict[str, Any]:
-        """Get statistics about the metadata catalog using VAST DB"""
+    def get_metadata_stats(self, detailed: bool = True, use_cache: bool = True) -> Dict[str, Any]:
+        """Get statistics about the metadata catalog using VAST DB
+        
+        ``total_files`` and ``table_size_bytes`` come from the table's own
+        stats (no scan). With ``detailed`` the projected stats columns are
+        scanned and reduced with Arrow group_by/aggregate into per-mission,
+        per-dataset and per-format counts and sizes plus observation and
+        ingestion time ranges. Results are cached for
+        ``lab2.stats.cache_ttl_seconds`` and invalidated on insert.
+        """
         if not VASTDB_AVAILABLE:
             logger.warning("⚠️  vastdb not available - mock metadata stats")
             return {
@@ -1056,6 +1089,15 @@ class VASTDatabaseManager:
                 'mission_counts': {},
                 'dataset_counts': {}
             }
+        
+        from lab2.metadata_stats import STATS_COLUMNS, MetadataStatsAccumulator, stats_cache
+        
+        cache_key = self._stats_cache_key() + (detailed,)
+        if use_cache:
+            cached = stats_cache.get(cache_key)
+            if cached is not None:
+                logger.debug("Using cached metadata stats")
+                return cached
             
         try:
             if not self.connection:
@@ -1063,37 +1105,40 @@ class VASTDatabaseManager:
                     return {}
             
             # Use VAST DB transaction to get statistics
-            with self.connection.transaction() as tx:
-                bucket = tx.bucket(self.bucket_name)
-                
+            with self._session() as session:
                 # Check if schema and table exist
                 try:
-                    schema = bucket.schema(self.schema_name)
-                    table = schema.table("swift_metadata")
+                    table = session.table("swift_metadata")
                     
-                    # Get total count using select()
-                    reader = table.select()
-                    total_count = 0
-                    mission_counts = {}
-                    dataset_counts = {}
+                    started = time.perf_counter()
                     
-                    # Process all records to count them
-                    for batch in reader:
-                        total_count += len(batch)
-                        
-                        # Count by mission and dataset
-                        for i in range(len(batch)):
-                            mission_id = batch['mission_id'][i].as_py() if batch['mission_id'][i] is not None else 'unknown'
-                            dataset_name = batch['dataset_name'][i].as_py() if batch['dataset_name'][i] is not None else 'unknown'
-                            
-                            mission_counts[mission_id] = mission_counts.get(mission_id, 0) + 1
-                            dataset_counts[dataset_name] = dataset_counts.get(dataset_name, 0) + 1
+                    table_stats = None
+                    try:
+                        self._log_api_call("table.get_stats()", "table=swift_metadata")
+                        table_stats = table.get_stats()
+                    except Exception as e:
+                        logger.debug(f"Table stats unavailable, counting rows while scanning: {e}")
                     
-                    return {
-                        'total_files': total_count,
-                        'mission_counts': mission_counts,
-                        'dataset_counts': dataset_counts
-                    }
+                    accumulator = MetadataStatsAccumulator()
+                    if detailed or table_stats is None:
+                        columns = [c for c in STATS_COLUMNS if c in session.columns("swift_metadata").names]
+                        self._log_api_call(
+                            "table.select()",
+                            f"table=swift_metadata, columns={len(columns)} (stats projection)"
+                        )
+                        for batch in table.select(columns=columns):
+                            accumulator.add(batch)
+                    
+                    stats = accumulator.result() if detailed else {}
+                    if table_stats is not None:
+                        stats['total_files'] = table_stats.num_rows
+                        stats['table_size_bytes'] = table_stats.size_in_bytes
+                    else:
+                        stats['total_files'] = accumulator.rows
+                    stats.setdefault('mission_counts', {})
+                    stats.setdefault('dataset_counts', {})
+                    
+                    logger.debug(f"Computed metadata stats in {(time.perf_counter() - started) * 1000:.1f} ms")
                     
                 except Exception:
                     # Schema or table doesn't exist yet
@@ -1104,6 +1149,9 @@ class VASTDatabaseManager:
                         'dataset_counts': {}
                     }
             
+            stats_cache.put(cache_key, stats, self.config.get('lab2.stats.cache_ttl_seconds', 60))
+            return stats
+            
         except Exception as e:
             logger.error(f"❌ Failed to get metadata stats: {e}")
             return {}
@@ -1174,6 +1222,15 @@ class VASTDatabaseManager:
                     # Create empty table with same schema
                     schema.create_table("swift_metadata", columns)
                     
+                    # The manifest describes the catalog contents, so it is cleared too
+                    from lab2.ingestion_manifest import MANIFEST_TABLE, manifest_columns
+                    try:
+                        schema.table(MANIFEST_TABLE).drop()
+                        schema.create_table(MANIFEST_TABLE, manifest_columns())
+                    except Exception:
+                        pass
+                    
+                    self.invalidate_stats_cache()
                     logger.info(f"✅ Cleared {total_count} records from metadata tables")
                     return True
                     
@@ -1233,21 +1290,24 @@ class VASTDatabaseManager:
                     
                     # Get all tables in the schema
                     try:
-                        # Try to get the swift_metadata table specifically
-                        try:
-                            table = schema.table("swift_metadata")
-                            
-                            # Log API call
-                            self._log_api_call(
-                                "table.drop()",
-                                f"table=swift_metadata (DESTRUCTIVE OPERATION)"
-                            )
-                            
-                            table.drop()
-                            tables_deleted += 1
-                            logger.info(f"✅ Deleted table 'swift_metadata'")
-                        except Exception as e:
-                            logger.debug(f"Table 'swift_metadata' may not exist: {e}")
+                        # Drop the lab tables (metadata catalog and ingestion manifest)
+                        from lab2.ingestion_manifest import MANIFEST_TABLE
+                        self.invalidate_stats_cache()
+                        for table_name in ("swift_metadata", MANIFEST_TABLE):
+                            try:
+                                table = schema.table(table_name)
+                                
+                                # Log API call
+                                self._log_api_call(
+                                    "table.drop()",
+                                    f"table={table_name} (DESTRUCTIVE OPERATION)"
+                                )
+                                
+                                table.drop()
+                                tables_deleted += 1
+                                logger.info(f"✅ Deleted table '{table_name}'")
+                            except Exception as e:
+                                logger.debug(f"Table '{table_name}' may not exist: {e}")
                         
                         # Now try to drop the schema
                         # Log API call
@@ -1292,3 +1352,224 @@ class VASTDatabaseManager:
     def __exit__(self, exc_type, exc_val, exc_tb):
         """Context manager exit"""
         self.close()
+
+
+class MetadataSession:
+    """One VAST DB transaction plus the bucket/schema/table handles resolved in it
+    
+    Handles are looked up lazily and cached for the lifetime of the
+    transaction, so a batch of operations pays for ``bucket()``, ``schema()``
+    and ``table()`` (and the column listing each table handle loads) once.
+    Missing schemas or tables raise from the same calls as the raw vastdb API.
+    """
+    
+    def __init__(self, tx, bucket_name: str, schema_name: str):
+        self.tx = tx
+        self.bucket_name = bucket_name
+        self.schema_name = schema_name
+        self.failed = False
+        self.committed = False
+        self._bucket = None
+        self._schema = None
+        self._tables = {}
+        self._commit_callbacks = []
+    
+    @property
+    def bucket(self):
+        if self._bucket is None:
+            self._bucket = self.tx.bucket(self.bucket_name)
+        return self._bucket
+    
+    @property
+    def schema(self):
+        if self._schema is None:
+            self._schema = self.bucket.schema(self.schema_name)
+        return self._schema
+    
+    def table(self, name: str = "swift_metadata"):
+        """Table handle, resolved once per session"""
+        if name not in self._tables:
+            self._tables[name] = self.schema.table(name)
+        return self._tables[name]
+    
+    def columns(self, name: str = "swift_metadata"):
+        """Arrow schema of a table (loaded with the handle, so no extra round trip)"""
+        table = self.table(name)
+        arrow_schema = getattr(table, 'arrow_schema', None)
+        return arrow_schema if arrow_schema is not None else table.columns()
+    
+    def mark_failed(self):
+        """Make the session roll back instead of committing"""
+        self.failed = True
+    
+    def after_commit(self, callback):
+        """Run ``callback`` once the transaction has committed (skipped on rollback)"""
+        self._commit_callbacks.append(callback)
+    
+    def run_commit_callbacks(self):
+        callbacks, self._commit_callbacks = self._commit_callbacks, []
+        for callback in callbacks:
+            callback()
+
+
+class TransactionMetrics:
+    """Thread-safe counters for transaction open (begin) and commit latency"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        with self._lock:
+            self.opened = 0
+            self.committed = 0
+            self.rolled_back = 0
+            self.open_seconds = 0.0
+            self.commit_seconds = 0.0
+            self.max_open_seconds = 0.0
+            self.max_commit_seconds = 0.0
+    
+    def record_open(self, seconds: float):
+        with self._lock:
+            self.opened += 1
+            self.open_seconds += seconds
+            self.max_open_seconds = max(self.max_open_seconds, seconds)
+    
+    def record_commit(self, seconds: float):
+        with self._lock:
+            self.committed += 1
+            self.commit_seconds += seconds
+            self.max_commit_seconds = max(self.max_commit_seconds, seconds)
+    
+    def record_rollback(self):
+        with self._lock:
+            self.rolled_back += 1
+    
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'transactions': self.opened,
+                'committed': self.committed,
+                'rolled_back': self.rolled_back,
+                'avg_open_ms': self.open_seconds / self.opened * 1000 if self.opened else 0.0,
+                'max_open_ms': self.max_open_seconds * 1000,
+                'avg_commit_ms': self.commit_seconds / self.committed * 1000 if self.committed else 0.0,
+                'max_commit_ms': self.max_commit_seconds * 1000
+            }
+    
+    def log_summary(self):
+        summary = self.summary()
+        logger.info(
+            f"⏱️  VAST DB transactions: {summary['transactions']} opened, {summary['committed']} committed, "
+            f"{summary['rolled_back']} rolled back | open avg {summary['avg_open_ms']:.1f} ms "
+            f"(max {summary['max_open_ms']:.1f}) | commit avg {summary['avg_commit_ms']:.1f} ms "
+            f"(max {summary['max_commit_ms']:.1f})"
+        )
+
+
+class MetadataInsertBuffer:
+    """Bounded accumulation buffer in front of VASTDatabaseManager.insert_metadata_batch
+    
+    Metadata records are held in memory until either ``max_rows`` records are
+    buffered or the oldest buffered record is ``max_age_seconds`` old, and are
+    then flushed in one transaction. The age check happens when a record is
+    added, so callers should always ``flush()`` (or use the buffer as a context
+    manager) once the input is exhausted.
+    
+    Ingestion manifest entries ride along with the records and are committed
+    in the same transaction (see lab2.ingestion_manifest).
+    """
+    
+    def __init__(self, db_manager: VASTDatabaseManager, max_rows: int = 5000, max_age_seconds: float = 30.0):
+        self.db_manager = db_manager
+        self.max_rows = max(1, int(max_rows))
+        self.max_age_seconds = max_age_seconds
+        self._records: List[Dict[str, Any]] = []
+        self._manifest_entries: List[Dict[str, Any]] = []
+        self._replace_paths: List[str] = []
+        self._pending = 0
+        self._first_added_at: Optional[float] = None
+        
+        # Running totals across all flushes
+        self.inserted_count = 0
+        self.failed_count = 0
+        self.flush_count = 0
+    
+    def __len__(self) -> int:
+        return self._pending
+    
+    def add(self, metadata: Dict[str, Any], manifest_entry: Optional[Dict[str, Any]] = None,
+            replace_existing: bool = False) -> int:
+        """Buffer a record, flushing if a limit was reached. Returns rows inserted by that flush.
+        
+        ``replace_existing`` deletes the catalog row for the record's file_path
+        in the same transaction (used when an object changed since last ingest).
+        """
+        self._records.append(metadata)
+        if replace_existing:
+            self._replace_paths.append(metadata.get('file_path'))
+        if manifest_entry is not None:
+            self._manifest_entries.append(manifest_entry)
+        return self._added()
+    
+    def add_manifest_entry(self, manifest_entry: Dict[str, Any]) -> int:
+        """Buffer a manifest entry for an object that produced no record (skipped or failed)"""
+        self._manifest_entries.append(manifest_entry)
+        return self._added()
+    
+    def _added(self) -> int:
+        if self._pending == 0:
+            self._first_added_at = time.monotonic()
+        self._pending += 1
+        
+        if self._pending >= self.max_rows:
+            return self.flush()
+        if self.max_age_seconds is not None and time.monotonic() - self._first_added_at >= self.max_age_seconds:
+            return self.flush()
+        return 0
+    
+    def flush(self) -> int:
+        """Insert all buffered records. Returns the number of rows inserted."""
+        if self._pending == 0:
+            return 0
+        
+        records = self._records
+        manifest_entries = self._manifest_entries
+        replace_paths = self._replace_paths
+        self._records = []
+        self._manifest_entries = []
+        self._replace_paths = []
+        self._pending = 0
+        self._first_added_at = None
+        
+        inserted = self.db_manager.insert_metadata_batch(
+            records, batch_rows=self.max_rows,
+            manifest_entries=manifest_entries or None, replace_paths=replace_paths or None
+        )
+        if records and inserted < len(records) and manifest_entries:
+            self._record_failed_batch(manifest_entries)
+        self.inserted_count += inserted
+        self.failed_count += len(records) - inserted
+        self.flush_count += 1
+        logger.info(f"💾 Flushed {len(records)} metadata records ({inserted} inserted)")
+        return inserted
+    
+    def _record_failed_batch(self, manifest_entries: List[Dict[str, Any]]):
+        """Re-record the manifest entries of a batch that did not commit, marking its records failed
+        
+        The next run then retries those objects instead of trusting an older
+        entry for the same key.
+        """
+        from lab2.ingestion_manifest import STATUS_FAILED, STATUS_INGESTED
+        
+        entries = [dict(entry, status=STATUS_FAILED) if entry.get('status') == STATUS_INGESTED else entry
+                   for entry in manifest_entries]
+        self.db_manager.insert_metadata_batch([], manifest_entries=entries)
+    
+    def __enter__(self):
+        """Context manager entry"""
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit - flush whatever is still buffered"""
+        self.flush()
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Concurrent Weather Downloader
+Fetches weather and air quality data for many locations at once with asyncio:
+every location, both endpoints and every date chunk run concurrently under one
+global rate limiter, and responses are kept in an on-disk content-addressed
+cache so re-runs over overlapping date ranges skip the network
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+# Use centralized config files at repo root
+sys.path.append(str(Path(__file__).parent.parent))
+from lab3.weather_downloader import (
+    GEOCODE_URL, WEATHER_URL, AIR_QUALITY_URL, WEATHER_HOURLY, AIR_QUALITY_HOURLY,
+    parse_coordinates, parse_geocode_response, save_weather_csvs
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = Path.home() / '.cache' / 'cosmos-labs' / 'lab3-open-meteo'
+# Chunk windows are counted from this day so the same dates always fall in the same chunk
+CHUNK_EPOCH = date(1970, 1, 1)
+
+
+class APIError(Exception):
+    """Non-retryable Open-Meteo error (bad request, missing data)"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+
+
+def split_date_range(start: str, end: str, chunk_days: int) -> List[Tuple[str, str]]:
+    """Split the inclusive range [start, end] into (start, end) date chunks
+
+    Chunks follow fixed ``chunk_days`` windows counted from 1970-01-01 rather
+    than from ``start``, so two runs over overlapping ranges request identical
+    interior chunks and share their cache entries.
+    """
+    first, last = date.fromisoformat(start), date.fromisoformat(end)
+    if last < first:
+        raise ValueError(f"End date {end} is before start date {start}")
+    if chunk_days <= 0:
+        return [(start, end)]
+
+    chunks = []
+    current = first
+    while current <= last:
+        window = (current - CHUNK_EPOCH).days // chunk_days
+        window_end = CHUNK_EPOCH + timedelta(days=(window + 1) * chunk_days - 1)
+        chunk_end = min(window_end, last)
+        chunks.append((current.isoformat(), chunk_end.isoformat()))
+        current = chunk_end + timedelta(days=1)
+    return chunks
+
+
+def merge_responses(responses: List[Dict]) -> Dict:
+    """Concatenate the hourly arrays of consecutive chunk responses"""
+    responses = [response for response in responses if response.get('hourly')]
+    if not responses:
+        return {}
+    merged = dict(responses[0])
+    hourly = {key: [] for key in responses[0]['hourly']}
+    for response in responses:
+        rows = len(response['hourly'].get('time', []))
+        for key, values in hourly.items():
+            values.extend(response['hourly'].get(key) or [None] * rows)
+    merged['hourly'] = hourly
+    return merged
+
+
+class AsyncRateLimiter:
+    """Global request pacing shared by every concurrent task
+
+    Request starts are spaced ``60 / requests_per_minute`` seconds apart and at
+    most ``max_concurrency`` requests are in flight. ``pause()`` holds back all
+    tasks after the server answers 429, instead of each task backing off alone.
+    """
+
+    def __init__(self, requests_per_minute: float = 600, max_concurrency: int = 8):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        self._lock = asyncio.Lock()
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+
+    def pause(self, seconds: float):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def __aenter__(self):
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot, self._paused_until)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+        await self._semaphore.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._semaphore.release()
+        return False
+
+
+class ResponseCache:
+    """On-disk JSON responses addressed by the SHA-256 of the request (URL + sorted params)
+
+    Entries are written atomically, one file per request under a two-character
+    fan-out directory, so concurrent runs can share the same cache directory.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root).expanduser()
+
+    @staticmethod
+    def key(url: str, params: Dict) -> str:
+        request = json.dumps({'url': url, 'params': {k: str(v) for k, v in params.items()}}, sort_keys=True)
+        return hashlib.sha256(request.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict]:
+        try:
+            with open(self._path(key), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"⚠️ Ignoring unreadable cache entry {key}: {e}")
+            return None
+
+    def put(self, key: str, data: Dict):
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(temp_path, path)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not write cache entry {key}: {e}")
+
+
+class AsyncWeatherDownloader:
+    """Downloads many locations concurrently (aiohttp, or threaded requests when aiohttp is missing)"""
+
+    def __init__(self, weather_url: str = WEATHER_URL, air_quality_url: str = AIR_QUALITY_URL,
+                 geocode_url: str = GEOCODE_URL, requests_per_minute: float = 600, max_concurrency: int = 8,
+                 chunk_days: int = 90, cache: Optional[ResponseCache] = None, cache_recent_days: int = 7,
+                 max_retries: int = 4, base_delay: float = 5.0, timeout: float = 120.0):
+        self.weather_url = weather_url
+        self.air_quality_url = air_quality_url
+        self.geocode_url = geocode_url
+        self.requests_per_minute = requests_per_minute
+        self.max_concurrency = max_concurrency
+        self.chunk_days = chunk_days
+        self.cache = cache
+        self.cache_recent_days = cache_recent_days
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.timeout = timeout
+        self.stats = {'requests': 0, 'cache_hits': 0, 'retries': 0}
+        self._limiter: Optional[AsyncRateLimiter] = None
+        self._session = None
+
+    @classmethod
+    def from_config(cls, config, base_url: Optional[str] = None) -> 'AsyncWeatherDownloader':
+        """Build a downloader from the ``lab3.download`` settings
+
+        ``base_url`` (or ``lab3.download.base_url``) points all three endpoints
+        at one server, e.g. a local fake Open-Meteo for testing.
+        """
+        base_url = base_url or config.get('lab3.download.base_url', None)
+        urls = {}
+        if base_url:
+            base_url = base_url.rstrip('/')
+            urls = {
+                'weather_url': f"{base_url}/v1/archive",
+                'air_quality_url': f"{base_url}/v1/air-quality",
+                'geocode_url': f"{base_url}/v1/search",
+            }
+        cache_dir = config.get('lab3.download.cache_dir', str(DEFAULT_CACHE_DIR))
+        return cls(
+            requests_per_minute=config.get('lab3.download.requests_per_minute', 600),
+            max_concurrency=config.get('lab3.download.max_concurrency', 8),
+            chunk_days=config.get('lab3.download.chunk_days', 90),
+            cache=ResponseCache(cache_dir) if cache_dir else None,
+            cache_recent_days=config.get('lab3.download.cache_recent_days', 7),
+            max_retries=config.get('lab3.download.max_retries', 4),
+            base_delay=config.get('lab3.download.base_delay_seconds', 5.0),
+            timeout=config.get('lab3.download.timeout_seconds', 120.0),
+            **urls
+        )
+
+    def download(self, locations: List[str], start: str, end: str, output_dir: Path) -> Dict[str, Optional[str]]:
+        """Download every location and save its CSVs; returns {location: label, or None on failure}"""
+        return asyncio.run(self.download_all(locations, start, end, output_dir))
+
+    async def download_all(self, locations: List[str], start: str, end: str,
+                           output_dir: Path) -> Dict[str, Optional[str]]:
+        """Async version of ``download``"""
+        self.stats = {'requests': 0, 'cache_hits': 0, 'retries': 0}
+        self._limiter = AsyncRateLimiter(self.requests_per_minute, self.max_concurrency)
+        if not AIOHTTP_AVAILABLE:
+            logger.info("ℹ️ aiohttp not installed (pip install aiohttp) - using threaded requests")
+        started = time.perf_counter()
+        logger.info(f"🚀 Downloading {len(locations)} locations concurrently "
+                    f"({len(split_date_range(start, end, self.chunk_days))} chunks per endpoint)")
+
+        if AIOHTTP_AVAILABLE:
+            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout)) as session:
+                self._session = session
+                try:
+                    results = await self._download_locations(locations, start, end, output_dir)
+                finally:
+                    self._session = None
+        else:
+            results = await self._download_locations(locations, start, end, output_dir)
+
+        labels = {}
+        for location, result in zip(locations, results):
+            if isinstance(result, BaseException):
+                logger.error(f"❌ Failed to download {location}: {result}")
+                labels[location] = None
+            else:
+                labels[location] = result
+
+        elapsed = time.perf_counter() - started
+        logger.info(f"✅ Downloaded {sum(1 for label in labels.values() if label)}/{len(locations)} locations "
+                    f"in {elapsed:.1f}s ({self.stats['requests']} requests, {self.stats['cache_hits']} cache hits, "
+                    f"{self.stats['retries']} retries)")
+        return labels
+
+    async def _download_locations(self, locations: List[str], start: str, end: str, output_dir: Path) -> List:
+        return await asyncio.gather(
+            *(self.download_location(location, start, end, output_dir) for location in locations),
+            return_exceptions=True)
+
+    async def download_location(self, location: str, start: str, end: str, output_dir: Path) -> str:
+        """Geocode one location, fetch both endpoints concurrently and save the CSVs"""
+        lat, lon, label = await self.geocode(location)
+        logger.info(f"📍 {location} -> {lat:.4f}, {lon:.4f} ({label})")
+        weather, air = await asyncio.gather(
+            self.fetch_range(self.weather_url, lat, lon, start, end, WEATHER_HOURLY),
+            self.fetch_range(self.air_quality_url, lat, lon, start, end, AIR_QUALITY_HOURLY),
+        )
+        await asyncio.to_thread(save_weather_csvs, Path(output_dir), label, weather, air)
+        return label
+
+    async def geocode(self, location: str) -> Tuple[float, float, str]:
+        location = location.strip()
+        coords = parse_coordinates(location)
+        if coords:
+            return coords
+        data = await self.fetch_json(self.geocode_url, {'name': location, 'count': 1}, cacheable=True)
+        return parse_geocode_response(location, data)
+
+    async def fetch_range(self, url: str, lat: float, lon: float, start: str, end: str, hourly: str) -> Dict:
+        """Fetch [start, end] as parallel chunk requests and merge them back in date order"""
+        recent = (date.today() - timedelta(days=self.cache_recent_days)).isoformat()
+        chunk_requests = []
+        for chunk_start, chunk_end in split_date_range(start, end, self.chunk_days):
+            params = {
+                'latitude': lat,
+                'longitude': lon,
+                'start_date': chunk_start,
+                'end_date': chunk_end,
+                'hourly': hourly,
+                'timezone': 'UTC',
+            }
+            # The archive keeps revising the last few days, so those chunks are always re-fetched
+            chunk_requests.append(self.fetch_json(url, params, cacheable=chunk_end < recent))
+        return merge_responses(await asyncio.gather(*chunk_requests))
+
+    async def fetch_json(self, url: str, params: Dict, cacheable: bool = True) -> Dict:
+        """GET a JSON response, served from the cache when possible"""
+        key = ResponseCache.key(url, params) if self.cache and cacheable else None
+        if key:
+            cached = await asyncio.to_thread(self.cache.get, key)
+            if cached is not None:
+                self.stats['cache_hits'] += 1
+                return cached
+        data = await self._request_json(url, params)
+        if key:
+            await asyncio.to_thread(self.cache.put, key, data)
+        return data
+
+    async def _request_json(self, url: str, params: Dict) -> Dict:
+        """Rate-limited GET with exponential backoff (honours Retry-After on 429)"""
+        for attempt in range(self.max_retries):
+            last_attempt = attempt == self.max_retries - 1
+            delay = self.base_delay * (2 ** attempt) * (1 + random.random() * 0.25)
+            try:
+                async with self._limiter:
+                    self.stats['requests'] += 1
+                    status, retry_after, body = await self._get(url, params)
+            except Exception as e:
+                if last_attempt:
+                    logger.error(f"❌ Request failed after {self.max_retries} attempts: {e}")
+                    raise
+                logger.warning(f"⚠️ Request failed, retrying in {delay:.1f}s "
+                               f"(attempt {attempt + 1}/{self.max_retries}): {e}")
+                self.stats['retries'] += 1
+                await asyncio.sleep(delay)
+                continue
+
+            if status == 200:
+                return body
+            if status == 429 or status >= 500:
+                if last_attempt:
+                    raise APIError(status, f"giving up after {self.max_retries} attempts")
+                if status == 429:
+                    delay = retry_after if retry_after is not None else delay
+                    self._limiter.pause(delay)
+                    logger.warning(f"⚠️ Rate limited, pausing all requests for {delay:.1f}s "
+                                   f"(attempt {attempt + 1}/{self.max_retries})")
+                else:
+                    logger.warning(f"⚠️ Server error {status}, retrying in {delay:.1f}s "
+                                   f"(attempt {attempt + 1}/{self.max_retries})")
+                self.stats['retries'] += 1
+                await asyncio.sleep(delay)
+                continue
+            if status == 400:
+                raise APIError(status, f"API doesn't support this request ({params.get('start_date')} to "
+                                       f"{params.get('end_date')}): {body}")
+            raise APIError(status, str(body))
+        return {}
+
+    async def _get(self, url: str, params: Dict) -> Tuple[int, Optional[float], Dict]:
+        """One GET -> (status, Retry-After seconds, JSON body or error text)"""
+        if self._session is not None:
+            query = {k: str(v) for k, v in params.items()}
+            async with self._session.get(url, params=query) as response:
+                body = await response.json(content_type=None) if response.status == 200 else await response.text()
+                return response.status, _retry_after(response.headers.get('Retry-After')), body
+
+        response = await asyncio.to_thread(requests.get, url, params=params, timeout=self.timeout)
+        body = response.json() if response.status_code == 200 else response.text
+        return response.status_code, _retry_after(response.headers.get('Retry-After')), body
+
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
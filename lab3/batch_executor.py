@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Batch Executor
+Runs a VAST DB job as small idempotent batches, each in its own transaction.
+A transient failure (request timeout, overloaded service, lost connection or
+transaction) retries only the failed batch, with exponential backoff and
+jitter, and completed write batches are recorded in an on-disk checkpoint so a
+re-run after a crash resumes where it stopped instead of starting the whole
+job again
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Failures worth retrying in a fresh transaction: timeouts, overload and lost
+# connections or transactions. Everything else (bad requests, missing tables,
+# schema mismatches...) fails the same way again and is raised immediately.
+TRANSIENT_ERRORS = (ConnectionError, TimeoutError)
+try:
+    import requests
+    TRANSIENT_ERRORS += (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+except ImportError:
+    pass
+try:
+    from vastdb import errors as vastdb_errors
+    TRANSIENT_ERRORS += (
+        vastdb_errors.RequestTimeout,
+        vastdb_errors.ServiceUnavailable,  # includes Slowdown
+        vastdb_errors.ConnectionError,
+        vastdb_errors.MissingTransaction,
+    )
+except ImportError:
+    pass
+
+
+def is_transient_error(error: Exception) -> bool:
+    """True for errors a fresh transaction can be expected to get past"""
+    return isinstance(error, TRANSIENT_ERRORS)
+
+
+def split_values(values: Optional[Sequence], size: int) -> List[Optional[list]]:
+    """``values`` in groups of at most ``size`` ([None] when there is nothing to split)"""
+    if not values or size <= 0:
+        return [list(values) if values else None]
+    values = list(values)
+    return [values[i:i + size] for i in range(0, len(values), size)]
+
+
+def split_window(start: Optional[datetime], end: Optional[datetime],
+                 days: int) -> List[Tuple[Optional[datetime], Optional[datetime]]]:
+    """Split the inclusive window [start, end] into consecutive inclusive pieces of ``days``
+
+    Pieces end one microsecond before the next one starts, so ``time >= lo
+    AND time <= hi`` predicates never return a row twice. Open-ended
+    windows are returned whole.
+    """
+    if start is None or end is None or days <= 0 or end - start <= timedelta(days=days):
+        return [(start, end)]
+    pieces = []
+    lo = start
+    while lo <= end:
+        hi = min(lo + timedelta(days=days) - timedelta(microseconds=1), end)
+        pieces.append((lo, hi))
+        lo = hi + timedelta(microseconds=1)
+    return pieces
+
+
+class Checkpoint:
+    """Keys of completed batches in a JSON file, rewritten atomically after every batch"""
+
+    def __init__(self, path):
+        self.path = Path(path).expanduser()
+        self._lock = threading.Lock()
+        self._done = set()
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self._done = set(json.load(f))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"⚠️ Ignoring unreadable checkpoint {self.path}: {e}")
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._done
+
+    def add(self, key: str):
+        with self._lock:
+            self._done.add(key)
+            self._save()
+
+    def discard_prefix(self, prefix: str):
+        """Forget the batches of a finished job so the file only holds work in progress"""
+        with self._lock:
+            self._done = {key for key in self._done if not key.startswith(prefix)}
+            self._save()
+
+    def _save(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(sorted(self._done), f)
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not write checkpoint {self.path}: {e}")
+
+
+class BatchExecutor:
+    """Runs each batch in a fresh transaction with per-batch retry
+
+    ``transaction`` is a zero-argument callable returning a context manager
+    (typically a VAST DB transaction, or a schema opened inside one); each
+    batch function receives what it yields. Batches must be idempotent:
+    a retried batch may follow a failure that happened after its work was
+    already done. Safe to share between threads.
+    """
+
+    def __init__(self, transaction: Callable, max_retries: int = 4, base_delay: float = 0.5,
+                 max_delay: float = 30.0, checkpoint: Optional[Checkpoint] = None):
+        self.transaction = transaction
+        self.max_retries = max(1, int(max_retries))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.checkpoint = checkpoint
+
+    @classmethod
+    def from_config(cls, config, transaction: Callable, checkpoint: Optional[Checkpoint] = None):
+        return cls(
+            transaction,
+            max_retries=config.get('lab3.executor.max_retries', 4),
+            base_delay=config.get('lab3.executor.base_delay_seconds', 0.5),
+            max_delay=config.get('lab3.executor.max_delay_seconds', 30.0),
+            checkpoint=checkpoint,
+        )
+
+    def is_done(self, key: str) -> bool:
+        return self.checkpoint is not None and key in self.checkpoint
+
+    def run(self, fn: Callable, key: Optional[str] = None):
+        """Run ``fn(<transaction context>)`` until it commits, retrying transient errors
+
+        With a checkpoint and a ``key``, the batch is recorded once it
+        commits; callers skip recorded batches with ``is_done``.
+        """
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                with self.transaction() as context:
+                    result = fn(context)
+                if self.checkpoint is not None and key is not None:
+                    self.checkpoint.add(key)
+                return result
+            except Exception as e:
+                if not is_transient_error(e) or attempt == self.max_retries:
+                    raise
+                delay = self.backoff(attempt)
+                logger.warning(f"⚠️ Batch {key or fn.__name__} failed (attempt {attempt}/{self.max_retries}), "
+                               f"retrying in {delay:.1f}s: {e}")
+                time.sleep(delay)
+
+    def map(self, fn: Callable, items: Iterable) -> list:
+        """``[run(lambda context: fn(context, item)) for item in items]``: one transaction per item
+
+        A failing item is retried on its own; items that already succeeded
+        keep their results.
+        """
+        return [self.run(lambda context, item=item: fn(context, item)) for item in items]
+
+    def backoff(self, attempt: int) -> float:
+        """Exponential delay for the attempt, with +/-50% jitter so parallel clients do not retry in step"""
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return delay * random.uniform(0.5, 1.5)
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Lab 3 CSV Ingestion Benchmark
+Compares the original row-by-row csv.reader parser with the pyarrow.csv
+streaming ingestion path on synthetic multi-year hourly datasets for many
+locations (no VAST DB needed - inserts go to an in-memory stand-in table)
+"""
+
+import argparse
+import logging
+import math
+import sys
+import tempfile
+import time
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pyarrow as pa
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from lab3.batch_executor import BatchExecutor
+from lab3.weather_database import WeatherVASTDB, WEATHER_SCHEMA, AIR_QUALITY_SCHEMA
+from lab3.weather_downloader import save_weather_csvs
+
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s', force=True)
+logger = logging.getLogger(__name__)
+
+WEATHER_VARIABLES = [f.name for f in WEATHER_SCHEMA if f.name not in ('location', 'time')]
+AIR_QUALITY_VARIABLES = [f.name for f in AIR_QUALITY_SCHEMA if f.name not in ('location', 'time')]
+
+
+class BenchmarkConfig:
+    """Minimal stand-in for ConfigLoader"""
+
+    def __init__(self, values: Dict = None):
+        self.values = values or {}
+
+    def get(self, key: str, default=None):
+        return self.values.get(key, default)
+
+    def get_secret(self, key: str, default=None):
+        return default
+
+
+class TableStandIn:
+    """In-memory table standing in for a VAST DB table (measures parsing, not the database)"""
+
+    def __init__(self):
+        self.rows = 0
+        self.inserts = 0
+
+    def select(self, columns=None, predicate=None, internal_row_id=False):
+        schema = pa.schema([('time', pa.timestamp('us'))] + ([('$row_id', pa.uint64())] if internal_row_id else []))
+        return pa.RecordBatchReader.from_batches(schema, [])
+
+    def insert(self, batch):
+        self.rows += batch.num_rows
+        self.inserts += 1
+
+
+class SchemaStandIn:
+    def __init__(self):
+        self.tables = {'hourly_weather': TableStandIn(), 'hourly_air_quality': TableStandIn()}
+
+    def table(self, name: str):
+        return self.tables[name]
+
+
+def make_api_response(variables: List[str], hours: int, seed: int) -> Dict:
+    """Open-Meteo shaped response with ``hours`` hourly values (about 1% missing)"""
+    rng = np.random.default_rng(seed)
+    start = datetime(2020, 1, 1)
+    hourly = {'time': [(start + timedelta(hours=h)).strftime('%Y-%m-%dT%H:%M') for h in range(hours)]}
+    for variable in variables:
+        values = np.round(rng.normal(20, 8, hours), 1).tolist()
+        for index in rng.choice(hours, size=max(1, hours // 100), replace=False):
+            values[index] = None
+        hourly[variable] = values
+    units = {'time': 'iso8601', **{variable: '' for variable in variables}}
+    return {'hourly': hourly, 'hourly_units': units}
+
+
+def legacy_parse(csv_path: Path, table_schema: pa.Schema, location_label: str) -> pa.Table:
+    """The previous implementation: csv.reader into lists, header.index() per cell, per-value parsing"""
+    import csv
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        rows = list(reader)
+
+    def get_index(key):
+        try:
+            return header.index(key)
+        except ValueError:
+            return None
+
+    def parse_float(v):
+        try:
+            return float(v) if v and v != 'null' else None
+        except (ValueError, TypeError):
+            return None
+
+    col_map = {field.name: field.name for field in table_schema}
+    data = {col: [] for col in col_map.values()}
+    for row in rows:
+        if len(row) < len(header):
+            continue
+        time_idx = get_index('time')
+        if time_idx is None:
+            continue
+        try:
+            time_val = datetime.fromisoformat(row[time_idx].replace('Z', '+00:00'))
+            for col, key in col_map.items():
+                if col == 'time':
+                    data[col].append(time_val)
+                elif col == 'location':
+                    data[col].append(location_label)
+                else:
+                    idx = get_index(key)
+                    data[col].append(parse_float(row[idx]) if idx is not None else None)
+        except (ValueError, TypeError):
+            continue
+    return pa.Table.from_pydict(data)
+
+
+def arrow_parse(db: WeatherVASTDB, csv_path: Path, table_schema: pa.Schema, location_label: str) -> pa.Table:
+    """The new path: streaming pyarrow.csv reader with explicit types"""
+    reader = db._open_csv(csv_path, table_schema)
+    return pa.Table.from_batches([db._to_table_batch(batch, table_schema, location_label) for batch in reader],
+                                 schema=table_schema)
+
+
+def run_benchmark(locations: int, years: float, repeat: int):
+    hours = int(math.ceil(years * 365 * 24))
+    db = WeatherVASTDB(BenchmarkConfig())
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        base_dir = Path(temp_dir)
+        print(f"📝 Writing {locations} locations x {hours} hourly rows (weather + air quality)...")
+        labels = []
+        for i in range(locations):
+            label = f"City_{i:03d}"
+            weather = make_api_response(WEATHER_VARIABLES, hours, seed=i)
+            air = make_api_response(AIR_QUALITY_VARIABLES, hours, seed=10_000 + i)
+            save_weather_csvs(base_dir, label, weather, air)
+            labels.append(label)
+
+        files = []
+        for label in labels:
+            files.append((base_dir / label / 'weather.csv', WEATHER_SCHEMA, label))
+            files.append((base_dir / label / 'air_quality.csv', AIR_QUALITY_SCHEMA, label))
+        total_bytes = sum(path.stat().st_size for path, _, _ in files)
+        total_rows = hours * len(files)
+
+        # Both parsers must produce the same table
+        legacy = legacy_parse(*files[0]).cast(WEATHER_SCHEMA)
+        arrow = arrow_parse(db, *files[0])
+        if not legacy.equals(arrow):
+            print("❌ Parsers disagree on the first file")
+            return False
+
+        timings = {}
+        for mode in ('legacy', 'pyarrow.csv', 'ingest'):
+            best = None
+            for _ in range(repeat):
+                schema = SchemaStandIn()
+                started = time.perf_counter()
+                for path, table_schema, label in files:
+                    if mode == 'legacy':
+                        legacy_parse(path, table_schema, label)
+                    elif mode == 'pyarrow.csv':
+                        arrow_parse(db, path, table_schema, label)
+                    else:
+                        table_name = 'hourly_weather' if table_schema is WEATHER_SCHEMA else 'hourly_air_quality'
+                        db._ingest_csv_data(BatchExecutor(lambda: nullcontext(schema)), path, table_name, label)
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            timings[mode] = best
+
+        inserted = sum(table.rows for table in schema.tables.values())
+        if inserted != total_rows:
+            print(f"❌ Ingest path inserted {inserted} rows, expected {total_rows}")
+            return False
+
+    print(f"\n📊 Results ({len(files)} CSV files, {total_rows:,} rows, {total_bytes / (1024 ** 2):.1f} MB, best of {repeat}):")
+    for mode, elapsed in timings.items():
+        print(f"   {mode:>11}: {elapsed:7.2f}s - {total_rows / elapsed:12,.0f} rows/s, "
+              f"{total_bytes / (1024 ** 2) / elapsed:7.1f} MB/s")
+    print(f"   ⚡ pyarrow.csv speedup over legacy parser: {timings['legacy'] / max(timings['pyarrow.csv'], 1e-9):.1f}x")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark legacy vs pyarrow.csv weather ingestion')
+    parser.add_argument('--locations', type=int, default=10, help='Number of synthetic locations (default: 10)')
+    parser.add_argument('--years', type=float, default=3, help='Years of hourly data per location (default: 3)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per mode, best time is reported (default: 3)')
+    args = parser.parse_args()
+
+    return run_benchmark(args.locations, args.years, args.repeat)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
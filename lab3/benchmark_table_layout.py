@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Lab 3 Table Layout Benchmark
+Compares how much data typical location/time range scans have to read from
+an hourly table stored in arrival order versus one clustered by its
+(location, time) sorting key. Storage is modelled as fixed-size row blocks
+with min/max statistics per column, which is how a scan skips data: a block
+is read only when its location and time ranges can match the predicate
+(no VAST DB needed)
+"""
+
+import argparse
+import math
+import sys
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+
+def arrival_order(locations: int, hours: int, batch_hours: int, seed: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(location code, hour) of every row in the order ingestion inserts them
+
+    Each location arrives in ``batch_hours`` windows (download chunks,
+    periodic refreshes) and windows of all locations are interleaved in
+    random order, as concurrent downloads and re-runs finish.
+    """
+    batches = [(code, start) for code in range(locations) for start in range(0, hours, batch_hours)]
+    rng = np.random.default_rng(seed)
+    rng.shuffle(batches)
+    codes = np.concatenate([np.full(min(batch_hours, hours - start), code, dtype=np.int32) for code, start in batches])
+    times = np.concatenate([np.arange(start, min(start + batch_hours, hours), dtype=np.int64) for _, start in batches])
+    return codes, times
+
+
+def sorted_layout(codes: np.ndarray, times: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Rows ordered by the hourly tables' (location, time) sorting key"""
+    order = np.lexsort((times, codes))
+    return codes[order], times[order]
+
+
+def block_statistics(codes: np.ndarray, times: np.ndarray, block_rows: int) -> Dict[str, np.ndarray]:
+    """Per-block row count and min/max of location and time"""
+    starts = np.arange(0, len(codes), block_rows)
+    return {
+        'rows': np.diff(np.append(starts, len(codes))),
+        'location_min': np.minimum.reduceat(codes, starts),
+        'location_max': np.maximum.reduceat(codes, starts),
+        'time_min': np.minimum.reduceat(times, starts),
+        'time_max': np.maximum.reduceat(times, starts),
+    }
+
+
+def scan_volume(stats: Dict[str, np.ndarray], locations: Sequence[int], start: int, end: int) -> Tuple[int, int]:
+    """(blocks, rows) a scan for ``location IN locations AND time BETWEEN start AND end`` reads"""
+    wanted = np.asarray(locations)[:, None]
+    location_match = ((wanted >= stats['location_min']) & (wanted <= stats['location_max'])).any(axis=0)
+    time_match = (stats['time_min'] <= end) & (stats['time_max'] >= start)
+    read = location_match & time_match
+    return int(read.sum()), int(stats['rows'][read].sum())
+
+
+def benchmark_queries(locations: int, hours: int) -> List[Tuple[str, List[int], int, int]]:
+    """Scans the analytics demo and ingestion dedup issue: (name, location codes, first hour, last hour)"""
+    last = hours - 1
+    six_months = min(hours, 180 * 24)
+    return [
+        ('1 city, last 6 months', [0], last - six_months + 1, last),
+        ('3 cities, last 6 months', list(range(min(3, locations))), last - six_months + 1, last),
+        ('1 city, all history', [locations // 2], 0, last),
+        ('1 city, 1 day (ingest dedup)', [locations - 1], last - 23, last),
+        ('all cities, 1 week', list(range(locations)), last - 7 * 24 + 1, last),
+    ]
+
+
+def run_benchmark(locations: int, years: float, batch_days: int, block_rows: int, seed: int):
+    hours = int(math.ceil(years * 365 * 24))
+    print(f"📝 Modelling {locations} locations x {hours:,} hourly rows, inserted in {batch_days}-day batches "
+          f"in random order, {block_rows:,}-row blocks...")
+    codes, times = arrival_order(locations, hours, batch_days * 24, seed)
+    layouts = {
+        'arrival order': block_statistics(codes, times, block_rows),
+        'sorted (location, time)': block_statistics(*sorted_layout(codes, times), block_rows),
+    }
+    total_rows = len(codes)
+
+    print(f"\n📊 Rows read per scan ({total_rows:,} rows in the table):")
+    for name, query_locations, start, end in benchmark_queries(locations, hours):
+        matching = len(query_locations) * (end - start + 1)
+        print(f"   🔍 {name} ({matching:,} matching rows)")
+        volumes = {}
+        for layout, stats in layouts.items():
+            blocks, rows = scan_volume(stats, query_locations, start, end)
+            if rows < matching:
+                print(f"❌ {layout} layout skipped matching rows")
+                return False
+            volumes[layout] = rows
+            print(f"      {layout:>23}: {rows:12,} rows in {blocks:5,} blocks ({rows / total_rows:6.1%} of table)")
+        ratio = volumes['arrival order'] / max(volumes['sorted (location, time)'], 1)
+        if ratio >= 1:
+            print(f"      ⚡ {ratio:.1f}x less data read when sorted")
+        else:
+            print(f"      ⚠️ {1 / ratio:.1f}x more data read when sorted (scan spans every location)")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark scan volume of unsorted vs (location, time) sorted weather tables')
+    parser.add_argument('--locations', type=int, default=50, help='Number of locations (default: 50)')
+    parser.add_argument('--years', type=float, default=3, help='Years of hourly data per location (default: 3)')
+    parser.add_argument('--batch-days', type=int, default=30, help='Days of data per insert batch (default: 30)')
+    parser.add_argument('--block-rows', type=int, default=65536, help='Rows per storage block (default: 65536)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the insert order (default: 0)')
+    args = parser.parse_args()
+
+    return run_benchmark(args.locations, args.years, args.batch_days, args.block_rows, args.seed)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Fake Open-Meteo Server
+Local stand-in for the archive, air quality and geocoding APIs used by the
+weather downloaders. Values are deterministic for a (location, hour), so
+chunked and whole-range downloads return identical data, and every Nth
+request can be answered with 429 to exercise the rate-limit handling
+"""
+
+import argparse
+import json
+import logging
+import math
+import sys
+import threading
+import time
+import zlib
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+CITIES = {
+    'Beijing': (39.9075, 116.3972, 'Beijing', 'China'),
+    'London': (51.5085, -0.1257, 'England', 'United Kingdom'),
+    'New York': (40.7143, -74.006, 'New York', 'United States'),
+    'Tokyo': (35.6895, 139.6917, 'Tokyo', 'Japan'),
+}
+
+
+class FakeOpenMeteoServer:
+    """Threaded HTTP server answering /v1/archive, /v1/air-quality and /v1/search
+
+    Use as a context manager; ``url`` is the base URL to hand to the
+    downloader and ``requests`` counts the requests served per path.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0,
+                 rate_limit_every: int = 0, retry_after: float = 1.0):
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.requests: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._total = 0
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Serve in the calling thread until interrupted"""
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def _count(self, path: str) -> bool:
+        """Record a request; True when it should be rate limited"""
+        with self._lock:
+            self._total += 1
+            self.requests[path] = self.requests.get(path, 0) + 1
+            return bool(self.rate_limit_every) and self._total % self.rate_limit_every == 0
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+                if server._count(parsed.path):
+                    self._send(429, {'error': True, 'reason': 'Too many requests'},
+                               {'Retry-After': str(server.retry_after)})
+                    return
+                if server.latency:
+                    time.sleep(server.latency)
+                try:
+                    if parsed.path == '/v1/search':
+                        self._send(200, geocode_response(params.get('name', '')))
+                    elif parsed.path in ('/v1/archive', '/v1/air-quality'):
+                        self._send(200, hourly_response(params))
+                    else:
+                        self._send(404, {'error': True, 'reason': f'Unknown path {parsed.path}'})
+                except (KeyError, ValueError) as e:
+                    self._send(400, {'error': True, 'reason': str(e)})
+
+            def _send(self, status: int, payload: Dict, headers: Optional[Dict] = None):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+def geocode_response(name: str) -> Dict:
+    if name not in CITIES:
+        return {}
+    lat, lon, admin1, country = CITIES[name]
+    return {'results': [{'name': name, 'latitude': lat, 'longitude': lon, 'admin1': admin1, 'country': country}]}
+
+
+def hourly_response(params: Dict) -> Dict:
+    """Deterministic hourly values for every variable in ``params['hourly']``"""
+    start = date.fromisoformat(params['start_date'])
+    end = date.fromisoformat(params['end_date'])
+    if end < start:
+        raise ValueError('end_date is before start_date')
+    lat, lon = float(params['latitude']), float(params['longitude'])
+    variables = [v for v in params['hourly'].split(',') if v]
+
+    first = datetime.combine(start, datetime.min.time())
+    hours = ((end - start).days + 1) * 24
+    times = [first + timedelta(hours=h) for h in range(hours)]
+    hourly = {'time': [t.strftime('%Y-%m-%dT%H:%M') for t in times]}
+    for variable in variables:
+        seed = zlib.crc32(f"{lat:.4f},{lon:.4f},{variable}".encode()) % 1000
+        hourly[variable] = [round(seed / 50 + 10 * math.sin((t.timestamp() / 3600 + seed) / 24 * 2 * math.pi), 1)
+                            for t in times]
+    return {
+        'latitude': lat,
+        'longitude': lon,
+        'timezone': 'UTC',
+        'hourly_units': {'time': 'iso8601', **{variable: '' for variable in variables}},
+        'hourly': hourly,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a fake Open-Meteo API for local downloader testing')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on (default: 8765)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds of delay per response (default: 0)')
+    parser.add_argument('--rate-limit-every', type=int, default=0, help='Answer every Nth request with 429 (default: off)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = FakeOpenMeteoServer(port=args.port, latency=args.latency, rate_limit_every=args.rate_limit_every)
+    logger.info(f"🌐 Fake Open-Meteo listening on {server.url} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
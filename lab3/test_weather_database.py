@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Tests for Lab 3 weather ingestion and queries
+Run offline: no VAST DB connection is made
+"""
+
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from lab3.benchmark_csv_ingestion import BenchmarkConfig
+from lab3.weather_database import WEATHER_SCHEMA, WeatherVASTDB
+from lab3.weather_query import WeatherQuery
+from lab3.weather_rollups import combine_rollups, compute_rollup, plan_window, stale_locations
+
+
+def read_csv(text: str) -> pa.Table:
+    """Parse ``text`` the way ingestion does"""
+    db = WeatherVASTDB(BenchmarkConfig())
+    with tempfile.TemporaryDirectory() as temp_dir:
+        csv_path = Path(temp_dir) / 'weather.csv'
+        csv_path.write_text(text)
+        reader = db._open_csv(csv_path, WEATHER_SCHEMA)
+        return pa.Table.from_batches([db._to_table_batch(batch, WEATHER_SCHEMA, 'Test City') for batch in reader],
+                                     schema=WEATHER_SCHEMA)
+
+
+def test_csv_bad_cells_do_not_fail_the_file():
+    """A bad value becomes null, a row with a bad time is skipped, a trailing Z is accepted"""
+    table = read_csv(
+        "time,temperature_2m,relative_humidity_2m,surface_pressure,wind_speed_10m,wind_direction_10m,precipitation\n"
+        "2024-01-01T00:00,1.5,80,1013.2,3.1,180,0\n"
+        "2024-01-01T01:00Z,abc,81,1013.0,3.4,185,0.1\n"
+        "not-a-time,2.0,82,1012.8,3.2,190,0\n"
+        "2024-01-01 03:00:00, 2.5 ,NaN,,-3e-1,.5,1.\n"
+    )
+    rows = table.to_pylist()
+
+    assert [row['time'] for row in rows] == [
+        datetime(2024, 1, 1, 0), datetime(2024, 1, 1, 1), datetime(2024, 1, 1, 3)
+    ]
+    assert {row['location'] for row in rows} == {'Test City'}
+    assert rows[0]['temperature_2m'] == 1.5
+    assert rows[1]['temperature_2m'] is None
+    assert rows[1]['relative_humidity_2m'] == 81
+    assert rows[2]['temperature_2m'] == 2.5
+    assert rows[2]['relative_humidity_2m'] is None
+    assert rows[2]['surface_pressure'] is None
+    assert rows[2]['wind_speed_10m'] == -0.3
+    assert rows[2]['wind_direction_10m'] == 0.5
+    assert rows[2]['precipitation'] == 1.0
+
+
+def test_csv_missing_columns_are_null():
+    """Columns absent from the file are stored as nulls"""
+    table = read_csv("time,temperature_2m\n2024-01-01T00:00,4.0\n")
+
+    assert table.num_rows == 1
+    assert table.column('temperature_2m').to_pylist() == [4.0]
+    assert table.column('precipitation').to_pylist() == [None]
+
+
+def hourly_rows(locations, start: datetime, hours: int) -> pa.Table:
+    """Synthetic hourly readings with some missing values"""
+    rng = np.random.default_rng(7)
+    times = np.arange(np.datetime64(start, 'us'), np.datetime64(start + timedelta(hours=hours), 'us'),
+                      np.timedelta64(1, 'h'))
+    temperature = rng.normal(15, 8, hours * len(locations))
+    temperature[::13] = np.nan
+    return pa.table({
+        'location': np.repeat(locations, hours),
+        'time': pa.array(np.tile(times, len(locations)), pa.timestamp('us')),
+        'temperature_2m': pa.array(temperature, from_pandas=True),
+    })
+
+
+def between(table: pa.Table, column: str, lo: datetime, hi: datetime) -> pa.Table:
+    """Rows with ``lo <= column < hi``"""
+    values = table.column(column)
+    return table.filter(pc.and_(pc.greater_equal(values, pa.scalar(lo, values.type)),
+                                pc.less(values, pa.scalar(hi, values.type))))
+
+
+def rollups_for_window(hourly: pa.Table, metrics, start: datetime, end: datetime) -> pa.Table:
+    """What WeatherQuery._rollup_rows reads for [start, end] when the rollups are up to date"""
+    stats = [f'{metric}_{stat}' for metric in metrics for stat in ('min', 'max', 'mean', 'count')]
+    rollups = {granularity: compute_rollup(hourly, metrics, granularity) for granularity in ('day', 'month')}
+    parts = []
+    for granularity, lo, hi in plan_window(start, end + timedelta(microseconds=1)):
+        if granularity is None:
+            rows = compute_rollup(between(hourly, 'time', lo, hi), metrics, 'day')
+        else:
+            rows = between(rollups[granularity], 'period', lo, hi)
+        parts.append(rows.select(['location', 'period'] + stats))
+    return pa.concat_tables(parts)
+
+
+def test_rollups_match_hourly_stats():
+    """Combined rollups over a window with partial days and months give the hourly statistics"""
+    metrics = ['temperature_2m']
+    hourly = hourly_rows(['Alpha', 'Beta'], datetime(2024, 1, 1), 24 * 120)
+    start, end = datetime(2024, 1, 10, 5), datetime(2024, 4, 3, 7)
+
+    combined = combine_rollups(rollups_for_window(hourly, metrics, start, end), metrics)
+    window = between(hourly, 'time', start, end + timedelta(microseconds=1))
+    expected = WeatherQuery.aggregate_by_location(window, metrics)
+
+    assert list(combined.index) == list(expected.index) == ['Alpha', 'Beta']
+    assert np.allclose(combined['temperature_2m_mean'], expected['temperature_2m_mean'])
+    assert (combined['temperature_2m_max'] == expected['temperature_2m_max']).all()
+    assert (combined['temperature_2m_count'] == expected['temperature_2m_count']).all()
+
+
+def test_plan_window_covers_window_once():
+    """Pieces are contiguous, whole periods where possible, hourly at the ragged edges"""
+    start, end = datetime(2024, 1, 10, 5), datetime(2024, 4, 3, 8)
+    pieces = plan_window(start, end)
+
+    assert pieces[0] == (None, start, datetime(2024, 1, 11))
+    assert (('month', datetime(2024, 2, 1), datetime(2024, 4, 1))) in pieces
+    assert pieces[-1] == (None, datetime(2024, 4, 3), end)
+    assert all(previous[2] == piece[1] for previous, piece in zip(pieces, pieces[1:]))
+
+
+def test_stale_locations():
+    """Empty or partial rollups are reported against the stored time ranges"""
+    metrics = ['temperature_2m']
+    hourly = hourly_rows(['Alpha', 'Beta', 'Gamma'], datetime(2024, 1, 1), 24 * 90)
+    lo, hi = datetime(2024, 2, 1), datetime(2024, 4, 1)
+    monthly = between(compute_rollup(hourly, metrics, 'month'), 'period', lo, hi)
+    ranges = pa.table({
+        'location': ['Alpha', 'Beta', 'Gamma'],
+        'first_time': pa.array([datetime(2024, 1, 1)] * 3, pa.timestamp('us')),
+        'last_time': pa.array([datetime(2024, 3, 30, 23)] * 3, pa.timestamp('us')),
+    })
+
+    assert stale_locations(monthly, ranges, lo, hi) == []
+    # Beta's March rollup is missing (refresh failed), Gamma has none at all
+    keep = pc.invert(pc.or_(
+        pc.and_(pc.equal(monthly.column('location'), 'Beta'),
+                pc.equal(monthly.column('period'), pa.scalar(datetime(2024, 3, 1), pa.timestamp('us')))),
+        pc.equal(monthly.column('location'), 'Gamma'),
+    ))
+    assert stale_locations(monthly.filter(keep), ranges, lo, hi) == ['Beta', 'Gamma']
+    # Hours stored after the rollups were computed
+    extended = ranges.set_column(2, 'last_time', pa.array([datetime(2024, 3, 31, 23)] * 3, pa.timestamp('us')))
+    assert stale_locations(monthly, extended, lo, hi) == ['Alpha', 'Beta', 'Gamma']
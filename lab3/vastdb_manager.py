@@ -26,6 +26,7 @@ def main():
     parser = argparse.ArgumentParser(description="Manage VAST Database for weather data")
     parser.add_argument("--drop", action="store_true", help="Drop existing weather and air quality tables")
     parser.add_argument("--setup", action="store_true", help="Setup database infrastructure (tables, schema, etc.)")
+    parser.add_argument("--rebuild-rollups", action="store_true", help="Recompute the daily/monthly rollup tables and the locations table from the hourly data")
     parser.add_argument("--dry-run", action="store_true", help="Show what would be done without making changes")
     
     args = parser.parse_args()
@@ -61,8 +62,17 @@ def main():
             logger.error("❌ Failed to setup database infrastructure")
             return 1
     
+    # Handle rollup backfill
+    if args.rebuild_rollups:
+        logger.info("📊 Rebuilding daily/monthly rollup tables and the locations table...")
+        if db.rebuild_rollups():
+            return 0
+        else:
+            logger.error("❌ Failed to rebuild rollup and locations tables")
+            return 1
+    
     # If no operation specified, show help
-    if not args.drop and not args.setup:
+    if not args.drop and not args.setup and not args.rebuild_rollups:
         parser.print_help()
         return 0
 
@@ -5,7 +5,12 @@ Demonstrates interesting correlations and patterns in weather + air quality data
 """
 
 import sys
+import io
 import argparse
+import builtins
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from pathlib import Path
 import pandas as pd
@@ -19,8 +24,72 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 sys.path.append(str(Path(__file__).parent.parent))
 
 from lab3.lab3_config import Lab3ConfigLoader
+from lab3.batch_executor import BatchExecutor
+from lab3.weather_database import WeatherVASTDB, LOCATIONS_TABLE
+from lab3.weather_query import WeatherQuery, WEATHER_TABLE, AIR_QUALITY_TABLE, resolve_database_names
 import vastdb
 
+# WHO 24-hour guideline values (µg/m³; ozone is an 8-hour average)
+WHO_DAILY_GUIDELINES = {
+    'pm2_5': 25,
+    'pm10': 50,
+    'nitrogen_dioxide': 25,
+    'sulphur_dioxide': 40,
+    'ozone': 100,
+}
+AIR_QUALITY_COLUMNS = list(WHO_DAILY_GUIDELINES)
+# (column, label, emoji) in display order
+AIR_QUALITY_DISPLAY = [
+    ('pm2_5', 'PM2.5', '🌫️'),
+    ('pm10', 'PM10', '🌫️'),
+    ('nitrogen_dioxide', 'NO2', '🚗'),
+    ('sulphur_dioxide', 'SO2', '🏭'),
+    ('ozone', 'Ozone', '☀️'),
+]
+# Table header -> (weather column, air quality column)
+CORRELATION_PAIRS = [
+    ('Temp vs PM2.5', ('temperature_2m', 'pm2_5')),
+    ('Humidity vs PM2.5', ('relative_humidity_2m', 'pm2_5')),
+    ('Wind vs PM2.5', ('wind_speed_10m', 'pm2_5')),
+    ('Temp vs Ozone', ('temperature_2m', 'ozone')),
+    ('Temp vs NO2', ('temperature_2m', 'nitrogen_dioxide')),
+    ('Wind vs NO2', ('wind_speed_10m', 'nitrogen_dioxide')),
+    ('Wind vs SO2', ('wind_speed_10m', 'sulphur_dioxide')),
+]
+# Columns every analysis together needs from each table (--run-all loads exactly these once)
+RUN_ALL_COLUMNS = {
+    WEATHER_TABLE: list(dict.fromkeys(weather for _, (weather, _) in CORRELATION_PAIRS)),
+    AIR_QUALITY_TABLE: AIR_QUALITY_COLUMNS,
+}
+
+class ThreadOutput:
+    """Per-thread output capture for the parallel analyses
+    
+    While a thread is inside ``capture()`` this module's ``print`` writes to
+    that thread's own buffer, so sections are shown whole and in order once
+    they finish instead of interleaving. ``sys.stdout`` is never replaced.
+    """
+    
+    _local = threading.local()
+    
+    @classmethod
+    @contextmanager
+    def capture(cls):
+        cls._local.buffer = io.StringIO()
+        try:
+            yield cls._local.buffer
+        finally:
+            cls._local.buffer = None
+    
+    @classmethod
+    def stream(cls):
+        return getattr(cls._local, 'buffer', None) or sys.stdout
+
+def print(*args, **kwargs):
+    """print() that writes to the calling thread's ThreadOutput buffer while one is active"""
+    kwargs.setdefault('file', ThreadOutput.stream())
+    builtins.print(*args, **kwargs)
+
 def print_header(title, emoji="🌤️"):
     """Print a fancy header"""
     print(f"\n{emoji} {title}")
@@ -66,30 +135,6 @@ def print_compact_table(data, headers, title="", max_col_width=15):
                 data_parts.append(cell_str.ljust(col_widths[i]))
         print("   " + " | ".join(data_parts))
 
-def retry_transaction(func, max_retries=3, delay=1):
-    """Retry a function that uses transactions with exponential backoff"""
-    for attempt in range(max_retries):
-        try:
-            return func()
-        except Exception as e:
-            error_str = str(e).lower()
-            # Check for various transaction-related error patterns
-            if any(pattern in error_str for pattern in ["tx_id", "transaction", "rpc failed", "invalidargument"]):
-                print(f"   ⚠️  Transaction/RPC error (attempt {attempt + 1}/{max_retries}): {e}")
-                if attempt < max_retries - 1:
-                    print(f"   🔄 Retrying in {delay} seconds...")
-                    time.sleep(delay)
-                    delay *= 2  # Exponential backoff
-                    continue
-                else:
-                    print(f"   ❌ Max retries reached. Skipping this analysis.")
-                    return None
-            else:
-                # Non-transaction error, don't retry
-                raise e
-    return None
-
-
 def get_weather_connection():
     """Get VAST DB connection for weather data"""
     config = Lab3ConfigLoader()
@@ -123,413 +168,169 @@ def get_weather_connection():
         return None, None
 
 def get_data_summary(conn, config, trends=False):
-    """Get basic data summary with robust error handling"""
+    """Row counts and locations of the hourly tables (None on failure)"""
     print_section("Data Summary", "📈")
     
     try:
-        # Get bucket and schema names from config
-        # Use same bucket derivation logic as weather_database.py
-        view_path_cfg = config.get('lab3.database.view_path', f"/{config.get('lab3.database.name', 'weather_analytics')}")
-        bucket_name = config.get('lab3.database.bucket_name', view_path_cfg.lstrip('/').replace('/', '-'))
-        schema_name = config.get('lab3.database.schema', 'weather_analytics')
+        bucket_name, schema_name = resolve_database_names(config)
+        db = WeatherVASTDB(config)
         
-        # Use transaction to access tables with retry logic
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                with conn.transaction() as tx:
-                    bucket = tx.bucket(bucket_name)
-                    schema = bucket.schema(schema_name)
-                    
-                    weather_table = schema.table('hourly_weather')
-                    air_quality_table = schema.table('hourly_air_quality')
-                    
-                    # Get row counts
-                    weather_count = 0
-                    air_quality_count = 0
-                    
-                    # Get unique locations
-                    locations = set()
-                    
-                    # Count weather records and collect locations
-                    print("   🔍 Counting weather records...")
-                    weather_reader = weather_table.select(columns=['location'])
-                    for batch in weather_reader:
-                        df = batch.to_pandas()
-                        weather_count += len(df)
-                        if 'location' in df.columns:
-                            locations.update(df['location'].tolist())
-                    
-                    # Count air quality records
-                    print("   🔍 Counting air quality records...")
-                    air_quality_reader = air_quality_table.select(columns=['location'])
-                    for batch in air_quality_reader:
-                        df = batch.to_pandas()
-                        air_quality_count += len(df)
-                    
-                    print(f"   📊 Weather records: {weather_count:,}")
-                    print(f"   🌫️  Air quality records: {air_quality_count:,}")
-                    print(f"   📍 Locations: {len(locations)}")
-                    print(f"   🏙️  Cities: {', '.join(sorted(locations))}")
-                    
-                    return weather_table, air_quality_table, list(locations)
-                    
-            except Exception as tx_error:
-                if "tx_id" in str(tx_error) or "transaction" in str(tx_error).lower():
-                    print(f"   ⚠️  Transaction error (attempt {attempt + 1}/{max_retries}): {tx_error}")
-                    if attempt < max_retries - 1:
-                        print("   🔄 Retrying with fresh transaction...")
-                        time.sleep(1)  # Brief pause before retry
-                        continue
-                raise tx_error
+        # Row counts from table stats, locations from the locations table; one retried batch
+        print("   🔍 Reading table statistics and locations...")
+        executor = BatchExecutor.from_config(config, conn.transaction)
+        summary = executor.run(lambda tx: db.summarize(tx.bucket(bucket_name).schema(schema_name)))
+        locations = summary['locations']
+        if summary['locations_source'] != LOCATIONS_TABLE:
+            print("   💡 Locations were scanned from the hourly tables; run vastdb_manager.py --rebuild-rollups to fill the locations table")
+        
+        print(f"   📊 Weather records: {summary['rows'][WEATHER_TABLE]:,}")
+        print(f"   🌫️  Air quality records: {summary['rows'][AIR_QUALITY_TABLE]:,}")
+        print(f"   📍 Locations: {len(locations)}")
+        print(f"   🏙️  Cities: {', '.join(locations)}")
+        return locations
         
     except Exception as e:
         print(f"   ❌ Error getting data summary: {e}")
         if "tx_id" in str(e):
             print("   💡 This appears to be a transaction timeout. Try running with --locations and fewer cities for faster analysis.")
-        return None, None, []
+        return None
 
-def analyze_daily_patterns(conn, config, locations, debug=False, trends=False):
+def analysis_window(trends=False):
+    """(start, end) of the analysis period: 10 years with --trends, otherwise 6 months"""
+    end_date = datetime(2025, 9, 15)
+    if trends:
+        start_date = datetime(2015, 1, 1)  # 10 years of data
+    else:
+        start_date = end_date - timedelta(days=180)  # 6 months before end date
+    return start_date, end_date
+
+def short_location_name(location):
+    """Shorten location labels for compact tables"""
+    return location.replace('_Beijing_China', '').replace('_England_United-Kingdom', '').replace('_New-York_United-States', '')
+
+def analyze_daily_patterns(conn, config, locations, debug=False, trends=False, query=None):
     """Analyze daily weather and air quality patterns"""
     print_section("Daily Patterns", "📅")
     
     try:
-        # Get bucket and schema names from config
-        # Use same bucket derivation logic as weather_database.py
-        view_path_cfg = config.get('lab3.database.view_path', f"/{config.get('lab3.database.name', 'weather_analytics')}")
-        bucket_name = config.get('lab3.database.bucket_name', view_path_cfg.lstrip('/').replace('/', '-'))
-        schema_name = config.get('lab3.database.schema', 'weather_analytics')
+        query = query or WeatherQuery(conn, config)
+        start_date, end_date = analysis_window(trends)
+        if trends:
+            print(f"   📈 Analyzing 10-year trends ({start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')})")
+        else:
+            print(f"   📅 Analyzing last 6 months ({start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')})")
+        
+        # Averages and daily means come from the daily/monthly rollups where the window
+        # covers whole periods; the hour-of-day profile needs hourly rows (skipped for --trends)
+        started = time.perf_counter()
+        weather_stats = query.location_stats(WEATHER_TABLE, ['temperature_2m', 'relative_humidity_2m'],
+                                             locations, start_date, end_date)
+        air_quality_stats = query.location_stats(AIR_QUALITY_TABLE, AIR_QUALITY_COLUMNS, locations, start_date, end_date)
+        daily_pm = query.daily_means(AIR_QUALITY_TABLE, ['pm2_5'], locations, start_date, end_date)
+        hourly_pm = None if trends else query.hourly_profile(AIR_QUALITY_TABLE, ['pm2_5'], locations, start_date, end_date)
+        if debug:
+            print(f"   🔍 Debug: aggregates computed in {time.perf_counter() - started:.2f}s from {query.rows_read:,} rows")
         
-        # Use transaction to access tables
-        with conn.transaction() as tx:
-            bucket = tx.bucket(bucket_name)
-            schema = bucket.schema(schema_name)
+        total_locations = len(locations)
+        for i, location in enumerate(locations, 1):
+            print(f"\n   🏙️  {location} ({i}/{total_locations}):")
             
-            weather_table = schema.table('hourly_weather')
-            air_quality_table = schema.table('hourly_air_quality')
+            if location not in weather_stats.index or location not in air_quality_stats.index:
+                print(f"      ⚠️  No data available for this date range")
+                if debug:
+                    print(f"      🔍 Debug: Weather data: {location in weather_stats.index}, Air quality data: {location in air_quality_stats.index}")
+                continue
             
-            # Set date range based on trends flag
-            if trends:
-                end_date = datetime(2025, 9, 15)
-                start_date = datetime(2015, 1, 1)  # 10 years of data
-            else:
-                end_date = datetime(2025, 9, 15)
-                start_date = end_date - timedelta(days=180)  # 6 months before end date
+            weather = weather_stats.loc[location]
+            air = air_quality_stats.loc[location]
+            avg_temp = weather['temperature_2m_mean']
+            avg_humidity = weather['relative_humidity_2m_mean']
+            print(f"      🌡️  Avg Temperature: {avg_temp:.1f}°C")
+            print(f"      💧 Avg Humidity: {avg_humidity:.1f}%")
             
-            if trends:
-                print(f"   📈 Analyzing 10-year trends ({start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')})")
-            else:
-                print(f"   📅 Analyzing last 6 months ({start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')})")
+            # Debug air quality data
+            if debug:
+                print(f"      🔍 Debug: {int(air['pm2_5_count'])} valid PM2.5, {int(air['pm10_count'])} valid PM10")
             
-            # Sample data for each location
-            total_locations = len(locations)
-            for i, location in enumerate(locations, 1):
-                print(f"\n   🏙️  {location} ({i}/{total_locations}):")
-                
-                # Get weather data for the 6-month period
-                weather_data = []
-                weather_reader = weather_table.select(columns=['time', 'location', 'temperature_2m', 'relative_humidity_2m', 'wind_speed_10m', 'precipitation'])
-                for batch in weather_reader:
-                    df = batch.to_pandas()
-                    if 'location' in df.columns:
-                        location_data = df[df['location'] == location]
-                        for _, row in location_data.iterrows():
-                            row_time = pd.to_datetime(row['time'])
-                            # Filter to our 6-month date range
-                            if start_date <= row_time <= end_date:
-                                weather_data.append({
-                                    'time': row['time'],
-                                    'temp': row['temperature_2m'],
-                                    'humidity': row['relative_humidity_2m'],
-                                    'wind_speed': row['wind_speed_10m'],
-                                    'precipitation': row['precipitation']
-                                })
-                
-                # Get air quality data for the 6-month period
-                air_quality_data = []
-                air_quality_reader = air_quality_table.select(columns=['time', 'location', 'pm2_5', 'pm10', 'ozone', 'nitrogen_dioxide', 'sulphur_dioxide'])
-                for batch in air_quality_reader:
-                    df = batch.to_pandas()
-                    print(f"🔍 Air quality batch columns: {list(df.columns)}")
-                    if 'location' in df.columns:
-                        location_data = df[df['location'] == location]
-                        print(f"🔍 Found {len(location_data)} rows for {location}")
-                        for _, row in location_data.iterrows():
-                            row_time = pd.to_datetime(row['time'])
-                            # Filter to our 6-month date range
-                            if start_date <= row_time <= end_date:
-                                air_quality_data.append({
-                                    'time': row['time'],
-                                    'pm2_5': row['pm2_5'],
-                                    'pm10': row['pm10'],
-                                    'ozone': row['ozone'],
-                                    'nitrogen_dioxide': row['nitrogen_dioxide'],
-                                    'sulphur_dioxide': row['sulphur_dioxide']
-                                })
+            averages = {}
+            for column, label, emoji in AIR_QUALITY_DISPLAY:
+                if air[f'{column}_count'] > 0:
+                    averages[column] = air[f'{column}_mean']
+                    print(f"      {emoji}  Avg {label}: {averages[column]:.1f} µg/m³")
+                elif column in ('pm2_5', 'pm10'):
+                    print(f"      ⚠️  No valid {label} data found for {location}")
+                    print(f"      🌫️  Avg {label}: No valid data")
             
-                if weather_data and air_quality_data:
-                    # Calculate averages with data validation
-                    avg_temp = sum(w['temp'] for w in weather_data if not pd.isna(w['temp'])) / len([w for w in weather_data if not pd.isna(w['temp'])])
-                    avg_humidity = sum(w['humidity'] for w in weather_data if not pd.isna(w['humidity'])) / len([w for w in weather_data if not pd.isna(w['humidity'])])
-                    
-                    # Filter out NaN values for air quality
-                    valid_pm25 = [a['pm2_5'] for a in air_quality_data if not pd.isna(a['pm2_5'])]
-                    valid_pm10 = [a['pm10'] for a in air_quality_data if not pd.isna(a['pm10'])]
-                    
-                    avg_pm2_5 = sum(valid_pm25) / len(valid_pm25) if valid_pm25 else float('nan')
-                    avg_pm10 = sum(valid_pm10) / len(valid_pm10) if valid_pm10 else float('nan')
-                    
-                    print(f"      🌡️  Avg Temperature: {avg_temp:.1f}°C")
-                    print(f"      💧 Avg Humidity: {avg_humidity:.1f}%")
-                    
-                    # Debug air quality data
-                    if debug:
-                        print(f"      🔍 Debug: {len(air_quality_data)} air quality records, {len(valid_pm25)} valid PM2.5, {len(valid_pm10)} valid PM10")
-                    if len(valid_pm25) == 0:
-                        print(f"      ⚠️  No valid PM2.5 data found for {location}")
-                    if len(valid_pm10) == 0:
-                        print(f"      ⚠️  No valid PM10 data found for {location}")
-                    
-                    if not pd.isna(avg_pm2_5):
-                        print(f"      🌫️  Avg PM2.5: {avg_pm2_5:.1f} µg/m³")
-                    else:
-                        print(f"      🌫️  Avg PM2.5: No valid data")
-                    
-                    if not pd.isna(avg_pm10):
-                        print(f"      🌫️  Avg PM10: {avg_pm10:.1f} µg/m³")
-                    else:
-                        print(f"      🌫️  Avg PM10: No valid data")
-                    
-                    # Additional air quality parameters
-                    valid_no2 = [a['nitrogen_dioxide'] for a in air_quality_data if 'nitrogen_dioxide' in a and not pd.isna(a['nitrogen_dioxide'])]
-                    valid_so2 = [a['sulphur_dioxide'] for a in air_quality_data if 'sulphur_dioxide' in a and not pd.isna(a['sulphur_dioxide'])]
-                    valid_ozone = [a['ozone'] for a in air_quality_data if 'ozone' in a and not pd.isna(a['ozone'])]
-                    
-                    if valid_no2:
-                        avg_no2 = sum(valid_no2) / len(valid_no2)
-                        print(f"      🚗  Avg NO2: {avg_no2:.1f} µg/m³")
-                    if valid_so2:
-                        avg_so2 = sum(valid_so2) / len(valid_so2)
-                        print(f"      🏭  Avg SO2: {avg_so2:.1f} µg/m³")
-                    if valid_ozone:
-                        avg_ozone = sum(valid_ozone) / len(valid_ozone)
-                        print(f"      ☀️  Avg Ozone: {avg_ozone:.1f} µg/m³")
-                    
-                    # WHO guidelines check
-                    who_pm2_5_daily = 25  # µg/m³
-                    who_pm10_daily = 50   # µg/m³
-                    who_no2_daily = 25    # µg/m³ (24-hour average)
-                    who_so2_daily = 40    # µg/m³ (24-hour average)
-                    who_ozone_daily = 100 # µg/m³ (8-hour average)
-                    
-                    if avg_pm2_5 > who_pm2_5_daily:
-                        print(f"      ⚠️  PM2.5 exceeds WHO daily guideline ({who_pm2_5_daily} µg/m³)")
-                    if avg_pm10 > who_pm10_daily:
-                        print(f"      ⚠️  PM10 exceeds WHO daily guideline ({who_pm10_daily} µg/m³)")
-                    if valid_no2 and avg_no2 > who_no2_daily:
-                        print(f"      ⚠️  NO2 exceeds WHO daily guideline ({who_no2_daily} µg/m³)")
-                    if valid_so2 and avg_so2 > who_so2_daily:
-                        print(f"      ⚠️  SO2 exceeds WHO daily guideline ({who_so2_daily} µg/m³)")
-                    if valid_ozone and avg_ozone > who_ozone_daily:
-                        print(f"      ⚠️  Ozone exceeds WHO daily guideline ({who_ozone_daily} µg/m³)")
-                    
-                    # Weather impact assessment
-                    if avg_humidity > 70:
-                        print(f"      🌧️  High humidity may trap pollutants")
-                    if avg_temp < 0:
-                        print(f"      ❄️  Cold weather may increase heating emissions")
-                else:
-                    print(f"      ⚠️  No data available for this date range")
-                    if debug:
-                        print(f"      🔍 Debug: Weather data: {len(weather_data) if weather_data else 0} records, Air quality data: {len(air_quality_data) if air_quality_data else 0} records")
+            # WHO guidelines check
+            for column, label, _ in AIR_QUALITY_DISPLAY:
+                if column in averages and averages[column] > WHO_DAILY_GUIDELINES[column]:
+                    print(f"      ⚠️  {label} exceeds WHO daily guideline ({WHO_DAILY_GUIDELINES[column]} µg/m³)")
+            
+            # Daily and hour-of-day PM2.5 patterns
+            if location in daily_pm.index.get_level_values('location'):
+                days = daily_pm.loc[location, 'pm2_5'].dropna()
+                if len(days):
+                    days_over = int((days > WHO_DAILY_GUIDELINES['pm2_5']).sum())
+                    print(f"      📆 Days over WHO PM2.5 guideline: {days_over}/{len(days)}")
+            if hourly_pm is not None and location in hourly_pm.index.get_level_values('location'):
+                hours = hourly_pm.loc[location, 'pm2_5'].dropna()
+                if len(hours):
+                    print(f"      🕐 PM2.5 peaks at {int(hours.idxmax()):02d}:00 UTC ({hours.max():.1f} µg/m³)")
+            
+            # Weather impact assessment
+            if avg_humidity > 70:
+                print(f"      🌧️  High humidity may trap pollutants")
+            if avg_temp < 0:
+                print(f"      ❄️  Cold weather may increase heating emissions")
                 
     except Exception as e:
         print(f"   ❌ Error analyzing daily patterns: {e}")
 
-def analyze_correlations(conn, config, locations, debug=False, trends=False):
+def analyze_correlations(conn, config, locations, debug=False, trends=False, query=None):
     """Analyze correlations between weather and air quality"""
     print_section("Weather-Air Quality Correlations", "🔗")
     
     try:
-        # Get bucket and schema names from config
-        # Use same bucket derivation logic as weather_database.py
-        view_path_cfg = config.get('lab3.database.view_path', f"/{config.get('lab3.database.name', 'weather_analytics')}")
-        bucket_name = config.get('lab3.database.bucket_name', view_path_cfg.lstrip('/').replace('/', '-'))
-        schema_name = config.get('lab3.database.schema', 'weather_analytics')
+        query = query or WeatherQuery(conn, config)
         
-        # Use transaction to access tables with timeout handling
         try:
-            with conn.transaction() as tx:
-                bucket = tx.bucket(bucket_name)
-                schema = bucket.schema(schema_name)
-                
-                weather_table = schema.table('hourly_weather')
-                air_quality_table = schema.table('hourly_air_quality')
-                
-                print("   🔍 Analyzing correlations (this may take a moment)...")
+            print("   🔍 Analyzing correlations (this may take a moment)...")
+            
+            start_date, end_date = analysis_window(trends)
+            if trends:
+                print(f"   📈 Analyzing correlations for 10-year trends ({start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')})")
+            else:
+                print(f"   📅 Analyzing correlations for last 6 months ({start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')})")
+            
+            # Every matched hour for every location, joined on (location, time)
+            started = time.perf_counter()
+            correlations = query.correlations([pair for _, pair in CORRELATION_PAIRS], locations, start_date, end_date)
+            if debug:
+                print(f"   🔍 Debug: correlations computed in {time.perf_counter() - started:.2f}s")
+            
+            if not correlations.empty:
+                print(f"\n   📊 Correlation Analysis (based on {int(correlations['points'].sum()):,} data points):")
                 
-                # Set date range based on trends flag
-                if trends:
-                    end_date = datetime(2025, 9, 15)
-                    start_date = datetime(2015, 1, 1)  # 10 years of data
-                else:
-                    end_date = datetime(2025, 9, 15)
-                    start_date = end_date - timedelta(days=180)  # 6 months before end date
+                headers = ['Location'] + [label for label, _ in CORRELATION_PAIRS]
+                compact_data = []
+                for location, row in correlations.iterrows():
+                    cells = [short_location_name(location)]
+                    for _, (a, b) in CORRELATION_PAIRS:
+                        value = row[f'{a} vs {b}']
+                        cells.append(f"{value:.3f}" if not pd.isna(value) else "N/A")
+                    compact_data.append(cells)
+                print_compact_table(compact_data, headers, title="Correlation Coefficients", max_col_width=18)
                 
-                if trends:
-                    print(f"   📈 Analyzing correlations for 10-year trends ({start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')})")
-                else:
-                    print(f"   📅 Analyzing correlations for last 6 months ({start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')})")
+                # Interpretation
+                print("\n   💡 Interpretation:")
+                print("   • Positive correlation: variables increase together")
+                print("   • Negative correlation: one increases as other decreases")
+                print("   • |r| > 0.7: strong correlation")
+                print("   • |r| > 0.5: moderate correlation")
+                print("   • |r| < 0.3: weak correlation")
+            else:
+                print("   ❌ No matching data found for correlation analysis")
                 
-                # Sample data for correlation analysis
-                sample_data = []
-                # Limit to reasonable number of locations for performance
-                max_locations = min(len(locations), 5) if len(locations) > 5 else len(locations)
-                for i, location in enumerate(locations[:max_locations], 1):
-                    print(f"   📍 Sampling data for {location} ({i}/{max_locations})...")
-                    
-                    # Get weather data for the 6-month period
-                    weather_data = []
-                    weather_reader = weather_table.select(columns=['time', 'location', 'temperature_2m', 'relative_humidity_2m', 'wind_speed_10m', 'precipitation'])
-                    for batch in weather_reader:
-                        df = batch.to_pandas()
-                        if 'location' in df.columns:
-                            location_data = df[df['location'] == location]
-                            for _, row in location_data.iterrows():
-                                row_time = pd.to_datetime(row['time'])
-                                # Filter to our 6-month date range
-                                if start_date <= row_time <= end_date:
-                                    weather_data.append({
-                                        'time': row['time'],
-                                        'temp': row['temperature_2m'],
-                                        'humidity': row['relative_humidity_2m'],
-                                        'wind_speed': row['wind_speed_10m'],
-                                        'precipitation': row['precipitation']
-                                    })
-                                    if len(weather_data) >= 100:  # Sample 100 points
-                                        break
-                        if len(weather_data) >= 100:
-                            break
-                    
-                    # Get air quality data for the 6-month period
-                    air_quality_data = []
-                    air_quality_reader = air_quality_table.select(columns=['time', 'location', 'pm2_5', 'pm10', 'ozone', 'nitrogen_dioxide', 'sulphur_dioxide'])
-                    for batch in air_quality_reader:
-                        df = batch.to_pandas()
-                        if 'location' in df.columns:
-                            location_data = df[df['location'] == location]
-                            for _, row in location_data.iterrows():
-                                row_time = pd.to_datetime(row['time'])
-                                # Filter to our 6-month date range
-                                if start_date <= row_time <= end_date:
-                                    air_quality_data.append({
-                                        'time': row['time'],
-                                        'pm2_5': row['pm2_5'],
-                                        'pm10': row['pm10'],
-                                        'ozone': row['ozone']
-                                    })
-                                    if len(air_quality_data) >= 100:  # Sample 100 points
-                                        break
-                        if len(air_quality_data) >= 100:
-                            break
-            
-                    # Combine data
-                    if weather_data and air_quality_data:
-                        # Simple time-based matching (assuming hourly data)
-                        for w in weather_data[:50]:  # Limit to 50 points for correlation
-                            for a in air_quality_data[:50]:
-                                if w['time'] == a['time']:
-                                    sample_row = {
-                                        'location': location,
-                                        'temp': w['temp'],
-                                        'humidity': w['humidity'],
-                                        'wind_speed': w['wind_speed'],
-                                        'precipitation': w['precipitation'],
-                                        'pm2_5': a['pm2_5'],
-                                        'pm10': a['pm10']
-                                    }
-                                    
-                                    # Add optional air quality columns if they exist
-                                    if 'ozone' in a and not pd.isna(a['ozone']):
-                                        sample_row['ozone'] = a['ozone']
-                                    if 'nitrogen_dioxide' in a and not pd.isna(a['nitrogen_dioxide']):
-                                        sample_row['nitrogen_dioxide'] = a['nitrogen_dioxide']
-                                    if 'sulphur_dioxide' in a and not pd.isna(a['sulphur_dioxide']):
-                                        sample_row['sulphur_dioxide'] = a['sulphur_dioxide']
-                                    
-                                    sample_data.append(sample_row)
-                                    break
-            
-                if sample_data:
-                    df = pd.DataFrame(sample_data)
-                    
-                    print(f"\n   📊 Correlation Analysis (based on {len(df)} data points):")
-                    
-                    # Calculate correlations
-                    correlations = []
-                    for location in df['location'].unique():
-                        loc_data = df[df['location'] == location]
-                        
-                        if len(loc_data) > 10:  # Need enough data for correlation
-                            # Basic correlations (always available)
-                            temp_pm25_corr = loc_data['temp'].corr(loc_data['pm2_5'])
-                            humidity_pm25_corr = loc_data['humidity'].corr(loc_data['pm2_5'])
-                            wind_pm25_corr = loc_data['wind_speed'].corr(loc_data['pm2_5'])
-                            
-                            # Optional correlations (only if columns exist)
-                            temp_ozone_corr = None
-                            temp_no2_corr = None
-                            wind_no2_corr = None
-                            wind_so2_corr = None
-                            
-                            if 'ozone' in loc_data.columns:
-                                temp_ozone_corr = loc_data['temp'].corr(loc_data['ozone'])
-                            if 'nitrogen_dioxide' in loc_data.columns:
-                                temp_no2_corr = loc_data['temp'].corr(loc_data['nitrogen_dioxide'])
-                                wind_no2_corr = loc_data['wind_speed'].corr(loc_data['nitrogen_dioxide'])
-                            if 'sulphur_dioxide' in loc_data.columns:
-                                wind_so2_corr = loc_data['wind_speed'].corr(loc_data['sulphur_dioxide'])
-                            
-                            correlations.append({
-                                'Location': location,
-                                'Temp vs PM2.5': f"{temp_pm25_corr:.3f}",
-                                'Humidity vs PM2.5': f"{humidity_pm25_corr:.3f}",
-                                'Wind vs PM2.5': f"{wind_pm25_corr:.3f}",
-                                'Temp vs Ozone': f"{temp_ozone_corr:.3f}" if temp_ozone_corr is not None else "N/A",
-                                'Temp vs NO2': f"{temp_no2_corr:.3f}" if temp_no2_corr is not None else "N/A",
-                                'Wind vs NO2': f"{wind_no2_corr:.3f}" if wind_no2_corr is not None else "N/A",
-                                'Wind vs SO2': f"{wind_so2_corr:.3f}" if wind_so2_corr is not None else "N/A"
-                            })
-                    
-                    if correlations:
-                        # Convert to compact table format
-                        headers = ['Location', 'Temp vs PM2.5', 'Humidity vs PM2.5', 'Wind vs PM2.5', 'Temp vs Ozone', 'Temp vs NO2', 'Wind vs NO2', 'Wind vs SO2']
-                        compact_data = []
-                        for corr in correlations:
-                            # Shorten location names for better display
-                            short_location = corr['Location'].replace('_Beijing_China', '').replace('_England_United-Kingdom', '').replace('_New-York_United-States', '')
-                            compact_data.append([
-                                short_location,
-                                corr['Temp vs PM2.5'],
-                                corr['Humidity vs PM2.5'],
-                                corr['Wind vs PM2.5'],
-                                corr['Temp vs Ozone'],
-                                corr['Temp vs NO2'],
-                                corr['Wind vs NO2'],
-                                corr['Wind vs SO2']
-                            ])
-                        print_compact_table(compact_data, headers, title="Correlation Coefficients", max_col_width=18)
-                        
-                        # Interpretation
-                        print("\n   💡 Interpretation:")
-                        print("   • Positive correlation: variables increase together")
-                        print("   • Negative correlation: one increases as other decreases")
-                        print("   • |r| > 0.7: strong correlation")
-                        print("   • |r| > 0.5: moderate correlation")
-                        print("   • |r| < 0.3: weak correlation")
-                else:
-                    print("   ❌ No matching data found for correlation analysis")
-                    
         except Exception as e:
             print(f"   ⚠️  Correlation analysis failed: {e}")
             print("   💡 This might be due to transaction timeout or connection issues")
@@ -537,132 +338,84 @@ def analyze_correlations(conn, config, locations, debug=False, trends=False):
     except Exception as e:
         print(f"   ❌ Error analyzing correlations: {e}")
 
-def analyze_pollution_episodes(conn, config, locations, debug=False, trends=False):
+def analyze_pollution_episodes(conn, config, locations, debug=False, trends=False, query=None):
     """Analyze high pollution episodes"""
     print_section("Pollution Episodes", "⚠️")
     
     try:
-        # Get bucket and schema names from config
-        # Use same bucket derivation logic as weather_database.py
-        view_path_cfg = config.get('lab3.database.view_path', f"/{config.get('lab3.database.name', 'weather_analytics')}")
-        bucket_name = config.get('lab3.database.bucket_name', view_path_cfg.lstrip('/').replace('/', '-'))
-        schema_name = config.get('lab3.database.schema', 'weather_analytics')
+        query = query or WeatherQuery(conn, config)
         
-        # Use transaction to access tables with error handling
         try:
-            with conn.transaction() as tx:
-                bucket = tx.bucket(bucket_name)
-                schema = bucket.schema(schema_name)
-                
-                air_quality_table = schema.table('hourly_air_quality')
-                
-                print("   🔍 Identifying high pollution episodes...")
-                
-                # Set date range based on trends flag
-                if trends:
-                    end_date = datetime(2025, 9, 15)
-                    start_date = datetime(2015, 1, 1)  # 10 years of data
-                else:
-                    end_date = datetime(2025, 9, 15)
-                    start_date = end_date - timedelta(days=180)  # 6 months before end date
-                
-                if trends:
-                    print(f"   📈 Analyzing pollution episodes for 10-year trends ({start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')})")
-                else:
-                    print(f"   📅 Analyzing pollution episodes for last 6 months ({start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')})")
-                
-                # WHO guidelines
-                who_pm2_5_daily = 25  # µg/m³
-                who_pm10_daily = 50   # µg/m³
-                
-                episodes = []
-                total_locations = len(locations)
-                for i, location in enumerate(locations, 1):
-                    print(f"   📍 Checking {location} ({i}/{total_locations})...")
-                    
-                    # Sample air quality data for the 6-month period
-                    air_quality_data = []
-                    air_quality_reader = air_quality_table.select(columns=['time', 'location', 'pm2_5', 'pm10'])
-                    for batch in air_quality_reader:
-                        df = batch.to_pandas()
-                        if 'location' in df.columns:
-                            location_data = df[df['location'] == location]
-                            for _, row in location_data.iterrows():
-                                row_time = pd.to_datetime(row['time'])
-                                # Filter to our 6-month date range
-                                if start_date <= row_time <= end_date:
-                                    air_quality_data.append({
-                                        'time': row['time'],
-                                        'pm2_5': row['pm2_5'],
-                                        'pm10': row['pm10']
-                                    })
-                                    if len(air_quality_data) >= 200:  # Sample 200 points
-                                        break
-                        if len(air_quality_data) >= 200:
-                            break
-                
-                    if air_quality_data:
-                        # Find high pollution episodes with data validation
-                        valid_pm25 = [a['pm2_5'] for a in air_quality_data if not pd.isna(a['pm2_5'])]
-                        valid_pm10 = [a['pm10'] for a in air_quality_data if not pd.isna(a['pm10'])]
-                        
-                        high_pm25_count = sum(1 for a in valid_pm25 if a > who_pm2_5_daily)
-                        high_pm10_count = sum(1 for a in valid_pm10 if a > who_pm10_daily)
-                        
-                        avg_pm25 = sum(valid_pm25) / len(valid_pm25) if valid_pm25 else float('nan')
-                        avg_pm10 = sum(valid_pm10) / len(valid_pm10) if valid_pm10 else float('nan')
-                        
-                        max_pm25 = max(valid_pm25) if valid_pm25 else float('nan')
-                        max_pm10 = max(valid_pm10) if valid_pm10 else float('nan')
-                        
-                        episodes.append({
-                            'Location': location,
-                            'Avg PM2.5': f"{avg_pm25:.1f}" if not pd.isna(avg_pm25) else "No data",
-                            'Max PM2.5': f"{max_pm25:.1f}" if not pd.isna(max_pm25) else "No data",
-                            'High PM2.5 Hours': f"{high_pm25_count}",
-                            'Avg PM10': f"{avg_pm10:.1f}" if not pd.isna(avg_pm10) else "No data",
-                            'Max PM10': f"{max_pm10:.1f}" if not pd.isna(max_pm10) else "No data",
-                            'High PM10 Hours': f"{high_pm10_count}"
-                        })
+            print("   🔍 Identifying high pollution episodes...")
+            
+            start_date, end_date = analysis_window(trends)
+            if trends:
+                print(f"   📈 Analyzing pollution episodes for 10-year trends ({start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')})")
+            else:
+                print(f"   📅 Analyzing pollution episodes for last 6 months ({start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')})")
+            
+            # WHO guidelines
+            who_pm2_5_daily = WHO_DAILY_GUIDELINES['pm2_5']
+            who_pm10_daily = WHO_DAILY_GUIDELINES['pm10']
+            
+            started = time.perf_counter()
+            data = query.scan(AIR_QUALITY_TABLE, ['pm2_5', 'pm10'], locations, start_date, end_date)
+            stats = query.aggregate_by_location(data, ['pm2_5', 'pm10'],
+                                                thresholds={'pm2_5': who_pm2_5_daily, 'pm10': who_pm10_daily})
+            pm25_episodes = query.episodes_by_location(data.select(['location', 'time', 'pm2_5']).to_pandas(),
+                                                       'pm2_5', who_pm2_5_daily)
+            if debug:
+                print(f"   🔍 Debug: {data.num_rows:,} readings aggregated in {time.perf_counter() - started:.2f}s")
+            
+            def fmt(value):
+                return f"{value:.1f}" if not pd.isna(value) else "No data"
+            
+            episodes = []
+            for location in locations:
+                if location not in stats.index:
+                    continue
+                row = stats.loc[location]
+                runs = pm25_episodes.loc[location] if location in pm25_episodes.index else None
+                episodes.append({
+                    'Location': location,
+                    'Avg PM2.5': fmt(row['pm2_5_mean']),
+                    'Max PM2.5': fmt(row['pm2_5_max']),
+                    'High PM2.5 Hours': f"{int(row['pm2_5_hours_over'])}",
+                    'PM2.5 Episodes': f"{runs['episodes']}" if runs is not None else "0",
+                    'Longest (h)': f"{runs['longest_hours']}" if runs is not None else "0",
+                    'Avg PM10': fmt(row['pm10_mean']),
+                    'Max PM10': fmt(row['pm10_max']),
+                    'High PM10 Hours': f"{int(row['pm10_hours_over'])}"
+                })
+            
+            if episodes:
+                # Convert to compact table format
+                headers = ['Location', 'Avg PM2.5', 'Max PM2.5', 'High PM2.5 Hours', 'PM2.5 Episodes', 'Longest (h)',
+                           'Avg PM10', 'Max PM10', 'High PM10 Hours']
+                compact_data = [[short_location_name(ep['Location'])] + [ep[header] for header in headers[1:]]
+                                for ep in episodes]
+                print_compact_table(compact_data, headers, title="Pollution Summary", max_col_width=16)
                 
-                if episodes:
-                    # Convert to compact table format
-                    headers = ['Location', 'Avg PM2.5', 'Max PM2.5', 'High PM2.5 Hours', 'Avg PM10', 'Max PM10', 'High PM10 Hours']
-                    compact_data = []
-                    for ep in episodes:
-                        # Shorten location names for better display
-                        short_location = ep['Location'].replace('_Beijing_China', '').replace('_England_United-Kingdom', '').replace('_New-York_United-States', '')
-                        compact_data.append([
-                            short_location,
-                            ep['Avg PM2.5'],
-                            ep['Max PM2.5'],
-                            ep['High PM2.5 Hours'],
-                            ep['Avg PM10'],
-                            ep['Max PM10'],
-                            ep['High PM10 Hours']
-                        ])
-                    print_compact_table(compact_data, headers, title="Pollution Summary", max_col_width=16)
+                # Health impact assessment
+                print("\n   🏥 Health Impact Assessment:")
+                for ep in episodes:
+                    location = ep['Location']
+                    avg_pm25_str = ep['Avg PM2.5']
+                    high_pm25_hours = int(ep['High PM2.5 Hours'])
                     
-                    # Health impact assessment
-                    print("\n   🏥 Health Impact Assessment:")
-                    for ep in episodes:
-                        location = ep['Location']
-                        avg_pm25_str = ep['Avg PM2.5']
-                        high_pm25_hours = int(ep['High PM2.5 Hours'])
-                        
-                        if avg_pm25_str != "No data":
-                            avg_pm25 = float(avg_pm25_str)
-                            if avg_pm25 > who_pm2_5_daily:
-                                print(f"   ⚠️  {location}: High PM2.5 exposure risk")
-                            elif high_pm25_hours > 0:
-                                print(f"   ⚡ {location}: Occasional PM2.5 spikes")
-                            else:
-                                print(f"   ✅ {location}: Good air quality")
+                    if avg_pm25_str != "No data":
+                        avg_pm25 = float(avg_pm25_str)
+                        if avg_pm25 > who_pm2_5_daily:
+                            print(f"   ⚠️  {location}: High PM2.5 exposure risk")
+                        elif high_pm25_hours > 0:
+                            print(f"   ⚡ {location}: Occasional PM2.5 spikes (longest {ep['Longest (h)']}h above guideline)")
                         else:
-                            print(f"   ❓ {location}: No air quality data available")
-                else:
-                    print("   ❌ No air quality data available for analysis")
-                    
+                            print(f"   ✅ {location}: Good air quality")
+                    else:
+                        print(f"   ❓ {location}: No air quality data available")
+            else:
+                print("   ❌ No air quality data available for analysis")
+                
         except Exception as e:
             print(f"   ⚠️  Pollution analysis failed: {e}")
             print("   💡 This might be due to transaction timeout or connection issues")
@@ -670,14 +423,115 @@ def analyze_pollution_episodes(conn, config, locations, debug=False, trends=Fals
     except Exception as e:
         print(f"   ❌ Error analyzing pollution episodes: {e}")
 
+class StageTimer:
+    """Wall-clock time per named stage (thread-safe), reported at the end of the run"""
+    
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = []
+        self._lock = threading.Lock()
+    
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.stages.append((name, time.perf_counter() - started))
+    
+    def report(self):
+        total = time.perf_counter() - self.started
+        print_section("Stage Timings", "⏱️")
+        rows = [[name, f"{elapsed:.2f}s", f"{elapsed / total * 100:.0f}%"] for name, elapsed in self.stages]
+        rows.append(["total (wall clock)", f"{total:.2f}s", "100%"])
+        print_compact_table(rows, ['Stage', 'Time', 'Of total'], title="Time per stage (parallel stages overlap)", max_col_width=40)
+
+def select_locations(locations, args):
+    """Apply --locations / --all-cities / default first-3 selection"""
+    # Filter locations if specified
+    if args.locations:
+        locations = [loc for loc in locations if any(loc.lower().find(arg.lower()) != -1 for arg in args.locations)]
+        if not locations:
+            print("   ❌ No matching locations found")
+            return []
+    
+    # Apply location limits based on options
+    if not args.all_cities and not args.locations:
+        locations = locations[:3]
+        print(f"   📍 Default mode: Analyzing first {len(locations)} locations")
+    else:
+        print(f"   🌍 All cities mode: Analyzing all {len(locations)} locations")
+    return locations
+
+def load_analysis_data(query, locations, start_date, end_date, timer):
+    """One projected scan per table for the selected locations and analysis window, both tables read in parallel"""
+    print_section("Loading Analysis Data", "📥")
+    print(f"   🔍 One scan per table ({start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')})...")
+    
+    def load(table_name):
+        with timer.stage(f"scan {table_name}"):
+            return query.preload(table_name, RUN_ALL_COLUMNS[table_name], start_date, end_date, locations=locations)
+    
+    with ThreadPoolExecutor(max_workers=len(RUN_ALL_COLUMNS)) as pool:
+        weather, air_quality = pool.map(load, [WEATHER_TABLE, AIR_QUALITY_TABLE])
+    
+    print(f"   📊 Weather records in window: {weather.num_rows:,}")
+    print(f"   🌫️  Air quality records in window: {air_quality.num_rows:,}")
+    return weather.num_rows + air_quality.num_rows
+
+def run_all(conn, config, args, timer):
+    """Single-pass mode: load each table once, then run the analyses in parallel on the shared data"""
+    with timer.stage("data summary"):
+        locations = get_data_summary(conn, config, args.trends)
+    if locations is None:
+        return 1
+    locations = select_locations(locations, args)
+    if not locations:
+        return 1
+    
+    start_date, end_date = analysis_window(args.trends)
+    query = WeatherQuery(conn, config)
+    try:
+        rows = load_analysis_data(query, locations, start_date, end_date, timer)
+    except Exception as e:
+        print(f"   ❌ Error loading analysis data: {e}")
+        return 1
+    if not rows:
+        print("   ❌ No data found in the analysis window")
+        return 1
+    
+    print("\n🔄 Running analyses in parallel on the shared data...")
+    analyses = [
+        ("daily patterns", analyze_daily_patterns),
+        ("correlations", analyze_correlations),
+        ("pollution episodes", analyze_pollution_episodes),
+    ]
+    
+    def run(name, analysis):
+        with ThreadOutput.capture() as buffer, timer.stage(name):
+            analysis(conn, config, locations, debug=args.debug, trends=args.trends, query=query)
+        return buffer.getvalue()
+    
+    with timer.stage("analyses (parallel)"):
+        with ThreadPoolExecutor(max_workers=len(analyses)) as pool:
+            futures = [pool.submit(run, name, analysis) for name, analysis in analyses]
+            sections = [future.result() for future in futures]
+    
+    for section in sections:
+        print(section, end='')
+    return 0
+
 def main():
     parser = argparse.ArgumentParser(description="Weather Analytics Demo - Fancy Console Output")
     parser.add_argument("--all-cities", action="store_true", help="Analyze all available cities (default: first 3)")
     parser.add_argument("--locations", nargs="+", help="Specific locations to analyze")
     parser.add_argument("--trends", action="store_true", help="Analyze long-term trends (10 years: 2015-2025)")
+    parser.add_argument("--run-all", action="store_true", help="Single pass: one scan per table shared by all analyses, run in parallel")
     parser.add_argument("--debug", action="store_true", help="Enable debug output for troubleshooting")
     
     args = parser.parse_args()
+    timer = StageTimer()
     
     print_header("Weather Analytics Demo", "🌤️")
     if args.trends:
@@ -693,6 +547,8 @@ def main():
         print(f"   📍 Specific locations mode - analyzing: {', '.join(args.locations)}")
     else:
         print("   📍 Default mode - analyzing first 3 locations (use --all-cities for all)")
+    if args.run_all:
+        print("   ⚡ Run-all mode - one scan per table, analyses in parallel")
     
     print("   💡 If you encounter transaction errors, try --locations with fewer cities for faster analysis")
     if args.debug:
@@ -700,53 +556,43 @@ def main():
     
     # Connect to VAST DB
     print_section("Connecting to VAST Database", "🔌")
-    conn, config = get_weather_connection()
+    with timer.stage("connect"):
+        conn, config = get_weather_connection()
     if not conn or not config:
         return 1
     
     print("   ✅ Connected to VAST Database")
     
-    # Get data summary
-    weather_table, air_quality_table, locations = get_data_summary(conn, config, args.trends)
-    if not weather_table or not air_quality_table:
-        return 1
-    
-    # Filter locations if specified
-    if args.locations:
-        locations = [loc for loc in locations if any(loc.lower().find(arg.lower()) != -1 for arg in args.locations)]
-        if not locations:
-            print("   ❌ No matching locations found")
+    if args.run_all:
+        if run_all(conn, config, args, timer):
             return 1
-    
-    # Apply location limits based on options
-    if not args.all_cities and not args.locations:
-        locations = locations[:3]
-        print(f"   📍 Default mode: Analyzing first {len(locations)} locations")
     else:
-        print(f"   🌍 All cities mode: Analyzing all {len(locations)} locations")
-    
-    # Run analyses with retry logic for transaction errors
-    print("\n🔄 Running analyses with transaction retry logic...")
-    
-    # Wrap each analysis in retry logic
-    def run_daily_patterns():
-        analyze_daily_patterns(conn, config, locations, debug=args.debug, trends=args.trends)
-    
-    def run_correlations():
-        analyze_correlations(conn, config, locations, debug=args.debug, trends=args.trends)
-    
-    def run_pollution_episodes():
-        analyze_pollution_episodes(conn, config, locations, debug=args.debug, trends=args.trends)
-    
-    # Execute with retry logic
-    print("   🔄 Starting daily patterns analysis...")
-    retry_transaction(run_daily_patterns, max_retries=2, delay=1)
-    
-    print("   🔄 Starting correlations analysis...")
-    retry_transaction(run_correlations, max_retries=2, delay=2)
+        # Get data summary
+        with timer.stage("data summary"):
+            locations = get_data_summary(conn, config, args.trends)
+        if locations is None:
+            return 1
+        
+        locations = select_locations(locations, args)
+        if not locations:
+            return 1
+        
+        # Reads are split into batches that are retried on their own on transaction errors
+        print("\n🔄 Running analyses with per-batch transaction retry...")
+        
+        print("   🔄 Starting daily patterns analysis...")
+        with timer.stage("daily patterns"):
+            analyze_daily_patterns(conn, config, locations, debug=args.debug, trends=args.trends)
+        
+        print("   🔄 Starting correlations analysis...")
+        with timer.stage("correlations"):
+            analyze_correlations(conn, config, locations, debug=args.debug, trends=args.trends)
+        
+        print("   🔄 Starting pollution episodes analysis...")
+        with timer.stage("pollution episodes"):
+            analyze_pollution_episodes(conn, config, locations, debug=args.debug, trends=args.trends)
     
-    print("   🔄 Starting pollution episodes analysis...")
-    retry_transaction(run_pollution_episodes, max_retries=2, delay=2)
+    timer.report()
     
     print_header("Analysis Complete", "✅")
     print("   🎉 Weather analytics demo completed successfully!")
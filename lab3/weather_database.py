@@ -5,14 +5,81 @@ Handles all VAST Database operations for weather data storage and retrieval
 """
 
 import logging
-from datetime import datetime
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Tuple
 
 import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+
+from lab3.batch_executor import BatchExecutor, Checkpoint
+from lab3.weather_rollups import (
+    GRANULARITIES, compute_rollup, metric_columns, next_period, period_start, rollup_schema, rollup_table_name
+)
 
 logger = logging.getLogger(__name__)
 
+WEATHER_SCHEMA = pa.schema([
+    ('location', pa.utf8()),
+    ('time', pa.timestamp('us')),
+    ('temperature_2m', pa.float64()),
+    ('relative_humidity_2m', pa.float64()),
+    ('surface_pressure', pa.float64()),
+    ('wind_speed_10m', pa.float64()),
+    ('wind_direction_10m', pa.float64()),
+    ('precipitation', pa.float64()),
+])
+AIR_QUALITY_SCHEMA = pa.schema([
+    ('location', pa.utf8()),
+    ('time', pa.timestamp('us')),
+    ('pm10', pa.float64()),
+    ('pm2_5', pa.float64()),
+    ('nitrogen_dioxide', pa.float64()),
+    ('ozone', pa.float64()),
+    ('sulphur_dioxide', pa.float64()),
+])
+TABLE_SCHEMAS = {
+    'hourly_weather': WEATHER_SCHEMA,
+    'hourly_air_quality': AIR_QUALITY_SCHEMA,
+}
+# daily_/monthly_ rollups of each hourly table (see weather_rollups.py)
+ROLLUP_SCHEMAS = {
+    rollup_table_name(source_table, granularity): rollup_schema(source_schema)
+    for source_table, source_schema in TABLE_SCHEMAS.items()
+    for granularity in GRANULARITIES
+}
+# One row per (location, hourly table) with the stored time range, kept up to
+# date by ingestion so summaries never have to scan the hourly tables
+LOCATIONS_TABLE = 'locations'
+LOCATIONS_SCHEMA = pa.schema([
+    ('location', pa.utf8()),
+    ('source_table', pa.utf8()),
+    ('first_time', pa.timestamp('us')),
+    ('last_time', pa.timestamp('us')),
+])
+DIMENSION_SCHEMAS = {LOCATIONS_TABLE: LOCATIONS_SCHEMA}
+
+# Clustered layout: VAST DB keeps each table sorted by these columns, so a
+# scan filtered by location and time only touches the matching row ranges
+SORTING_KEYS = {
+    **{table_name: ('location', 'time') for table_name in TABLE_SCHEMAS},
+    **{table_name: ('location', 'period') for table_name in ROLLUP_SCHEMAS},
+    LOCATIONS_TABLE: ('location', 'source_table'),
+}
+
+# Cell values treated as missing measurements
+CSV_NULL_VALUES = ['', 'null', 'None', 'NaN', 'nan']
+
+# Time formats accepted in the CSV ``time`` column (after a trailing 'Z' is trimmed)
+CSV_TIME_FORMATS = ('%Y-%m-%dT%H:%M', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d %H:%M:%S')
+# A decimal or scientific-notation number; other cell text is a missing value
+CSV_NUMBER_PATTERN = r'^[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$'
+
+# How rows whose (location, time) is already stored are handled
+INGEST_MODES = ('skip', 'upsert')
+
+DEFAULT_CHECKPOINT_FILE = '~/.cache/cosmos-labs/lab3-ingest-checkpoint.json'
+
 
 class WeatherVASTDB:
     """Minimal VAST DB manager for weather analytics (safe, lab-style)."""
@@ -52,6 +119,20 @@ class WeatherVASTDB:
             logger.error(f"❌ Connect failed: {e}")
             return False
 
+    @contextmanager
+    def _schema_transaction(self):
+        """Transaction yielding the weather schema (one per executor batch)"""
+        with self._conn.transaction() as tx:
+            yield tx.bucket(self.bucket).schema(self.schema)
+
+    def _executor(self, checkpoint: bool = False) -> BatchExecutor:
+        """Batch executor over ``_schema_transaction``, optionally recording finished batches on disk"""
+        checkpoint_file = self.config.get('lab3.executor.checkpoint_file', DEFAULT_CHECKPOINT_FILE)
+        return BatchExecutor.from_config(
+            self.config, self._schema_transaction,
+            checkpoint=Checkpoint(checkpoint_file) if checkpoint and checkpoint_file else None,
+        )
+
     def setup_infrastructure(self, dry_run: bool = True) -> bool:
         if not self._vastdb_available:
             logger.warning("⚠️ vastdb not installed; skipping setup")
@@ -79,53 +160,56 @@ class WeatherVASTDB:
                         logger.error(f"❌ Could not access schema '{self.schema}': {e}")
                         return False
 
-                weather_cols = pa.schema([
-                    ('location', pa.utf8()),
-                    ('time', pa.timestamp('us')),
-                    ('temperature_2m', pa.float64()),
-                    ('relative_humidity_2m', pa.float64()),
-                    ('surface_pressure', pa.float64()),
-                    ('wind_speed_10m', pa.float64()),
-                    ('wind_direction_10m', pa.float64()),
-                    ('precipitation', pa.float64()),
-                ])
-                air_cols = pa.schema([
-                    ('location', pa.utf8()),
-                    ('time', pa.timestamp('us')),
-                    ('pm10', pa.float64()),
-                    ('pm2_5', pa.float64()),
-                    ('nitrogen_dioxide', pa.float64()),
-                    ('ozone', pa.float64()),
-                    ('sulphur_dioxide', pa.float64()),
-                ])
                 # Create tables if missing
-                try:
-                    schema.create_table('hourly_weather', weather_cols)
-                    logger.info("✅ Created table 'hourly_weather'")
-                except Exception:
-                    try:
-                        schema.table('hourly_weather')
-                        logger.info("ℹ️ Table 'hourly_weather' already exists")
-                    except Exception as e:
-                        logger.error(f"❌ Could not access table 'hourly_weather': {e}")
-                        return False
-                try:
-                    schema.create_table('hourly_air_quality', air_cols)
-                    logger.info("✅ Created table 'hourly_air_quality'")
-                except Exception:
-                    try:
-                        schema.table('hourly_air_quality')
-                        logger.info("ℹ️ Table 'hourly_air_quality' already exists")
-                    except Exception as e:
-                        logger.error(f"❌ Could not access table 'hourly_air_quality': {e}")
+                for table_name, table_schema in {**TABLE_SCHEMAS, **ROLLUP_SCHEMAS, **DIMENSION_SCHEMAS}.items():
+                    if not self._ensure_table(schema, table_name, table_schema):
                         return False
             return True
         except Exception as e:
             logger.error(f"❌ Setup failed: {e}")
             return False
 
+    def sorting_key(self, table_name: str) -> list:
+        """Column indices of the table's sorting key ([] when the sorted layout is disabled)"""
+        if not self.config.get('lab3.database.sorted_layout', True):
+            return []
+        table_schema = {**TABLE_SCHEMAS, **ROLLUP_SCHEMAS, **DIMENSION_SCHEMAS}[table_name]
+        return [table_schema.get_field_index(column) for column in SORTING_KEYS[table_name]]
+
+    def _ensure_table(self, schema, table_name: str, table_schema: pa.Schema) -> bool:
+        """Create the table (sorted by its SORTING_KEYS columns) or bring an existing one to that layout"""
+        sorting_key = self.sorting_key(table_name)
+        table = schema.table(table_name, fail_if_missing=False)
+        if table is None:
+            try:
+                schema.create_table(table_name, table_schema, sorting_key=sorting_key)
+                logger.info(f"✅ Created table '{table_name}'" + (f" sorted by {', '.join(SORTING_KEYS[table_name])}" if sorting_key else ""))
+                return True
+            except Exception as e:
+                if not sorting_key:
+                    logger.error(f"❌ Could not create table '{table_name}': {e}")
+                    return False
+                logger.warning(f"⚠️ Sorted layout not supported for '{table_name}' ({e}), creating it unsorted")
+            try:
+                schema.create_table(table_name, table_schema)
+                logger.info(f"✅ Created table '{table_name}'")
+                return True
+            except Exception as e:
+                logger.error(f"❌ Could not create table '{table_name}': {e}")
+                return False
+        
+        logger.info(f"ℹ️ Table '{table_name}' already exists")
+        if sorting_key and not table.sorted_table:
+            # Existing rows are re-sorted by VAST DB in the background
+            try:
+                table.add_sorting_key(sorting_key)
+                logger.info(f"✅ Added sorting key ({', '.join(SORTING_KEYS[table_name])}) to '{table_name}'")
+            except Exception as e:
+                logger.warning(f"⚠️ Could not add sorting key to '{table_name}', keeping unsorted layout: {e}")
+        return True
+
     def drop_tables(self) -> bool:
-        """Drop weather and air quality tables"""
+        """Drop weather and air quality tables (and their rollups and locations table)"""
         if not self._vastdb_available:
             logger.warning("⚠️ vastdb not installed; skipping drop")
             return False
@@ -135,7 +219,7 @@ class WeatherVASTDB:
             with self._conn.transaction() as tx:
                 bucket = tx.bucket(self.bucket)
                 schema = bucket.schema(self.schema)
-                tables_to_drop = ['hourly_weather', 'hourly_air_quality']
+                tables_to_drop = list(TABLE_SCHEMAS) + list(ROLLUP_SCHEMAS) + list(DIMENSION_SCHEMAS)
                 dropped_count = 0
                 for table_name in tables_to_drop:
                     try:
@@ -151,178 +235,406 @@ class WeatherVASTDB:
             logger.error(f"❌ Drop tables failed: {e}")
             return False
 
-    def ingest_location_csvs(self, loc_dir: Path, location_label: str) -> bool:
-        """Ingest CSV files for a location into VAST DB"""
+    def ingest_location_csvs(self, loc_dir: Path, location_label: str, mode: str = None) -> bool:
+        """Ingest CSV files for a location into VAST DB
+        
+        ``mode`` (default ``lab3.ingest.mode``) is ``skip`` to keep rows that
+        are already stored, or ``upsert`` to replace them with the CSV values.
+        """
+        mode = mode or self.config.get('lab3.ingest.mode', 'skip')
+        if mode not in INGEST_MODES:
+            logger.error(f"❌ Unknown ingest mode '{mode}' (expected one of {INGEST_MODES})")
+            return False
         if not self._vastdb_available:
             logger.warning("⚠️ vastdb not installed; skipping ingestion")
             return False
         if not self._connect():
             return False
+        # Every CSV batch commits on its own, so a failure keeps the batches before it
+        executor = self._executor(checkpoint=True)
+        touched = {}
+        success = True
         try:
-            with self._conn.transaction() as tx:
-                bucket = tx.bucket(self.bucket)
-                schema = bucket.schema(self.schema)
-                # Ingest weather data
-                weather_csv = loc_dir / "weather.csv"
-                if weather_csv.exists():
-                    self._ingest_csv_data(schema, weather_csv, 'hourly_weather', location_label)
-                # Ingest air quality data
-                air_csv = loc_dir / "air_quality.csv"
-                if air_csv.exists():
-                    self._ingest_csv_data(schema, air_csv, 'hourly_air_quality', location_label)
+            # Ingest weather data
+            weather_csv = loc_dir / "weather.csv"
+            if weather_csv.exists():
+                self._ingest_csv_data(executor, weather_csv, 'hourly_weather', location_label, mode, touched)
+            # Ingest air quality data
+            air_csv = loc_dir / "air_quality.csv"
+            if air_csv.exists():
+                self._ingest_csv_data(executor, air_csv, 'hourly_air_quality', location_label, mode, touched)
+        except Exception as e:
+            logger.error(f"❌ Ingestion failed (committed batches are kept, re-run to resume): {e}")
+            success = False
+        
+        # Rollups are rebuilt from the committed hourly rows, in their own transaction
+        touched = {table_name: window for table_name, window in touched.items() if window}
+        if touched:
+            self.refresh_locations(location_label, touched)
+        if touched and self.config.get('lab3.rollups.enabled', True):
+            self.refresh_rollups(location_label, touched)
+        return success
+
+    def refresh_locations(self, location_label: str, windows: dict) -> bool:
+        """Widen the stored time range of ``location_label`` in the locations table by the written windows"""
+        from ibis import _
+        
+        if not self._conn and not self._connect():
+            return False
+        
+        def record(schema, window):
+            source_table, (first, last) = window
+            table = schema.table(LOCATIONS_TABLE)
+            predicate = (_.location == location_label) & (_.source_table == source_table)
+            stored = table.select(columns=['first_time', 'last_time'], predicate=predicate,
+                                  internal_row_id=True).read_all()
+            if stored.num_rows:
+                first = min(first, pc.min(stored.column('first_time')).as_py())
+                last = max(last, pc.max(stored.column('last_time')).as_py())
+                table.delete(stored)
+            table.insert(pa.table({
+                'location': [location_label], 'source_table': [source_table],
+                'first_time': [first], 'last_time': [last],
+            }, schema=LOCATIONS_SCHEMA))
+        
+        try:
+            self._executor().map(record, windows.items())
             return True
         except Exception as e:
-            logger.error(f"❌ Ingestion failed: {e}")
+            logger.warning(f"⚠️ Locations table update failed for {location_label} (run vastdb_manager.py --rebuild-rollups): {e}")
             return False
 
+    def get_data_summary(self):
+        """Row counts and distinct locations of the hourly tables (None on failure), see ``summarize``"""
+        if not self._vastdb_available:
+            logger.warning("⚠️ vastdb not installed; skipping summary")
+            return None
+        if not self._conn and not self._connect():
+            return None
+        try:
+            with self._conn.transaction() as tx:
+                return self.summarize(tx.bucket(self.bucket).schema(self.schema))
+        except Exception as e:
+            logger.error(f"❌ Data summary failed: {e}")
+            return None
 
-    def _ingest_csv_data(self, schema, csv_path: Path, table_name: str, location_label: str):
-        """Ingest CSV data into VAST DB table with duplicate filtering"""
+    def summarize(self, schema) -> dict:
+        """``{'rows': {hourly table: row count}, 'locations': [...], 'locations_source': ...}``
+        
+        Row counts come from the table statistics and locations from the
+        locations table, so the cost does not grow with the hourly data.
+        When the locations table is missing or does not cover every
+        non-empty hourly table (data ingested before it existed), distinct
+        locations are computed by streaming the location column instead.
+        """
+        rows = {table_name: self._row_count(schema.table(table_name)) for table_name in TABLE_SCHEMAS}
+        locations = None
         try:
-            table = schema.table(table_name)
+            stored = schema.table(LOCATIONS_TABLE).select(columns=['location', 'source_table']).read_all()
+            covered = set(stored.column('source_table').to_pylist())
+            if all(table_name in covered for table_name, count in rows.items() if count):
+                locations = sorted(pc.unique(stored.column('location')).to_pylist())
         except Exception as e:
-            logger.warning(f"⚠️ Table {table_name} does not exist, recreating infrastructure...")
-            if not self.setup_infrastructure(dry_run=False):
-                logger.error(f"❌ Failed to recreate infrastructure for {table_name}")
-                return
-            table = schema.table(table_name)
+            logger.info(f"ℹ️ Locations table unavailable, scanning location columns: {e}")
+        if locations is not None:
+            return {'rows': rows, 'locations': locations, 'locations_source': LOCATIONS_TABLE}
         
-        # Load CSV data
-        header, rows = self._load_csv(csv_path)
-        if not rows:
-            logger.warning(f"⚠️ No data in {csv_path}")
-            return
+        distinct = set()
+        for table_name in TABLE_SCHEMAS:
+            distinct |= self._distinct_locations(schema.table(table_name))
+        return {'rows': rows, 'locations': sorted(distinct), 'locations_source': 'scan'}
+
+    @staticmethod
+    def _row_count(table) -> int:
+        """Row count from the table statistics, counted from a one-column scan if stats are unavailable"""
+        try:
+            return int(table.get_stats().num_rows)
+        except Exception as e:
+            logger.info(f"ℹ️ Table stats unavailable, counting rows: {e}")
+            return sum(batch.num_rows for batch in table.select(columns=['location']))
+
+    @staticmethod
+    def _distinct_locations(table) -> set:
+        """Distinct locations streamed batch by batch (only the unique values of each batch are kept)"""
+        distinct = set()
+        for batch in table.select(columns=['location']):
+            distinct.update(pc.unique(batch.column('location')).to_pylist())
+        distinct.discard(None)
+        return distinct
+
+    def refresh_rollups(self, location_label: str, windows: dict) -> bool:
+        """Recompute the daily and monthly rollups of ``location_label`` for the touched windows
         
-        # Parse columns based on table type
-        if table_name == 'hourly_weather':
-            col_map = {
-                'time': 'time',
-                'location': 'location',
-                'temperature_2m': 'temperature_2m',
-                'relative_humidity_2m': 'relative_humidity_2m',
-                'surface_pressure': 'surface_pressure',
-                'wind_speed_10m': 'wind_speed_10m',
-                'wind_direction_10m': 'wind_direction_10m',
-                'precipitation': 'precipitation',
-            }
-        else:
-            col_map = {
-                'time': 'time',
-                'location': 'location',
-                'pm10': 'pm10',
-                'pm2_5': 'pm2_5',
-                'nitrogen_dioxide': 'nitrogen_dioxide',
-                'ozone': 'ozone',
-                'sulphur_dioxide': 'sulphur_dioxide',
-            }
+        ``windows`` maps an hourly table name to the (min, max) time written.
+        Every month overlapping the window is re-aggregated from its hourly
+        rows, so the cost is proportional to the new data, not the table.
+        """
+        if not self._conn and not self._connect():
+            return False
         
-        data, times = self._parse_csv_columns(header, rows, col_map, location_label)
-        if not data:
-            logger.warning(f"⚠️ No valid data parsed from {csv_path}")
-            return
+        def refresh(schema, window):
+            source_table, (start, end) = window
+            lo, hi = period_start(start, 'month'), next_period(end, 'month')
+            hourly = self._read_hourly(schema.table(source_table), source_table, location_label, lo, hi)
+            for granularity in GRANULARITIES:
+                self._replace_rollup_rows(schema, source_table, granularity, hourly, location_label, lo, hi)
         
-        logger.info(f"🔍 Parsed data columns: {list(data.keys())}")
-        logger.info(f"🔍 Sample data: {[(k, len(v)) for k, v in data.items()]}")
+        try:
+            # One transaction per hourly table: a retry recomputes only that table's rollups
+            self._executor().map(refresh, windows.items())
+            logger.info(f"✅ Refreshed rollups for {location_label}")
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Rollup refresh failed for {location_label} (run vastdb_manager.py --rebuild-rollups): {e}")
+            return False
+
+    def rebuild_rollups(self) -> bool:
+        """Recompute every rollup table and the locations table from the full hourly tables (backfill for existing data)"""
+        if not self._vastdb_available:
+            logger.warning("⚠️ vastdb not installed; skipping rollup rebuild")
+            return False
+        if not self._connect():
+            return False
         
-        # Insert with duplicate filtering
-        self._insert_with_duplicate_filtering(table, data, times, location_label)
-
-    def _load_csv(self, path: Path) -> Tuple[List[str], List[List[str]]]:
-        """Load CSV file and return header and rows"""
-        import csv
-        with open(path, 'r', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            header = next(reader)
-            rows = list(reader)
-        return header, rows
-
-    def _parse_csv_columns(self, header: List[str], rows: List[List[str]], 
-                          col_map: Dict[str, str], location_label: str) -> Tuple[Dict, List[datetime]]:
-        """Parse CSV columns into PyArrow-compatible format"""
-        def get_index(key):
-            try:
-                return header.index(key)
-            except ValueError:
-                return None
+        def rebuild(schema, source_table):
+            hourly = self._read_hourly(schema.table(source_table), source_table)
+            logger.info(f"📊 Rolling up {hourly.num_rows:,} rows of {source_table}")
+            for granularity in GRANULARITIES:
+                self._replace_rollup_rows(schema, source_table, granularity, hourly)
+            self._replace_location_rows(schema, source_table, hourly)
         
-        def parse_float(v):
-            try:
-                return float(v) if v and v != 'null' else None
-            except (ValueError, TypeError):
-                return None
+        try:
+            self._executor().map(rebuild, TABLE_SCHEMAS)
+            logger.info("✅ Rebuilt rollup and locations tables")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Rollup rebuild failed: {e}")
+            return False
+
+    def _read_hourly(self, table, source_table: str, location_label: str = None, start=None, end=None) -> pa.Table:
+        """Hourly rows of one location in [start, end) (everything when no filter is given)"""
+        from ibis import _
         
-        data = {col: [] for col in col_map.values()}
-        times = []
+        predicate = None
+        if location_label is not None:
+            predicate = (_.location == location_label) & (_.time >= start) & (_.time < end)
+        columns = ['location', 'time'] + metric_columns(TABLE_SCHEMAS[source_table])
+        return table.select(columns=columns, predicate=predicate).read_all()
+
+    def _replace_rollup_rows(self, schema, source_table: str, granularity: str, hourly: pa.Table,
+                             location_label: str = None, start=None, end=None):
+        """Delete the stored rollup rows of the window and insert ones computed from ``hourly``"""
+        from ibis import _
         
-        for row in rows:
-            if len(row) < len(header):
-                continue
-            time_idx = get_index('time')
-            if time_idx is None:
-                continue
-            try:
-                time_val = datetime.fromisoformat(row[time_idx].replace('Z', '+00:00'))
-                times.append(time_val)
-                for col, key in col_map.items():
-                    if col == 'time':
-                        data[col].append(time_val)
-                    elif col == 'location':
-                        data[col].append(location_label)
-                    else:
-                        idx = get_index(key)
-                        if idx is not None:
-                            data[col].append(parse_float(row[idx]))
-                        else:
-                            data[col].append(None)
-            except (ValueError, TypeError):
-                continue
+        table_name = rollup_table_name(source_table, granularity)
+        table = schema.table(table_name)
+        predicate = None
+        if location_label is not None:
+            predicate = (_.location == location_label) & (_.period >= start) & (_.period < end)
+        stored = table.select(columns=['period'], predicate=predicate, internal_row_id=True).read_all()
+        if stored.num_rows:
+            table.delete(stored)
+        
+        rollup = compute_rollup(hourly, metric_columns(TABLE_SCHEMAS[source_table]), granularity, ROLLUP_SCHEMAS[table_name])
+        if rollup.num_rows:
+            table.insert(rollup)
+
+    def _replace_location_rows(self, schema, source_table: str, hourly: pa.Table):
+        """Replace the locations table rows of ``source_table`` with the ranges found in ``hourly``"""
+        from ibis import _
+        
+        table = schema.table(LOCATIONS_TABLE)
+        stored = table.select(columns=['location'], predicate=(_.source_table == source_table), internal_row_id=True).read_all()
+        if stored.num_rows:
+            table.delete(stored)
         
-        return data, times
+        ranges = hourly.group_by('location').aggregate([('time', 'min'), ('time', 'max')])
+        if ranges.num_rows:
+            table.insert(pa.table({
+                'location': ranges.column('location'),
+                'source_table': pa.array([source_table] * ranges.num_rows, pa.utf8()),
+                'first_time': ranges.column('time_min'),
+                'last_time': ranges.column('time_max'),
+            }, schema=LOCATIONS_SCHEMA))
 
-    def _insert_with_duplicate_filtering(self, table, data: Dict, times: List[datetime], 
-                                       location_label: str):
-        """Insert data with duplicate filtering using pre-query approach"""
+    def _ingest_csv_data(self, executor: BatchExecutor, csv_path: Path, table_name: str, location_label: str,
+                         mode: str = 'skip', touched: dict = None):
+        """Stream a CSV into a VAST DB table, one executor batch (and transaction) per RecordBatch
+        
+        Each batch is checked only against the rows stored for the same
+        location inside the batch's time window (see ``_stored_rows``), so
+        the cost follows the size of the new data, not of the table. That
+        check also makes a batch idempotent: a retried or resumed batch
+        skips (or replaces) the rows it already wrote. Batches recorded in
+        the executor's checkpoint are not sent again.
+        Returns the (min, max) time of the rows written, or None; ``touched``
+        is updated after every committed batch so a failure part-way through
+        still reports what was written.
+        """
+        touched = {} if touched is None else touched
         try:
-            # Pre-query existing data to check for duplicates
-            logger.info(f"🔍 Checking existing data for {location_label}...")
-            reader = table.select(columns=['time', 'location'])
-            existing_times = set()
-            total_rows = 0
-            for batch in reader:
-                df = batch.to_pandas()
-                total_rows += len(df)
-                # Filter by location in pandas (more efficient than processing all rows)
-                location_data = df[df['location'] == location_label]
-                if len(location_data) > 0:
-                    existing_times.update(location_data['time'].tolist())
-            
-            logger.info(f"🔍 Query returned {total_rows} total rows, found {len(existing_times)} existing timestamps for {location_label}")
+            executor.run(lambda schema: schema.table(table_name))
+        except Exception as e:
+            logger.warning(f"⚠️ Table {table_name} does not exist, recreating infrastructure...")
+            if not self.setup_infrastructure(dry_run=False):
+                logger.error(f"❌ Failed to recreate infrastructure for {table_name}")
+                return None
+        
+        table_schema = TABLE_SCHEMAS[table_name]
+        try:
+            reader = self._open_csv(csv_path, table_schema)
+            stat = csv_path.stat()
+        except Exception as e:
+            logger.warning(f"⚠️ Could not read {csv_path}: {e}")
+            return None
+        # A changed file gets new batch keys, so stale progress is never reused
+        job = f"{table_name}|{location_label}|{mode}|{csv_path.resolve()}|{stat.st_size}|{stat.st_mtime_ns}|"
+        
+        def write(schema, batch, written):
+            """Insert one batch; ``written`` keeps the most rows any attempt wrote
             
-            # Filter out duplicates
-            new_data = {col: [] for col in data.keys()}
-            new_times = []
-            for i, time_val in enumerate(times):
-                # Compare raw timestamp values
-                if time_val not in existing_times:
-                    for col in data.keys():
-                        new_data[col].append(data[col][i])
-                    new_times.append(time_val)
+            A commit can fail after the server applied it, in which case the
+            retry finds every row already stored; the batch still counts as
+            written so its rollups get refreshed.
+            """
+            table = schema.table(table_name)
+            replaced = 0
+            stored = self._stored_rows(table, location_label, batch.column('time'), with_row_ids=(mode == 'upsert'))
+            if stored.num_rows:
+                if mode == 'upsert':
+                    # Replace the stored rows this batch has new values for
+                    overlap = stored.filter(pc.is_in(stored.column('time'), value_set=batch.column('time')))
+                    if overlap.num_rows:
+                        table.delete(overlap)
+                        replaced = overlap.num_rows
+                else:
+                    # Anti-join: keep only timestamps that are not stored yet
+                    batch = batch.filter(pc.invert(pc.is_in(batch.column('time'), value_set=stored.column('time'))))
             
-            logger.info(f"🔍 Processing {len(times)} timestamps, {len(new_times)} are new")
+            if batch.num_rows:
+                # Insert in sorting key order (the batch holds a single location)
+                table.insert(batch.sort_by('time'))
+            written['inserted'] = max(written['inserted'], batch.num_rows)
+            written['replaced'] = max(written['replaced'], replaced)
+        
+        try:
+            parsed = 0
+            inserted = 0
+            replaced = 0
+            resumed = 0
+            for index, batch in enumerate(reader):
+                batch = self._to_table_batch(batch, table_schema, location_label)
+                if not batch.num_rows:
+                    continue
+                parsed += batch.num_rows
+                
+                key = f"{job}{index}"
+                if executor.is_done(key):
+                    # Committed by an earlier, interrupted run; its window still needs rollups
+                    resumed += batch.num_rows
+                    batch_inserted = batch.num_rows
+                else:
+                    written = {'inserted': 0, 'replaced': 0}
+                    executor.run(lambda schema, batch=batch: write(schema, batch, written), key)
+                    batch_inserted = written['inserted']
+                    inserted += batch_inserted
+                    replaced += written['replaced']
+                
+                if batch_inserted:
+                    bounds = pc.min_max(batch.column('time'))
+                    start, end = bounds['min'].as_py(), bounds['max'].as_py()
+                    window = touched.get(table_name)
+                    touched[table_name] = (start, end) if window is None else (min(window[0], start), max(window[1], end))
             
-            if not new_times:
+            if executor.checkpoint is not None:
+                executor.checkpoint.discard_prefix(job)
+            if resumed:
+                logger.info(f"⏭️ Resumed {location_label} {table_name}: {resumed} records were committed by an earlier run")
+            if parsed == 0:
+                logger.warning(f"⚠️ No valid data parsed from {csv_path}")
+            elif inserted == 0 and not resumed:
                 logger.info(f"ℹ️ All data for {location_label} already exists, skipping")
-                return
-            
-            logger.info(f"📊 Inserting {len(new_times)} new records for {location_label}")
-            
-            # Create PyArrow table
-            arrow_table = pa.Table.from_pydict(new_data)
-            table.insert(arrow_table)
-            logger.info(f"✅ Successfully inserted {len(new_times)} records for {location_label}")
-            
+            elif replaced:
+                logger.info(f"✅ Upserted {inserted} records for {location_label} into {table_name} ({replaced} replaced)")
+            else:
+                logger.info(f"✅ Successfully inserted {inserted} of {parsed} records for {location_label} into {table_name}")
+            return touched.get(table_name)
         except Exception as e:
             logger.error(f"❌ Insert failed for {location_label}: {e}")
+            raise
+
+    def _open_csv(self, path: Path, table_schema: pa.Schema) -> pa.RecordBatchReader:
+        """Streaming CSV reader returning every table column as text
+        
+        Columns missing from the file come back as nulls and '', 'null' and
+        'NaN' are nulls. Values are converted by ``_to_table_batch``, so a
+        bad cell only loses that value (or its row, for a bad time) instead
+        of failing the whole file as Arrow's typed conversion would.
+        """
+        value_fields = [field for field in table_schema if field.name != 'location']
+        block_size = int(self.config.get('lab3.ingest.csv_block_size_mb', 4) * 1024 * 1024)
+        return pacsv.open_csv(
+            path,
+            read_options=pacsv.ReadOptions(block_size=block_size),
+            parse_options=pacsv.ParseOptions(invalid_row_handler=lambda row: 'skip'),
+            convert_options=pacsv.ConvertOptions(
+                column_types={field.name: pa.utf8() for field in value_fields},
+                include_columns=[field.name for field in value_fields],
+                include_missing_columns=True,
+                null_values=CSV_NULL_VALUES,
+                strings_can_be_null=True,
+            ),
+        )
+
+    @staticmethod
+    def _parse_times(values: pa.Array) -> pa.Array:
+        """ISO-8601 text (Open-Meteo writes 2024-01-01T00:00) to timestamp[us]; unparseable times are null"""
+        values = pc.replace_substring_regex(pc.utf8_trim_whitespace(values), 'Z$', '')
+        return pc.coalesce(*[pc.strptime(values, format=time_format, unit='us', error_is_null=True)
+                             for time_format in CSV_TIME_FORMATS])
+
+    @staticmethod
+    def _parse_numbers(values: pa.Array, value_type: pa.DataType) -> pa.Array:
+        """Numeric text to ``value_type``; cells that are not numbers become null"""
+        values = pc.utf8_trim_whitespace(values)
+        valid = pc.match_substring_regex(values, CSV_NUMBER_PATTERN)
+        return pc.if_else(valid, values, pa.scalar(None, pa.utf8())).cast(value_type)
+
+    def _to_table_batch(self, batch: pa.RecordBatch, table_schema: pa.Schema, location_label: str) -> pa.RecordBatch:
+        """Convert the text columns, drop rows without a valid time and lay the batch out in table column order"""
+        columns = {}
+        for field in table_schema:
+            if field.name == 'location':
+                continue
+            values = batch.column(field.name)
+            if pa.types.is_timestamp(field.type):
+                columns[field.name] = self._parse_times(values)
+            else:
+                columns[field.name] = self._parse_numbers(values, field.type)
+        
+        valid = pc.is_valid(columns['time'])
+        columns = {name: column.filter(valid) for name, column in columns.items()}
+        num_rows = len(columns['time'])
+        location = pa.repeat(pa.scalar(location_label, table_schema.field('location').type), num_rows)
+        arrays = [location if field.name == 'location' else columns[field.name] for field in table_schema]
+        return pa.RecordBatch.from_arrays(
+            [column.cast(field.type) for column, field in zip(arrays, table_schema)], schema=table_schema
+        )
+
+    def _stored_rows(self, table, location_label: str, times: pa.Array, with_row_ids: bool = False) -> pa.Table:
+        """Stored ``time`` values for a location within the [min, max] window of ``times``
+        
+        The location and time range are pushed down to VAST DB as a
+        predicate, so only the overlapping window is read back. With
+        ``with_row_ids`` the result also carries ``$row_id`` for deletes.
+        """
+        from ibis import _
+        
+        bounds = pc.min_max(times)
+        start, end = bounds['min'].as_py(), bounds['max'].as_py()
+        predicate = (_.location == location_label) & (_.time >= start) & (_.time <= end)
+        reader = table.select(columns=['time'], predicate=predicate, internal_row_id=with_row_ids)
+        return reader.read_all()
 
     def _vastpy_bootstrap_bucket(self) -> bool:
         """Bootstrap bucket using vastpy (VMS API)"""
@@ -11,7 +11,7 @@ import logging
 import time
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import argparse
 import requests
@@ -31,10 +31,12 @@ GEOCODE_URL = "https://geocoding-api.open-meteo.com/v1/search"
 WEATHER_URL = "https://archive-api.open-meteo.com/v1/archive"
 AIR_QUALITY_URL = "https://air-quality-api.open-meteo.com/v1/air-quality"
 
+WEATHER_HOURLY = "temperature_2m,relative_humidity_2m,surface_pressure,wind_speed_10m,wind_direction_10m,precipitation"
+AIR_QUALITY_HOURLY = "pm10,pm2_5,nitrogen_dioxide,ozone,sulphur_dioxide"
 
-def geocode_location(name_or_coords: str) -> Tuple[float, float, str]:
-    """Resolve city name or "lat,lon" string to (lat, lon, label)."""
-    name_or_coords = name_or_coords.strip()
+
+def parse_coordinates(name_or_coords: str) -> Optional[Tuple[float, float, str]]:
+    """Parse a "lat,lon" string to (lat, lon, label), or None for city names."""
     if "," in name_or_coords:
         try:
             lat_str, lon_str = [p.strip() for p in name_or_coords.split(",", 1)]
@@ -42,11 +44,24 @@ def geocode_location(name_or_coords: str) -> Tuple[float, float, str]:
             return lat, lon, f"{lat:.4f},{lon:.4f}"
         except Exception:
             pass
+    return None
+
+
+def geocode_location(name_or_coords: str) -> Tuple[float, float, str]:
+    """Resolve city name or "lat,lon" string to (lat, lon, label)."""
+    name_or_coords = name_or_coords.strip()
+    coords = parse_coordinates(name_or_coords)
+    if coords:
+        return coords
 
     params = {"name": name_or_coords, "count": 1}
     r = requests.get(GEOCODE_URL, params=params, timeout=20)
     r.raise_for_status()
-    data = r.json()
+    return parse_geocode_response(name_or_coords, r.json())
+
+
+def parse_geocode_response(name_or_coords: str, data: Dict) -> Tuple[float, float, str]:
+    """Turn an Open-Meteo geocoding response into (lat, lon, label)."""
     if not data.get("results"):
         raise ValueError(f"No geocoding results for '{name_or_coords}'")
     res = data["results"][0]
@@ -98,7 +113,7 @@ def fetch_weather(lat: float, lon: float, start: str, end: str) -> Dict:
         "longitude": lon,
         "start_date": start,
         "end_date": end,
-        "hourly": "temperature_2m,relative_humidity_2m,surface_pressure,wind_speed_10m,wind_direction_10m,precipitation",
+        "hourly": WEATHER_HOURLY,
         "timezone": "UTC"
     }
     return _make_api_request(WEATHER_URL, params)
@@ -111,7 +126,7 @@ def fetch_air_quality(lat: float, lon: float, start: str, end: str) -> Dict:
         "longitude": lon,
         "start_date": start,
         "end_date": end,
-        "hourly": "pm10,pm2_5,nitrogen_dioxide,ozone,sulphur_dioxide",
+        "hourly": AIR_QUALITY_HOURLY,
         "timezone": "UTC"
     }
     return _make_api_request(AIR_QUALITY_URL, params)
@@ -165,6 +180,9 @@ def main():
     parser.add_argument("--end", required=True, help="End date (YYYY-MM-DD)")
     parser.add_argument("--output-dir", default="weather_data", help="Output directory for CSV files")
     parser.add_argument("--no-download", action="store_true", help="Skip downloading, just process existing CSV files")
+    parser.add_argument("--concurrent", action="store_true", help="Download all locations concurrently (chunked, rate limited, cached)")
+    parser.add_argument("--base-url", help="Send --concurrent requests to this Open-Meteo compatible server (e.g. fake_open_meteo.py)")
+    parser.add_argument("--upsert", action="store_true", help="Replace rows already stored for a location/time instead of skipping them")
     
     args = parser.parse_args()
     
@@ -197,17 +215,32 @@ def main():
     output_dir = Path(args.output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
     
+    # Download every location up front when running concurrently
+    downloaded = {}
+    if args.concurrent and not args.no_download:
+        from lab3.async_weather_downloader import AsyncWeatherDownloader
+        downloader = AsyncWeatherDownloader.from_config(config, base_url=args.base_url)
+        downloaded = downloader.download(locations, args.start, args.end, output_dir)
+    
     # Process each location
     for i, location in enumerate(locations, 1):
         logger.info(f"🌍 Processing {location} ({i}/{len(locations)})")
         
         try:
-            # Geocode location
-            lat, lon, label = geocode_location(location)
-            logger.info(f"📍 {location} -> {lat:.4f}, {lon:.4f} ({label})")
+            if args.concurrent and not args.no_download:
+                label = downloaded.get(location)
+                if not label:
+                    logger.warning(f"⚠️ Download failed for {location}, skipping ingestion")
+                    continue
+            else:
+                # Geocode location
+                lat, lon, label = geocode_location(location)
+                logger.info(f"📍 {location} -> {lat:.4f}, {lon:.4f} ({label})")
             
-            # Download data if not skipping
-            if not args.no_download:
+            # Download data if not skipping (--concurrent already downloaded everything)
+            if args.no_download:
+                logger.info(f"⏭️ Skipping download for {label} (--no-download)")
+            elif not args.concurrent:
                 logger.info(f"🌤️ Downloading weather data for {label}...")
                 weather = fetch_weather(lat, lon, args.start, args.end)
                 
@@ -216,8 +249,6 @@ def main():
                 
                 # Save to CSV files
                 save_weather_csvs(output_dir, label, weather, air)
-            else:
-                logger.info(f"⏭️ Skipping download for {label} (--no-download)")
             
             # Ingest to VAST DB (always try to ingest existing data)
             from lab3.weather_database import WeatherVASTDB
@@ -230,12 +261,12 @@ def main():
                 loc_dir = output_dir / label
                 if loc_dir.exists():
                     logger.info(f"📊 Ingesting {label} data to VAST DB...")
-                    db.ingest_location_csvs(loc_dir, label)
+                    db.ingest_location_csvs(loc_dir, label, mode='upsert' if args.upsert else None)
                 else:
                     logger.warning(f"⚠️ No data directory found for {label}")
             
             # Rate limiting between cities (after all operations, before next API call)
-            if not args.no_download and i < len(locations):
+            if not args.no_download and not args.concurrent and i < len(locations):
                 logger.info("⏳ Waiting 60s before next city (respecting 600 calls/min limit)...")
                 time.sleep(60)
         
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Weather Query Layer
+Columnar reads and aggregates over the hourly weather tables: location and
+time filters are pushed down to VAST DB, only the needed columns are fetched,
+and per-location statistics are computed with Arrow/pandas group-bys instead
+of per-row Python loops
+"""
+
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from lab3.batch_executor import BatchExecutor, split_values, split_window
+from lab3.weather_database import LOCATIONS_TABLE
+from lab3.weather_rollups import combine_rollups, compute_rollup, plan_window, rollup_table_name, stale_locations
+
+logger = logging.getLogger(__name__)
+
+WEATHER_TABLE = 'hourly_weather'
+AIR_QUALITY_TABLE = 'hourly_air_quality'
+
+# Consecutive readings further apart than this start a new episode
+EPISODE_GAP = pd.Timedelta(hours=1)
+
+
+def resolve_database_names(config) -> Tuple[str, str]:
+    """(bucket, schema) using the same derivation as weather_database.py"""
+    view_path_cfg = config.get('lab3.database.view_path', f"/{config.get('lab3.database.name', 'weather_analytics')}")
+    bucket_name = config.get('lab3.database.bucket_name', view_path_cfg.lstrip('/').replace('/', '-'))
+    schema_name = config.get('lab3.database.schema', 'weather_analytics')
+    return bucket_name, schema_name
+
+
+def build_predicate(locations: Optional[Sequence[str]] = None, start: Optional[datetime] = None,
+                    end: Optional[datetime] = None, time_column: str = 'time'):
+    """ibis predicate for ``location IN locations AND time BETWEEN start AND end`` (None when unfiltered)"""
+    from ibis import _
+    
+    time = getattr(_, time_column)
+    terms = []
+    if locations:
+        locations = list(locations)
+        terms.append(_.location == locations[0] if len(locations) == 1 else _.location.isin(locations))
+    if start is not None:
+        terms.append(time >= start)
+    if end is not None:
+        terms.append(time <= end)
+
+    predicate = None
+    for term in terms:
+        predicate = term if predicate is None else predicate & term
+    return predicate
+
+
+class WeatherQuery:
+    """Shared query layer for the weather analytics
+
+    Every method runs one projected, predicate-filtered scan covering all
+    requested locations at once and aggregates the result vectorized. Large
+    scans are read as batches of locations and time windows, each in its
+    own transaction, so a transient error re-reads one batch, not the scan.
+    """
+
+    def __init__(self, conn, config):
+        self.conn = conn
+        self.bucket_name, self.schema_name = resolve_database_names(config)
+        self.use_rollups = config.get('lab3.rollups.enabled', True)
+        self.rows_read = 0
+        self._rows_read_lock = threading.Lock()
+        self.executor = BatchExecutor.from_config(config, conn.transaction)
+        self.batch_locations = config.get('lab3.executor.read_batch_locations', 16)
+        self.batch_days = config.get('lab3.executor.read_batch_days', 366)
+        # table name -> (rows, start, end, locations) loaded once by preload() and shared by every analysis
+        self._preloaded: Dict[str, Tuple[pa.Table, Optional[datetime], Optional[datetime],
+                                         Optional[frozenset]]] = {}
+
+    def preload(self, table_name: str, columns: Sequence[str], start: Optional[datetime] = None,
+                end: Optional[datetime] = None, locations: Optional[Sequence[str]] = None) -> pa.Table:
+        """Run one projected scan and serve later ``scan`` calls inside it from memory
+
+        Any scan of ``table_name`` whose columns, window and locations fall
+        inside the preloaded ones is answered by filtering the cached Arrow
+        table, so several analyses share a single read. Rollups are skipped for it.
+        """
+        data = self.scan(table_name, columns, locations, start, end)
+        self._preloaded[table_name] = (data, start, end, frozenset(locations) if locations else None)
+        return data
+
+    def _from_preloaded(self, table_name: str, columns: Sequence[str], locations: Optional[Sequence[str]],
+                        start: Optional[datetime], end: Optional[datetime]) -> Optional[pa.Table]:
+        if not self._covers(table_name, start, end):
+            return None
+        data, _, _, loaded_locations = self._preloaded[table_name]
+        if not set(columns) <= set(data.column_names):
+            return None
+        if loaded_locations is not None and not (locations and set(locations) <= loaded_locations):
+            return None
+        mask = None
+        if locations:
+            mask = pc.is_in(data.column('location'), value_set=pa.array(list(locations), pa.utf8()))
+        for op, bound in ((pc.greater_equal, start), (pc.less_equal, end)):
+            if bound is not None:
+                term = op(data.column('time'), pa.scalar(bound, data.schema.field('time').type))
+                mask = term if mask is None else pc.and_(mask, term)
+        data = data.filter(mask) if mask is not None else data
+        return data.select(list(columns))
+
+    def _covers(self, table_name: str, start: Optional[datetime], end: Optional[datetime]) -> bool:
+        """True when the preloaded rows of ``table_name`` contain the whole [start, end] window"""
+        if table_name not in self._preloaded:
+            return False
+        _, loaded_start, loaded_end, _ = self._preloaded[table_name]
+        starts_inside = loaded_start is None or (start is not None and start >= loaded_start)
+        ends_inside = loaded_end is None or (end is not None and end <= loaded_end)
+        return starts_inside and ends_inside
+
+    def scan(self, table_name: str, columns: Sequence[str], locations: Optional[Sequence[str]] = None,
+             start: Optional[datetime] = None, end: Optional[datetime] = None,
+             time_column: str = 'time') -> pa.Table:
+        """Fetch ``location``, ``time_column`` and ``columns`` for the matching rows"""
+        columns = list(dict.fromkeys(['location', time_column, *columns]))
+        if time_column == 'time':
+            preloaded = self._from_preloaded(table_name, columns, locations, start, end)
+            if preloaded is not None:
+                return preloaded
+        
+        def read(tx, piece):
+            group, lo, hi = piece
+            table = tx.bucket(self.bucket_name).schema(self.schema_name).table(table_name)
+            return table.select(columns=columns, predicate=build_predicate(group, lo, hi, time_column)).read_all()
+        
+        pieces = [(group, lo, hi) for group in split_values(locations, self.batch_locations)
+                  for lo, hi in split_window(start, end, self.batch_days)]
+        parts = self.executor.map(read, pieces)
+        data = parts[0] if len(parts) == 1 else pa.concat_tables(parts)
+        with self._rows_read_lock:
+            self.rows_read += data.num_rows
+        return data
+
+    def location_stats(self, table_name: str, columns: Sequence[str], locations: Optional[Sequence[str]] = None,
+                       start: Optional[datetime] = None, end: Optional[datetime] = None,
+                       thresholds: Optional[Dict[str, float]] = None) -> pd.DataFrame:
+        """Per-location mean, max and valid-reading count of each column
+
+        For every column in ``thresholds`` an ``<column>_hours_over`` count of
+        readings above the threshold is added (hourly data only). Without
+        thresholds the stats come from the rollup tables where they cover
+        the stored hours (see ``_rollup_rows``). Indexed by location.
+        """
+        if not thresholds and self._can_use_rollups(table_name, start, end):
+            try:
+                rollups = self._rollup_rows(table_name, columns, locations, start, end, ('month', 'day'))
+                return combine_rollups(rollups, columns)
+            except Exception as e:
+                logger.warning(f"⚠️ Rollups unavailable for {table_name}, reading hourly rows: {e}")
+        data = self.scan(table_name, columns, locations, start, end)
+        return self.aggregate_by_location(data, columns, thresholds)
+
+    @staticmethod
+    def aggregate_by_location(data: pa.Table, columns: Sequence[str],
+                              thresholds: Optional[Dict[str, float]] = None) -> pd.DataFrame:
+        thresholds = thresholds or {}
+        aggregations = []
+        for column in columns:
+            aggregations += [(column, 'mean'), (column, 'max'), (column, 'count')]
+        for column, limit in thresholds.items():
+            data = data.append_column(f'{column}_over', pc.cast(pc.greater(data.column(column), limit), pa.int64()))
+            aggregations.append((f'{column}_over', 'sum'))
+
+        grouped = data.group_by('location').aggregate(aggregations).to_pandas()
+        grouped = grouped.rename(columns={f'{column}_over_sum': f'{column}_hours_over' for column in thresholds})
+        for column in thresholds:
+            grouped[f'{column}_hours_over'] = grouped[f'{column}_hours_over'].fillna(0).astype(int)
+        return grouped.set_index('location').sort_index()
+
+    def daily_means(self, table_name: str, columns: Sequence[str], locations: Optional[Sequence[str]] = None,
+                    start: Optional[datetime] = None, end: Optional[datetime] = None) -> pd.DataFrame:
+        """Mean of each column per (location, UTC day)"""
+        if self._can_use_rollups(table_name, start, end):
+            try:
+                rollups = self._rollup_rows(table_name, columns, locations, start, end, ('day',))
+                daily = rollups.select(['location', 'period'] + [f'{column}_mean' for column in columns])
+                daily = daily.rename_columns(['location', 'day'] + list(columns)).to_pandas()
+                # Partial edge days come from hourly rows and may share a day with each other
+                return daily.groupby(['location', 'day']).mean().sort_index()
+            except Exception as e:
+                logger.warning(f"⚠️ Rollups unavailable for {table_name}, reading hourly rows: {e}")
+        data = self.scan(table_name, columns, locations, start, end)
+        data = data.append_column('day', pc.floor_temporal(data.column('time'), unit='day'))
+        grouped = data.group_by(['location', 'day']).aggregate([(column, 'mean') for column in columns])
+        grouped = grouped.rename_columns([name.removesuffix('_mean') for name in grouped.column_names])
+        return grouped.to_pandas().set_index(['location', 'day']).sort_index()
+
+    def _can_use_rollups(self, table_name: str, start: Optional[datetime], end: Optional[datetime]) -> bool:
+        return (bool(self.use_rollups) and start is not None and end is not None
+                and not self._covers(table_name, start, end))
+
+    def _rollup_rows(self, table_name: str, columns: Sequence[str], locations: Optional[Sequence[str]],
+                     start: datetime, end: datetime, granularities: Sequence[str]) -> pa.Table:
+        """Rollup rows covering [start, end]: whole periods from the rollup tables, the rest from hourly rows
+        
+        A whole period is only taken from a rollup table for locations whose
+        rollup hours match the range in the locations table; empty or stale
+        rollups (e.g. a failed refresh) are recomputed from the hourly rows.
+        """
+        stats = [f'{column}_{stat}' for column in columns for stat in ('min', 'max', 'mean', 'count')]
+        ranges = self._stored_ranges(table_name, locations)
+        unranged = sorted(set(locations or ()) - set(ranges.column('location').to_pylist()))
+        parts = []
+        for granularity, lo, hi in plan_window(start, end + timedelta(microseconds=1), granularities):
+            last = hi - timedelta(microseconds=1)
+            hourly_locations = locations
+            if granularity is not None:
+                rollup_name = rollup_table_name(table_name, granularity)
+                rollup = self.scan(rollup_name, ['hours'] + stats, locations, lo, last, time_column='period')
+                hourly_locations = stale_locations(rollup, ranges, lo, hi) + unranged
+                if hourly_locations:
+                    logger.info(f"ℹ️ {rollup_name} does not cover {len(hourly_locations)} location(s) "
+                                f"from {lo:%Y-%m-%d} to {last:%Y-%m-%d}, reading hourly rows")
+                    stale = pa.array(hourly_locations, pa.utf8())
+                    rollup = rollup.filter(pc.invert(pc.is_in(rollup.column('location'), value_set=stale)))
+                parts.append(rollup.select(['location', 'period'] + stats))
+                if not hourly_locations:
+                    continue
+            hourly = self.scan(table_name, columns, hourly_locations, lo, last)
+            parts.append(compute_rollup(hourly, columns, 'day').select(['location', 'period'] + stats))
+        return pa.concat_tables([part.cast(parts[0].schema) for part in parts])
+
+    def _stored_ranges(self, table_name: str, locations: Optional[Sequence[str]]) -> pa.Table:
+        """``location``, ``first_time`` and ``last_time`` of ``table_name`` from the locations table"""
+        ranges = self.scan(LOCATIONS_TABLE, ['source_table', 'last_time'], locations, time_column='first_time')
+        ranges = ranges.filter(pc.equal(ranges.column('source_table'), table_name))
+        if ranges.num_rows == 0:
+            raise ValueError(f"{LOCATIONS_TABLE} table has no rows for {table_name}")
+        return ranges.select(['location', 'first_time', 'last_time'])
+
+    def hourly_profile(self, table_name: str, columns: Sequence[str], locations: Optional[Sequence[str]] = None,
+                       start: Optional[datetime] = None, end: Optional[datetime] = None) -> pd.DataFrame:
+        """Mean of each column per (location, hour of day)"""
+        data = self.scan(table_name, columns, locations, start, end)
+        data = data.append_column('hour', pc.hour(data.column('time')))
+        grouped = data.group_by(['location', 'hour']).aggregate([(column, 'mean') for column in columns])
+        grouped = grouped.rename_columns([name.removesuffix('_mean') for name in grouped.column_names])
+        return grouped.to_pandas().set_index(['location', 'hour']).sort_index()
+
+    def joined_hourly(self, weather_columns: Sequence[str], air_quality_columns: Sequence[str],
+                      locations: Optional[Sequence[str]] = None, start: Optional[datetime] = None,
+                      end: Optional[datetime] = None) -> pd.DataFrame:
+        """Weather and air quality readings matched on (location, time)"""
+        weather = self.scan(WEATHER_TABLE, weather_columns, locations, start, end)
+        air_quality = self.scan(AIR_QUALITY_TABLE, air_quality_columns, locations, start, end)
+        return weather.join(air_quality, keys=['location', 'time'], join_type='inner').to_pandas()
+
+    def correlations(self, pairs: Sequence[Tuple[str, str]], locations: Optional[Sequence[str]] = None,
+                     start: Optional[datetime] = None, end: Optional[datetime] = None,
+                     min_points: int = 10) -> pd.DataFrame:
+        """Pearson correlation of each (weather column, air quality column) pair per location
+
+        Columns are named ``"<weather> vs <air quality>"``; locations with
+        fewer than ``min_points`` matched hours are left out.
+        """
+        weather_columns = list(dict.fromkeys(a for a, _ in pairs))
+        air_quality_columns = list(dict.fromkeys(b for _, b in pairs))
+        joined = self.joined_hourly(weather_columns, air_quality_columns, locations, start, end)
+        return self.correlate_by_location(joined, pairs, min_points)
+
+    @staticmethod
+    def correlate_by_location(joined: pd.DataFrame, pairs: Sequence[Tuple[str, str]],
+                              min_points: int = 10) -> pd.DataFrame:
+        columns = list(dict.fromkeys([column for pair in pairs for column in pair]))
+        counts = joined.groupby('location').size()
+        keep = counts[counts >= min_points].index
+        if keep.empty:
+            return pd.DataFrame(columns=[f'{a} vs {b}' for a, b in pairs])
+        matrix = joined[joined['location'].isin(keep)].groupby('location')[columns].corr()
+        result = pd.DataFrame({f'{a} vs {b}': matrix.xs(a, level=1)[b] for a, b in pairs})
+        result['points'] = counts[keep]
+        return result.sort_index()
+
+    def threshold_episodes(self, table_name: str, column: str, threshold: float,
+                           locations: Optional[Sequence[str]] = None, start: Optional[datetime] = None,
+                           end: Optional[datetime] = None) -> pd.DataFrame:
+        """Runs of consecutive hourly readings above ``threshold`` per location
+
+        Returns ``episodes`` (number of runs), ``hours_over`` and
+        ``longest_hours``, indexed by location.
+        """
+        data = self.scan(table_name, [column], locations, start, end).to_pandas()
+        return self.episodes_by_location(data, column, threshold)
+
+    @staticmethod
+    def episodes_by_location(data: pd.DataFrame, column: str, threshold: float) -> pd.DataFrame:
+        data = data.sort_values(['location', 'time'], kind='stable')
+        over = (data[column] > threshold).to_numpy()
+        location = data['location'].to_numpy()
+        times = data['time'].to_numpy()
+
+        # A run continues when the previous reading is the same location, one hour earlier and also over
+        continues = np.zeros(len(data), dtype=bool)
+        if len(data) > 1:
+            continues[1:] = (over[:-1] & (location[1:] == location[:-1])
+                             & ((times[1:] - times[:-1]) <= EPISODE_GAP.to_timedelta64()))
+        starts = over & ~continues
+        episode_id = np.cumsum(starts)
+
+        runs = pd.DataFrame({'location': location[over], 'episode': episode_id[over]})
+        lengths = runs.groupby(['location', 'episode']).size()
+        result = pd.DataFrame({
+            'episodes': pd.Series(starts, index=location).groupby(level=0).sum(),
+            'hours_over': pd.Series(over, index=location).groupby(level=0).sum(),
+            'longest_hours': lengths.groupby(level=0).max() if not lengths.empty else pd.Series(dtype=int),
+        })
+        result['longest_hours'] = result['longest_hours'].fillna(0)
+        return result.astype(int).sort_index()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Weather Rollups
+Daily and monthly per-location summaries (min/max/mean/count of every metric)
+of the hourly weather and air quality tables. Rollup rows are recomputed from
+the hourly rows of the periods an ingestion touched, and long-horizon queries
+combine a few thousand rollup rows instead of re-aggregating millions of hours
+"""
+
+from datetime import datetime, timedelta
+from typing import List, Optional, Sequence, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+GRANULARITIES = ('day', 'month')
+ROLLUP_PREFIXES = {'day': 'daily', 'month': 'monthly'}
+ROLLUP_STATS = ('min', 'max', 'mean', 'count')
+
+# Hourly source table -> suffix of its rollup tables
+SOURCE_SUFFIXES = {'hourly_weather': 'weather', 'hourly_air_quality': 'air_quality'}
+
+
+def rollup_table_name(source_table: str, granularity: str) -> str:
+    """e.g. ('hourly_weather', 'day') -> 'daily_weather'"""
+    return f"{ROLLUP_PREFIXES[granularity]}_{SOURCE_SUFFIXES[source_table]}"
+
+
+def metric_columns(source_schema: pa.Schema) -> List[str]:
+    return [field.name for field in source_schema if field.name not in ('location', 'time')]
+
+
+def rollup_schema(source_schema: pa.Schema) -> pa.Schema:
+    """location, period start, hours in the period, then <metric>_min/_max/_mean/_count"""
+    fields = [('location', pa.utf8()), ('period', pa.timestamp('us')), ('hours', pa.int64())]
+    for metric in metric_columns(source_schema):
+        fields += [(f'{metric}_min', pa.float64()), (f'{metric}_max', pa.float64()),
+                   (f'{metric}_mean', pa.float64()), (f'{metric}_count', pa.int64())]
+    return pa.schema(fields)
+
+
+def period_start(ts: datetime, granularity: str) -> datetime:
+    if granularity == 'month':
+        return datetime(ts.year, ts.month, 1)
+    return datetime(ts.year, ts.month, ts.day)
+
+
+def next_period(ts: datetime, granularity: str) -> datetime:
+    """Start of the period after the one containing ``ts``"""
+    start = period_start(ts, granularity)
+    if granularity == 'month':
+        return datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return start + timedelta(days=1)
+
+
+def plan_window(start: datetime, end: datetime, granularities: Sequence[str] = ('month', 'day')
+                ) -> List[Tuple[Optional[str], datetime, datetime]]:
+    """Cover the half-open window [start, end) with the coarsest whole periods
+
+    Returns (granularity, lo, hi) pieces in time order; granularity None means
+    the piece is not a whole period and has to be read from the hourly table.
+    """
+    pieces = []
+
+    def cover(lo: datetime, hi: datetime, levels: Sequence[str]):
+        if lo >= hi:
+            return
+        if not levels:
+            pieces.append((None, lo, hi))
+            return
+        granularity = levels[0]
+        first = lo if period_start(lo, granularity) == lo else next_period(lo, granularity)
+        last = period_start(hi, granularity)
+        if first >= last:
+            cover(lo, hi, levels[1:])
+            return
+        cover(lo, first, levels[1:])
+        pieces.append((granularity, first, last))
+        cover(last, hi, levels[1:])
+
+    cover(start, end, list(granularities))
+    return pieces
+
+
+def compute_rollup(data: pa.Table, metrics: Sequence[str], granularity: str,
+                   schema: Optional[pa.Schema] = None) -> pa.Table:
+    """Aggregate hourly rows (location, time, metrics...) into rollup rows"""
+    data = data.append_column('period', pc.floor_temporal(data.column('time'), unit=granularity))
+    aggregations = [('time', 'count')]
+    for metric in metrics:
+        aggregations += [(metric, stat) for stat in ROLLUP_STATS]
+    grouped = data.group_by(['location', 'period']).aggregate(aggregations)
+    grouped = grouped.rename_columns(['hours' if name == 'time_count' else name for name in grouped.column_names])
+
+    names = ['location', 'period', 'hours'] + [f'{metric}_{stat}' for metric in metrics for stat in ROLLUP_STATS]
+    grouped = grouped.select(names)
+    if schema is not None:
+        grouped = grouped.cast(pa.schema([schema.field(name) for name in names]))
+    return grouped.sort_by([('location', 'ascending'), ('period', 'ascending')])
+
+
+def stale_locations(rollup: pa.Table, ranges: pa.Table, start: datetime, end: datetime) -> List[str]:
+    """Locations whose rollup rows for [start, end) do not account for every stored hour
+
+    ``ranges`` has each location's stored ``first_time`` and ``last_time``
+    (the locations table). A location is stale when the summed rollup
+    ``hours`` differ from the hours its range spans inside the window, e.g.
+    when the rollup refresh after an ingestion failed. Hourly rows are
+    expected on the hour, so a location with gaps in its hourly data is
+    always reported and read from the hourly table.
+    """
+    ranges = ranges.group_by('location').aggregate([('first_time', 'min'), ('last_time', 'max')]).to_pandas()
+    ranges = ranges.set_index('location')
+    lower = ranges['first_time_min'].clip(lower=pd.Timestamp(start)).dt.ceil('h')
+    upper = ranges['last_time_max'].clip(upper=pd.Timestamp(end) - pd.Timedelta(microseconds=1)).dt.floor('h')
+    expected = ((upper - lower) // pd.Timedelta(hours=1) + 1).clip(lower=0)
+
+    hours = rollup.group_by('location').aggregate([('hours', 'sum')]).to_pandas()
+    hours = hours.set_index('location')['hours_sum'].reindex(expected.index).fillna(0)
+    return sorted(expected.index[hours.to_numpy() != expected.to_numpy()])
+
+
+def combine_rollups(rollups: pa.Table, metrics: Sequence[str]) -> pd.DataFrame:
+    """Merge rollup rows into one row per location
+
+    Produces <metric>_mean (count-weighted), <metric>_min, <metric>_max and
+    <metric>_count, indexed by location.
+    """
+    columns = {'location': rollups.column('location')}
+    aggregations = []
+    for metric in metrics:
+        count = rollups.column(f'{metric}_count')
+        columns[f'{metric}_weighted'] = pc.multiply(rollups.column(f'{metric}_mean'), pc.cast(count, pa.float64()))
+        columns[f'{metric}_min'] = rollups.column(f'{metric}_min')
+        columns[f'{metric}_max'] = rollups.column(f'{metric}_max')
+        columns[f'{metric}_count'] = count
+        aggregations += [(f'{metric}_weighted', 'sum'), (f'{metric}_min', 'min'),
+                         (f'{metric}_max', 'max'), (f'{metric}_count', 'sum')]
+
+    grouped = pa.table(columns).group_by('location').aggregate(aggregations).to_pandas()
+    result = pd.DataFrame({'location': grouped['location']})
+    for metric in metrics:
+        count = grouped[f'{metric}_count_sum']
+        result[f'{metric}_mean'] = grouped[f'{metric}_weighted_sum'] / count.where(count > 0)
+        result[f'{metric}_min'] = grouped[f'{metric}_min_min']
+        result[f'{metric}_max'] = grouped[f'{metric}_max_max']
+        result[f'{metric}_count'] = count.astype(int)
+    return result.set_index('location').sort_index()
@@ -18,7 +18,6 @@ from protection_policies import ProtectionPoliciesManager
 from snapshot_manager import SnapshotManager
 from snapshot_restore import SnapshotRestoreManager
 
-from vastpy import VASTClient
 
 
 class Lab4Solution:
@@ -44,22 +43,9 @@ class Lab4Solution:
         self.snapshot_manager = SnapshotManager(self.config)
         self.snapshot_restore = SnapshotRestoreManager(self.config)
         self.vast_client = None
-        # Initialize vast client (used for view checks/creation)
-        vast_cfg = self.config.get_vast_config()
-        
-        # Strip protocol from address (like Lab 1 does)
-        address = vast_cfg.get('address')
-        if address.startswith('https://'):
-            address = address[8:]  # Remove 'https://' prefix
-        elif address.startswith('http://'):
-            address = address[7:]  # Remove 'http://' prefix
-        
+        # Initialize vast client (used for view checks/creation), shared with the managers above
         try:
-            self.vast_client = VASTClient(
-                address=address,
-                user=vast_cfg.get('user'),  # Use 'user' not 'username'
-                password=vast_cfg.get('password')
-            )
+            self.vast_client = self.config.get_vast_client()
         except Exception as e:
             self.logger.warning(f"Failed to initialize VAST client: {e}")
             self.vast_client = None
@@ -13,7 +13,6 @@ from datetime import datetime
 
 # Import Lab 4 configuration
 from lab4_config import Lab4Config
-from vastpy import VASTClient
 
 
 class SnapshotManager:
@@ -34,21 +33,11 @@ class SnapshotManager:
         self.config = config or Lab4Config()
         self.vast_config = self.config.get_vast_config()
         
-        # Strip protocol from address (like other labs do)
-        address = self.vast_config['address']
-        if address.startswith('https://'):
-            address = address[8:]
-        elif address.startswith('http://'):
-            address = address[7:]
-        
         # Initialize VAST client
         self.logger = logging.getLogger(__name__)
         try:
-            self.vast_client = VASTClient(
-                address=address,
-                user=self.vast_config.get('user'),
-                password=self.vast_config.get('password')
-            )
+            # Shared with the other Lab 4 managers using the same config (cached GETs)
+            self.vast_client = self.config.get_vast_client()
             self.logger.info(f"✅ VAST client initialized for snapshot management")
         except Exception as e:
             self.logger.error(f"❌ Failed to initialize VAST client: {e}")
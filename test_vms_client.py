@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Tests for the caching VAST client
+Run offline against a stub vastpy client: no VMS connection is made
+"""
+
+import threading
+import time
+
+from vms_client import CachedVASTClient, VMSCache
+
+
+class StubVASTClient:
+    """Records every request; GETs can be held open with ``release``"""
+
+    def __init__(self, url='api', log=None, release=None, started=None):
+        self.url = url
+        self.log = log if log is not None else []
+        self.release = release
+        self.started = started
+
+    def __getitem__(self, part):
+        return StubVASTClient(f'{self.url}/{part}', self.log, self.release, self.started)
+
+    def __getattr__(self, part):
+        if part.startswith('_'):
+            raise AttributeError(part)
+        return self[part]
+
+    def get(self, **params):
+        self.log.append(('GET', self.url, params))
+        if self.started is not None:
+            self.started.set()
+        if self.release is not None:
+            self.release.wait(5)
+        if params.get('fail'):
+            raise RuntimeError('VMS error')
+        return [{'url': self.url, 'params': params, 'calls': len(self.log)}]
+
+    def patch(self, **params):
+        self.log.append(('PATCH', self.url, params))
+        return {}
+
+
+def gets(stub: StubVASTClient) -> int:
+    return sum(1 for method, _, _ in stub.log if method == 'GET')
+
+
+def test_concurrent_gets_share_one_request():
+    release, started = threading.Event(), threading.Event()
+    stub = StubVASTClient(release=release, started=started)
+    client = CachedVASTClient(stub)
+    results = []
+
+    threads = [threading.Thread(target=lambda: results.append(client.quotas.get())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    started.wait(5)
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert gets(stub) == 1
+    assert len(results) == 8 and all(result == results[0] for result in results)
+    stats = client.cache_stats()
+    assert stats['misses'] == 1 and stats['coalesced'] + stats['hits'] == 7
+
+
+def test_write_during_get_is_not_cached():
+    release, started = threading.Event(), threading.Event()
+    stub = StubVASTClient(release=release, started=started)
+    client = CachedVASTClient(stub)
+
+    reader = threading.Thread(target=lambda: client.views.get(path='/raw'))
+    reader.start()
+    started.wait(5)
+    client.views[1].patch(hard_limit=1)
+    release.set()
+    reader.join(5)
+
+    # The response that was in flight during the write is not reused
+    client.views.get(path='/raw')
+    assert gets(stub) == 2
+    client.views.get(path='/raw')
+    assert gets(stub) == 2
+
+
+def test_writes_invalidate_only_their_resource():
+    stub = StubVASTClient()
+    client = CachedVASTClient(stub)
+    client.views.get()
+    client.quotas.get()
+
+    client.quotas[7].patch(hard_limit=1)
+    client.views.get()
+    client.quotas.get()
+
+    assert [url for method, url, _ in stub.log if method == 'GET'] == ['api/views', 'api/quotas', 'api/quotas']
+
+
+def test_entries_expire_after_ttl():
+    stub = StubVASTClient()
+    client = CachedVASTClient(stub, VMSCache(ttls={'quotas': 0.05}))
+
+    client.quotas.get()
+    client.quotas.get()
+    assert gets(stub) == 1
+    time.sleep(0.1)
+    client.quotas.get()
+    assert gets(stub) == 2
+
+
+def test_uncached_resources_and_errors_always_reach_vms():
+    stub = StubVASTClient()
+    client = CachedVASTClient(stub)
+
+    client.snapshots.get()
+    client.snapshots.get()
+    for _ in range(2):
+        try:
+            client.views.get(fail=True)
+        except RuntimeError:
+            pass
+
+    assert gets(stub) == 4
+    assert client.cache_stats()['uncached'] == 2
+
+
+def test_callers_get_their_own_copy():
+    stub = StubVASTClient()
+    client = CachedVASTClient(stub)
+
+    first = client.views.get(path='/raw')
+    first[0]['url'] = 'changed'
+    first.append({'url': 'extra'})
+
+    assert client.views.get(path='/raw') == [{'url': 'api/views', 'params': {'path': '/raw'}, 'calls': 1}]
+    assert gets(stub) == 1
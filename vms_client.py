@@ -0,0 +1,168 @@
+# vms_client.py
+import copy
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds a GET response stays fresh, per top-level VMS resource. Resources not
+# listed here are not cached: snapshots, protected paths, tasks etc. change
+# state on the cluster by themselves and are polled for exactly that.
+DEFAULT_TTLS = {
+    'clusters': 60,
+    'views': 30,
+    'quotas': 15,
+    'viewpolicies': 300,
+    'protectionpolicies': 60,
+    'replicationpolicies': 300,
+    'tenants': 300,
+}
+
+
+class _Pending:
+    """A GET in flight that other callers of the same request wait on"""
+
+    def __init__(self, generation: int):
+        self.generation = generation
+        self.event = threading.Event()
+        self.result = None
+        self.error: Optional[Exception] = None
+
+
+class VMSCache:
+    """Response cache shared by a CachedVASTClient and every sub-client derived from it
+
+    Thread-safe. Concurrent identical GETs are coalesced into one VMS
+    request, and any POST/PUT/PATCH/DELETE drops the cached responses of
+    the resource it touched.
+    """
+
+    def __init__(self, ttls: Optional[Dict[str, float]] = None, default_ttl: float = 0):
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple, Tuple[float, Any]] = {}
+        self._pending: Dict[Tuple, _Pending] = {}
+        self._generations: Dict[str, int] = {}
+        self.stats = {'hits': 0, 'misses': 0, 'coalesced': 0, 'uncached': 0, 'invalidations': 0}
+
+    def ttl(self, resource: str) -> float:
+        return float(self.ttls.get(resource, self.default_ttl) or 0)
+
+    def get(self, key: Tuple, resource: str, fetch):
+        """Cached result of ``fetch()`` for ``key`` (callers get their own copy)"""
+        if self.ttl(resource) <= 0:
+            with self._lock:
+                self.stats['uncached'] += 1
+            return fetch()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.stats['hits'] += 1
+                return copy.deepcopy(entry[1])
+            pending = self._pending.get(key)
+            owner = pending is None
+            if owner:
+                pending = _Pending(self._generations.get(resource, 0))
+                self._pending[key] = pending
+                self.stats['misses'] += 1
+            else:
+                self.stats['coalesced'] += 1
+
+        if not owner:
+            pending.event.wait()
+            if pending.error is not None:
+                raise pending.error
+            return copy.deepcopy(pending.result)
+
+        try:
+            pending.result = fetch()
+            with self._lock:
+                # A mutation while the request was in flight makes its response stale
+                if self._generations.get(resource, 0) == pending.generation:
+                    self._entries[key] = (time.monotonic() + self.ttl(resource), pending.result)
+            return copy.deepcopy(pending.result)
+        except Exception as e:
+            pending.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._pending.get(key) is pending:
+                    del self._pending[key]
+            pending.event.set()
+
+    def invalidate(self, resource: Optional[str] = None):
+        """Forget cached responses of ``resource`` (all resources when None)"""
+        with self._lock:
+            self.stats['invalidations'] += 1
+            for store in (self._entries, self._pending):
+                for key in [key for key in store if resource is None or key[0][:1] == (resource,)]:
+                    del store[key]
+            for name in ([resource] if resource is not None else list(self._generations)):
+                self._generations[name] = self._generations.get(name, 0) + 1
+
+
+class CachedVASTClient:
+    """Drop-in wrapper around ``vastpy.VASTClient`` that caches GET responses
+
+    ``client.views.get(path=...)``, ``client.quotas[12].get()`` etc. work as
+    before; repeated GETs within the resource's TTL are answered from memory,
+    and writes through the wrapper invalidate the resource they touch.
+    """
+
+    def __init__(self, client, cache: Optional[VMSCache] = None, parts: Tuple[str, ...] = ()):
+        self._client = client
+        self._cache = cache if cache is not None else VMSCache()
+        self._parts = parts
+
+    def __getattr__(self, part):
+        if part.startswith('_'):
+            raise AttributeError(part)
+        return self[part]
+
+    def __getitem__(self, part):
+        return CachedVASTClient(self._client[part], self._cache, self._parts + (str(part),))
+
+    def __repr__(self):
+        return f"CachedVASTClient({self._client!r})"
+
+    @property
+    def _resource(self) -> str:
+        return self._parts[0] if self._parts else ''
+
+    def get(self, **params):
+        key = (self._parts, tuple(sorted((name, repr(value)) for name, value in params.items())))
+        return self._cache.get(key, self._resource, lambda: self._client.get(**params))
+
+    def options(self, **params):
+        return self._client.options(**params)
+
+    def _write(self, method: str, params: Dict):
+        try:
+            return getattr(self._client, method)(**params)
+        finally:
+            # Also after a failure: the change may have been applied before the error
+            self._cache.invalidate(self._resource)
+
+    def post(self, **params):
+        return self._write('post', params)
+
+    def put(self, **params):
+        return self._write('put', params)
+
+    def patch(self, **params):
+        return self._write('patch', params)
+
+    def delete(self, **params):
+        return self._write('delete', params)
+
+    def invalidate(self, resource: Optional[str] = None):
+        self._cache.invalidate(resource)
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Hit/miss counters; ``misses + uncached`` is the number of GETs sent to VMS"""
+        with self._cache._lock:
+            return dict(self._cache.stats)